@@ -6,12 +6,14 @@ from datetime import datetime, timedelta
 import numpy as np
 from typing import Dict, List
 import json
+from utils.census_forecast import CensusForecaster
 
 class AdvancedAnalytics:
     """Advanced analytics and reporting for hospital data"""
     
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        self.census_forecaster = CensusForecaster()
     
     def display_analytics_dashboard(self):
         """Main analytics dashboard"""
@@ -182,16 +184,12 @@ class AdvancedAnalytics:
         # Patient flow analysis
         st.markdown("#### Patient Flow Trends")
         
-        # Generate sample patient flow data
-        dates = [datetime.now() - timedelta(days=x) for x in range(30, 0, -1)]
-        admissions = np.random.poisson(15, 30)  # Average 15 admissions per day
-        discharges = np.random.poisson(14, 30)  # Average 14 discharges per day
+        department = st.selectbox("Department", self.census_forecaster.departments(), key="flow_department")
+        flow_df = self.census_forecaster.daily_flow(department, days=30)
         
-        flow_df = pd.DataFrame({
-            'Date': dates,
-            'Admissions': admissions,
-            'Discharges': discharges
-        })
+        if flow_df[['Admissions', 'Discharges']].to_numpy().sum() == 0:
+            st.info("No admissions or discharges recorded in the last 30 days.")
+            return
         
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=flow_df['Date'], y=flow_df['Admissions'], 
@@ -206,6 +204,17 @@ class AdvancedAnalytics:
             font=dict(color='white')
         )
         st.plotly_chart(fig, use_container_width=True)
+        
+        # Census
+        census_df = self.census_forecaster.census_series(department, days=30, freq='daily')
+        fig = px.line(census_df, x='timestamp', y='census', title="Average Daily Census (Last 30 Days)")
+        fig.update_traces(line=dict(color='#00ccff', width=3))
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white')
+        )
+        st.plotly_chart(fig, use_container_width=True)
     
     def _display_financial_analytics(self):
         """Display financial analytics"""
@@ -288,30 +297,36 @@ class AdvancedAnalytics:
         with col1:
             st.markdown("#### Predicted Patient Admissions")
             
-            # Generate prediction data
-            future_dates = [datetime.now() + timedelta(days=x) for x in range(1, 8)]
-            predicted_admissions = np.random.poisson(16, 7)  # Predicted admissions
-            confidence_upper = predicted_admissions + np.random.poisson(3, 7)
-            confidence_lower = np.maximum(0, predicted_admissions - np.random.poisson(3, 7))
+            department = st.selectbox("Department", self.census_forecaster.departments(),
+                                      key="forecast_department")
+            forecast_df = self.census_forecaster.forecast(department, days=7)
             
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=future_dates, y=predicted_admissions,
-                                    mode='lines+markers', name='Predicted',
-                                    line=dict(color='#00ff88')))
-            fig.add_trace(go.Scatter(x=future_dates, y=confidence_upper,
-                                    fill=None, mode='lines', line_color='rgba(0,0,0,0)',
-                                    showlegend=False))
-            fig.add_trace(go.Scatter(x=future_dates, y=confidence_lower,
-                                    fill='tonexty', mode='lines', line_color='rgba(0,0,0,0)',
-                                    name='Confidence Interval', fillcolor='rgba(0,255,136,0.2)'))
-            
-            fig.update_layout(
-                title="7-Day Admission Forecast",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white')
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            if forecast_df.empty:
+                st.info("Not enough admission history to forecast admissions yet.")
+            else:
+                future_dates = forecast_df['Date']
+                
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=future_dates, y=forecast_df['Predicted Admissions'],
+                                        mode='lines+markers', name='Predicted',
+                                        line=dict(color='#00ff88')))
+                fig.add_trace(go.Scatter(x=future_dates, y=forecast_df['Upper'],
+                                        fill=None, mode='lines', line_color='rgba(0,0,0,0)',
+                                        showlegend=False))
+                fig.add_trace(go.Scatter(x=future_dates, y=forecast_df['Lower'],
+                                        fill='tonexty', mode='lines', line_color='rgba(0,0,0,0)',
+                                        name='Confidence Interval', fillcolor='rgba(0,255,136,0.2)'))
+                fig.add_trace(go.Scatter(x=future_dates, y=forecast_df['Predicted Census'],
+                                        mode='lines+markers', name='Predicted Census',
+                                        line=dict(color='#00ccff', dash='dot')))
+                
+                fig.update_layout(
+                    title="7-Day Admission Forecast",
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white')
+                )
+                st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.markdown("#### Risk Score Predictions")
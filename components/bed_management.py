@@ -4,6 +4,17 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 import json
 import os
+from utils.bed_transactions import BedTransactionManager, BedAllocationError
+from utils.bed_assignment import BedOccupancyIndex, BedAssignmentEngine
+from utils.bed_events import BedEventStore
+from utils.batch_render import card_row, render_cards
+
+BED_STATUS_COLORS = {
+    'Available': '#00ff88',
+    'Occupied': '#ff4444',
+    'Maintenance': '#ffa500',
+    'Reserved': '#00ccff'
+}
 
 class BedManagementSystem:
     """Complete bed and room management system"""
@@ -13,13 +24,17 @@ class BedManagementSystem:
         self.admissions_file = "data/admissions.json"
         self.transfers_file = "data/transfers.json"
         self.rooms_file = "data/rooms.json"
+        self.bed_events = BedEventStore()
+        self.transactions = BedTransactionManager(self.beds_file, self.admissions_file, self.transfers_file,
+                                                  event_store=self.bed_events)
+        self.assignment_engine = BedAssignmentEngine()
     
     def display_bed_management(self):
         """Main bed management dashboard"""
         st.markdown("## 🛏️ Bed & Room Management")
         
-        tab1, tab2, tab3, tab4 = st.tabs([
-            "📊 Bed Status", "🏥 Patient Admissions", "↔️ Transfers", "⚙️ Room Management"
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+            "📊 Bed Status", "🏥 Patient Admissions", "↔️ Transfers", "🕓 Bed History", "⚙️ Room Management"
         ])
         
         with tab1:
@@ -32,6 +47,9 @@ class BedManagementSystem:
             self._manage_transfers()
         
         with tab4:
+            self._display_bed_history()
+        
+        with tab5:
             self._manage_rooms()
     
     def _display_bed_status(self):
@@ -41,14 +59,15 @@ class BedManagementSystem:
         beds = self._load_data(self.beds_file)
         
         if not beds:
-            beds = self._initialize_default_beds()
-            self._save_data(self.beds_file, beds)
+            beds = self.transactions.add_beds(self._initialize_default_beds(), only_if_empty=True)
         
         # Calculate bed statistics
-        total_beds = len(beds)
-        occupied_beds = sum(1 for bed in beds.values() if bed.get('status') == 'Occupied')
-        available_beds = sum(1 for bed in beds.values() if bed.get('status') == 'Available')
-        maintenance_beds = sum(1 for bed in beds.values() if bed.get('status') == 'Maintenance')
+        index = BedOccupancyIndex(beds)
+        totals = index.totals()
+        total_beds = totals['total']
+        occupied_beds = totals['occupied']
+        available_beds = totals['available']
+        maintenance_beds = totals['maintenance']
         
         occupancy_rate = (occupied_beds / total_beds * 100) if total_beds > 0 else 0
         
@@ -73,20 +92,7 @@ class BedManagementSystem:
         # Bed status by department
         st.markdown("### 🏥 Bed Status by Department")
         
-        departments = {}
-        for bed in beds.values():
-            dept = bed.get('department', 'Unknown')
-            if dept not in departments:
-                departments[dept] = {'total': 0, 'occupied': 0, 'available': 0, 'maintenance': 0}
-            
-            departments[dept]['total'] += 1
-            status = bed.get('status', 'Unknown')
-            if status == 'Occupied':
-                departments[dept]['occupied'] += 1
-            elif status == 'Available':
-                departments[dept]['available'] += 1
-            elif status == 'Maintenance':
-                departments[dept]['maintenance'] += 1
+        departments = index.departments
         
         # Display department status
         for dept_name, dept_data in departments.items():
@@ -111,29 +117,18 @@ class BedManagementSystem:
         # Group beds by department for visual display
         for dept_name, dept_data in departments.items():
             with st.expander(f"{dept_name} Department ({dept_data['available']} available)"):
-                dept_beds = {bid: bed for bid, bed in beds.items() if bed.get('department') == dept_name}
+                dept_beds = [bed for bed in beds.values() if bed.get('department') == dept_name]
                 
                 # Display beds in a grid
-                cols = st.columns(5)
-                for i, (bed_id, bed) in enumerate(dept_beds.items()):
-                    col_idx = i % 5
-                    
-                    status_color = {
-                        'Available': '#00ff88',
-                        'Occupied': '#ff4444',
-                        'Maintenance': '#ffa500',
-                        'Reserved': '#00ccff'
-                    }.get(bed.get('status'), '#666666')
-                    
-                    with cols[col_idx]:
-                        st.markdown(f"""
-                        <div style="background: rgba(255,255,255,0.05); border: 2px solid {status_color}; 
-                                    border-radius: 8px; padding: 10px; margin: 5px; text-align: center;">
-                            <strong>{bed.get('bed_number', 'N/A')}</strong><br>
-                            <small style="color: {status_color};">{bed.get('status', 'Unknown')}</small><br>
-                            {f"<small>{bed.get('patient_name', '')}</small>" if bed.get('patient_name') else ""}
-                        </div>
-                        """, unsafe_allow_html=True)
+                render_cards([
+                    card_row(
+                        BED_STATUS_COLORS.get(bed.get('status'), '#666666'),
+                        bed.get('bed_number', 'N/A'),
+                        bed.get('status', 'Unknown'),
+                        [bed.get('patient_name', '')]
+                    )
+                    for bed in dept_beds
+                ], layout='grid', columns=5)
     
     def _manage_admissions(self):
         """Manage patient admissions"""
@@ -161,10 +156,10 @@ class BedManagementSystem:
                     
                     # Get available beds for selected department
                     beds = self._load_data(self.beds_file)
+                    rooms_by_bed = {bed['bed_number']: bed.get('room_number') for bed in beds.values()}
                     available_beds = [
-                        f"{bed['bed_number']} ({bed['room_number']})"
-                        for bed in beds.values()
-                        if bed.get('department') == department and bed.get('status') == 'Available'
+                        f"{bed_number} ({rooms_by_bed[bed_number]})"
+                        for bed_number in BedOccupancyIndex(beds).available_beds(department)
                     ]
                     
                     if available_beds:
@@ -199,20 +194,19 @@ class BedManagementSystem:
                             'created_at': datetime.now().isoformat()
                         }
                         
-                        # Save admission
-                        admissions = self._load_data(self.admissions_file)
-                        admission_id = f"ADM_{len(admissions) + 1:04d}"
-                        admissions[admission_id] = admission_data
-                        self._save_data(self.admissions_file, admissions)
-                        
-                        # Update bed status
-                        self._update_bed_status(bed_number, 'Occupied', patient_name, patient_id)
-                        
-                        st.success(f"Patient {patient_name} admitted successfully! Admission ID: {admission_id}")
-                        st.rerun()
+                        # Save admission and occupy the bed in one transaction
+                        try:
+                            admission_id = self.transactions.admit_patient(admission_data)
+                        except BedAllocationError as e:
+                            st.error(str(e))
+                        else:
+                            st.success(f"Patient {patient_name} admitted successfully! Admission ID: {admission_id}")
+                            st.rerun()
                     else:
                         st.error("Please fill in all required fields and select an available bed.")
         
+        self._bulk_bed_assignment()
+        
         # Current admissions
         admissions = self._load_data(self.admissions_file)
         current_admissions = {
@@ -244,11 +238,81 @@ class BedManagementSystem:
                 
                 with col3:
                     if st.button("📤 Discharge", key=f"discharge_{adm_id}"):
-                        self._discharge_patient(adm_id, admission)
-                        st.rerun()
+                        try:
+                            self._discharge_patient(adm_id, admission)
+                        except BedAllocationError as e:
+                            st.error(str(e))
+                        else:
+                            st.rerun()
         else:
             st.info("No current admissions.")
     
+    def _bulk_bed_assignment(self):
+        """Propose and apply bed placements for a queue of pending admissions"""
+        with st.expander("🧮 Bulk Bed Assignment"):
+            st.markdown("Enter the pending admissions queue (e.g. ED boarders) and let the optimizer place them.")
+            
+            queue_df = st.data_editor(
+                pd.DataFrame(columns=['patient_id', 'patient_name', 'department', 'acuity', 'isolation', 'bed_type']),
+                num_rows="dynamic",
+                column_config={
+                    'department': st.column_config.SelectboxColumn("Department", options=[
+                        "Emergency", "ICU", "General Surgery", "Cardiology", 
+                        "Pediatrics", "Maternity", "Orthopedics"
+                    ]),
+                    'acuity': st.column_config.NumberColumn("Acuity (1-5)", min_value=1, max_value=5, default=3),
+                    'isolation': st.column_config.CheckboxColumn("Isolation", default=False),
+                    'bed_type': st.column_config.TextColumn("Bed Type (optional)")
+                },
+                key="bulk_assignment_queue"
+            )
+            
+            if st.button("🧮 Propose Placements"):
+                queue = [
+                    row for row in queue_df.to_dict('records')
+                    if row.get('patient_id') and row.get('patient_name') and row.get('department')
+                ]
+                beds = self._load_data(self.beds_file)
+                st.session_state.bulk_assignment_proposal = self.assignment_engine.propose(
+                    queue, BedOccupancyIndex(beds)
+                )
+            
+            proposal = st.session_state.get('bulk_assignment_proposal')
+            if proposal:
+                if proposal['placements']:
+                    st.dataframe(pd.DataFrame(proposal['placements'])[[
+                        'patient_id', 'patient_name', 'department', 'acuity',
+                        'bed_number', 'assigned_department', 'overflow'
+                    ]], use_container_width=True)
+                if proposal['unplaced']:
+                    st.warning(f"{len(proposal['unplaced'])} patient(s) could not be placed: " +
+                               ", ".join(str(p['patient_name']) for p in proposal['unplaced']))
+                
+                if proposal['placements'] and st.button("✅ Admit All Proposed"):
+                    now = datetime.now()
+                    admissions = [{
+                        'patient_id': p['patient_id'],
+                        'patient_name': p['patient_name'],
+                        'admission_date': now.strftime("%Y-%m-%d"),
+                        'admission_time': now.strftime("%H:%M:%S"),
+                        'admission_type': 'Emergency' if p['department'] == 'Emergency' else 'Transfer',
+                        'department': p['assigned_department'],
+                        'bed_number': p['bed_number'],
+                        'acuity': p.get('acuity'),
+                        'isolation': bool(p.get('isolation')),
+                        'status': 'Admitted',
+                        'created_at': now.isoformat()
+                    } for p in proposal['placements']]
+                    
+                    try:
+                        admission_ids = self.transactions.admit_patients(admissions)
+                    except BedAllocationError as e:
+                        st.error(f"{e}. Please propose placements again.")
+                    else:
+                        del st.session_state.bulk_assignment_proposal
+                        st.success(f"Admitted {len(admission_ids)} patients.")
+                        st.rerun()
+    
     def _manage_transfers(self):
         """Manage patient transfers"""
         st.markdown("### ↔️ Patient Transfers")
@@ -294,10 +358,14 @@ class BedManagementSystem:
                 
                 if st.button("Transfer Patient") and new_bed:
                     patient_id = selected_patient.split('ID: ')[1].split(')')[0]
-                    self._process_transfer(patient_id, new_department, new_bed.split(' (')[0], 
-                                        transfer_reason, new_doctor, str(transfer_date))
-                    st.success("Patient transferred successfully!")
-                    st.rerun()
+                    try:
+                        self._process_transfer(patient_id, new_department, new_bed.split(' (')[0], 
+                                            transfer_reason, new_doctor, str(transfer_date))
+                    except BedAllocationError as e:
+                        st.error(str(e))
+                    else:
+                        st.success("Patient transferred successfully!")
+                        st.rerun()
             else:
                 st.info("No patients available for transfer.")
         
@@ -318,9 +386,88 @@ class BedManagementSystem:
                     <strong>Reason:</strong> {transfer.get('reason', 'N/A')}
                 </div>
                 """, unsafe_allow_html=True)
+            
+            if len(transfers) > 5 and st.checkbox("Show full transfer history"):
+                st.dataframe(pd.DataFrame.from_dict(transfers, orient='index'), use_container_width=True)
         else:
             st.info("No transfer history.")
     
+    def _display_bed_history(self):
+        """Point-in-time bed occupancy and bed change history"""
+        st.markdown("### 🕓 Bed History")
+        
+        departments = ["All", "Emergency", "ICU", "General Surgery", "Cardiology", 
+                       "Pediatrics", "Maternity", "Orthopedics"]
+        
+        # Point-in-time occupancy
+        st.markdown("#### Occupancy at a Point in Time")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            department = st.selectbox("Department", departments, key="history_department")
+        
+        with col2:
+            query_date = st.date_input("Date", datetime.now().date(), key="history_date")
+        
+        with col3:
+            query_time = st.time_input("Time", datetime.now().time().replace(second=0, microsecond=0),
+                                       key="history_time")
+        
+        dept_filter = None if department == "All" else department
+        when = datetime.combine(query_date, query_time)
+        counts = self.bed_events.occupancy_at(when, dept_filter)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Total Beds", counts['total'])
+        
+        with col2:
+            st.metric("Occupied", counts['occupied'])
+        
+        with col3:
+            st.metric("Available", counts['available'])
+        
+        with col4:
+            occupancy = (counts['occupied'] / counts['total'] * 100) if counts['total'] > 0 else 0
+            st.metric("Occupancy Rate", f"{occupancy:.1f}%")
+        
+        # Occupancy over time
+        st.markdown("#### Occupancy Over Time")
+        days = st.slider("Days to show", min_value=1, max_value=30, value=7, key="history_days")
+        end = datetime.now().replace(minute=0, second=0, microsecond=0)
+        series = self.bed_events.occupancy_series(end - timedelta(days=days), end, timedelta(hours=1), dept_filter)
+        
+        if series and any(point['total'] for point in series):
+            import plotly.express as px
+            series_df = pd.DataFrame(series)
+            fig = px.line(series_df, x='timestamp', y=['occupied', 'total'],
+                          title=f"Hourly Occupancy - {department}")
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='white')
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No bed history recorded for this period yet.")
+        
+        # Individual bed history
+        st.markdown("#### Bed Change Log")
+        beds = self._load_data(self.beds_file)
+        bed_numbers = sorted(bed['bed_number'] for bed in beds.values())
+        
+        if bed_numbers:
+            selected_bed = st.selectbox("Bed", bed_numbers, key="history_bed")
+            events = self.bed_events.history(selected_bed, datetime.now() - timedelta(days=days))
+            
+            if events:
+                st.dataframe(pd.DataFrame(events)[[
+                    'timestamp', 'cause', 'from_status', 'status', 'patient_name', 'department'
+                ]].iloc[::-1], use_container_width=True)
+            else:
+                st.info(f"No changes to bed {selected_bed} in the last {days} days.")
+    
     def _manage_rooms(self):
         """Manage rooms and bed configuration"""
         st.markdown("### ⚙️ Room Management")
@@ -441,7 +588,7 @@ class BedManagementSystem:
     
     def _create_beds_for_room(self, room_number: str, bed_count: int, department: str, room_type: str):
         """Create beds for a new room"""
-        beds = self._load_data(self.beds_file)
+        beds = {}
         
         for i in range(1, bed_count + 1):
             bed_id = f"{room_number}_BED_{i}"
@@ -458,80 +605,21 @@ class BedManagementSystem:
                 'created_date': datetime.now().strftime("%Y-%m-%d")
             }
         
-        self._save_data(self.beds_file, beds)
+        self.transactions.add_beds(beds)
     
     def _update_bed_status(self, bed_number: str, status: str, patient_name: str = None, patient_id: str = None):
         """Update bed status"""
-        beds = self._load_data(self.beds_file)
-        
-        for bed_id, bed in beds.items():
-            if bed['bed_number'] == bed_number:
-                bed['status'] = status
-                bed['patient_name'] = patient_name
-                bed['patient_id'] = patient_id
-                bed['last_updated'] = datetime.now().isoformat()
-                break
-        
-        self._save_data(self.beds_file, beds)
+        self.transactions.update_bed_status(bed_number, status, patient_name, patient_id)
     
     def _discharge_patient(self, admission_id: str, admission_data: Dict):
-        """Discharge a patient"""
-        # Update admission status
-        admissions = self._load_data(self.admissions_file)
-        admissions[admission_id]['status'] = 'Discharged'
-        admissions[admission_id]['discharge_date'] = datetime.now().strftime("%Y-%m-%d")
-        self._save_data(self.admissions_file, admissions)
-        
-        # Free up the bed
-        bed_number = admission_data.get('bed_number')
-        if bed_number:
-            self._update_bed_status(bed_number, 'Available')
+        """Discharge a patient and free the bed atomically"""
+        self.transactions.discharge_patient(admission_id)
     
     def _process_transfer(self, patient_id: str, new_department: str, new_bed: str, 
                          reason: str, new_doctor: str, transfer_date: str):
-        """Process patient transfer"""
-        # Get current admission
-        admissions = self._load_data(self.admissions_file)
-        
-        for adm_id, admission in admissions.items():
-            if admission['patient_id'] == patient_id and admission['status'] == 'Admitted':
-                old_bed = admission.get('bed_number')
-                old_department = admission['department']
-                
-                # Update admission
-                admission['department'] = new_department
-                admission['bed_number'] = new_bed
-                admission['attending_doctor'] = new_doctor
-                
-                # Free old bed
-                if old_bed:
-                    self._update_bed_status(old_bed, 'Available')
-                
-                # Occupy new bed
-                self._update_bed_status(new_bed, 'Occupied', admission['patient_name'], patient_id)
-                
-                # Record transfer
-                transfers = self._load_data(self.transfers_file)
-                transfer_id = f"TRF_{len(transfers) + 1:04d}"
-                
-                transfer_data = {
-                    'patient_id': patient_id,
-                    'patient_name': admission['patient_name'],
-                    'from_department': old_department,
-                    'from_bed': old_bed,
-                    'to_department': new_department,
-                    'to_bed': new_bed,
-                    'reason': reason,
-                    'new_doctor': new_doctor,
-                    'transfer_date': transfer_date,
-                    'created_at': datetime.now().isoformat()
-                }
-                
-                transfers[transfer_id] = transfer_data
-                self._save_data(self.transfers_file, transfers)
-                break
-        
-        self._save_data(self.admissions_file, admissions)
+        """Process patient transfer as a single transaction across beds, admissions and transfers"""
+        return self.transactions.transfer_patient(patient_id, new_department, new_bed,
+                                                  reason, new_doctor, transfer_date)
     
     def _load_data(self, filename: str) -> Dict:
         """Load data from JSON file"""
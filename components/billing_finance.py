@@ -1,9 +1,26 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, Iterator, List
 import json
 import os
+from utils.revenue_aggregates import RevenueAggregateStore, last_months
+from utils.billing_ledger import BillingLedger, LedgerError
+from utils.storage import file_lock
+from utils.ar_aging import ReceivablesAgingIndex
+from utils.claims_pipeline import ClaimsPipeline, REQUIRED_COLUMNS
+from utils.service_catalog import ServiceCatalog, PricingEngine, PricingError
+from utils.financial_export import FinancialExporter, ExportError, EXPORT_FORMATS
+from utils.batch_render import card_row, render_cards
+from components.pdf_generator import PDFReportGenerator
+
+CLAIM_STATUS_COLORS = {
+    'Submitted': '#00ccff',
+    'Under Review': '#ffa500',
+    'Approved': '#00ff88',
+    'Denied': '#ff4444',
+    'Paid': '#00ff88'
+}
 
 class BillingFinanceManager:
     """Complete billing and financial management system"""
@@ -13,6 +30,43 @@ class BillingFinanceManager:
         self.payments_file = "data/payments.json"
         self.insurance_file = "data/insurance.json"
         self.services_file = "data/services.json"
+        self.exports_dir = "data/exports"
+        self.pdf_generator = PDFReportGenerator()
+        self.claims_pipeline = ClaimsPipeline(self.insurance_file, self.services_file)
+        self.catalog = ServiceCatalog(self.services_file)
+        self.pricing = PricingEngine(self.catalog)
+        self.revenue = RevenueAggregateStore(services_file=self.services_file)
+        self.ledger = BillingLedger()
+        
+        if self.ledger.is_empty():
+            # Opening entries for bills and payments recorded before the ledger
+            self.ledger.bootstrap(self._load_data(self.bills_file), self._load_data(self.payments_file))
+        self.aging = ReceivablesAgingIndex(self.ledger, self._load_data(self.bills_file))
+        self.exporter = FinancialExporter(
+            self.bills_file, self.payments_file, self.insurance_file,
+            bill_status=lambda bill_id, bill: self.ledger.bill_status(bill_id, bill.get('status'))
+        )
+    
+    def export_bills(self, fmt: str = 'csv', **filters) -> Iterator[bytes]:
+        """
+        Stream bills as CSV or Parquet.
+        
+        Args:
+            fmt: 'csv' or 'parquet'
+            **filters: start_date, end_date, status, department
+        
+        Returns:
+            Generator of encoded chunks
+        """
+        return self.exporter.stream('bills', fmt, **filters)
+    
+    def export_payments(self, fmt: str = 'csv', **filters) -> Iterator[bytes]:
+        """Stream payments as CSV or Parquet (filters: start_date, end_date, department)"""
+        return self.exporter.stream('payments', fmt, **filters)
+    
+    def export_claims(self, fmt: str = 'csv', **filters) -> Iterator[bytes]:
+        """Stream insurance claims as CSV or Parquet (filters: start_date, end_date, status)"""
+        return self.exporter.stream('claims', fmt, **filters)
     
     def display_billing_dashboard(self):
         """Main billing and finance dashboard"""
@@ -43,19 +97,20 @@ class BillingFinanceManager:
         st.markdown("### 💰 Financial Overview")
         
         bills = self._load_data(self.bills_file)
-        payments = self._load_data(self.payments_file)
+        
+        if not self.revenue.exists():
+            # Backfill aggregates for bills written before they were kept
+            self.revenue.rebuild(bills, self._load_data(self.payments_file))
         
         # Calculate financial metrics
-        total_revenue = sum(bill.get('total_amount', 0) for bill in bills.values())
-        total_paid = sum(payment.get('amount', 0) for payment in payments.values())
+        totals = self.revenue.totals()
+        total_revenue = totals['billed']
+        total_paid = totals['collected']
         outstanding = total_revenue - total_paid
         
         # This month's metrics
         current_month = datetime.now().strftime("%Y-%m")
-        monthly_revenue = sum(
-            bill.get('total_amount', 0) for bill in bills.values() 
-            if bill.get('bill_date', '').startswith(current_month)
-        )
+        monthly_revenue = self.revenue.month(current_month)['billed']
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -76,19 +131,9 @@ class BillingFinanceManager:
         # Revenue trends
         st.markdown("### 📈 Revenue Trends")
         
-        # Generate sample revenue data for last 6 months
-        months = []
-        revenues = []
-        
-        for i in range(6, 0, -1):
-            month_date = datetime.now() - timedelta(days=i*30)
-            months.append(month_date.strftime("%Y-%m"))
-            # Calculate revenue for each month
-            month_revenue = sum(
-                bill.get('total_amount', 0) for bill in bills.values()
-                if bill.get('bill_date', '').startswith(month_date.strftime("%Y-%m"))
-            )
-            revenues.append(month_revenue if month_revenue > 0 else 15000 + i * 2000)  # Sample data
+        months = last_months(6)
+        series = self.revenue.monthly_series(months)
+        revenues = [month['billed'] for month in series]
         
         # Create revenue chart
         import plotly.express as px
@@ -101,26 +146,69 @@ class BillingFinanceManager:
         )
         st.plotly_chart(fig, use_container_width=True)
         
+        by_category = self.revenue.breakdown(months, by='category')
+        if by_category:
+            fig = px.pie(values=list(by_category.values()), names=list(by_category.keys()),
+                         title="Revenue by Service Category (6 Months)")
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='white')
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        if st.button("🔄 Rebuild Revenue Aggregates"):
+            self.revenue.rebuild(bills, self._load_data(self.payments_file))
+            st.success("Revenue aggregates rebuilt from bills and payments.")
+            st.rerun()
+        
+        self._export_financial_data()
+        
         # Outstanding bills
-        st.markdown("### 📋 Outstanding Bills")
-        outstanding_bills = {
-            bill_id: bill for bill_id, bill in bills.items() 
-            if bill.get('status') in ['Pending', 'Partially Paid']
-        }
+        st.markdown("### 📋 Accounts Receivable Aging")
+        aging_totals = self.aging.totals()
+        
+        if not any(aging_totals.values()):
+            st.success("No outstanding bills!")
+            return
+        
+        cols = st.columns(len(aging_totals))
+        for col, (bucket, amount) in zip(cols, aging_totals.items()):
+            with col:
+                st.metric(f"{bucket} days", f"${amount:,.2f}")
+        
+        group_by = st.radio("Group by", ["Payer", "Department"], horizontal=True, key="aging_group_by")
+        st.dataframe(pd.DataFrame(self.aging.aging(by=group_by.lower())), use_container_width=True)
         
-        if outstanding_bills:
-            for bill_id, bill in list(outstanding_bills.items())[:5]:  # Show first 5
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### Oldest Outstanding Bills")
+            for debt in self.aging.oldest(5):
+                bill = bills.get(debt['bill_id'], {})
                 st.markdown(f"""
                 <div style="background: rgba(255, 165, 0, 0.1); border: 2px solid rgba(255, 165, 0, 0.3); 
                             border-radius: 10px; padding: 15px; margin: 10px 0;">
-                    <strong>Bill #{bill_id}</strong> - {bill.get('patient_name', 'Unknown')}<br>
-                    <strong>Amount:</strong> ${bill.get('total_amount', 0):.2f}<br>
-                    <strong>Status:</strong> {bill.get('status', 'Unknown')}<br>
-                    <strong>Due Date:</strong> {bill.get('due_date', 'N/A')}
+                    <strong>Bill #{debt['bill_id']}</strong> - {bill.get('patient_name', 'Unknown')}<br>
+                    <strong>Balance Due:</strong> ${debt['balance']:.2f}<br>
+                    <strong>Payer:</strong> {debt['payer']}<br>
+                    <strong>Due Date:</strong> {debt['due_date']} ({debt['days_past_due']} days past due)
+                </div>
+                """, unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("#### Largest Outstanding Bills")
+            for debt in self.aging.largest(5):
+                bill = bills.get(debt['bill_id'], {})
+                st.markdown(f"""
+                <div style="background: rgba(255, 68, 68, 0.1); border: 2px solid rgba(255, 68, 68, 0.3); 
+                            border-radius: 10px; padding: 15px; margin: 10px 0;">
+                    <strong>Bill #{debt['bill_id']}</strong> - {bill.get('patient_name', 'Unknown')}<br>
+                    <strong>Balance Due:</strong> ${debt['balance']:.2f}<br>
+                    <strong>Department:</strong> {debt['department']}<br>
+                    <strong>Due Date:</strong> {debt['due_date']} ({debt['days_past_due']} days past due)
                 </div>
                 """, unsafe_allow_html=True)
-        else:
-            st.success("No outstanding bills!")
     
     def _generate_patient_bill(self):
         """Generate patient bills"""
@@ -137,6 +225,10 @@ class BillingFinanceManager:
             
             with col2:
                 room_type = st.selectbox("Room Type", ["General Ward", "Private Room", "ICU", "Emergency"])
+                department = st.selectbox("Department", [
+                    "Emergency", "ICU", "General Surgery", "Cardiology", 
+                    "Pediatrics", "Maternity", "Orthopedics"
+                ])
                 doctor_name = st.text_input("Attending Doctor")
                 insurance_provider = st.text_input("Insurance Provider (Optional)")
                 insurance_id = st.text_input("Insurance ID (Optional)")
@@ -144,14 +236,15 @@ class BillingFinanceManager:
             st.markdown("#### Services & Charges")
             
             # Service selection
-            services = self._load_data(self.services_file)
-            if not services:
+            if not self.catalog.in_category():
                 # Initialize default services
-                services = self._get_default_services()
-                self._save_data(self.services_file, services)
+                self._save_data(self.services_file, self._get_default_services())
             
-            selected_services = []
-            total_amount = 0
+            active_services = self.catalog.in_category(active_only=True)
+            service_labels = {
+                f"{self.catalog.services[sid].get('code') or sid} - {self.catalog.services[sid]['name']}": sid
+                for sid in active_services
+            }
             
             # Room charges
             days_stayed = (discharge_date - admission_date).days
@@ -163,74 +256,99 @@ class BillingFinanceManager:
             }
             
             room_cost = room_charges.get(room_type, 200) * days_stayed
-            total_amount += room_cost
             
             st.write(f"**Room Charges ({room_type}):** ${room_cost:.2f} ({days_stayed} days)")
             
-            # Additional services
+            # Additional services, one row per bill line
             st.markdown("**Additional Services:**")
-            
-            for service_id, service in services.items():
-                if st.checkbox(f"{service['name']} - ${service['cost']:.2f}", key=f"service_{service_id}"):
-                    quantity = st.number_input(f"Quantity for {service['name']}", 
-                                             min_value=1, value=1, key=f"qty_{service_id}")
-                    service_total = service['cost'] * quantity
-                    selected_services.append({
-                        'name': service['name'],
-                        'cost': service['cost'],
-                        'quantity': quantity,
-                        'total': service_total
-                    })
-                    total_amount += service_total
+            service_lines = st.data_editor(
+                pd.DataFrame({'Service': pd.Series(dtype='object'), 'Quantity': pd.Series(dtype='int64')}),
+                column_config={
+                    'Service': st.column_config.SelectboxColumn("Service", options=list(service_labels),
+                                                                required=True),
+                    'Quantity': st.column_config.NumberColumn("Quantity", min_value=1, step=1, default=1)
+                },
+                num_rows="dynamic",
+                use_container_width=True,
+                key="bill_service_lines"
+            )
             
             # Taxes and discounts
             tax_rate = st.number_input("Tax Rate (%)", min_value=0.0, max_value=50.0, value=8.5) / 100
             discount = st.number_input("Discount ($)", min_value=0.0, value=0.0)
             
-            tax_amount = total_amount * tax_rate
-            final_amount = total_amount + tax_amount - discount
-            
-            st.markdown(f"**Subtotal:** ${total_amount:.2f}")
-            st.markdown(f"**Tax:** ${tax_amount:.2f}")
-            st.markdown(f"**Discount:** ${discount:.2f}")
-            st.markdown(f"**Total Amount:** ${final_amount:.2f}")
-            
             if st.form_submit_button("Generate Bill"):
                 if patient_id and patient_name:
-                    bill_data = {
-                        'patient_id': patient_id,
-                        'patient_name': patient_name,
-                        'admission_date': str(admission_date),
-                        'discharge_date': str(discharge_date),
-                        'room_type': room_type,
-                        'doctor_name': doctor_name,
-                        'insurance_provider': insurance_provider,
-                        'insurance_id': insurance_id,
-                        'room_charges': room_cost,
-                        'services': selected_services,
-                        'subtotal': total_amount,
-                        'tax_rate': tax_rate,
-                        'tax_amount': tax_amount,
-                        'discount': discount,
-                        'total_amount': final_amount,
-                        'bill_date': datetime.now().strftime("%Y-%m-%d"),
-                        'due_date': (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d"),
-                        'status': 'Pending',
-                        'created_at': datetime.now().isoformat()
-                    }
-                    
-                    bills = self._load_data(self.bills_file)
-                    bill_id = f"BILL_{len(bills) + 1:04d}"
-                    bills[bill_id] = bill_data
-                    self._save_data(self.bills_file, bills)
-                    
-                    st.success(f"Bill {bill_id} generated successfully!")
+                    lines = [
+                        (service_labels.get(row['Service']), row['Quantity'] if pd.notna(row['Quantity']) else 1)
+                        for _, row in service_lines.dropna(subset=['Service']).iterrows()
+                    ]
+                    try:
+                        quote = self.pricing.price(
+                            lines,
+                            extra_lines=[{'name': f"Room Charges ({room_type})", 'amount': room_cost,
+                                          'category': 'Room'}],
+                            tax_rate=tax_rate,
+                            discount=discount
+                        )
+                    except PricingError as e:
+                        st.error(f"Could not price bill: {e}")
+                        quote = None
                     
-                    # Option to download bill
-                    if st.button("📄 Download Bill PDF"):
-                        self._generate_bill_pdf(bill_id, bill_data)
+                    if quote:
+                        bill_data = {
+                            'patient_id': patient_id,
+                            'patient_name': patient_name,
+                            'admission_date': str(admission_date),
+                            'discharge_date': str(discharge_date),
+                            'room_type': room_type,
+                            'department': department,
+                            'doctor_name': doctor_name,
+                            'insurance_provider': insurance_provider,
+                            'insurance_id': insurance_id,
+                            'room_charges': room_cost,
+                            'services': quote['lines'],
+                            'subtotal': quote['subtotal'],
+                            'tax_rate': tax_rate,
+                            'tax_amount': quote['tax_amount'],
+                            'discount': quote['discount'],
+                            'total_amount': quote['total_amount'],
+                            'bill_date': datetime.now().strftime("%Y-%m-%d"),
+                            'due_date': (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d"),
+                            'status': 'Pending',
+                            'created_at': datetime.now().isoformat()
+                        }
+                        
+                        # Ids are allocated and saved under a lock so two sessions cannot take the same one
+                        with file_lock(self.bills_file + ".lock"):
+                            bills = self._load_data(self.bills_file)
+                            bill_id = f"BILL_{len(bills) + 1:04d}"
+                            try:
+                                self.ledger.post_bill(bill_id, bill_data)
+                            except LedgerError as e:
+                                st.error(str(e))
+                                return
+                            bills[bill_id] = bill_data
+                            self._save_data(self.bills_file, bills)
+                        self.revenue.record_bill(bill_data)
+                        
+                        st.success(
+                            f"Bill {bill_id} generated successfully! Subtotal ${quote['subtotal']:.2f}, "
+                            f"tax ${quote['tax_amount']:.2f}, discount ${quote['discount']:.2f}, "
+                            f"total ${quote['total_amount']:.2f}"
+                        )
+                        st.session_state.last_generated_bill = bill_id
                 else:
                     st.error("Please fill in patient ID and name.")
+        
+        # Option to download bill (buttons are not allowed inside the form)
+        last_bill_id = st.session_state.get('last_generated_bill')
+        if last_bill_id:
+            bill_data = self._load_data(self.bills_file).get(last_bill_id)
+            if bill_data:
+                self._generate_bill_pdf(last_bill_id, bill_data)
+        
+        self._generate_invoice_batch()
     
     def _process_payments(self):
         """Process patient payments"""
@@ -244,10 +362,10 @@ class BillingFinanceManager:
                 with col1:
                     # Get list of pending bills
                     bills = self._load_data(self.bills_file)
+                    open_balances = self.ledger.open_bills()
                     pending_bills = [
-                        f"{bill_id} - {bill['patient_name']} (${bill['total_amount']:.2f})"
-                        for bill_id, bill in bills.items()
-                        if bill.get('status') in ['Pending', 'Partially Paid']
+                        f"{bill_id} - {bills[bill_id]['patient_name']} (${balance:.2f} due)"
+                        for bill_id, balance in open_balances.items() if bill_id in bills
                     ]
                     
                     if pending_bills:
@@ -281,13 +399,21 @@ class BillingFinanceManager:
                             'recorded_at': datetime.now().isoformat()
                         }
                         
-                        payments = self._load_data(self.payments_file)
-                        payment_id = f"PAY_{len(payments) + 1:04d}"
-                        payments[payment_id] = payment_data
-                        self._save_data(self.payments_file, payments)
-                        
-                        # Update bill status
-                        self._update_bill_status(bill_id, payment_amount)
+                        with file_lock(self.payments_file + ".lock"):
+                            payments = self._load_data(self.payments_file)
+                            payment_id = f"PAY_{len(payments) + 1:04d}"
+                            
+                            # Allocate the payment to the bill in the ledger first, so a
+                            # rejected payment is never saved
+                            try:
+                                self.ledger.post_payment(payment_id, payment_data)
+                            except LedgerError as e:
+                                st.error(str(e))
+                                return
+                            
+                            payments[payment_id] = payment_data
+                            self._save_data(self.payments_file, payments)
+                        self.revenue.record_payment(payment_data, bills.get(bill_id))
                         
                         st.success(f"Payment {payment_id} recorded successfully!")
                         st.rerun()
@@ -313,6 +439,21 @@ class BillingFinanceManager:
                 """, unsafe_allow_html=True)
         else:
             st.info("No payments recorded yet.")
+        
+        with st.expander("🔍 Ledger Reconciliation"):
+            trial_balance = self.ledger.trial_balance()
+            if trial_balance:
+                st.dataframe(pd.DataFrame(
+                    [{'Account': account, 'Balance': balance} for account, balance in trial_balance.items()]
+                ), use_container_width=True)
+            
+            if st.button("Run Reconciliation"):
+                issues = self.ledger.reconcile(self._load_data(self.bills_file), payments)
+                if issues:
+                    st.warning(f"{len(issues)} discrepancies found between the ledger and billing records.")
+                    st.dataframe(pd.DataFrame(issues), use_container_width=True)
+                else:
+                    st.success("Ledger is balanced and matches all bills and payments.")
     
     def _manage_insurance(self):
         """Manage insurance claims"""
@@ -353,42 +494,80 @@ class BillingFinanceManager:
                         'created_at': datetime.now().isoformat()
                     }
                     
-                    claims = self._load_data(self.insurance_file)
-                    claim_id = f"CLM_{len(claims) + 1:04d}"
-                    claims[claim_id] = claim_data
-                    self._save_data(self.insurance_file, claims)
+                    # Same lock as batch imports, so neither drops the other's claims
+                    with file_lock(self.claims_pipeline.lock_file):
+                        claims = self._load_data(self.insurance_file)
+                        claim_id = f"CLM_{len(claims) + 1:04d}"
+                        claims[claim_id] = claim_data
+                        self._save_data(self.insurance_file, claims)
                     
                     st.success(f"Insurance claim {claim_id} submitted successfully!")
                     st.rerun()
         
+        self._import_claim_batch()
+        
         # Display existing claims
         claims = self._load_data(self.insurance_file)
         
         if claims:
             st.markdown("#### Insurance Claims Status")
             
-            for claim_id, claim in claims.items():
-                status_color = {
-                    'Submitted': '#00ccff',
-                    'Under Review': '#ffa500',
-                    'Approved': '#00ff88',
-                    'Denied': '#ff4444',
-                    'Paid': '#00ff88'
-                }.get(claim['status'], '#ffffff')
-                
-                st.markdown(f"""
-                <div style="background: rgba(255,255,255,0.05); border-left: 4px solid {status_color}; 
-                            padding: 15px; margin: 10px 0; border-radius: 5px;">
-                    <strong>Claim #{claim_id}</strong> - {claim['patient_name']}<br>
-                    <strong>Provider:</strong> {claim['insurance_provider']}<br>
-                    <strong>Amount:</strong> ${claim['claim_amount']:.2f}<br>
-                    <strong>Status:</strong> <span style="color: {status_color};">{claim['status']}</span><br>
-                    <strong>Submitted:</strong> {claim['submitted_date']}
-                </div>
-                """, unsafe_allow_html=True)
+            statuses = sorted(set(claim.get('status', 'Submitted') for claim in claims.values()))
+            selected_status = st.selectbox("Filter by Status", ["All"] + statuses, key="claim_status_filter")
+            
+            render_cards([
+                card_row(
+                    CLAIM_STATUS_COLORS.get(claim['status'], '#ffffff'),
+                    f"Claim #{claim_id} - {claim['patient_name']}",
+                    claim['status'],
+                    [
+                        f"Provider: {claim['insurance_provider']}",
+                        f"Amount: ${claim.get('claim_amount') or 0:.2f}"
+                        + (f" (expected ${claim['expected_reimbursement']:.2f})"
+                           if claim.get('expected_reimbursement') else ""),
+                        claim.get('rejection_reason') or f"Submitted: {claim['submitted_date']}"
+                    ]
+                )
+                for claim_id, claim in claims.items()
+                if selected_status == "All" or claim.get('status') == selected_status
+            ], layout='list')
         else:
             st.info("No insurance claims submitted yet.")
     
+    def _import_claim_batch(self):
+        """Adjudicate a batch of claims from a CSV or JSON lines file"""
+        with st.expander("📥 Import Claim Batch"):
+            st.caption("Columns: " + ", ".join(REQUIRED_COLUMNS) + " (optional: quantity, diagnosis, provider_id, notes)")
+            uploaded = st.file_uploader("Claim file", type=["csv", "jsonl", "json"], key="claim_batch")
+            
+            if uploaded is not None and st.button("Process Batch"):
+                fmt = 'csv' if uploaded.name.lower().endswith('.csv') else 'jsonl'
+                try:
+                    results = self.claims_pipeline.run(uploaded.getvalue(), fmt=fmt)
+                except ValueError as e:
+                    st.error(f"Could not read claim file: {e}")
+                    return
+                
+                counts = results['status'].value_counts()
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Claims", len(results))
+                with col2:
+                    st.metric("Approved", int(counts.get('Approved', 0)))
+                with col3:
+                    st.metric("Under Review", int(counts.get('Under Review', 0)))
+                with col4:
+                    st.metric("Denied", int(counts.get('Denied', 0)))
+                
+                st.markdown("**Pipeline Throughput**")
+                st.dataframe(self.claims_pipeline.metrics_frame(), use_container_width=True)
+                
+                st.markdown(f"**Expected Reimbursement:** ${results['expected_reimbursement'].sum():,.2f}")
+                denied = results[results['status'] == 'Denied']
+                if not denied.empty:
+                    st.dataframe(denied[['claim_id', 'patient_name', 'treatment_code', 'rejection_reason']],
+                                 use_container_width=True)
+    
     def _manage_services(self):
         """Manage hospital services and pricing"""
         st.markdown("### ⚙️ Service Management")
@@ -434,36 +613,59 @@ class BillingFinanceManager:
                     st.success("Service added successfully!")
                     st.rerun()
         
+        # Price updates take effect from a date, earlier bills keep their prices
+        if self.catalog.in_category():
+            with st.expander("💲 Update Service Price"):
+                with st.form("update_service_price"):
+                    price_labels = {
+                        f"{self.catalog.services[sid].get('code') or sid} - {self.catalog.services[sid]['name']}": sid
+                        for sid in self.catalog.in_category()
+                    }
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        price_service = st.selectbox("Service", list(price_labels))
+                        new_price = st.number_input("New Price ($)", min_value=0.0, value=0.0, format="%.2f")
+                    
+                    with col2:
+                        effective_from = st.date_input("Effective From")
+                    
+                    if st.form_submit_button("Update Price"):
+                        try:
+                            version = self.catalog.set_price(price_labels[price_service], new_price, effective_from)
+                            st.success(f"Price version {version} saved, effective {effective_from}.")
+                        except PricingError as e:
+                            st.error(str(e))
+                
+                history = self.catalog.price_history(price_labels[price_service])
+                if history:
+                    st.dataframe(pd.DataFrame(history), use_container_width=True, hide_index=True)
+        
         # Display existing services
-        services = self._load_data(self.services_file)
+        categories = self.catalog.categories()
         
-        if services:
+        if categories:
             st.markdown("#### Hospital Services")
             
             # Filter by category
-            categories = list(set(service['category'] for service in services.values()))
             selected_category = st.selectbox("Filter by Category", ["All"] + categories)
+            service_ids = self.catalog.in_category(None if selected_category == "All" else selected_category)
             
-            filtered_services = {
-                sid: service for sid, service in services.items()
-                if selected_category == "All" or service['category'] == selected_category
-            }
+            prices = self.catalog.prices(service_ids)
+            rows = []
+            for service_id in service_ids:
+                service = self.catalog.services[service_id]
+                active = service.get('active', True)
+                rows.append(card_row(
+                    '#00ff88' if active else '#666666',
+                    f"{service['name']} ({service.get('code', 'N/A')})",
+                    'Active' if active else 'Inactive',
+                    [f"Category: {service['category']}",
+                     f"Price: ${prices[service_id]:.2f}",
+                     f"Department: {service.get('department', 'N/A')}"]
+                ))
             
-            for service_id, service in filtered_services.items():
-                status_color = '#00ff88' if service.get('active', True) else '#666666'
-                
-                st.markdown(f"""
-                <div style="background: rgba(255,255,255,0.05); border-left: 4px solid {status_color}; 
-                            padding: 15px; margin: 10px 0; border-radius: 5px;">
-                    <strong>{service['name']}</strong> ({service.get('code', 'N/A')})<br>
-                    <strong>Category:</strong> {service['category']}<br>
-                    <strong>Cost:</strong> ${service['cost']:.2f}<br>
-                    <strong>Department:</strong> {service.get('department', 'N/A')}<br>
-                    <strong>Status:</strong> <span style="color: {status_color};">
-                        {'Active' if service.get('active', True) else 'Inactive'}
-                    </span>
-                </div>
-                """, unsafe_allow_html=True)
+            render_cards(rows, layout='list', columns=1)
         else:
             st.info("No services configured yet.")
     
@@ -512,29 +714,114 @@ class BillingFinanceManager:
             }
         }
     
-    def _update_bill_status(self, bill_id: str, payment_amount: float):
-        """Update bill status based on payment"""
-        bills = self._load_data(self.bills_file)
+    def _generate_bill_pdf(self, bill_id: str, bill_data: Dict):
+        """Generate the PDF bill on request, keeping it until the bill or its payments change"""
+        key = (bill_id, self.ledger.paid(bill_id))
+        cached = st.session_state.get('bill_pdf')
+        if cached is None or cached[0] != key:
+            if not st.button("📄 Prepare Bill PDF", key=f"prepare_{bill_id}"):
+                return
+            cached = (key, self.pdf_generator.generate_invoice(bill_id, bill_data, key[1]))
+            st.session_state.bill_pdf = cached
         
-        if bill_id in bills:
-            bill = bills[bill_id]
-            current_paid = bill.get('paid_amount', 0)
-            new_paid = current_paid + payment_amount
-            total_amount = bill['total_amount']
+        st.download_button(
+            "📄 Download Bill PDF",
+            data=cached[1],
+            file_name=f"{bill_id}.pdf",
+            mime="application/pdf",
+            key=f"download_{bill_id}"
+        )
+    
+    def _generate_invoice_batch(self):
+        """Render all invoices for a billing period into a ZIP archive"""
+        with st.expander("📦 Batch Invoice Generation"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                start_date = st.date_input("From", datetime.now().date().replace(day=1), key="invoice_from")
+            with col2:
+                end_date = st.date_input("To", datetime.now().date(), key="invoice_to")
+            with col3:
+                workers = st.number_input("Worker Processes", min_value=1, max_value=32,
+                                          value=os.cpu_count() or 1, key="invoice_workers")
             
-            bill['paid_amount'] = new_paid
+            archive_path = os.path.join(self.exports_dir, f"invoices_{start_date}_{end_date}.zip")
             
-            if new_paid >= total_amount:
-                bill['status'] = 'Paid'
-            elif new_paid > 0:
-                bill['status'] = 'Partially Paid'
+            if st.button("Generate Invoices"):
+                bills = self._load_data(self.bills_file)
+                jobs = (
+                    (bill_id, bill, self.ledger.paid(bill_id))
+                    for bill_id, bill in bills.items()
+                    if str(start_date) <= bill.get('bill_date', '') <= str(end_date)
+                )
+                
+                os.makedirs(self.exports_dir, exist_ok=True)
+                started = datetime.now()
+                with st.spinner("Rendering invoices..."):
+                    with open(archive_path, 'wb') as archive:
+                        count = self.pdf_generator.generate_invoice_batch(jobs, archive, workers=int(workers))
+                elapsed = (datetime.now() - started).total_seconds()
+                
+                if count:
+                    st.success(f"Rendered {count} invoices in {elapsed:.1f}s.")
+                else:
+                    os.remove(archive_path)
+                    st.info("No bills found for this period.")
             
-            bills[bill_id] = bill
-            self._save_data(self.bills_file, bills)
+            if os.path.exists(archive_path):
+                with open(archive_path, 'rb') as archive:
+                    st.download_button(
+                        "⬇️ Download Invoices (ZIP)",
+                        data=archive,
+                        file_name=os.path.basename(archive_path),
+                        mime="application/zip"
+                    )
     
-    def _generate_bill_pdf(self, bill_id: str, bill_data: Dict):
-        """Generate PDF bill (placeholder)"""
-        st.info("PDF generation feature would be implemented here using ReportLab")
+    def _export_financial_data(self):
+        """Export bills, payments or claims to CSV/Parquet for finance"""
+        with st.expander("📤 Export Financial Data"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                dataset = st.selectbox("Data", ["Bills", "Payments", "Claims"], key="export_dataset")
+                fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=str.upper, key="export_format")
+            with col2:
+                start_date = st.date_input("From", datetime.now().date().replace(day=1), key="export_from")
+                end_date = st.date_input("To", datetime.now().date(), key="export_to")
+            with col3:
+                statuses = {
+                    "Bills": ["Pending", "Partially Paid", "Paid"],
+                    "Claims": list(CLAIM_STATUS_COLORS)
+                }.get(dataset)
+                status = st.selectbox("Status", ["All"] + statuses, key="export_status") if statuses else "All"
+                department = st.text_input("Department (optional)", key="export_department") \
+                    if dataset != "Claims" else ""
+            
+            export_path = os.path.join(self.exports_dir, f"{dataset.lower()}_{start_date}_{end_date}.{fmt}")
+            
+            if st.button("Export", key="export_run"):
+                filters = {'start_date': start_date, 'end_date': end_date,
+                           'department': department.strip() or None}
+                if dataset != "Payments":
+                    filters['status'] = None if status == "All" else status
+                
+                os.makedirs(self.exports_dir, exist_ok=True)
+                try:
+                    with st.spinner("Exporting..."):
+                        size = self.exporter.export(dataset.lower(), export_path, fmt, **filters)
+                    st.success(f"Exported {dataset.lower()} ({size / 1024:,.1f} KB).")
+                except ExportError as e:
+                    st.error(str(e))
+            
+            if os.path.exists(export_path):
+                with open(export_path, 'rb') as export_file:
+                    st.download_button(
+                        f"⬇️ Download {dataset} ({fmt.upper()})",
+                        data=export_file,
+                        file_name=os.path.basename(export_path),
+                        mime="text/csv" if fmt == 'csv' else "application/octet-stream",
+                        key="export_download"
+                    )
     
     def _load_data(self, filename: str) -> Dict:
         """Load data from JSON file"""
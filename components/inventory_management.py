@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List
 import json
 import os
+from utils.inventory_index import InventoryIndex
+from utils.reorder_planner import ReorderPlanner
+from utils.stock_ledger import StockLedger, StockError, MOVEMENT_TYPES
+from utils.lot_tracker import LotTracker
+from utils.maintenance_scheduler import MaintenanceScheduler, next_due
+from utils.scan_ingest import ScanReceiver, parse_scans
+from utils.job_runner import job_runner
+from utils.storage import file_lock
 
 class InventoryManager:
     """Complete inventory management for hospital supplies and equipment"""
@@ -13,6 +21,23 @@ class InventoryManager:
         self.equipment_file = "data/equipment.json"
         self.suppliers_file = "data/suppliers.json"
         self.orders_file = "data/purchase_orders.json"
+        self.work_orders_file = "data/work_orders.json"
+        self.stock_ledger = StockLedger()
+        
+        if self.stock_ledger.is_empty():
+            # Opening balances for quantities counted before the ledger
+            self.stock_ledger.bootstrap(self._load_data(self.inventory_file))
+        self.inventory_index = InventoryIndex(self.inventory_file, self.stock_ledger)
+        self.lot_tracker = LotTracker(self.stock_ledger)
+        self.scan_receiver = ScanReceiver(self.stock_ledger, self.inventory_index)
+        self.maintenance = MaintenanceScheduler(self.equipment_file, self.work_orders_file)
+        self.reorder_planner = ReorderPlanner(self.stock_ledger, self.inventory_file,
+                                              self.suppliers_file, self.orders_file)
+        
+        # Nightly batch of draft purchase orders for items due for reorder
+        job_runner().daily("reorder_drafts", "02:00", self.reorder_planner.draft_orders)
+        # Daily work orders for equipment overdue or due within the week
+        job_runner().daily("maintenance_work_orders", "06:00", self.maintenance.create_work_orders)
     
     def display_inventory_dashboard(self):
         """Main inventory management dashboard"""
@@ -43,13 +68,17 @@ class InventoryManager:
         st.markdown("### 📊 Inventory Overview")
         
         # Load inventory data
-        inventory = self._load_data(self.inventory_file)
+        index = self.inventory_index
+        index.refresh()
+        inventory = index.items
         equipment = self._load_data(self.equipment_file)
         
         # Calculate metrics
+        low_stock = index.low_stock()
+        expired = index.expired()
         total_items = len(inventory)
-        low_stock_items = sum(1 for item in inventory.values() if item.get('quantity', 0) < item.get('min_threshold', 10))
-        expired_items = sum(1 for item in inventory.values() if self._is_expired(item.get('expiry_date')))
+        low_stock_items = len(low_stock)
+        expired_items = len(expired)
         equipment_count = len(equipment)
         
         # Display metrics
@@ -70,16 +99,47 @@ class InventoryManager:
         # Low stock alerts
         if low_stock_items > 0:
             st.markdown("### 🚨 Low Stock Alerts")
-            for item_id, item in inventory.items():
-                if item.get('quantity', 0) < item.get('min_threshold', 10):
-                    st.warning(f"⚠️ {item['name']}: {item['quantity']} units remaining (Min: {item['min_threshold']})")
+            for item_id in low_stock:
+                item = inventory[item_id]
+                st.warning(f"⚠️ {item['name']}: {item['quantity']} units remaining (Min: {item['min_threshold']})")
         
         # Expiry alerts
         if expired_items > 0:
             st.markdown("### ⏰ Expiry Alerts")
-            for item_id, item in inventory.items():
-                if self._is_expired(item.get('expiry_date')):
-                    st.error(f"❌ {item['name']}: Expired on {item['expiry_date']}")
+            for item_id in expired:
+                item = inventory[item_id]
+                st.error(f"❌ {item['name']}: Expired on {item['expiry_date']}")
+        
+        self._display_waste_report(inventory)
+        
+        # Items about to expire
+        days_ahead = st.number_input("Show items expiring within (days)", min_value=1, max_value=365,
+                                     value=30, key="expiring_within_days")
+        expiring = index.expiring_within(int(days_ahead))
+        if expiring:
+            st.markdown(f"### 📅 Expiring in the Next {int(days_ahead)} Days")
+            for item_id in expiring:
+                item = inventory[item_id]
+                st.warning(f"⏳ {item['name']}: Expires on {item['expiry_date']} ({item['quantity']} {item.get('unit', 'units')})")
+    
+    def _display_waste_report(self, inventory: Dict):
+        """Value of expired stock still on the shelves, by lot"""
+        waste = self.lot_tracker.waste_report(
+            unit_costs={item_id: item.get('cost_per_unit', 0) for item_id, item in inventory.items()}
+        )
+        if waste.empty:
+            return
+        
+        st.markdown("### 🗑️ Expired Stock")
+        st.metric("Expired Stock Value", f"${waste['value'].sum():,.2f}", delta=f"{len(waste)} lots",
+                  delta_color="inverse")
+        waste.insert(1, 'name', waste['item_id'].map(lambda item_id: inventory.get(item_id, {}).get('name', item_id)))
+        st.dataframe(waste, use_container_width=True, hide_index=True)
+        
+        if st.button("Write Off Expired Lots", key="write_off_expired"):
+            written_off = self.lot_tracker.write_off_expired()
+            st.success(f"Recorded {len(written_off)} expiry movements.")
+            st.rerun()
     
     def _manage_medical_supplies(self):
         """Manage medical supplies inventory"""
@@ -107,6 +167,12 @@ class InventoryManager:
                 
                 location = st.text_input("Storage Location")
                 supplier = st.text_input("Supplier")
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    barcode = st.text_input("Barcode")
+                with col2:
+                    lot_number = st.text_input("Lot Number")
                 notes = st.text_area("Notes")
                 
                 if st.form_submit_button("Add Supply"):
@@ -121,21 +187,27 @@ class InventoryManager:
                         'expiry_date': str(expiry_date),
                         'location': location,
                         'supplier': supplier,
+                        'barcode': barcode.strip(),
                         'notes': notes,
                         'added_date': datetime.now().strftime("%Y-%m-%d"),
                         'last_updated': datetime.now().isoformat()
                     }
                     
                     inventory = self._load_data(self.inventory_file)
-                    supply_id = f"SUP_{len(inventory) + 1:04d}"
+                    supply_id = self._next_supply_id(inventory)
                     inventory[supply_id] = supply_data
                     self._save_data(self.inventory_file, inventory)
+                    if quantity:
+                        self.stock_ledger.record(supply_id, 'receipt', quantity, note="Initial stock",
+                                                 lot=lot_number or f"{supply_id}-1", expiry_date=str(expiry_date),
+                                                 unit_cost=cost_per_unit)
                     
                     st.success("Medical supply added successfully!")
                     st.rerun()
         
         # Display existing supplies
-        inventory = self._load_data(self.inventory_file)
+        self.inventory_index.refresh()
+        inventory = dict(self.inventory_index.items)
         
         if inventory:
             st.markdown("#### Current Medical Supplies")
@@ -153,9 +225,12 @@ class InventoryManager:
                     if category_filter == "All" or supply['category'] == category_filter:
                         filtered_supplies[supply_id] = supply
             
+            self._record_stock_movement(inventory)
+            self._receive_barcode_scans()
+            
             # Display supplies in cards
             for supply_id, supply in filtered_supplies.items():
-                status_color = self._get_status_color(supply)
+                status_color = self.inventory_index.status_color(supply_id)
                 
                 col1, col2, col3 = st.columns([3, 1, 1])
                 
@@ -176,12 +251,136 @@ class InventoryManager:
                 
                 with col3:
                     if st.button("🗑️ Delete", key=f"delete_{supply_id}"):
-                        del inventory[supply_id]
-                        self._save_data(self.inventory_file, inventory)
-                        st.rerun()
+                        self._delete_supply(supply_id)
         else:
             st.info("No medical supplies in inventory.")
     
+    def _delete_supply(self, supply_id: str):
+        """Write off a supply's remaining stock and remove it from inventory.json"""
+        on_hand = self.stock_ledger.on_hand(supply_id)
+        if on_hand > 0:
+            try:
+                self.lot_tracker.dispense(supply_id, on_hand, note="Written off: supply deleted",
+                                          movement_type='adjustment')
+            except StockError as e:
+                st.error(str(e))
+                return
+        
+        # The index holds ledger quantities and expiries; save from the file itself
+        inventory = self._load_data(self.inventory_file)
+        inventory.pop(supply_id, None)
+        self._save_data(self.inventory_file, inventory)
+        st.rerun()
+    
+    def _next_supply_id(self, inventory: Dict) -> str:
+        """Supply id following the highest one in use, including deleted supplies still in the stock ledger"""
+        used = set(inventory) | set(self.stock_ledger.on_hand_all())
+        numbers = [int(supply_id.split('_')[-1]) for supply_id in used
+                   if supply_id.startswith('SUP_') and supply_id.split('_')[-1].isdigit()]
+        return f"SUP_{max(numbers, default=0) + 1:04d}"
+    
+    def _record_stock_movement(self, inventory: Dict):
+        """Record receipts, issues, adjustments and expiries, and show stock history"""
+        labels = {f"{supply['name']} ({supply_id})": supply_id for supply_id, supply in inventory.items()}
+        
+        with st.expander("🔄 Record Stock Movement"):
+            with st.form("stock_movement"):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    item_label = st.selectbox("Supply", list(labels))
+                    movement_type = st.selectbox("Movement", list(MOVEMENT_TYPES), format_func=str.title)
+                
+                with col2:
+                    quantity = st.number_input("Quantity (adjustments may be negative)", value=1.0, step=1.0)
+                    reference = st.text_input("Reference (PO, ward, ...)")
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    lot = st.text_input("Lot Number (stock removed without one is taken first-expiry-first-out)")
+                with col2:
+                    lot_expiry = st.date_input("Lot Expiry (receipts into a new lot)")
+                
+                note = st.text_input("Note")
+                
+                if st.form_submit_button("Record Movement"):
+                    item_id = labels[item_label]
+                    try:
+                        removes = MOVEMENT_TYPES[movement_type] < 0 or (movement_type == 'adjustment' and quantity < 0)
+                        if removes and not lot:
+                            self.lot_tracker.dispense(item_id, quantity, reference=reference or None,
+                                                      note=note or None, movement_type=movement_type)
+                        else:
+                            known_lot = lot in self.stock_ledger.lots.get(item_id, {})
+                            extra = {'expiry_date': str(lot_expiry),
+                                     'unit_cost': inventory[item_id].get('cost_per_unit')} \
+                                if movement_type == 'receipt' and lot and not known_lot else {}
+                            self.stock_ledger.record(item_id, movement_type, quantity, reference=reference or None,
+                                                     note=note or None, lot=lot or None, **extra)
+                        st.success("Stock movement recorded.")
+                        st.rerun()
+                    except StockError as e:
+                        st.error(str(e))
+        
+        with st.expander("📈 Stock History"):
+            item_label = st.selectbox("Supply", list(labels), key="stock_history_item")
+            days = st.slider("Days", min_value=7, max_value=365, value=90, key="stock_history_days")
+            end = datetime.now().date()
+            series = self.stock_ledger.daily_on_hand(labels[item_label], end - timedelta(days=days - 1), end)
+            
+            import plotly.express as px
+            fig = px.line(x=[day for day, _ in series], y=[quantity for _, quantity in series],
+                          title=f"On-Hand Quantity - {item_label}")
+            fig.update_traces(line=dict(color='#00ccff', width=3))
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='white'),
+                xaxis_title="Date",
+                yaxis_title="Quantity"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            
+            lots = self.lot_tracker.lots_of(labels[item_label])
+            if lots:
+                st.markdown("**Lots in Stock (dispensing order)**")
+                st.dataframe(pd.DataFrame(lots).reindex(columns=['lot', 'quantity', 'expiry_date', 'unit_cost']),
+                             use_container_width=True, hide_index=True)
+            
+            recent = list(self.stock_ledger.movements(labels[item_label], start=str(end - timedelta(days=days - 1))))
+            if recent:
+                st.dataframe(pd.DataFrame(recent[-50:][::-1])
+                             .reindex(columns=['timestamp', 'type', 'lot', 'quantity', 'reference', 'note']),
+                             use_container_width=True, hide_index=True)
+    
+    def _receive_barcode_scans(self):
+        """Receive a delivery from a file or paste of barcode scans"""
+        with st.expander("📥 Bulk Receipt (Barcode Scans)"):
+            st.caption("One scan per line: barcode, lot, expiry (YYYY-MM-DD or YYMMDD), quantity")
+            
+            uploaded = st.file_uploader("Scan File", type=['csv', 'txt', 'tsv'], key="scan_file")
+            pasted = st.text_area("Or Paste Scans", key="scan_text")
+            reference = st.text_input("Delivery Reference", key="scan_reference")
+            
+            if st.button("Receive Scans", key="receive_scans"):
+                lines = uploaded.getvalue().decode('utf-8', errors='replace').splitlines() if uploaded else []
+                lines += pasted.splitlines()
+                if not lines:
+                    st.warning("No scans to receive.")
+                    return
+                try:
+                    summary = self.scan_receiver.receive(parse_scans(lines), reference=reference or None)
+                except StockError as e:
+                    st.error(str(e))
+                    return
+                
+                st.success(f"Received {summary['units']:g} units in {summary['lines']} lot lines "
+                           f"from {summary['scans']} scans.")
+                if summary['rejected']:
+                    st.warning(f"{len(summary['rejected'])} scans were not received.")
+                    st.dataframe(pd.DataFrame(summary['rejected']), use_container_width=True, hide_index=True)
+    
     def _manage_equipment(self):
         """Manage medical equipment"""
         st.markdown("### 🏥 Medical Equipment")
@@ -226,7 +425,7 @@ class InventoryManager:
                         'notes': notes,
                         'added_date': datetime.now().strftime("%Y-%m-%d"),
                         'last_maintenance': None,
-                        'next_maintenance': self._calculate_next_maintenance(maintenance_schedule)
+                        'next_maintenance': str(next_due(maintenance_schedule, date.today()) or "As Needed")
                     }
                     
                     equipment = self._load_data(self.equipment_file)
@@ -238,12 +437,25 @@ class InventoryManager:
                     st.rerun()
         
         # Display equipment
-        equipment = self._load_data(self.equipment_file)
+        scheduler = self.maintenance
+        scheduler.refresh()
+        equipment = scheduler.equipment
         
         if equipment:
+            self._display_maintenance_calendar(equipment)
+            
             st.markdown("#### Medical Equipment Inventory")
             
-            for equipment_id, item in equipment.items():
+            view = st.selectbox("Show", ["All Equipment", "Overdue", "Due This Week"], key="equipment_view")
+            if view == "Overdue":
+                shown = scheduler.overdue()
+            elif view == "Due This Week":
+                shown = scheduler.due_this_week()
+            else:
+                shown = list(equipment)
+            
+            for equipment_id in shown:
+                item = equipment[equipment_id]
                 status_color = {
                     'Active': '#00ff88',
                     'Maintenance': '#ffa500',
@@ -258,12 +470,76 @@ class InventoryManager:
                     <strong>Manufacturer:</strong> {item['manufacturer']}<br>
                     <strong>Status:</strong> <span style="color: {status_color};">{item['status']}</span><br>
                     <strong>Location:</strong> {item.get('location', 'N/A')}<br>
-                    <strong>Next Maintenance:</strong> {item.get('next_maintenance', 'N/A')}
+                    <strong>Last Maintenance:</strong> {item.get('last_maintenance') or 'N/A'}<br>
+                    <strong>Next Maintenance:</strong> {scheduler.next_maintenance(equipment_id) or item.get('next_maintenance', 'N/A')}
                 </div>
                 """, unsafe_allow_html=True)
         else:
             st.info("No equipment in inventory.")
     
+    def _display_maintenance_calendar(self, equipment: Dict):
+        """Overdue and upcoming maintenance, work orders and the maintenance log"""
+        scheduler = self.maintenance
+        overdue = scheduler.overdue()
+        this_week = scheduler.due_this_week()
+        work_orders = scheduler.work_orders()
+        
+        st.markdown("#### 🛠️ Maintenance Calendar")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Overdue", len(overdue))
+        
+        with col2:
+            st.metric("Due This Week", len(this_week))
+        
+        with col3:
+            st.metric("Open Work Orders", len(work_orders))
+        
+        for equipment_id in overdue:
+            st.error(f"❌ {equipment[equipment_id]['name']}: maintenance was due on "
+                     f"{scheduler.next_maintenance(equipment_id)}")
+        for equipment_id in this_week:
+            st.warning(f"🔧 {equipment[equipment_id]['name']}: maintenance due on "
+                       f"{scheduler.next_maintenance(equipment_id)}")
+        
+        with st.expander("📋 Work Orders"):
+            if work_orders:
+                st.dataframe(pd.DataFrame.from_dict(work_orders, orient='index')
+                             .reindex(columns=['equipment_name', 'location', 'due_date', 'priority', 'status']),
+                             use_container_width=True)
+            else:
+                st.info("No open work orders.")
+            
+            last_run = job_runner().last_runs.get("maintenance_work_orders")
+            if last_run:
+                st.caption(f"Last automatic run: {last_run['started'][:16]}")
+            
+            if st.button("Create Work Orders Now", key="create_work_orders"):
+                created = job_runner().run_now("maintenance_work_orders")
+                st.success(f"Created {len(created)} work orders.")
+                st.rerun()
+        
+        with st.expander("✅ Log Maintenance"):
+            labels = {f"{item['name']} ({equipment_id})": equipment_id for equipment_id, item in equipment.items()}
+            with st.form("log_maintenance"):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    item_label = st.selectbox("Equipment", list(labels))
+                    performed_on = st.date_input("Service Date")
+                
+                with col2:
+                    technician = st.text_input("Technician")
+                    cost = st.number_input("Service Cost ($)", min_value=0.0, value=0.0, format="%.2f")
+                
+                notes = st.text_area("Work Performed")
+                
+                if st.form_submit_button("Log Maintenance"):
+                    next_date = scheduler.log_maintenance(labels[item_label], performed_on, technician, cost, notes)
+                    st.success(f"Maintenance logged. Next service due: {next_date or 'As Needed'}")
+                    st.rerun()
+    
     def _manage_purchase_orders(self):
         """Manage purchase orders"""
         st.markdown("### 📋 Purchase Orders")
@@ -316,16 +592,20 @@ class InventoryManager:
                             'created_date': datetime.now().isoformat()
                         }
                         
-                        orders = self._load_data(self.orders_file)
-                        po_id = f"PO_{len(orders) + 1:04d}"
-                        orders[po_id] = po_data
-                        self._save_data(self.orders_file, orders)
+                        # Same lock as the nightly draft orders, so neither overwrites the other
+                        with file_lock(self.reorder_planner.orders_lock):
+                            orders = self._load_data(self.orders_file)
+                            po_id = f"PO_{len(orders) + 1:04d}"
+                            orders[po_id] = po_data
+                            self._save_data(self.orders_file, orders)
                         
                         st.success(f"Purchase Order {po_id} created successfully!")
                         st.rerun()
                     else:
                         st.error("Please fill in required fields.")
         
+        self._display_reorder_plan()
+        
         # Display existing purchase orders
         orders = self._load_data(self.orders_file)
         
@@ -334,6 +614,7 @@ class InventoryManager:
             
             for po_id, order in orders.items():
                 status_color = {
+                    'Draft': '#cccccc',
                     'Pending': '#ffa500',
                     'Approved': '#00ccff',
                     'Ordered': '#00ff88',
@@ -353,6 +634,34 @@ class InventoryManager:
         else:
             st.info("No purchase orders found.")
     
+    def _display_reorder_plan(self):
+        """Show items due for reorder and generate draft purchase orders"""
+        with st.expander("🔁 Reorder Planning"):
+            plan = self.reorder_planner.plan()
+            due = plan[plan['order_quantity'] > 0]
+            
+            last_run = job_runner().last_runs.get("reorder_drafts")
+            if last_run:
+                outcome = f"{len(last_run['result'])} draft orders" if last_run['ok'] else f"failed: {last_run['error']}"
+                st.caption(f"Last nightly run {last_run['started'][:16]}: {outcome}")
+            
+            if due.empty:
+                st.info("No items are at or below their reorder point.")
+            else:
+                st.dataframe(
+                    due[['name', 'supplier', 'on_hand', 'on_order', 'daily_usage', 'lead_time_days',
+                         'safety_stock', 'reorder_point', 'order_quantity']].round(2),
+                    use_container_width=True
+                )
+            
+            if st.button("Generate Draft Orders Now", key="generate_reorder_drafts"):
+                created = self.reorder_planner.draft_orders()
+                if created:
+                    st.success(f"Created {len(created)} draft purchase orders.")
+                    st.rerun()
+                else:
+                    st.info("Nothing to order, or today's draft orders already exist.")
+    
     def _manage_suppliers(self):
         """Manage supplier information"""
         st.markdown("### 👥 Supplier Management")
@@ -373,6 +682,7 @@ class InventoryManager:
                     products = st.text_area("Products/Services")
                     payment_terms = st.text_input("Payment Terms")
                     rating = st.selectbox("Rating", ["1 Star", "2 Stars", "3 Stars", "4 Stars", "5 Stars"])
+                    lead_time_days = st.number_input("Lead Time (days)", min_value=1, max_value=180, value=7)
                 
                 if st.form_submit_button("Add Supplier"):
                     supplier_data = {
@@ -384,6 +694,7 @@ class InventoryManager:
                         'products': products,
                         'payment_terms': payment_terms,
                         'rating': rating,
+                        'lead_time_days': lead_time_days,
                         'added_date': datetime.now().strftime("%Y-%m-%d"),
                         'status': 'Active'
                     }
@@ -416,45 +727,6 @@ class InventoryManager:
         else:
             st.info("No suppliers registered.")
     
-    def _is_expired(self, expiry_date_str: str) -> bool:
-        """Check if item is expired"""
-        if not expiry_date_str:
-            return False
-        try:
-            expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-            return expiry_date < datetime.now().date()
-        except:
-            return False
-    
-    def _get_status_color(self, supply: Dict) -> str:
-        """Get color based on supply status"""
-        quantity = supply.get('quantity', 0)
-        min_threshold = supply.get('min_threshold', 10)
-        
-        if self._is_expired(supply.get('expiry_date')):
-            return '#ff4444'  # Red for expired
-        elif quantity < min_threshold:
-            return '#ffa500'  # Orange for low stock
-        else:
-            return '#00ff88'  # Green for normal
-    
-    def _calculate_next_maintenance(self, schedule: str) -> str:
-        """Calculate next maintenance date"""
-        now = datetime.now()
-        
-        if schedule == "Monthly":
-            next_date = now + timedelta(days=30)
-        elif schedule == "Quarterly":
-            next_date = now + timedelta(days=90)
-        elif schedule == "Semi-Annual":
-            next_date = now + timedelta(days=180)
-        elif schedule == "Annual":
-            next_date = now + timedelta(days=365)
-        else:
-            return "As Needed"
-        
-        return next_date.strftime("%Y-%m-%d")
-    
     def _load_data(self, filename: str) -> Dict:
         """Load data from JSON file"""
         if os.path.exists(filename):
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 import json
 import os
+from utils.patient_charts import PatientChartIndex, HISTORY, TIMELINE_PAGE_SIZE
 
 class MedicalRecordsManager:
     """Complete medical records management system"""
@@ -14,6 +15,11 @@ class MedicalRecordsManager:
         self.visits_file = "data/patient_visits.json"
         self.prescriptions_file = "data/prescriptions.json"
         self.lab_results_file = "data/lab_results.json"
+        self.charts = PatientChartIndex("data/charts", {
+            'visits': self.visits_file,
+            'prescriptions': self.prescriptions_file,
+            'lab_results': self.lab_results_file
+        }, history_file=self.records_file)
     
     def display_medical_records(self):
         """Main medical records dashboard"""
@@ -131,8 +137,7 @@ class MedicalRecordsManager:
                         st.rerun()
             
             # Display existing medical history
-            medical_records = self._load_data(self.records_file)
-            patient_records = medical_records.get(selected_patient['id'], [])
+            patient_records = self.charts.records(selected_patient['id'], HISTORY)
             
             if patient_records:
                 st.markdown("#### Existing Medical History")
@@ -214,10 +219,7 @@ class MedicalRecordsManager:
                                 'recorded_at': datetime.now().isoformat()
                             }
                             
-                            visits = self._load_data(self.visits_file)
-                            visit_id = f"VISIT_{len(visits) + 1:04d}"
-                            visits[visit_id] = visit_data
-                            self._save_data(self.visits_file, visits)
+                            self.charts.add('visits', visit_data)
                             
                             st.success("Visit recorded successfully!")
                             st.rerun()
@@ -309,10 +311,7 @@ class MedicalRecordsManager:
                                 'created_at': datetime.now().isoformat()
                             }
                             
-                            prescriptions = self._load_data(self.prescriptions_file)
-                            prescription_id = f"RX_{len(prescriptions) + 1:04d}"
-                            prescriptions[prescription_id] = prescription_data
-                            self._save_data(self.prescriptions_file, prescriptions)
+                            self.charts.add('prescriptions', prescription_data)
                             
                             st.success("Prescription created successfully!")
                             st.rerun()
@@ -392,10 +391,7 @@ class MedicalRecordsManager:
                                 'created_at': datetime.now().isoformat()
                             }
                             
-                            lab_results = self._load_data(self.lab_results_file)
-                            result_id = f"LAB_{len(lab_results) + 1:04d}"
-                            lab_results[result_id] = lab_result
-                            self._save_data(self.lab_results_file, lab_results)
+                            self.charts.add('lab_results', lab_result)
                             
                             st.success("Lab result added successfully!")
                             st.rerun()
@@ -446,6 +442,10 @@ class MedicalRecordsManager:
             patient = next(p for p in patients if p['name'] == selected_patient)
             
             if st.button("📄 Generate Complete Medical Report", use_container_width=True):
+                st.session_state.report_patient = patient['id']
+                st.session_state.timeline_pages = [None]
+            
+            if st.session_state.get('report_patient') == patient['id']:
                 st.markdown(f"### 📋 Complete Medical Report: {patient['name']}")
                 
                 # Patient summary
@@ -466,52 +466,68 @@ class MedicalRecordsManager:
                     st.write(f"**HDL Cholesterol:** {patient.get('hdl_cholesterol', 'N/A')} mg/dL")
                     st.write(f"**BMI:** {patient.get('bmi', 'N/A')} kg/m²")
                 
+                chart = self.charts.chart(patient['id'])
+                
                 # Medical history
-                medical_records = self._load_data(self.records_file)
-                patient_records = medical_records.get(patient['id'], [])
+                patient_records = chart[HISTORY]
                 
                 if patient_records:
                     st.markdown("#### Medical History")
                     for record in patient_records:
                         st.write(f"• **{record['condition']}** ({record['status']}) - Diagnosed: {record['diagnosis_date']}")
                 
-                # Recent visits
-                visits = self._load_data(self.visits_file)
-                patient_visits = [v for v in visits.values() if v['patient_id'] == patient['id']]
-                
-                if patient_visits:
-                    st.markdown("#### Recent Visits")
-                    for visit in patient_visits[-5:]:  # Last 5 visits
-                        st.write(f"• **{visit['visit_date']}** - {visit['visit_type']} ({visit['department']})")
-                
                 # Active prescriptions
-                prescriptions = self._load_data(self.prescriptions_file)
-                patient_prescriptions = [p for p in prescriptions.values() 
-                                       if p['patient_id'] == patient['id'] and p.get('status') == 'Active']
+                patient_prescriptions = [p for p in chart['prescriptions'].values() if p.get('status') == 'Active']
                 
                 if patient_prescriptions:
                     st.markdown("#### Active Prescriptions")
                     for prescription in patient_prescriptions:
                         st.write(f"• **{prescription['medication_name']}** - {prescription['dosage']} ({prescription['frequency']})")
                 
-                # Recent lab results
-                lab_results = self._load_data(self.lab_results_file)
-                patient_labs = [l for l in lab_results.values() if l['patient_id'] == patient['id']]
-                
-                if patient_labs:
-                    st.markdown("#### Recent Lab Results")
-                    for lab in patient_labs[-5:]:  # Last 5 lab results
-                        st.write(f"• **{lab['test_name']}** ({lab['test_date']}): {lab.get('result_value', 'N/A')} - {lab['status']}")
+                # Visits, prescriptions, lab results and history, newest first
+                self._display_timeline(patient['id'])
     
-    def _add_medical_history(self, patient_id: str, history_entry: dict):
-        """Add medical history entry for a patient"""
-        medical_records = self._load_data(self.records_file)
+    def _display_timeline(self, patient_id: str):
+        """Display one page of a patient's clinical timeline with paging controls"""
+        pages = st.session_state.setdefault('timeline_pages', [None])
+        entries, next_page = self.charts.timeline_page(patient_id, TIMELINE_PAGE_SIZE, pages[-1])
+        
+        if not entries:
+            return
+        
+        st.markdown("#### Clinical Timeline")
+        for entry in entries:
+            record = entry['record']
+            if entry['kind'] == 'visits':
+                line = f"🏥 Visit - {record.get('visit_type', 'N/A')} ({record.get('department', 'N/A')})"
+                if record.get('diagnosis'):
+                    line += f": {record['diagnosis']}"
+            elif entry['kind'] == 'prescriptions':
+                line = f"💊 Prescribed {record.get('medication_name', 'N/A')} {record.get('dosage', '')} ({record.get('frequency', 'N/A')})"
+            elif entry['kind'] == 'lab_results':
+                line = f"🧪 {record.get('test_name', 'N/A')}: {record.get('result_value', 'N/A')} {record.get('unit', '')} - {record.get('status', 'N/A')}"
+            else:
+                line = f"📜 Diagnosed {record.get('condition', 'N/A')} ({record.get('status', 'N/A')})"
+            st.write(f"• **{entry['date'] or 'Undated'}** {line}")
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
         
-        if patient_id not in medical_records:
-            medical_records[patient_id] = []
+        with col1:
+            if len(pages) > 1 and st.button("⬅️ Newer", key="timeline_newer"):
+                pages.pop()
+                st.rerun()
         
-        medical_records[patient_id].append(history_entry)
-        self._save_data(self.records_file, medical_records)
+        with col2:
+            st.caption(f"Page {len(pages)}")
+        
+        with col3:
+            if next_page is not None and st.button("Older ➡️", key="timeline_older"):
+                pages.append(next_page)
+                st.rerun()
+    
+    def _add_medical_history(self, patient_id: str, history_entry: dict):
+        """Add medical history entry for a patient"""
+        self.charts.add_history(patient_id, history_entry)
     
     def _load_data(self, filename: str) -> dict:
         """Load data from JSON file"""
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict
 import json
 import os
+from utils.batch_render import card_row, render_cards
 
 class NotificationManager:
     """Real-time notification and alert system"""
@@ -79,19 +80,16 @@ class NotificationManager:
             """, unsafe_allow_html=True)
         
         recent = self.get_recent_notifications(5)
-        for notif in recent:
-            icon = self._get_notification_icon(notif["type"])
-            bg_color = self._get_notification_color(notif["type"])
-            
-            if not notif["read"]:
-                st.sidebar.markdown(f"""
-                <div style="background: {bg_color}; border-left: 4px solid #ff4444; 
-                            padding: 10px; margin: 5px 0; border-radius: 5px;">
-                    <strong>{icon} {notif['title']}</strong><br>
-                    <small>{notif['message'][:50]}...</small><br>
-                    <small style="opacity: 0.7;">{self._format_time(notif['timestamp'])}</small>
-                </div>
-                """, unsafe_allow_html=True)
+        with st.sidebar:
+            render_cards([
+                card_row(
+                    "#ff4444",
+                    f"{self._get_notification_icon(notif['type'])} {notif['title']}",
+                    lines=[f"{notif['message'][:50]}...", self._format_time(notif['timestamp'])],
+                    background=self._get_notification_color(notif["type"])
+                )
+                for notif in recent if not notif["read"]
+            ], layout='compact')
     
     def _get_notification_icon(self, type: str) -> str:
         """Get icon for notification type"""
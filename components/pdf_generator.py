@@ -7,9 +7,24 @@ from reportlab.lib import colors
 from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import io
 import os
-from typing import Dict, List
+import zipfile
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+# Generator used by invoice worker processes, created once per process
+_worker_generator = None
+
+
+def _render_invoice_job(job: Tuple[str, Dict, float]) -> Tuple[str, bytes]:
+    """Process-pool entry point: render one invoice and return (bill_id, pdf bytes)."""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = PDFReportGenerator()
+    bill_id, bill, paid_amount = job
+    return bill_id, _worker_generator.generate_invoice(bill_id, bill, paid_amount)
 
 class PDFReportGenerator:
     """Generate branded PDF reports for PulseAI"""
@@ -260,4 +275,185 @@ class PDFReportGenerator:
         doc.build(story)
         pdf_data = buffer.getvalue()
         buffer.close()
-        return pdf_data
\ No newline at end of file
+        return pdf_data
+    
+    def generate_invoice(self, bill_id: str, bill: Dict, paid_amount: float = 0.0) -> bytes:
+        """Generate an itemised invoice for a bill"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4,
+                              topMargin=0.5*inch, bottomMargin=0.5*inch)
+        
+        story = []
+        
+        # Header with branding
+        story.append(self._create_header())
+        story.append(Spacer(1, 20))
+        
+        # Billing details
+        story.append(Paragraph(f"INVOICE {bill_id}", self.subheader_style))
+        details = [
+            ['Patient Name', bill.get('patient_name', 'N/A')],
+            ['Patient ID', bill.get('patient_id', 'N/A')],
+            ['Bill Date', bill.get('bill_date', 'N/A')],
+            ['Due Date', bill.get('due_date', 'N/A')],
+            ['Stay', f"{bill.get('admission_date', 'N/A')} to {bill.get('discharge_date', 'N/A')}"],
+            ['Attending Doctor', bill.get('doctor_name') or 'N/A'],
+            ['Insurance', f"{bill.get('insurance_provider') or 'None'} {bill.get('insurance_id') or ''}".strip()]
+        ]
+        details_table = Table(details, colWidths=[2*inch, 4*inch])
+        details_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f5e8')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ]))
+        story.append(details_table)
+        story.append(Spacer(1, 20))
+        
+        # Line items
+        story.append(Paragraph("CHARGES", self.subheader_style))
+        story.append(self._create_invoice_lines_table(bill, paid_amount))
+        story.append(Spacer(1, 20))
+        
+        story.append(self._create_invoice_footer())
+        
+        doc.build(story)
+        pdf_data = buffer.getvalue()
+        buffer.close()
+        return pdf_data
+    
+    def _create_invoice_lines_table(self, bill: Dict, paid_amount: float):
+        """Create invoice line items and totals table"""
+        data = [['Description', 'Qty', 'Unit Price', 'Amount']]
+        
+        room_charges = bill.get('room_charges', 0) or 0
+        if room_charges:
+            data.append([f"Room charges ({bill.get('room_type', 'Ward')})", '', '', f"${room_charges:,.2f}"])
+        
+        for service in bill.get('services', []):
+            data.append([
+                service.get('name', 'Service'),
+                str(service.get('quantity', 1)),
+                f"${service.get('cost', 0):,.2f}",
+                f"${service.get('total', 0):,.2f}"
+            ])
+        
+        item_rows = len(data)
+        total_amount = bill.get('total_amount', 0) or 0
+        data.extend([
+            ['Subtotal', '', '', f"${bill.get('subtotal', 0) or 0:,.2f}"],
+            [f"Tax ({(bill.get('tax_rate', 0) or 0) * 100:.1f}%)", '', '', f"${bill.get('tax_amount', 0) or 0:,.2f}"],
+            ['Discount', '', '', f"-${bill.get('discount', 0) or 0:,.2f}"],
+            ['Total', '', '', f"${total_amount:,.2f}"],
+            ['Paid', '', '', f"${paid_amount:,.2f}"],
+            ['Balance Due', '', '', f"${max(0.0, total_amount - paid_amount):,.2f}"]
+        ])
+        
+        table = Table(data, colWidths=[3.2*inch, 0.6*inch, 1.1*inch, 1.1*inch])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e3f2fd')),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, item_rows - 1), 1, colors.black),
+            ('LINEABOVE', (0, item_rows), (-1, item_rows), 1, colors.black),
+            ('FONTNAME', (0, item_rows + 3), (-1, item_rows + 3), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#f5f5f5')),
+        ]))
+        
+        return table
+    
+    def _create_invoice_footer(self):
+        """Create invoice footer"""
+        footer_text = """
+        <para align="center">
+        <font color="#666666" size="8">
+        ────────────────────────────────────────────────────────────────<br/>
+        PulseAI Hospital Management System - Billing Department<br/>
+        Please quote the invoice number with your payment. Thank you for choosing our hospital.<br/>
+        ────────────────────────────────────────────────────────────────
+        </font>
+        </para>
+        """
+        return Paragraph(footer_text, self.styles['Normal'])
+    
+    def generate_invoice_batch(self, jobs: Iterable[Tuple[str, Dict, float]], output: BinaryIO,
+                               workers: Optional[int] = None) -> int:
+        """
+        Render many invoices across a process pool into a ZIP stream.
+        
+        Jobs are submitted with a bounded number in flight and each PDF is
+        written to the archive as soon as it is the next one due, so memory
+        stays proportional to the pool size rather than the batch size.
+        `output` only needs to be writable; it does not have to be seekable.
+        
+        Args:
+            jobs: (bill_id, bill, paid_amount) tuples, e.g. from a generator
+            output: Binary stream the ZIP archive is written to
+            workers: Number of worker processes (defaults to the CPU count)
+        
+        Returns:
+            Number of invoices written
+        """
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = workers * 4
+        count = 0
+        
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive, \
+                ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            
+            def drain(limit: int):
+                nonlocal count
+                while len(in_flight) > limit:
+                    bill_id, pdf_data = in_flight.popleft().result()
+                    archive.writestr(f"{bill_id}.pdf", pdf_data)
+                    count += 1
+            
+            for job in jobs:
+                in_flight.append(pool.submit(_render_invoice_job, job))
+                drain(max_in_flight)
+            drain(0)
+        
+        return count
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    import time
+    
+    parser = argparse.ArgumentParser(description="Benchmark batch invoice rendering")
+    parser.add_argument("--bills", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    
+    random.seed(5)
+    services = [('General Consultation', 150.0), ('Blood Test - Complete', 75.0),
+                ('X-Ray Chest', 200.0), ('ECG', 100.0)]
+    
+    def sample_jobs():
+        for i in range(args.bills):
+            lines = [{'name': name, 'cost': cost, 'quantity': q, 'total': cost * q}
+                     for name, cost in random.sample(services, 2) for q in [random.randint(1, 3)]]
+            subtotal = 400 + sum(line['total'] for line in lines)
+            yield (f"BILL_{i:05d}", {
+                'patient_id': f"P{i:05d}", 'patient_name': f"Patient {i}", 'bill_date': '2026-01-31',
+                'due_date': '2026-03-02', 'room_type': 'Private Room', 'room_charges': 400,
+                'services': lines, 'subtotal': subtotal, 'tax_rate': 0.085,
+                'tax_amount': subtotal * 0.085, 'discount': 0, 'total_amount': subtotal * 1.085
+            }, 0.0)
+    
+    with tempfile.TemporaryFile() as output:
+        start = time.perf_counter()
+        count = PDFReportGenerator().generate_invoice_batch(sample_jobs(), output, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        size = output.tell()
+    
+    print(f"{count} invoices with {args.workers} workers in {elapsed:.1f}s "
+          f"({count / elapsed:.0f}/s), archive {size / 1e6:.1f} MB")
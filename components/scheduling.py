@@ -4,6 +4,14 @@ import json
 import os
 from typing import Dict, List, Optional
 import schedule
+from utils.batch_render import card_row, render_cards
+
+APPOINTMENT_STATUS_COLORS = {
+    "scheduled": "#00ccff",
+    "completed": "#00ff88",
+    "cancelled": "#ff4444",
+    "no-show": "#ffa500"
+}
 
 class AppointmentScheduler:
     """Advanced appointment scheduling system"""
@@ -98,24 +106,19 @@ class AppointmentScheduler:
         
         if daily_appointments:
             st.markdown("### Scheduled Appointments")
-            for apt in sorted(daily_appointments, key=lambda x: x["time"]):
-                status_color = {
-                    "scheduled": "#00ccff",
-                    "completed": "#00ff88",
-                    "cancelled": "#ff4444",
-                    "no-show": "#ffa500"
-                }.get(apt["status"], "#ffffff")
-                
-                st.markdown(f"""
-                <div style="background: rgba(255,255,255,0.1); border-left: 4px solid {status_color}; 
-                            padding: 15px; margin: 10px 0; border-radius: 5px;">
-                    <strong>🕐 {apt['time']} - Dr. {apt['doctor']}</strong><br>
-                    <strong>Patient:</strong> {apt['patient_name']}<br>
-                    <strong>Department:</strong> {apt['department']}<br>
-                    <strong>Status:</strong> <span style="color: {status_color};">{apt['status'].title()}</span><br>
-                    {f"<strong>Notes:</strong> {apt['notes']}" if apt['notes'] else ""}
-                </div>
-                """, unsafe_allow_html=True)
+            render_cards([
+                card_row(
+                    APPOINTMENT_STATUS_COLORS.get(apt["status"], "#ffffff"),
+                    f"🕐 {apt['time']} - Dr. {apt['doctor']}",
+                    f"Status: {apt['status'].title()}",
+                    [
+                        f"Patient: {apt['patient_name']}",
+                        f"Department: {apt['department']}",
+                        f"Notes: {apt['notes']}" if apt['notes'] else ""
+                    ]
+                )
+                for apt in sorted(daily_appointments, key=lambda x: x["time"])
+            ], layout='list')
         else:
             st.info("No appointments scheduled for this date.")
     
@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 import os
+from utils.payroll_engine import PayrollEngine, MONTHS
+from utils.roster_solver import RosterSolver, DEFAULT_RULES, SHIFT_TIMES
+from utils.shift_index import ShiftIndex, INACTIVE_SHIFT_STATUSES
+from utils.attendance_store import AttendanceStore, ATTENDANCE_STATUSES
+from utils.staff_search import StaffSearchIndex
 
 class StaffManagementSystem:
     """Complete staff and human resources management"""
@@ -13,6 +18,12 @@ class StaffManagementSystem:
         self.shifts_file = "data/shifts.json"
         self.attendance_file = "data/attendance.json"
         self.payroll_file = "data/payroll.json"
+        self.demand_file = "data/staffing_demand.json"
+        self.shift_index = ShiftIndex(self.shifts_file)
+        self.staff_index = StaffSearchIndex(self.staff_file)
+        self.attendance = AttendanceStore("data/attendance", legacy_file=self.attendance_file)
+        self.payroll_engine = PayrollEngine(self.staff_file, self.shifts_file,
+                                            self.attendance, self.payroll_file)
     
     def display_staff_dashboard(self):
         """Main staff management dashboard"""
@@ -43,7 +54,6 @@ class StaffManagementSystem:
         st.markdown("### 👥 Staff Overview")
         
         staff = self._load_data(self.staff_file)
-        attendance = self._load_data(self.attendance_file)
         
         # Calculate metrics
         total_staff = len(staff)
@@ -53,10 +63,7 @@ class StaffManagementSystem:
         
         # Today's attendance
         today = datetime.now().strftime("%Y-%m-%d")
-        present_today = sum(
-            1 for a in attendance.values() 
-            if a.get('date') == today and a.get('status') == 'Present'
-        )
+        present_today = self.attendance.counts(today)['Present']
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -165,7 +172,8 @@ class StaffManagementSystem:
                         staff = self._load_data(self.staff_file)
                         staff_id = f"STF_{len(staff) + 1:04d}"
                         staff[staff_id] = staff_data
-                        self._save_data(self.staff_file, staff_data)
+                        self._save_data(self.staff_file, staff)
+                        self.staff_index.add(staff_id, staff_data)
                         
                         st.success(f"Staff member {first_name} {last_name} added successfully!")
                         st.rerun()
@@ -173,30 +181,29 @@ class StaffManagementSystem:
                         st.error("Please fill in required fields.")
         
         # Display staff directory
-        staff = self._load_data(self.staff_file)
+        self.staff_index.refresh()
+        staff = self.staff_index.staff
         
         if staff:
             st.markdown("#### Staff Directory")
             
             # Search functionality
-            search_term = st.text_input("🔍 Search staff members...")
+            search_term = st.text_input("🔍 Search staff members...",
+                                        help="Name, employee ID, role, department or specialization; "
+                                             "partial words and small typos match")
             department_filter = st.selectbox("Filter by Department", 
                 ["All"] + ["Emergency", "ICU", "Surgery", "Cardiology", "Pediatrics",
                           "Radiology", "Laboratory", "Pharmacy", "Administration"])
             
             # Filter staff
-            filtered_staff = {}
-            for staff_id, member in staff.items():
-                name_match = (search_term.lower() in member.get('full_name', '').lower() or 
-                            search_term.lower() in member.get('employee_id', '').lower())
-                dept_match = (department_filter == "All" or 
-                            member.get('department') == department_filter)
-                
-                if (not search_term or name_match) and dept_match:
-                    filtered_staff[staff_id] = member
+            matches = self.staff_index.search(search_term,
+                                              None if department_filter == "All" else department_filter)
+            if search_term:
+                st.caption(f"{len(matches)} staff members match")
             
             # Display staff cards
-            for staff_id, member in filtered_staff.items():
+            for staff_id in matches:
+                member = staff[staff_id]
                 status_color = '#00ff88' if member.get('status') == 'Active' else '#ff4444'
                 
                 col1, col2, col3 = st.columns([3, 1, 1])
@@ -215,11 +222,14 @@ class StaffManagementSystem:
                 
                 with col2:
                     if st.button("📝 Edit", key=f"edit_staff_{staff_id}"):
-                        st.session_state[f"edit_staff_{staff_id}"] = True
+                        st.session_state.editing_staff = staff_id
                 
                 with col3:
                     if st.button("👁️ View", key=f"view_staff_{staff_id}"):
                         self._display_staff_details(member)
+                
+                if st.session_state.get('editing_staff') == staff_id:
+                    self._edit_staff_member(staff_id, member)
         else:
             st.info("No staff members in directory.")
     
@@ -269,13 +279,23 @@ class StaffManagementSystem:
                             'created_at': datetime.now().isoformat()
                         }
                         
-                        shifts = self._load_data(self.shifts_file)
-                        shift_id = f"SHF_{len(shifts) + 1:04d}"
-                        shifts[shift_id] = shift_data
-                        self._save_data(self.shifts_file, shifts)
-                        
-                        st.success("Shift scheduled successfully!")
-                        st.rerun()
+                        violations = self.shift_index.check(shift_data)
+                        if violations:
+                            for violation in violations:
+                                st.error(f"{violation['rule']}: {violation['detail']}")
+                        else:
+                            shifts = self._load_data(self.shifts_file)
+                            shift_id = self._next_shift_id(shifts)
+                            shifts[shift_id] = shift_data
+                            self._save_data(self.shifts_file, shifts)
+                            self.shift_index.add(shift_id, shift_data)
+                            
+                            st.success("Shift scheduled successfully!")
+                            st.rerun()
+        
+        self._generate_roster()
+        self._import_shifts()
+        self._display_on_duty()
         
         # Display upcoming shifts
         shifts = self._load_data(self.shifts_file)
@@ -315,6 +335,191 @@ class StaffManagementSystem:
         else:
             st.info("No shifts scheduled.")
     
+    def _generate_roster(self):
+        """Generate a month's roster from staffing demand, availability and work rules"""
+        with st.expander("🧮 Generate Monthly Roster"):
+            st.markdown("Enter the staff needed per department and shift each day, then let the solver build the roster.")
+            
+            demand = self._load_data(self.demand_file)
+            demand_df = st.data_editor(
+                pd.DataFrame(list(demand.values()),
+                             columns=['department', 'shift_type', 'role', 'specialization', 'required']),
+                num_rows="dynamic",
+                column_config={
+                    'department': st.column_config.SelectboxColumn("Department", options=[
+                        "Emergency", "ICU", "Surgery", "General Ward", 
+                        "Pharmacy", "Laboratory", "Administration"
+                    ]),
+                    'shift_type': st.column_config.SelectboxColumn("Shift", options=list(SHIFT_TIMES)),
+                    'role': st.column_config.SelectboxColumn("Role", options=[
+                        "Doctor", "Nurse", "Technician", "Administrator", 
+                        "Pharmacist", "Therapist", "Security", "Maintenance"
+                    ]),
+                    'specialization': st.column_config.TextColumn("Specialization (optional)"),
+                    'required': st.column_config.NumberColumn("Staff per Day", min_value=0, step=1, default=1)
+                },
+                key="staffing_demand"
+            )
+            
+            col1, col2, col3, col4, col5 = st.columns(5)
+            
+            with col1:
+                roster_month = st.selectbox("Month", MONTHS, index=datetime.now().month % 12, key="roster_month")
+            with col2:
+                roster_year = st.number_input("Year", min_value=2020, max_value=2030,
+                                              value=datetime.now().year, key="roster_year")
+            with col3:
+                max_consecutive = st.number_input("Max Consecutive Days", min_value=1, max_value=14,
+                                                  value=DEFAULT_RULES['max_consecutive_days'])
+            with col4:
+                min_rest = st.number_input("Min Rest (hours)", min_value=0, max_value=24,
+                                           value=DEFAULT_RULES['min_rest_hours'])
+            with col5:
+                max_shifts = st.number_input("Max Shifts / Month", min_value=1, max_value=31,
+                                             value=DEFAULT_RULES['max_shifts'])
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                if st.button("💾 Save Demand"):
+                    rows = [row for row in demand_df.to_dict('records') if row.get('department') and row.get('role')]
+                    self._save_data(self.demand_file, {f"DEM_{n:04d}": row for n, row in enumerate(rows, start=1)})
+                    st.success("Staffing demand saved.")
+            
+            with col2:
+                if st.button("🧮 Generate Roster"):
+                    month = MONTHS.index(roster_month) + 1
+                    staff = self._load_data(self.staff_file)
+                    roster = f"roster-{int(roster_year):04d}-{month:02d}"
+                    existing = [shift for shift in self._load_data(self.shifts_file).values()
+                                if shift.get('roster') != roster
+                                and shift.get('status') not in INACTIVE_SHIFT_STATUSES]
+                    solver = RosterSolver({'max_consecutive_days': int(max_consecutive),
+                                           'min_rest_hours': int(min_rest), 'max_shifts': int(max_shifts)})
+                    result = solver.solve(staff, demand_df.to_dict('records'), int(roster_year), month,
+                                          self._unavailable_dates(staff, int(roster_year), month), existing)
+                    st.session_state.roster_proposal = dict(result, year=int(roster_year), month=month,
+                                                            rules=solver.rules)
+            
+            proposal = st.session_state.get('roster_proposal')
+            if proposal:
+                stats = proposal['stats']
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    st.metric("Demand Covered", f"{stats['coverage_rate']:.1%}")
+                with col2:
+                    st.metric("Shifts Rostered", f"{stats['assigned']} / {stats['required']}")
+                with col3:
+                    st.metric("Rule Violations", len(proposal['violations']))
+                with col4:
+                    st.metric("Shifts per Person", f"{stats['min_shifts']}-{stats['max_shifts']}")
+                
+                st.dataframe(proposal['coverage'], use_container_width=True, hide_index=True)
+                if proposal['uncovered']:
+                    st.warning(f"{sum(u['missing'] for u in proposal['uncovered'])} shifts could not be staffed "
+                               "within the rules.")
+                    st.dataframe(pd.DataFrame(proposal['uncovered']), use_container_width=True, hide_index=True)
+                if proposal['violations']:
+                    st.error("The roster breaks these rules:")
+                    st.dataframe(pd.DataFrame(proposal['violations']), use_container_width=True, hide_index=True)
+                
+                if proposal['assignments']:
+                    st.dataframe(pd.DataFrame(proposal['assignments']).drop(columns=['out_of_department']),
+                                 use_container_width=True, hide_index=True)
+                    
+                    if st.button("✅ Publish Roster"):
+                        roster = f"roster-{proposal['year']:04d}-{proposal['month']:02d}"
+                        for assignment in proposal['assignments']:
+                            assignment['roster'] = roster
+                        published = self._write_shifts(proposal['assignments'], replace_roster=roster,
+                                                       min_rest_hours=proposal['rules']['min_rest_hours'])
+                        if published is not None:
+                            del st.session_state.roster_proposal
+                            st.success(f"Published {published} shifts.")
+                            st.rerun()
+    
+    def _unavailable_dates(self, staff: Dict, year: int, month: int) -> Dict[str, List[str]]:
+        """Days each employee cannot be rostered: listed unavailable dates and recorded leave"""
+        unavailable = {member['employee_id']: list(member.get('unavailable_dates', []))
+                       for member in staff.values() if member.get('employee_id')}
+        for record in self.attendance.month(year, month).values():
+            if record.get('status') == 'Leave':
+                unavailable.setdefault(record.get('employee_id'), []).append(record['date'])
+        return unavailable
+    
+    def _import_shifts(self):
+        """Import a roster of shifts from CSV after checking working-time rules"""
+        with st.expander("📤 Import Shifts (CSV)"):
+            st.caption("Columns: employee_id, shift_date, start_time, end_time; "
+                       "optional staff_name, shift_type, department, notes")
+            uploaded = st.file_uploader("Roster File", type=['csv'], key="shift_import_file")
+            
+            if uploaded is not None and st.button("Import Shifts", key="import_shifts"):
+                rows = pd.read_csv(uploaded, dtype=str).fillna('')
+                missing = {'employee_id', 'shift_date', 'start_time', 'end_time'} - set(rows.columns)
+                if missing:
+                    st.error(f"Missing columns: {', '.join(sorted(missing))}")
+                    return
+                imported = self._write_shifts(rows.to_dict('records'))
+                if imported is not None:
+                    st.success(f"Imported {imported} shifts.")
+    
+    def _write_shifts(self, new_shifts: List[Dict], replace_roster: Optional[str] = None,
+                      min_rest_hours: Optional[float] = None) -> Optional[int]:
+        """Save a batch of shifts unless one breaks the working-time rules; returns how many were saved"""
+        shifts = self._load_data(self.shifts_file)
+        replaced = [shift_id for shift_id, shift in shifts.items()
+                    if replace_roster and shift.get('roster') == replace_roster]
+        # A generated roster is checked against the rest rule it was generated with
+        index = self.shift_index
+        if min_rest_hours is not None and min_rest_hours != index.min_rest_hours:
+            index = ShiftIndex(self.shifts_file, index.max_weekly_hours, min_rest_hours)
+        violations = index.check_many(new_shifts, ignore=replaced)
+        if violations:
+            st.error(f"{len(violations)} shifts break the working-time rules; nothing was saved.")
+            st.dataframe(pd.DataFrame(violations), use_container_width=True, hide_index=True)
+            return None
+        
+        for shift_id in replaced:
+            del shifts[shift_id]
+        next_number = int(self._next_shift_id(shifts).split('_')[-1])
+        created_at = datetime.now().isoformat()
+        
+        for n, new_shift in enumerate(new_shifts):
+            shift = {
+                'employee_id': new_shift['employee_id'],
+                'staff_name': new_shift.get('staff_name', ''),
+                'shift_date': str(new_shift['shift_date'])[:10],
+                'shift_type': new_shift.get('shift_type', ''),
+                'start_time': new_shift['start_time'],
+                'end_time': new_shift['end_time'],
+                'department': new_shift.get('department', ''),
+                'notes': new_shift.get('notes', ''),
+                'status': 'Scheduled',
+                'created_at': created_at
+            }
+            if new_shift.get('roster'):
+                shift['roster'] = new_shift['roster']
+            shifts[f"SHF_{next_number + n:04d}"] = shift
+        
+        self._save_data(self.shifts_file, shifts)
+        return len(new_shifts)
+    
+    def _next_shift_id(self, shifts: Dict) -> str:
+        """Shift id following the highest one in use"""
+        numbers = [int(shift_id.split('_')[-1]) for shift_id in shifts if shift_id.split('_')[-1].isdigit()]
+        return f"SHF_{max(numbers, default=0) + 1:04d}"
+    
+    def _display_on_duty(self):
+        """Staff whose shift is in progress right now"""
+        on_duty = self.shift_index.on_duty(datetime.now())
+        st.markdown(f"#### 🩺 On Duty Now ({len(on_duty)})")
+        if on_duty:
+            st.dataframe(pd.DataFrame([self.shift_index.shifts[shift_id] for shift_id in on_duty])
+                         .reindex(columns=['staff_name', 'department', 'shift_type', 'start_time', 'end_time']),
+                         use_container_width=True, hide_index=True)
+    
     def _manage_attendance(self):
         """Manage staff attendance"""
         st.markdown("### ⏰ Attendance Management")
@@ -353,10 +558,7 @@ class StaffManagementSystem:
                         'marked_at': datetime.now().isoformat()
                     }
                     
-                    attendance = self._load_data(self.attendance_file)
-                    attendance_id = f"ATT_{len(attendance) + 1:04d}"
-                    attendance[attendance_id] = attendance_data
-                    self._save_data(self.attendance_file, attendance)
+                    self.attendance.mark(attendance_data)
                     
                     st.success("Attendance marked successfully!")
                     st.rerun()
@@ -364,13 +566,17 @@ class StaffManagementSystem:
         # Display today's attendance
         st.markdown("#### Today's Attendance")
         
-        attendance = self._load_data(self.attendance_file)
         today = datetime.now().strftime("%Y-%m-%d")
+        today_attendance = self.attendance.on_date(today)
+        today_counts = self.attendance.counts(today)
+        month_counts = self.attendance.month_to_date()
         
-        today_attendance = {
-            att_id: att for att_id, att in attendance.items()
-            if att.get('date') == today
-        }
+        columns = st.columns(len(ATTENDANCE_STATUSES))
+        for column, status in zip(columns, ATTENDANCE_STATUSES):
+            with column:
+                st.metric(status, today_counts.get(status, 0))
+        st.caption("Month to date: " + " · ".join(f"{status} {month_counts.get(status, 0)}"
+                                                  for status in ATTENDANCE_STATUSES))
         
         if today_attendance:
             for att_id, att in today_attendance.items():
@@ -403,10 +609,7 @@ class StaffManagementSystem:
             col1, col2 = st.columns(2)
             
             with col1:
-                payroll_month = st.selectbox("Month", [
-                    "January", "February", "March", "April", "May", "June",
-                    "July", "August", "September", "October", "November", "December"
-                ])
+                payroll_month = st.selectbox("Month", MONTHS, index=datetime.now().month - 1)
                 payroll_year = st.number_input("Year", min_value=2020, max_value=2030, 
                                              value=datetime.now().year)
             
@@ -432,6 +635,7 @@ class StaffManagementSystem:
                             border-radius: 10px; padding: 15px; margin: 10px 0;">
                     <strong>{record['staff_name']}</strong> - {record['month']} {record['year']}<br>
                     <strong>Basic Salary:</strong> ${record['basic_salary']:.2f}<br>
+                    <strong>Hours Worked:</strong> {record.get('worked_hours', 0):g} ({record.get('overtime_hours', 0):g} overtime)<br>
                     <strong>Overtime:</strong> ${record.get('overtime_pay', 0):.2f}<br>
                     <strong>Deductions:</strong> ${record.get('deductions', 0):.2f}<br>
                     <strong>Net Pay:</strong> ${record['net_pay']:.2f}
@@ -440,6 +644,42 @@ class StaffManagementSystem:
         else:
             st.info("No payroll records found.")
     
+    def _edit_staff_member(self, staff_id: str, member: Dict):
+        """Edit a staff member's role, department and contact details"""
+        roles = ["Doctor", "Nurse", "Technician", "Administrator",
+                 "Pharmacist", "Therapist", "Security", "Maintenance"]
+        departments = ["Emergency", "ICU", "Surgery", "Cardiology", "Pediatrics",
+                       "Radiology", "Laboratory", "Pharmacy", "Administration"]
+        statuses = ["Active", "On Leave", "Inactive"]
+        
+        with st.form(f"edit_staff_form_{staff_id}"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                role = st.selectbox("Role", roles,
+                                    index=roles.index(member['role']) if member.get('role') in roles else 0)
+                department = st.selectbox("Department", departments,
+                                          index=departments.index(member['department'])
+                                          if member.get('department') in departments else 0)
+                specialization = st.text_input("Specialization/Certification", member.get('specialization', ''))
+            
+            with col2:
+                phone = st.text_input("Phone Number", member.get('phone', ''))
+                email = st.text_input("Email", member.get('email', ''))
+                status = st.selectbox("Status", statuses,
+                                      index=statuses.index(member['status']) if member.get('status') in statuses else 0)
+            
+            if st.form_submit_button("Save Changes"):
+                staff = self._load_data(self.staff_file)
+                staff[staff_id] = dict(staff.get(staff_id, member), role=role, department=department,
+                                       specialization=specialization, phone=phone, email=email, status=status)
+                self._save_data(self.staff_file, staff)
+                self.staff_index.add(staff_id, staff[staff_id])
+                
+                del st.session_state.editing_staff
+                st.success(f"Updated {member.get('full_name', staff_id)}")
+                st.rerun()
+    
     def _display_staff_details(self, staff_member: Dict):
         """Display detailed staff information"""
         st.markdown(f"#### Staff Details: {staff_member.get('full_name', 'N/A')}")
@@ -462,33 +702,9 @@ class StaffManagementSystem:
     
     def _generate_monthly_payroll(self, month: str, year: int, overtime_rate: float, deduction_rate: float):
         """Generate monthly payroll for all staff"""
-        staff = self._load_data(self.staff_file)
-        payroll = self._load_data(self.payroll_file)
-        
-        for staff_id, member in staff.items():
-            if member.get('status') == 'Active':
-                basic_salary = member.get('salary', 0)
-                overtime_pay = 0  # Would be calculated based on shifts and hours
-                deductions = basic_salary * (deduction_rate / 100)
-                net_pay = basic_salary + overtime_pay - deductions
-                
-                payroll_data = {
-                    'employee_id': member.get('employee_id'),
-                    'staff_name': member.get('full_name'),
-                    'month': month,
-                    'year': year,
-                    'basic_salary': basic_salary,
-                    'overtime_pay': overtime_pay,
-                    'deductions': deductions,
-                    'net_pay': net_pay,
-                    'generated_date': datetime.now().strftime("%Y-%m-%d")
-                }
-                
-                payroll_id = f"PAY_{member.get('employee_id')}_{month}_{year}"
-                payroll[payroll_id] = payroll_data
-        
-        self._save_data(self.payroll_file, payroll)
-        st.success(f"Payroll generated for {month} {year}")
+        summary = self.payroll_engine.run(month, int(year), overtime_rate, deduction_rate)
+        st.success(f"Payroll generated for {month} {int(year)}: {summary['computed']} employees calculated, "
+                   f"{summary['unchanged']} unchanged since the last run")
     
     def _load_data(self, filename: str) -> Dict:
         """Load data from JSON file"""
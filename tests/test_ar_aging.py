@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from utils.ar_aging import ReceivablesAgingIndex, aging_bucket
+from utils.billing_ledger import BillingLedger
+
+
+def _ledger(tmp_path):
+    return BillingLedger(str(tmp_path / "ledger_journal.jsonl"), str(tmp_path / "ledger_index.json"))
+
+
+def _bill(amount, days_overdue, payer=None, department='ICU'):
+    return {'total_amount': amount, 'due_date': (date.today() - timedelta(days=days_overdue)).isoformat(),
+            'insurance_provider': payer, 'department': department}
+
+
+def _pay(ledger, payment_id, bill_id, amount):
+    ledger.post_payment(payment_id, {'bill_id': bill_id, 'amount': amount, 'payment_date': '2026-03-01'})
+
+
+def test_aging_buckets():
+    assert [aging_bucket(days) for days in (-5, 30, 31, 60, 61, 90, 91)] == \
+        ['0-30', '0-30', '31-60', '31-60', '61-90', '61-90', '90+']
+
+
+def test_aging_follows_ledger_postings(tmp_path):
+    ledger = _ledger(tmp_path)
+    bills = {'B1': _bill(100, 10, 'Aetna'), 'B2': _bill(200, 45), 'B3': _bill(300, 120, 'Aetna')}
+    ledger.post([ledger._bill_entry('B1', bills['B1'])])
+    aging = ReceivablesAgingIndex(ledger, bills)
+    ledger.post([ledger._bill_entry(bill_id, bills[bill_id]) for bill_id in ('B2', 'B3')])
+    _pay(ledger, 'P1', 'B3', 120)
+
+    assert aging.totals() == {'0-30': 100.0, '31-60': 200.0, '61-90': 0.0, '90+': 180.0}
+    rows = {row['Payer']: row['Total'] for row in aging.aging(by='payer')}
+    assert rows == {'Aetna': 280.0, 'Self-Pay': 200.0}
+    assert [bill['bill_id'] for bill in aging.oldest(2)] == ['B3', 'B2']
+    assert [bill['bill_id'] for bill in aging.largest(3)] == ['B2', 'B3', 'B1']
+
+
+def test_paid_bills_leave_the_rankings(tmp_path):
+    ledger = _ledger(tmp_path)
+    bills = {f"B{n}": _bill(100 + n, n) for n in range(5)}
+    ledger.post([ledger._bill_entry(bill_id, bill) for bill_id, bill in bills.items()])
+    aging = ReceivablesAgingIndex(ledger, bills)
+    _pay(ledger, 'P1', 'B4', 104)
+    _pay(ledger, 'P2', 'B3', 50)
+
+    assert [bill['bill_id'] for bill in aging.oldest(5)] == ['B3', 'B2', 'B1', 'B0']
+    assert [bill['bill_id'] for bill in aging.largest(2)] == ['B2', 'B1']
+
+
+def test_heaps_stay_bounded_under_many_payments(tmp_path):
+    ledger = _ledger(tmp_path)
+    bills = {f"B{n}": _bill(10_000, n % 100) for n in range(20)}
+    ledger.post([ledger._bill_entry(bill_id, bill) for bill_id, bill in bills.items()])
+    aging = ReceivablesAgingIndex(ledger, bills)
+
+    ledger.post_payments((f"P{n}", {'bill_id': f"B{n % 20}", 'amount': 1, 'payment_date': '2026-03-01'}, None)
+                         for n in range(2000))
+    ledger.post_payments((f"Q{n}", {'bill_id': f"B{n}", 'amount': 10_000, 'payment_date': '2026-03-01'}, None)
+                         for n in range(15))
+
+    assert len(aging._by_size) <= 2 * 5 + 64 and len(aging._by_due) <= 2 * 5 + 64
+    assert sorted(bill['bill_id'] for bill in aging.largest(10)) == [f"B{n}" for n in range(15, 20)]
+    assert aging.largest(1)[0]['balance'] == 10_000 - 100
@@ -0,0 +1,59 @@
+import json
+from datetime import date
+
+import pytest
+
+import utils.attendance_store
+from utils.attendance_store import AttendanceStore
+
+
+def _legacy(tmp_path):
+    legacy = {}
+    for day in range(1, 11):
+        for employee in ('E1', 'E2'):
+            legacy[f"ATT_{len(legacy) + 1:04d}"] = {'employee_id': employee, 'date': f"2026-03-{day:02d}",
+                                                   'status': 'Present'}
+    legacy['ATT_9999'] = {'employee_id': 'E1', 'date': '2026-03-01', 'status': 'Late'}
+    path = tmp_path / "attendance.json"
+    path.write_text(json.dumps(legacy))
+    return str(path)
+
+
+def test_migration_keeps_last_mark_per_day(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance"), _legacy(tmp_path))
+    assert len(store.month(2026, 3)) == 20
+    assert store.get('E1', '2026-03-01')['status'] == 'Late'
+    assert store.totals(date(2026, 3, 1), date(2026, 3, 10)) == {
+        'Present': 19, 'Absent': 0, 'Late': 1, 'Half Day': 0, 'Leave': 0}
+
+
+def test_interrupted_migration_is_redone(tmp_path, monkeypatch):
+    legacy = _legacy(tmp_path)
+    directory = str(tmp_path / "attendance")
+    write = utils.attendance_store.atomic_write_json
+    written = []
+
+    def failing_write(path, data, *args, **kwargs):
+        if len(written) == 4:
+            raise OSError("disk full")
+        written.append(path)
+        write(path, data, *args, **kwargs)
+
+    monkeypatch.setattr(utils.attendance_store, 'atomic_write_json', failing_write)
+    with pytest.raises(OSError):
+        AttendanceStore(directory, legacy)
+    assert not (tmp_path / "attendance").exists()
+
+    monkeypatch.setattr(utils.attendance_store, 'atomic_write_json', write)
+    store = AttendanceStore(directory, legacy)
+    assert len(store.month(2026, 3)) == 20
+    assert not (tmp_path / "attendance.migrating").exists()
+
+
+def test_marking_again_replaces_the_days_mark(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance"), None)
+    first = store.mark({'employee_id': 'E1', 'date': '2026-03-02', 'status': 'Absent'})
+    again = store.mark({'employee_id': 'E1', 'date': '2026-03-02', 'status': 'Present'})
+    assert first == again
+    assert store.counts('2026-03-02')['Present'] == 1 and store.counts('2026-03-02')['Absent'] == 0
+    assert AttendanceStore(str(tmp_path / "attendance"), None).get('E1', '2026-03-02')['status'] == 'Present'
@@ -0,0 +1,50 @@
+import json
+import re
+
+from utils import batch_render
+from utils.batch_render import LAYOUTS, card_row, render_cards
+
+
+def _capture(monkeypatch):
+    calls = []
+    monkeypatch.setattr(batch_render.components, 'html',
+                        lambda html, height, scrolling: calls.append((html, height, scrolling)))
+    return calls
+
+
+def _rows(html):
+    return json.loads(re.search(r"const rows = (.*);", html).group(1))
+
+
+def test_card_row_drops_blank_lines_and_stringifies():
+    assert card_row('#fff', 101, None, ["a", "", None, 3]) == ['#fff', '101', '', ['a', '3'], None]
+
+
+def test_all_cards_are_sent_in_one_component(monkeypatch):
+    calls = _capture(monkeypatch)
+    render_cards([card_row('#0f0', f"BED-{i}") for i in range(12)], columns=5)
+
+    assert len(calls) == 1
+    html, height, scrolling = calls[0]
+    card_height, gap = LAYOUTS['grid']
+    assert len(_rows(html)) == 12
+    assert height == 3 * card_height + 2 * gap + 4
+    assert not scrolling
+
+
+def test_markup_in_fields_cannot_close_the_script(monkeypatch):
+    calls = _capture(monkeypatch)
+    render_cards([card_row('#0f0', "</script><img src=x onerror=alert(1)>")])
+
+    html = calls[0][0]
+    assert "</script><img" not in html
+    assert _rows(html)[0][1] == "</script><img src=x onerror=alert(1)>"
+
+
+def test_tall_collections_scroll_and_empty_ones_render_nothing(monkeypatch):
+    calls = _capture(monkeypatch)
+    render_cards([])
+    render_cards([card_row('#0f0', str(i)) for i in range(100)], layout='list', max_height=300)
+
+    assert len(calls) == 1
+    assert calls[0][1:] == (300, True)
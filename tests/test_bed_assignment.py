@@ -0,0 +1,66 @@
+from utils.bed_assignment import BedAssignmentEngine, BedOccupancyIndex
+
+
+def _beds(*specs):
+    return {f"B{n}": {'bed_number': number, 'department': department, 'bed_type': bed_type, 'status': status}
+            for n, (number, department, bed_type, status) in enumerate(specs)}
+
+
+def _patient(patient_id, department, acuity=3, isolation=False, bed_type=None):
+    return {'patient_id': patient_id, 'patient_name': patient_id, 'department': department,
+            'acuity': acuity, 'isolation': isolation, 'bed_type': bed_type}
+
+
+def test_index_counts_and_buckets_available_beds():
+    index = BedOccupancyIndex(_beds(('ICU-1', 'ICU', 'ICU', 'Available'),
+                                    ('ICU-2', 'ICU', 'ICU', 'Occupied'),
+                                    ('GS-1', 'General Surgery', 'General', 'Maintenance')))
+
+    assert index.available_beds('ICU') == ['ICU-1']
+    assert index.occupancy_rate('ICU') == 0.5
+    assert index.totals() == {'total': 3, 'occupied': 1, 'available': 1, 'maintenance': 1}
+
+
+def test_no_bed_is_assigned_twice_and_home_department_comes_first():
+    index = BedOccupancyIndex(_beds(('CAR-1', 'Cardiology', 'General', 'Available'),
+                                    ('GS-1', 'General Surgery', 'General', 'Available')))
+    result = BedAssignmentEngine().propose([_patient('P1', 'Cardiology'), _patient('P2', 'Cardiology')], index)
+
+    beds = [placement['bed_number'] for placement in result['placements']]
+    assert sorted(beds) == ['CAR-1', 'GS-1']
+    home = next(p for p in result['placements'] if not p['overflow'])
+    assert home['bed_number'] == 'CAR-1'
+
+
+def test_higher_acuity_wins_the_last_home_bed():
+    index = BedOccupancyIndex(_beds(('CAR-1', 'Cardiology', 'General', 'Available'),
+                                    ('GS-1', 'General Surgery', 'General', 'Available')))
+    result = BedAssignmentEngine().propose([_patient('stable', 'Cardiology', acuity=1),
+                                            _patient('critical', 'Cardiology', acuity=5)], index)
+
+    placed = {p['patient_id']: p['bed_number'] for p in result['placements']}
+    assert placed['critical'] == 'CAR-1'
+
+
+def test_isolation_and_icu_requirements_are_hard_constraints():
+    index = BedOccupancyIndex(_beds(('GS-1', 'General Surgery', 'General', 'Available')))
+    result = BedAssignmentEngine().propose([_patient('iso', 'General Surgery', isolation=True),
+                                            _patient('icu', 'General Surgery', bed_type='ICU')], index)
+
+    assert result['placements'] == []
+    assert {p['patient_id'] for p in result['unplaced']} == {'iso', 'icu'}
+
+
+def test_departments_without_overflow_route_leave_patients_unplaced():
+    index = BedOccupancyIndex(_beds(('MAT-1', 'Maternity', 'General', 'Available')))
+    result = BedAssignmentEngine(overflow={}).propose([_patient('P1', 'Cardiology')], index)
+
+    assert [p['patient_id'] for p in result['unplaced']] == ['P1']
+
+
+def test_blank_table_cells_get_defaults():
+    index = BedOccupancyIndex(_beds(('CAR-1', 'Cardiology', 'General', 'Available')))
+    result = BedAssignmentEngine().propose([{'patient_id': 'P1', 'patient_name': 'P1', 'department': 'Cardiology',
+                                             'acuity': None, 'isolation': None, 'bed_type': float('nan')}], index)
+
+    assert result['placements'][0]['acuity'] == 3.0
@@ -0,0 +1,89 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.bed_events import TRACKED_FIELDS, BedEventStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BedEventStore(str(tmp_path / "bed_events.jsonl"), str(tmp_path / "bed_snapshots.jsonl"),
+                         snapshot_interval=20)
+
+
+def _beds(count):
+    return {f"B{i:03d}": {'bed_number': f"B-{i:03d}", 'department': 'ICU' if i % 2 else 'Emergency',
+                          'bed_type': 'General', 'status': 'Available'} for i in range(count)}
+
+
+def _simulate(store, beds, start, changes, seed=28):
+    """Record random status changes one minute apart; returns the states after each change."""
+    rng = random.Random(seed)
+    history = []
+    for n in range(changes):
+        before = {bed_id: dict(bed) for bed_id, bed in beds.items()}
+        bed_id = rng.choice(sorted(beds))
+        beds[bed_id]['status'] = rng.choice(['Available', 'Occupied', 'Maintenance'])
+        events = store.build_events(before, beds, 'test')
+        when = (start + timedelta(minutes=n + 1)).isoformat()
+        for event in events:
+            event['timestamp'] = when
+        store.record(events, beds)
+        history.append((start + timedelta(minutes=n + 1), {b: dict(bed) for b, bed in beds.items()}))
+    return history
+
+
+def _tracked(beds):
+    return {bed_id: {field: bed.get(field) for field in TRACKED_FIELDS} for bed_id, bed in beds.items()}
+
+
+def test_replay_from_snapshots_equals_full_state(store):
+    beds = _beds(10)
+    start = datetime(2026, 1, 1)
+    store._write_snapshot(beds, 0, start.isoformat())
+    history = _simulate(store, beds, start, 120)
+
+    assert len(store._load_snapshot_index()) > 3
+    for when, expected in history[::7] + history[-1:]:
+        assert store.state_at(when) == _tracked(expected)
+
+
+def test_series_matches_point_queries(store):
+    beds = _beds(6)
+    start = datetime(2026, 1, 1)
+    store._write_snapshot(beds, 0, start.isoformat())
+    _simulate(store, beds, start, 60)
+
+    series = store.occupancy_series(start, start + timedelta(minutes=60), timedelta(minutes=5), 'ICU')
+    for point in series:
+        counts = store.occupancy_at(point['timestamp'], 'ICU')
+        assert {key: point[key] for key in counts} == counts
+
+
+def test_time_before_the_log_has_no_state(store):
+    beds = _beds(4)
+    start = datetime(2026, 1, 1)
+    store._write_snapshot(beds, 0, start.isoformat())
+    _simulate(store, beds, start, 10)
+
+    before = start - timedelta(days=1)
+    assert store.state_at(before) == {}
+    assert store.occupancy_at(before)['total'] == 0
+
+    series = store.occupancy_series(before, start + timedelta(minutes=10), timedelta(hours=12))
+    assert series[0]['total'] == 0
+    assert series[-1]['total'] == 4
+
+
+def test_recording_a_journal_twice_is_idempotent(store):
+    beds = _beds(2)
+    store.ensure_baseline(beds)
+    after = {bed_id: dict(bed, status='Occupied') for bed_id, bed in beds.items()}
+    events = store.build_events(beds, after, 'admission')
+
+    store.record(events, after)
+    store.record(events, after)
+
+    assert store.last_seq() == 2
+    assert [e['seq'] for e in store.history('B-000', datetime(2000, 1, 1)) if e['cause'] != 'baseline'] == [1]
@@ -0,0 +1,136 @@
+import os
+import threading
+
+import pytest
+
+from utils.bed_transactions import (BedAllocationError, BedTransactionManager,
+                                    TransactionConflictError)
+from utils.storage import atomic_write_json
+
+
+def _bed(number, status='Available'):
+    return {'bed_number': number, 'room_number': number, 'department': 'ICU', 'bed_type': 'ICU',
+            'status': status, 'patient_name': None, 'patient_id': None}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = BedTransactionManager(
+        beds_file=str(tmp_path / "beds.json"),
+        admissions_file=str(tmp_path / "admissions.json"),
+        transfers_file=str(tmp_path / "transfers.json"),
+        manifest_file=str(tmp_path / "bed_manifest.json"),
+    )
+    manager.add_beds({'ICU_01': _bed('ICU-01'), 'ICU_02': _bed('ICU-02')})
+    return manager
+
+
+def _admission(patient_id, bed_number):
+    return {'patient_id': patient_id, 'patient_name': patient_id, 'bed_number': bed_number,
+            'department': 'ICU', 'status': 'Admitted'}
+
+
+def test_admission_occupies_bed_and_records_admission(manager):
+    admission_id = manager.admit_patient(_admission('P1', 'ICU-01'))
+
+    txn = manager.begin()
+    assert txn.admissions[admission_id]['bed_number'] == 'ICU-01'
+    assert txn.beds['ICU_01']['status'] == 'Occupied'
+    assert txn.beds['ICU_01']['patient_id'] == 'P1'
+
+
+def test_stale_transaction_is_rejected_on_commit(manager):
+    first, second = manager.begin(), manager.begin()
+    first.occupy_bed('ICU-01', 'P1', 'P1')
+    second.occupy_bed('ICU-01', 'P2', 'P2')
+
+    manager.commit(first)
+    with pytest.raises(TransactionConflictError):
+        manager.commit(second)
+    assert manager.begin().beds['ICU_01']['patient_id'] == 'P1'
+
+
+def test_run_retries_conflicts_against_fresh_snapshot(manager):
+    attempts = []
+
+    def operation(txn):
+        attempts.append(dict(txn.versions))
+        if len(attempts) == 1:
+            # Another session commits between this attempt's begin and commit
+            manager.update_bed_status('ICU-02', 'Maintenance')
+        txn.set_bed_status('ICU-01', 'Reserved')
+
+    manager.run(operation)
+
+    assert len(attempts) == 2
+    txn = manager.begin()
+    assert txn.beds['ICU_01']['status'] == 'Reserved'
+    assert txn.beds['ICU_02']['status'] == 'Maintenance'
+
+
+def test_batch_admission_is_all_or_nothing(manager):
+    manager.update_bed_status('ICU-02', 'Maintenance')
+
+    with pytest.raises(BedAllocationError):
+        manager.admit_patients([_admission('P1', 'ICU-01'), _admission('P2', 'ICU-02')])
+
+    txn = manager.begin()
+    assert txn.admissions == {}
+    assert txn.beds['ICU_01']['status'] == 'Available'
+
+
+def test_transfer_and_discharge_move_and_free_beds(manager):
+    admission_id = manager.admit_patient(_admission('P1', 'ICU-01'))
+    manager.transfer_patient('P1', 'ICU', 'ICU-02', 'Step down', 'Dr. A', '2026-01-01')
+    manager.discharge_patient(admission_id)
+
+    txn = manager.begin()
+    assert txn.beds['ICU_01']['status'] == 'Available'
+    assert txn.beds['ICU_02']['status'] == 'Available'
+    assert txn.admissions[admission_id]['status'] == 'Discharged'
+    assert len(txn.transfers) == 1
+
+
+def test_concurrent_admissions_never_double_book(manager):
+    manager.add_beds({f"GW_{i:02d}": _bed(f"GW-{i:02d}") for i in range(10)})
+    errors = []
+
+    def admit(worker):
+        def operation(txn):
+            bed = next((b for b in txn.beds.values() if b['status'] == 'Available'), None)
+            if bed is None:
+                raise BedAllocationError("Ward full")
+            txn.occupy_bed(bed['bed_number'], worker, worker)
+            txn.admissions[txn.next_id('admissions', 'ADM')] = _admission(worker, bed['bed_number'])
+        try:
+            manager.run(operation, max_retries=100)
+        except BedAllocationError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=admit, args=(f"P{n}",)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    txn = manager.begin()
+    assigned = [a['bed_number'] for a in txn.admissions.values()]
+    assert not errors
+    assert len(assigned) == len(set(assigned)) == 8
+
+
+def test_committed_journal_is_rolled_forward_on_startup(manager, tmp_path):
+    txn = manager.begin()
+    txn.set_bed_status('ICU-01', 'Maintenance')
+    staged = str(tmp_path / "beds.json.crash.tmp")
+    manager._write_durable(staged, txn.beds)
+    atomic_write_json(manager.journal_file, {'txn_id': 'crash', 'staged': {manager.files['beds']: staged},
+                                            'events': [], 'versions': {'beds': 99, 'admissions': 0,
+                                                                       'transfers': 0}})
+
+    reopened = BedTransactionManager(*manager.files.values(), manifest_file=manager.manifest_file)
+
+    assert not os.path.exists(manager.journal_file)
+    txn = reopened.begin()
+    assert txn.beds['ICU_01']['status'] == 'Maintenance'
+    assert txn.versions['beds'] == 99
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from utils.billing_ledger import CASH, RECEIVABLES, UNAPPLIED, BillingLedger, LedgerError
+
+
+def _ledger(tmp_path, **kwargs):
+    return BillingLedger(str(tmp_path / "ledger_journal.jsonl"), str(tmp_path / "ledger_index.json"), **kwargs)
+
+
+def _bill(amount):
+    return {'total_amount': amount, 'bill_date': '2026-03-01'}
+
+
+def _payment(bill_id, amount):
+    return {'bill_id': bill_id, 'amount': amount, 'payment_date': '2026-03-02', 'payment_method': 'Cash'}
+
+
+def test_payments_allocate_and_books_balance(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.post_bill('B1', _bill(100))
+    ledger.post_payment('P1', _payment('B1', 60))
+    assert ledger.bill_status('B1') == 'Partially Paid'
+    ledger.post_payment('P2', _payment('B1', 70))
+
+    assert ledger.balance('B1') == 0 and ledger.bill_status('B1') == 'Paid'
+    assert ledger.account_balance(CASH) == 130
+    assert ledger.account_balance(UNAPPLIED) == -30
+    assert sum(ledger.trial_balance().values()) == 0
+    assert ledger.post_payment('P1', _payment('B1', 60)) == 2
+
+
+def test_rejected_payment_is_not_posted(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.post_bill('B1', _bill(100))
+    with pytest.raises(LedgerError):
+        ledger.post_payment('P1', _payment('B1', 0))
+    assert ledger.reconcile({'B1': _bill(100)}, {}) == []
+
+
+def test_reconcile_reports_drift(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.post_bill('B1', _bill(100))
+    ledger.post_payment('P1', _payment('B1', 40))
+    issues = ledger.reconcile({'B1': _bill(120), 'B2': _bill(5)}, {})
+    assert {issue['check'] for issue in issues} == {'bill amount', 'bill not posted', 'posted without source record'}
+
+
+def test_torn_append_is_picked_up_once_complete(tmp_path):
+    writer, reader = _ledger(tmp_path), _ledger(tmp_path)
+    writer.post_bill('B1', _bill(100))
+    assert reader.balance('B1') == 100
+
+    entry = {'kind': 'bill', 'ref': 'B2', 'entry': 2, 'amount': 50.0,
+             'postings': [{'account': RECEIVABLES, 'bill_id': 'B2', 'debit': 50.0, 'credit': 0.0},
+                          {'account': 'Revenue', 'debit': 0.0, 'credit': 50.0}]}
+    line = json.dumps(entry) + "\n"
+    with open(writer.journal_file, 'a') as f:
+        f.write(line[:20])
+    assert reader.balance('B2') == 0
+
+    with open(writer.journal_file, 'a') as f:
+        f.write(line[20:])
+    assert reader.balance('B2') == 50
+    reader.post_bill('B3', _bill(10))
+    assert reader.index['refs'] == {'B1': 1, 'B2': 2, 'B3': 3}
+
+
+def test_interrupted_append_does_not_swallow_next_entry(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.post_bill('B1', _bill(100))
+    with open(ledger.journal_file, 'a') as f:
+        f.write('{"kind": "bill", "ref": "B')
+
+    ledger.post_bill('B2', _bill(30))
+    reloaded = _ledger(tmp_path)
+    assert reloaded.index['refs'] == {'B1': 1, 'B2': 2}
+    assert reloaded.balance('B2') == 30
+
+
+def test_gap_blocks_posting_and_checkpoint(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.post_bill('B1', _bill(100))
+    entry = {'kind': 'bill', 'ref': 'B9', 'entry': 5, 'amount': 1.0, 'postings': []}
+    with open(ledger.journal_file, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+
+    reader = _ledger(tmp_path)
+    assert reader.gap == 5 and 'B9' not in reader.index['refs']
+    with pytest.raises(LedgerError):
+        reader.post_bill('B2', _bill(10))
+    reader.checkpoint()
+    assert not (tmp_path / "ledger_index.json").exists()
+
+
+def test_checkpoint_reload_replays_only_tail(tmp_path):
+    ledger = _ledger(tmp_path, checkpoint_interval=3)
+    for n in range(5):
+        ledger.post_bill(f"B{n}", _bill(10 + n))
+    reloaded = _ledger(tmp_path)
+    assert reloaded.index['refs'] == ledger.index['refs']
+    assert reloaded.trial_balance() == ledger.trial_balance()
+
+
+def test_reposting_a_ref_with_other_details_is_rejected(tmp_path):
+    ledger = _ledger(tmp_path)
+    number = ledger.post_bill('B1', _bill(100))
+    assert ledger.post_bill('B1', _bill(100)) == number
+
+    with pytest.raises(LedgerError):
+        ledger.post_bill('B1', _bill(250))
+    # Nothing of a rejected batch is applied, even its valid entries
+    with pytest.raises(LedgerError):
+        ledger.post([ledger._bill_entry('B2', _bill(40)), ledger._bill_entry('B1', _bill(250))])
+    assert ledger.balance('B1') == 100 and ledger.balance('B2') == 0
+
+    ledger.checkpoint()
+    reloaded = _ledger(tmp_path)
+    with pytest.raises(LedgerError):
+        reloaded.post_bill('B1', _bill(250))
+    assert reloaded.post_bill('B1', _bill(100)) == number
@@ -0,0 +1,95 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from utils.census_forecast import ALL_DEPARTMENTS, CensusForecaster, slot_hours
+
+
+def _admissions(count, now, seed=29):
+    rng = random.Random(seed)
+    admissions = {}
+    for n in range(count):
+        start = now - timedelta(hours=rng.randrange(24 * 60))
+        record = {'department': rng.choice(['ICU', 'Cardiology']), 'status': 'Admitted',
+                  'admission_date': start.strftime("%Y-%m-%d"), 'admission_time': start.strftime("%H:%M:%S")}
+        end = start + timedelta(hours=rng.randrange(1, 24 * 7))
+        if end < now:
+            record.update(status='Discharged', discharge_date=end.strftime("%Y-%m-%d"),
+                          discharge_time=end.strftime("%H:%M:%S"))
+        admissions[f"ADM_{n:04d}"] = record
+    return admissions
+
+
+@pytest.fixture
+def files(tmp_path):
+    return {'admissions_file': str(tmp_path / "admissions.json"), 'manifest_file': str(tmp_path / "manifest.json"),
+            'model_file': str(tmp_path / "census_model.json")}
+
+
+def _write(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _stats(forecaster):
+    return {dept: {key: np.round(np.asarray(value), 6).tolist() if isinstance(value, list) else value
+                   for key, value in stats.items()}
+            for dept, stats in forecaster.model['stats'].items()}
+
+
+def test_slot_hours_counts_every_hour_once():
+    counts = slot_hours(5, 5 + 168 * 2 + 10)
+    assert counts.sum() == 168 * 2 + 10
+    assert counts[5] == 3 and counts[20] == 2
+
+
+def test_incremental_refit_matches_a_fresh_fit(files):
+    now = datetime(2026, 3, 2, 12)
+    admissions = _admissions(300, now)
+    _write(files['admissions_file'], admissions)
+    forecaster = CensusForecaster(**files)
+    forecaster.refresh(now)
+
+    # Discharge some open stays, add new admissions, move the clock on
+    later = now + timedelta(hours=5)
+    for record in list(admissions.values())[:40]:
+        if record['status'] == 'Admitted':
+            record.update(status='Discharged', discharge_date=later.strftime("%Y-%m-%d"), discharge_time="14:00:00")
+    admissions.update({f"NEW_{n}": {'department': 'ICU', 'status': 'Admitted', 'admission_date': "2026-03-02",
+                                    'admission_time': "13:00:00"} for n in range(5)})
+    _write(files['admissions_file'], admissions)
+    forecaster.refresh(later)
+
+    fresh = CensusForecaster(files['admissions_file'], files['manifest_file'], files['model_file'] + ".fresh")
+    fresh.refresh(later)
+    assert forecaster.model['stays'] == fresh.model['stays']
+    assert _stats(forecaster) == _stats(fresh)
+
+
+def test_clock_only_refit_does_not_reread_admissions(files, monkeypatch):
+    now = datetime(2026, 3, 2, 12)
+    _write(files['admissions_file'], _admissions(50, now))
+    forecaster = CensusForecaster(**files)
+    forecaster.refresh(now)
+
+    reads = []
+    original = forecaster._load_json
+    monkeypatch.setattr(forecaster, '_load_json',
+                        lambda filename: reads.append(filename) or original(filename))
+    assert forecaster.refresh(now + timedelta(hours=3))
+    assert files['admissions_file'] not in reads
+
+
+def test_forecast_covers_the_horizon(files):
+    now = datetime(2026, 3, 2, 12)
+    _write(files['admissions_file'], _admissions(200, now))
+    forecaster = CensusForecaster(**files)
+    forecaster.refresh(now)
+
+    forecast = forecaster.forecast(ALL_DEPARTMENTS, days=7)
+    assert len(forecast) == 7
+    assert (forecast['Lower'] <= forecast['Predicted Admissions']).all()
+    assert (forecast['Predicted Census'] >= 0).all()
@@ -0,0 +1,112 @@
+import json
+
+from utils.claims_pipeline import ClaimsPipeline
+
+HEADER = "patient_name,insurance_provider,policy_number,claim_amount,treatment_date,treatment_code,quantity\n"
+
+
+def _pipeline(tmp_path, rules=None):
+    services = {
+        'SRV_1': {'name': 'ECG', 'code': 'diag001', 'category': 'Diagnostic', 'cost': 100.0},
+        'SRV_2': {'name': 'Appendectomy', 'code': 'SUR001', 'category': 'Surgery', 'cost': 5000.0},
+        'SRV_3': {'name': 'Old Test', 'code': 'OLD001', 'category': 'Diagnostic', 'cost': 10.0, 'active': False},
+    }
+    (tmp_path / "services.json").write_text(json.dumps(services))
+    if rules is not None:
+        (tmp_path / "coverage_rules.json").write_text(json.dumps(rules))
+    return ClaimsPipeline(str(tmp_path / "insurance.json"), str(tmp_path / "services.json"),
+                          str(tmp_path / "coverage_rules.json"))
+
+
+def _by_patient(result):
+    return result.set_index('patient_name')
+
+
+def test_validation_reasons(tmp_path):
+    batch = HEADER + "\n".join([
+        "Ok,Aetna,POL1,150,2026-01-05,DIAG001,1",
+        "Missing,Aetna,,150,2026-01-05,DIAG001,1",
+        "Amount,Aetna,POL2,-5,2026-01-05,DIAG001,1",
+        "Date,Aetna,POL3,150,not a date,DIAG001,1",
+        "Future,Aetna,POL4,150,2999-01-01,DIAG001,1",
+        "Unknown,Aetna,POL5,150,2026-01-05,XYZ999,1",
+        "Inactive,Aetna,POL6,150,2026-01-05,OLD001,1",
+        "Again,Aetna,POL1,150,2026-01-05,DIAG001,1",
+    ])
+    result = _by_patient(_pipeline(tmp_path).run(batch.encode(), fmt='csv'))
+
+    assert result['rejection_reason'].to_dict() == {
+        'Ok': '', 'Missing': 'Missing required field', 'Amount': 'Invalid claim amount',
+        'Date': 'Invalid treatment date', 'Future': 'Treatment date in the future',
+        'Unknown': 'Unknown treatment code', 'Inactive': 'Service inactive', 'Again': 'Duplicate within batch'}
+    assert (result.drop('Ok')['status'] == 'Denied').all()
+
+
+def test_adjudication_resolves_most_specific_rule(tmp_path):
+    rules = {'providers': {'Aetna': {'coverage': 0.9, 'categories': {'Surgery': {'max_per_claim': 1000}}}},
+             'review_threshold': 3000}
+    batch = HEADER + "\n".join([
+        "A,Aetna,POL1,150,2026-01-05,DIAG001,1",
+        "B,Cigna,POL2,150,2026-01-05,DIAG001,1",
+        "C,Aetna,POL3,9000,2026-01-05,SUR001,1",
+        "D,Cigna,POL4,9000,2026-01-05,SUR001,1",
+    ])
+    result = _by_patient(_pipeline(tmp_path, rules).run(batch.encode(), fmt='csv'))
+
+    assert result.loc['A', 'allowed_amount'] == 100.0
+    assert result.loc['A', 'expected_reimbursement'] == 72.0
+    assert result.loc['B', 'expected_reimbursement'] == 64.0
+    assert result.loc['C', 'expected_reimbursement'] == 1000.0
+    assert result.loc['D', 'expected_reimbursement'] == 3430.0
+    assert result['status'].to_dict() == {'A': 'Approved', 'B': 'Approved', 'C': 'Approved', 'D': 'Under Review'}
+
+
+def test_write_assigns_ids_and_rejects_resubmissions(tmp_path):
+    pipeline = _pipeline(tmp_path)
+    batch = HEADER + "A,Aetna,POL1,150,2026-01-05,DIAG001,2\n"
+    first = pipeline.run(batch.encode(), fmt='csv')
+    jsonl = json.dumps({'patient_name': 'A', 'insurance_provider': 'Aetna', 'policy_number': 'POL1',
+                        'claim_amount': 150, 'treatment_date': '2026-01-05', 'treatment_code': 'DIAG001'})
+    second = pipeline.run(jsonl.encode(), fmt='jsonl')
+
+    stored = json.loads((tmp_path / "insurance.json").read_text())
+    assert list(first['claim_id']) == ['CLM_0001'] and list(second['claim_id']) == ['CLM_0002']
+    assert stored['CLM_0001']['allowed_amount'] == 150.0 and stored['CLM_0001']['status'] == 'Approved'
+    assert stored['CLM_0002']['rejection_reason'] == 'Duplicate of an existing claim'
+    assert [row['stage'] for row in pipeline.metrics] == ['ingest', 'validate', 'adjudicate', 'write']
+
+
+def test_allowed_amount_uses_price_on_treatment_date(tmp_path):
+    pipeline = _pipeline(tmp_path)
+    (tmp_path / "price_lists.json").write_text(json.dumps({
+        'SRV_1': [{'effective_from': '2026-02-01', 'price': 140.0, 'version': 1}]}))
+    pipeline = ClaimsPipeline(pipeline.insurance_file, pipeline.services_file, pipeline.rules_file,
+                              str(tmp_path / "price_lists.json"))
+    batch = HEADER + "\n".join([
+        "Before,Aetna,POL1,500,2026-01-31,DIAG001,1",
+        "After,Aetna,POL2,500,2026-02-01,DIAG001,2",
+        "Capped,Aetna,POL3,120,2026-03-01,DIAG001,1",
+    ])
+    result = _by_patient(pipeline.run(batch.encode(), fmt='csv'))
+    assert result['allowed_amount'].to_dict() == {'Before': 100.0, 'After': 280.0, 'Capped': 120.0}
+
+
+def test_batch_write_waits_for_claims_saved_under_the_lock(tmp_path):
+    import threading
+
+    from utils.storage import file_lock
+
+    pipeline = _pipeline(tmp_path)
+    batch = HEADER + "A,Aetna,POL1,150,2026-01-05,DIAG001,1"
+    thread = threading.Thread(target=pipeline.run, args=(batch.encode(), 'csv'))
+    with file_lock(pipeline.lock_file):
+        thread.start()
+        thread.join(0.5)
+        assert thread.is_alive()
+        # A claim submitted from the form while the batch waits
+        (tmp_path / "insurance.json").write_text(json.dumps({'CLM_0001': {'policy_number': 'POL9'}}))
+    thread.join(5)
+
+    stored = json.loads((tmp_path / "insurance.json").read_text())
+    assert sorted(stored) == ['CLM_0001', 'CLM_0002']
+    assert stored['CLM_0002']['policy_number'] == 'POL1'
@@ -0,0 +1,105 @@
+import json
+import os
+from datetime import date, timedelta
+
+from streamlit.testing.v1 import AppTest
+
+from utils.inventory_index import InventoryIndex, parse_expiry
+from utils.stock_ledger import StockLedger
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def _index(tmp_path, items):
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(items))
+    return InventoryIndex(str(path))
+
+
+ITEMS = {
+    'A': {'quantity': 50, 'min_threshold': 10, 'expiry_date': _day(-10), 'barcode': ' 0123 '},
+    'B': {'quantity': 5, 'min_threshold': 10, 'expiry_date': _day(3)},
+    'C': {'quantity': 0, 'min_threshold': 20, 'expiry_date': _day(0)},
+    'D': {'quantity': 100, 'expiry_date': 'soon'},
+    'E': {'quantity': 12, 'min_threshold': 10, 'expiry_date': _day(-1)},
+    'F': {'quantity': 30, 'min_threshold': 10},
+}
+
+
+def test_parse_expiry():
+    assert parse_expiry('2026-03-01T10:00:00') == date(2026, 3, 1).toordinal()
+    assert parse_expiry('') is None and parse_expiry('31/12/2026') is None
+
+
+def test_expiry_and_stock_queries(tmp_path):
+    index = _index(tmp_path, ITEMS)
+    assert index.expired() == ['A', 'E']
+    assert index.expiring_within(0) == ['C']
+    assert index.expiring_within(3) == ['C', 'B']
+    assert index.low_stock() == ['C', 'B']
+    assert index.find_by_barcode('0123') == 'A'
+
+
+def test_status_prefers_expired_over_low_stock(tmp_path):
+    index = _index(tmp_path, dict(ITEMS, G={'quantity': 1, 'min_threshold': 10, 'expiry_date': _day(-2)}))
+    statuses = {item_id: index.status(item_id) for item_id in 'ABCDEFG'}
+    assert statuses == {'A': 'Expired', 'B': 'Low Stock', 'C': 'Low Stock', 'D': 'In Stock',
+                        'E': 'Expired', 'F': 'In Stock', 'G': 'Expired'}
+    assert index.status_color('B') == '#ffa500'
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    index = _index(tmp_path, ITEMS)
+    assert 'F' not in index.low_stock()
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(dict(ITEMS, F={'quantity': 2, 'min_threshold': 10})))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.low_stock() == ['C', 'F', 'B']
+
+
+def test_ledger_values_stay_out_of_the_loaded_records(tmp_path):
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps({'A': {'quantity': 5, 'expiry_date': _day(100)}}))
+    stock = StockLedger(str(tmp_path / "stock_movements.jsonl"), str(tmp_path / "stock_snapshots.jsonl"))
+    stock.record('A', 'receipt', 40, lot='L1', expiry_date=_day(30))
+    index = InventoryIndex(str(path), stock)
+    index.refresh()
+
+    assert index.items['A']['quantity'] == 40 and index.items['A']['expiry_date'] == _day(30)
+    assert index._load_json(str(path)) == {'A': {'quantity': 5, 'expiry_date': _day(100)}}
+
+
+def _delete_app():
+    import streamlit as st
+
+    from components.inventory_management import InventoryManager
+
+    # Deleting reruns the script; delete on the first run only
+    if not st.session_state.get('deleted'):
+        st.session_state.deleted = True
+        InventoryManager()._delete_supply('SUP_0001')
+
+
+def test_deleting_a_supply_writes_off_its_stock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    supplies = {'SUP_0001': {'name': 'Gauze', 'quantity': 1, 'expiry_date': _day(100)},
+                'SUP_0002': {'name': 'Saline', 'quantity': 3, 'expiry_date': _day(100)}}
+    (tmp_path / "data" / "inventory.json").write_text(json.dumps(supplies))
+    stock = StockLedger()
+    stock.record('SUP_0001', 'receipt', 20, lot='L1', expiry_date=_day(10))
+    stock.record('SUP_0001', 'receipt', 5, lot='L2', expiry_date=_day(-1))
+
+    app = AppTest.from_function(_delete_app)
+    app.run(timeout=30)
+    assert not app.exception
+
+    # The file keeps its own values for the other supplies, and no stock is left behind
+    assert json.loads((tmp_path / "data" / "inventory.json").read_text()) == {'SUP_0002': supplies['SUP_0002']}
+    assert StockLedger().on_hand_all() == {'SUP_0001': 0}
+
+    from components.inventory_management import InventoryManager
+    assert InventoryManager()._next_supply_id({'SUP_0002': {}}) == 'SUP_0003'
@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+from streamlit.testing.v1 import AppTest
+
+from components.pdf_generator import PDFReportGenerator
+
+
+def _bill(n):
+    return {'patient_id': f"P{n}", 'patient_name': f"Patient {n}", 'bill_date': '2026-03-01',
+            'due_date': '2026-03-31', 'room_type': 'Private Room', 'room_charges': 400.0,
+            'services': [{'name': 'ECG', 'cost': 100.0, 'quantity': 1, 'total': 100.0}],
+            'subtotal': 500.0, 'tax_rate': 0.0, 'tax_amount': 0.0, 'discount': 0.0, 'total_amount': 500.0}
+
+
+def test_batch_writes_one_pdf_per_bill_in_order():
+    jobs = ((f"BILL_{n:04d}", _bill(n), 0.0) for n in range(12))
+    output = io.BytesIO()
+    count = PDFReportGenerator().generate_invoice_batch(jobs, output, workers=2)
+
+    with zipfile.ZipFile(io.BytesIO(output.getvalue())) as archive:
+        names = archive.namelist()
+        assert count == 12
+        assert names == [f"BILL_{n:04d}.pdf" for n in range(12)]
+        assert all(archive.read(name).startswith(b"%PDF") for name in names)
+
+
+def _bill_pdf_app():
+    import streamlit as st
+
+    from components.billing_finance import BillingFinanceManager
+
+    manager = BillingFinanceManager()
+    manager._generate_bill_pdf('BILL_0001', st.session_state.bill)
+
+
+def test_bill_pdf_is_rendered_on_request_and_reused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    render = PDFReportGenerator.generate_invoice
+    monkeypatch.setattr(PDFReportGenerator, 'generate_invoice',
+                        lambda self, *args: calls.append(args[0]) or render(self, *args))
+
+    app = AppTest.from_function(_bill_pdf_app)
+    app.session_state.bill = _bill(1)
+    app.run()
+    assert not app.exception and calls == []
+    assert not app.get("download_button")
+
+    app.button(key="prepare_BILL_0001").click().run()
+    assert calls == ['BILL_0001']
+    app.run()
+    app.run()
+    assert calls == ['BILL_0001']
+    assert not app.exception and len(app.get("download_button")) == 1
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from utils.job_runner import JobRunner
+
+
+def _failing(calls):
+    def job():
+        calls.append(time.time())
+        raise RuntimeError("supplier feed down")
+    return job
+
+
+def test_failing_scheduled_job_waits_for_its_next_run():
+    runner = JobRunner(poll_seconds=0.05)
+    calls = []
+    runner.every('reorder_drafts', 60, _failing(calls))
+    runner.scheduler.jobs[0].next_run = runner.scheduler.jobs[0].next_run.replace(year=2000)
+    time.sleep(0.5)
+
+    assert len(calls) == 1
+    assert runner.last_runs['reorder_drafts']['ok'] is False
+    assert runner.last_runs['reorder_drafts']['error'] == "supplier feed down"
+    assert runner.scheduler.jobs[0].next_run.year > 2000
+
+
+def test_run_now_raises_job_errors():
+    runner = JobRunner()
+    calls = []
+    runner.jobs['work_orders'] = _failing(calls)
+    with pytest.raises(RuntimeError):
+        runner.run_now('work_orders')
+    assert runner.last_runs['work_orders']['ok'] is False
+
+
+def test_jobs_are_registered_once():
+    runner = JobRunner()
+    assert runner.daily('work_orders', "02:00", lambda: 3) is True
+    assert runner.daily('work_orders', "03:00", lambda: 4) is False
+    assert runner.run_now('work_orders') == 3
+    assert runner.last_runs['work_orders']['result'] == 3
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+
+from utils.lot_tracker import LotTracker
+from utils.stock_ledger import UNLOTTED, StockError, StockLedger
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def _tracker(tmp_path):
+    stock = StockLedger(str(tmp_path / "stock_movements.jsonl"), str(tmp_path / "stock_snapshots.jsonl"))
+    return stock, LotTracker(stock)
+
+
+def _lot_sums(stock):
+    return {item_id: sum(entry['quantity'] for entry in lots.values()) for item_id, lots in stock.lots.items()}
+
+
+def test_dispense_soonest_expiry_first_skipping_expired(tmp_path):
+    stock, tracker = _tracker(tmp_path)
+    stock.record_many([
+        {'item_id': 'A', 'type': 'receipt', 'quantity': 5, 'lot': 'LATE', 'expiry_date': _day(90)},
+        {'item_id': 'A', 'type': 'receipt', 'quantity': 5, 'lot': 'SOON', 'expiry_date': _day(10)},
+        {'item_id': 'A', 'type': 'receipt', 'quantity': 5, 'lot': 'GONE', 'expiry_date': _day(-1)},
+    ])
+    moved = tracker.dispense('A', 7)
+    assert [(m['lot'], m['quantity']) for m in moved] == [('SOON', -5), ('LATE', -2)]
+    with pytest.raises(StockError):
+        tracker.dispense('A', 4)
+    assert [lot['lot'] for lot in tracker.lots_of('A')] == ['GONE', 'LATE']
+
+
+def test_unlotted_receipt_is_dispensable(tmp_path):
+    stock, tracker = _tracker(tmp_path)
+    stock.record('A', 'receipt', 10, lot='L1', expiry_date=_day(30))
+    stock.record('A', 'receipt', 5)
+
+    moved = tracker.dispense('A', 12)
+    assert [(m['lot'], m['quantity']) for m in moved] == [('L1', -10), (UNLOTTED, -2)]
+    assert stock.quantities['A'] == 3 and _lot_sums(stock) == {'A': 3}
+
+
+def test_unlotted_removals_are_booked_to_lots(tmp_path):
+    stock, tracker = _tracker(tmp_path)
+    stock.record('A', 'receipt', 10, lot='L1', expiry_date=_day(-5))
+    stock.record('A', 'receipt', 10, lot='L2', expiry_date=_day(30))
+
+    with pytest.raises(StockError):
+        stock.record('A', 'expiry', 10)
+    tracker.dispense('A', 10, movement_type='expiry')
+    tracker.dispense('A', 3, movement_type='adjustment')
+
+    assert stock.lots['A']['L1']['quantity'] == 0 and stock.lots['A']['L2']['quantity'] == 7
+    assert stock.quantities['A'] == 7 and _lot_sums(stock) == {'A': 7}
+
+
+def test_waste_report_and_write_off(tmp_path):
+    stock, tracker = _tracker(tmp_path)
+    stock.record('A', 'receipt', 4, lot='OLD', expiry_date=_day(-3), unit_cost=2.5)
+    stock.record('B', 'receipt', 2, lot='OLD', expiry_date=_day(-1))
+    stock.record('B', 'receipt', 2, lot='NEW', expiry_date=_day(20))
+
+    waste = tracker.waste_report(unit_costs={'B': 1.0})
+    assert list(zip(waste['item_id'], waste['value'])) == [('A', 10.0), ('B', 2.0)]
+    tracker.write_off_expired()
+    assert stock.quantities == {'A': 0, 'B': 2} and tracker.waste_report().empty
+    assert _lot_sums(stock) == stock.quantities
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+
+from utils.maintenance_scheduler import MaintenanceScheduler, next_due
+
+TODAY = date(2026, 3, 10)
+
+
+def _scheduler(tmp_path, equipment):
+    (tmp_path / "equipment.json").write_text(json.dumps(equipment))
+    return MaintenanceScheduler(str(tmp_path / "equipment.json"), str(tmp_path / "work_orders.json"))
+
+
+EQUIPMENT = {
+    'E1': {'name': 'Ventilator', 'maintenance_schedule': 'Monthly', 'next_maintenance': '2026-03-01'},
+    'E2': {'name': 'Monitor', 'maintenance_schedule': 'Quarterly', 'last_maintenance': '2025-12-12'},
+    'E3': {'name': 'X-Ray', 'maintenance_schedule': 'Annual', 'next_maintenance': '2026-03-10'},
+    'E4': {'name': 'Bed', 'maintenance_schedule': 'As Needed', 'next_maintenance': '2026-01-01'},
+    'E5': {'name': 'Pump', 'maintenance_schedule': 'Monthly', 'next_maintenance': '2026-02-01', 'status': 'Retired'},
+    'E6': {'name': 'Scale', 'maintenance_schedule': 'Semi-Annual', 'next_maintenance': '2026-05-01'},
+}
+
+
+def test_next_due_clamps_to_month_end():
+    assert next_due('Monthly', date(2026, 1, 31)) == date(2026, 2, 28)
+    assert next_due('Quarterly', date(2025, 11, 30)) == date(2026, 2, 28)
+    assert next_due('Annual', date(2024, 2, 29)) == date(2025, 2, 28)
+    assert next_due('As Needed', TODAY) is None
+
+
+def test_overdue_and_due_this_week(tmp_path):
+    scheduler = _scheduler(tmp_path, EQUIPMENT)
+    assert scheduler.overdue(TODAY) == ['E1']
+    assert scheduler.due_this_week(TODAY) == ['E3', 'E2']
+    assert scheduler.next_maintenance('E2') == '2026-03-12'
+    assert scheduler.next_maintenance('E4') is None and scheduler.next_maintenance('E5') is None
+
+
+def test_work_orders_are_raised_once_and_closed_by_logging(tmp_path):
+    scheduler = _scheduler(tmp_path, EQUIPMENT)
+    created = scheduler.create_work_orders(TODAY)
+    assert {order['equipment_id']: order['priority'] for order in created.values()} == \
+        {'E1': 'High', 'E3': 'Normal', 'E2': 'Normal'}
+    assert scheduler.create_work_orders(TODAY) == {}
+
+    assert scheduler.log_maintenance('E1', TODAY, technician='Sam') == '2026-04-10'
+    assert scheduler.overdue(TODAY) == []
+    assert sorted(order['equipment_id'] for order in scheduler.work_orders().values()) == ['E2', 'E3']
+    stored = json.loads((tmp_path / "equipment.json").read_text())['E1']
+    assert stored['last_maintenance'] == '2026-03-10' and len(stored['maintenance_history'][0]['work_orders']) == 1
+
+
+def test_heap_stays_bounded_under_repeated_logging(tmp_path):
+    scheduler = _scheduler(tmp_path, EQUIPMENT)
+    performed = TODAY
+    for _ in range(200):
+        scheduler.log_maintenance('E1', performed)
+        performed = date.fromisoformat(scheduler.next_maintenance('E1'))
+    assert len(scheduler._heap) <= 2 * len(scheduler.due) + 64
+    assert scheduler.due_within(31, performed) == ['E1']
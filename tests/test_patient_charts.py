@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import utils.patient_charts
+from utils.patient_charts import CLINICAL_COLLECTIONS, PatientChartIndex
+from utils.storage import file_lock
+
+
+def _index(tmp_path):
+    files = {name: str(tmp_path / os.path.basename(path)) for name, (path, _) in CLINICAL_COLLECTIONS.items()}
+    return PatientChartIndex(str(tmp_path / "charts"), files, str(tmp_path / "medical_records.json"))
+
+
+def _write_visits(index, visits):
+    with open(index.files['visits'], 'w') as f:
+        json.dump(visits, f)
+    # Make sure the change is visible to the modification-time check
+    stamp = time.time() + len(visits)
+    os.utime(index.files['visits'], (stamp, stamp))
+
+
+def _visit(patient_id, day):
+    return {'patient_id': patient_id, 'visit_date': day, 'visit_time': '09:00'}
+
+
+def test_charts_follow_collections_changed_outside_the_index(tmp_path):
+    index = _index(tmp_path)
+    _write_visits(index, {'VISIT_0001': _visit('P1', '2026-01-05'), 'VISIT_0002': _visit('P2', '2026-01-06')})
+    assert list(index.records('P1', 'visits')) == ['VISIT_0001']
+
+    _write_visits(index, {'VISIT_0002': _visit('P2', '2026-01-06'), 'VISIT_0003': _visit('P2', '2026-01-07')})
+    assert index.records('P1', 'visits') == {}
+    assert list(index.records('P2', 'visits')) == ['VISIT_0002', 'VISIT_0003']
+    assert sorted(os.listdir(index.charts_dir)) == ['P2.json', '_manifest.json']
+
+
+def test_added_records_survive_a_rebuild(tmp_path):
+    index = _index(tmp_path)
+    record_id = index.add('visits', _visit('P1', '2026-01-05'))
+    index.add_history('P1', {'condition': 'Asthma', 'diagnosis_date': '2020-01-01'})
+    index.rebuild()
+
+    fresh = _index(tmp_path)
+    assert list(fresh.records('P1', 'visits')) == [record_id]
+    assert fresh.chart('P1')['medical_history'] == [{'condition': 'Asthma', 'diagnosis_date': '2020-01-01'}]
+
+
+def test_interrupted_rebuild_keeps_the_previous_charts(tmp_path, monkeypatch):
+    index = _index(tmp_path)
+    _write_visits(index, {'VISIT_0001': _visit('P1', '2026-01-05')})
+    index.refresh()
+
+    _write_visits(index, {'VISIT_0001': _visit('P1', '2026-01-05'), 'VISIT_0002': _visit('P2', '2026-01-06')})
+    write = utils.patient_charts.atomic_write_json
+    calls = []
+
+    def failing_write(path, data, *args, **kwargs):
+        calls.append(path)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        write(path, data, *args, **kwargs)
+
+    monkeypatch.setattr(utils.patient_charts, 'atomic_write_json', failing_write)
+    with pytest.raises(OSError):
+        index.refresh()
+    assert sorted(os.listdir(index.charts_dir)) == ['P1.json', '_manifest.json']
+
+    monkeypatch.setattr(utils.patient_charts, 'atomic_write_json', write)
+    assert list(_index(tmp_path).records('P2', 'visits')) == ['VISIT_0002']
+
+
+def test_waiting_reader_does_not_rebuild_again(tmp_path, monkeypatch):
+    index = _index(tmp_path)
+    _write_visits(index, {'VISIT_0001': _visit('P1', '2026-01-05')})
+    rebuilds = []
+    rebuild = PatientChartIndex._rebuild
+    monkeypatch.setattr(PatientChartIndex, '_rebuild', lambda self: rebuilds.append(self) or rebuild(self))
+
+    reader = _index(tmp_path)
+    with file_lock(index.lock_file):
+        # The reader finds the charts stale and queues behind the rebuild in progress
+        thread = threading.Thread(target=reader.refresh)
+        thread.start()
+        time.sleep(0.2)
+        index._rebuild()
+    thread.join(5)
+
+    assert rebuilds == [index]
+    assert list(reader.records('P1', 'visits')) == ['VISIT_0001']
+
+
+def _timeline_index(tmp_path):
+    index = _index(tmp_path)
+    # Many records share a day, and a day is shared across collections, so pages split ties
+    for n in range(23):
+        index.add('visits', _visit('P1', f"2026-02-{n % 4 + 1:02d}"))
+    for n in range(17):
+        index.add('prescriptions', {'patient_id': 'P1', 'prescribed_date': f"2026-02-{n % 3 + 1:02d}",
+                                    'created_at': ''})
+    for n in range(11):
+        index.add('lab_results', {'patient_id': 'P1', 'test_date': f"2026-02-0{n % 2 + 1}", 'created_at': ''})
+        index.add_history('P1', {'condition': f"Condition {n}", 'diagnosis_date': f"2026-02-0{n % 5 + 1}",
+                                 'added_date': ''})
+    index.add('visits', _visit('P2', '2026-02-02'))
+    return index
+
+
+@pytest.mark.parametrize('size', [1, 3, 10, 31, 61, 62, 100])
+def test_timeline_pages_are_newest_first_without_gaps_or_repeats(tmp_path, size):
+    index = _timeline_index(tmp_path)
+    entries = list(index.timeline('P1'))
+    assert len(entries) == 23 + 17 + 11 + 11
+    assert [entry['cursor'] for entry in entries] == sorted((entry['cursor'] for entry in entries), reverse=True)
+
+    paged, cursor = [], None
+    while True:
+        page, cursor = index.timeline_page('P1', size, cursor)
+        assert 0 < len(page) <= size
+        paged.extend(page)
+        if cursor is None:
+            break
+        assert cursor == page[-1]['cursor']
+    assert [entry['cursor'] for entry in paged] == [entry['cursor'] for entry in entries]
+
+
+def test_timeline_resumes_after_records_added_between_pages(tmp_path):
+    index = _timeline_index(tmp_path)
+    page, cursor = index.timeline_page('P1', 5)
+    index.add('visits', _visit('P1', '2026-03-01'))
+    index.add('visits', _visit('P1', '2026-01-01'))
+
+    rest = list(index.timeline('P1', before=cursor))
+    shown = {entry['cursor'] for entry in page}
+    # Newer records are not shown again below the cursor; older ones are
+    assert not shown & {entry['cursor'] for entry in rest}
+    assert rest[-1]['date'] == '2026-01-01'
+    assert all(entry['cursor'] < cursor for entry in rest)
+
+
+def test_timeline_returns_the_records(tmp_path):
+    index = _timeline_index(tmp_path)
+    entries = list(index.timeline('P1'))
+    history = [entry for entry in entries if entry['kind'] == 'medical_history']
+    assert {entry['record']['condition'] for entry in history} == {f"Condition {n}" for n in range(11)}
+    assert all(entry['record']['patient_id'] == 'P1' for entry in entries if entry['kind'] == 'visits')
+    assert index.timeline_page('P3') == ([], None)
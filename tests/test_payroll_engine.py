@@ -0,0 +1,67 @@
+import json
+
+from utils.attendance_store import AttendanceStore
+from utils.payroll_engine import PayrollEngine
+
+
+def _shift(employee_id, day, start='08:00:00', end='18:00:00', status='Scheduled'):
+    return {'employee_id': employee_id, 'shift_date': day, 'start_time': start, 'end_time': end, 'status': status}
+
+
+def _engine(tmp_path):
+    staff = {'S1': {'employee_id': 'E1', 'full_name': 'Ann', 'salary': 5200, 'status': 'Active'},
+             'S2': {'employee_id': 'E2', 'full_name': 'Bob', 'salary': 5200, 'status': 'Active'},
+             'S3': {'employee_id': 'E3', 'full_name': 'Cy', 'salary': 9000, 'status': 'Inactive'}}
+    shifts = {f"SH{n}": _shift('E1', f"2026-03-0{n}") for n in range(2, 7)}
+    shifts.update({'SH7': _shift('E2', '2026-03-02', '22:00:00', '06:00:00'),
+                   'SH8': _shift('E2', '2026-03-03', '08:00:00', '16:00:00'),
+                   'SH9': _shift('E2', '2026-03-04', status='Cancelled'),
+                   'SH10': _shift('E2', '2026-04-01')})
+    (tmp_path / "staff.json").write_text(json.dumps(staff))
+    (tmp_path / "shifts.json").write_text(json.dumps(shifts))
+    attendance = AttendanceStore(str(tmp_path / "attendance"), None)
+    attendance.mark({'employee_id': 'E2', 'date': '2026-03-03', 'status': 'Absent'})
+    return PayrollEngine(str(tmp_path / "staff.json"), str(tmp_path / "shifts.json"), attendance,
+                         str(tmp_path / "payroll.json"))
+
+
+def _records(tmp_path):
+    return {record['employee_id']: record for record in json.loads((tmp_path / "payroll.json").read_text()).values()}
+
+
+def test_overtime_absence_and_tax(tmp_path):
+    summary = _engine(tmp_path).run('March', 2026)
+    assert summary == {'computed': 2, 'unchanged': 0, 'employees': 2}
+
+    records = _records(tmp_path)
+    assert records['E1']['worked_hours'] == 50 and records['E1']['overtime_hours'] == 10
+    assert records['E1']['overtime_pay'] == 450 and records['E1']['net_pay'] == 5085
+    assert records['E2']['worked_hours'] == 8 and records['E2']['absent_days'] == 1
+    assert records['E2']['absence_deduction'] == 240 and records['E2']['net_pay'] == 4464
+
+
+def test_rerun_recomputes_only_changed_employees(tmp_path):
+    engine = _engine(tmp_path)
+    engine.run('March', 2026)
+    assert engine.run('March', 2026) == {'computed': 0, 'unchanged': 2, 'employees': 2}
+
+    engine.attendance.mark({'employee_id': 'E1', 'date': '2026-03-06', 'status': 'Half Day'})
+    assert engine.run('March', 2026) == {'computed': 1, 'unchanged': 1, 'employees': 2}
+    assert _records(tmp_path)['E1']['worked_hours'] == 45
+
+    assert engine.run('March', 2026, overtime_rate=2.0)['computed'] == 2
+
+
+def test_shift_times_with_or_without_seconds(tmp_path):
+    staff = {'S1': {'employee_id': 'E1', 'full_name': 'Ann', 'salary': 5200, 'status': 'Active'}}
+    shifts = {'SH1': _shift('E1', '2026-03-02', '07:00', '15:00'),
+              'SH2': _shift('E1', '2026-03-03', '22:00', '06:00:00'),
+              'SH3': _shift('E1', '2026-03-04', 'soon', '15:00'),
+              'SH4': _shift('E1', '2026-03-05', '25:00', '15:00')}
+    (tmp_path / "staff.json").write_text(json.dumps(staff))
+    (tmp_path / "shifts.json").write_text(json.dumps(shifts))
+    engine = PayrollEngine(str(tmp_path / "staff.json"), str(tmp_path / "shifts.json"),
+                           AttendanceStore(str(tmp_path / "attendance"), None), str(tmp_path / "payroll.json"))
+    engine.run('March', 2026)
+    # Unreadable times count no hours rather than a full day
+    assert _records(tmp_path)['E1']['worked_hours'] == 16
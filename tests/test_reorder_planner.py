@@ -0,0 +1,75 @@
+import json
+import threading
+from datetime import date, timedelta
+
+from utils.reorder_planner import ReorderPlanner
+from utils.stock_ledger import StockLedger
+from utils.storage import file_lock
+
+AS_OF = date(2026, 3, 31)
+
+
+def _planner(tmp_path, inventory):
+    (tmp_path / "inventory.json").write_text(json.dumps(inventory))
+    (tmp_path / "suppliers.json").write_text(json.dumps({'V1': {'name': 'Acme', 'lead_time_days': 10}}))
+    stock = StockLedger(str(tmp_path / "stock_movements.jsonl"), str(tmp_path / "stock_snapshots.jsonl"))
+    stock.bootstrap(inventory, (AS_OF - timedelta(days=120)).isoformat())
+    return ReorderPlanner(stock, str(tmp_path / "inventory.json"), str(tmp_path / "suppliers.json"),
+                          str(tmp_path / "purchase_orders.json"), window_days=30)
+
+
+def _issues(item_id, per_day):
+    return [{'item_id': item_id, 'type': 'issue', 'quantity': -per_day,
+             'timestamp': (AS_OF - timedelta(days=offset)).isoformat()} for offset in range(30)]
+
+
+INVENTORY = {
+    'A': {'name': 'Gloves', 'supplier': 'Acme', 'quantity': 40, 'min_threshold': 10, 'max_threshold': 100,
+          'cost_per_unit': 2.0},
+    'B': {'name': 'Masks', 'supplier': 'Other', 'quantity': 500, 'min_threshold': 10, 'max_threshold': 100},
+    'C': {'name': 'Swabs', 'supplier': 'Acme', 'quantity': 5, 'min_threshold': 10, 'max_threshold': 50},
+}
+
+
+def test_plan_uses_usage_and_lead_time(tmp_path):
+    planner = _planner(tmp_path, INVENTORY)
+    plan = planner.plan(AS_OF, _issues('A', 5))
+
+    assert plan.loc['A', 'daily_usage'] == 5 and plan.loc['A', 'usage_std'] == 0
+    assert plan.loc['A', 'lead_time_days'] == 10 and plan.loc['B', 'lead_time_days'] == 7
+    assert plan.loc['A', 'reorder_point'] == 50
+    assert plan.loc['A', 'order_quantity'] == 200 - 40
+    assert plan.loc['B', 'order_quantity'] == 0
+    assert plan.loc['C', 'reorder_point'] == 10 and plan.loc['C', 'order_quantity'] == 45
+
+
+def test_draft_orders_once_per_day_and_count_as_on_order(tmp_path):
+    planner = _planner(tmp_path, INVENTORY)
+    created = planner.draft_orders(AS_OF, _issues('A', 5))
+
+    assert list(created) == ['PO_0001']
+    order = created['PO_0001']
+    assert order['supplier'] == 'Acme' and order['status'] == 'Draft'
+    assert {line['item_id']: line['quantity'] for line in order['items']} == {'A': 160, 'C': 45}
+    assert planner.draft_orders(AS_OF, _issues('A', 5)) == {}
+    assert planner.plan(AS_OF, _issues('A', 5))['order_quantity'].sum() == 0
+
+
+def test_draft_orders_keep_orders_written_under_the_lock(tmp_path):
+    planner = _planner(tmp_path, INVENTORY)
+    orders_file = tmp_path / "purchase_orders.json"
+    orders_file.write_text(json.dumps({'PO_0001': {'status': 'Received', 'items': []}}))
+    results = {}
+
+    with file_lock(planner.orders_lock):
+        worker = threading.Thread(target=lambda: results.update(planner.draft_orders(AS_OF, [])))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+        orders = json.loads(orders_file.read_text())
+        orders['PO_0002'] = {'status': 'Received', 'items': []}
+        orders_file.write_text(json.dumps(orders))
+    worker.join()
+
+    assert list(results) == ['PO_0003']
+    assert sorted(json.loads(orders_file.read_text())) == ['PO_0001', 'PO_0002', 'PO_0003']
@@ -0,0 +1,76 @@
+import threading
+
+from utils.revenue_aggregates import RevenueAggregateStore, bill_lines
+
+
+def _store(tmp_path):
+    return RevenueAggregateStore(str(tmp_path / "revenue_aggregates.json"), str(tmp_path / "services.json"))
+
+
+def _bill(bill_id, total, date="2026-03-04"):
+    return {'bill_id': bill_id, 'bill_date': date, 'department': 'ICU', 'room_charges': total,
+            'services': [], 'total_amount': total}
+
+
+def test_bill_lines_add_up_to_total():
+    bill = {'department': 'ICU', 'room_charges': 100, 'total_amount': 165,
+            'services': [{'name': 'X-Ray', 'department': 'Radiology', 'category': 'Imaging', 'total': 50}]}
+    lines = bill_lines(bill)
+    assert abs(sum(amount for _, _, amount in lines) - 165) < 1e-9
+    assert {(department, category) for department, category, _ in lines} == {('ICU', 'Room'),
+                                                                           ('Radiology', 'Imaging')}
+
+
+def test_sessions_do_not_lose_each_others_updates(tmp_path):
+    first, second = _store(tmp_path), _store(tmp_path)
+    first.record_bill(_bill('B1', 100))
+    second.record_bill(_bill('B2', 50))
+    first.record_payment({'payment_date': '2026-03-05', 'amount': 40}, _bill('B1', 100))
+
+    for store in (first, second, _store(tmp_path)):
+        totals = store.totals()
+        assert totals['bills'] == 2 and totals['payments'] == 1
+        assert totals['billed'] == 150 and totals['collected'] == 40
+
+
+def test_reads_pick_up_changes_from_other_sessions(tmp_path):
+    reader, writer = _store(tmp_path), _store(tmp_path)
+    assert reader.month('2026-03')['billed'] == 0
+    writer.record_bill(_bill('B1', 75))
+    assert reader.month('2026-03')['billed'] == 75
+    assert reader.breakdown(['2026-03'], by='department') == {'ICU': 75}
+
+
+def test_concurrent_records_all_counted(tmp_path):
+    def record(offset):
+        store = _store(tmp_path)
+        for n in range(20):
+            store.record_bill(_bill(f"B{offset}-{n}", 10))
+
+    threads = [threading.Thread(target=record, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    totals = _store(tmp_path).totals()
+    assert totals['bills'] == 80 and totals['billed'] == 800
+
+
+def test_rebuild_matches_incremental(tmp_path):
+    bills = {f"B{n}": _bill(f"B{n}", 10 * n, f"2026-0{n % 3 + 1}-01") for n in range(1, 7)}
+    payments = {f"P{n}": {'bill_id': f"B{n}", 'payment_date': '2026-03-10', 'amount': 5 * n} for n in range(1, 4)}
+
+    (tmp_path / "a").mkdir()
+    incremental = _store(tmp_path / "a")
+    for bill in bills.values():
+        incremental.record_bill(bill)
+    for payment in payments.values():
+        incremental.record_payment(payment, bills[payment['bill_id']])
+
+    (tmp_path / "b").mkdir()
+    rebuilt = _store(tmp_path / "b")
+    rebuilt.rebuild(bills, payments)
+    assert rebuilt.totals() == incremental.totals()
+    assert rebuilt.monthly_series(['2026-01', '2026-02', '2026-03']) == \
+        incremental.monthly_series(['2026-01', '2026-02', '2026-03'])
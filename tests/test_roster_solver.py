@@ -0,0 +1,71 @@
+from utils.roster_solver import RosterSolver, check_roster
+
+
+def _staff(count, role='Nurse'):
+    return {f"S{n}": {'employee_id': f"E{n}", 'full_name': f"Nurse {n}", 'role': role,
+                      'department': 'ICU', 'status': 'Active'} for n in range(1, count + 1)}
+
+
+def _demand(shift_type='Day', required=1):
+    return [{'department': 'ICU', 'shift_type': shift_type, 'role': 'Nurse', 'required': required}]
+
+
+def _by_employee(assignments):
+    worked = {}
+    for shift in assignments:
+        worked.setdefault(shift['employee_id'], set()).add(shift['shift_date'])
+    return worked
+
+
+def test_roster_covers_demand_within_rules():
+    result = RosterSolver(time_limit=5).solve(_staff(8), _demand('Day', 2) + _demand('Night', 1), 2026, 2)
+    assert result['stats']['coverage_rate'] == 1.0
+    assert result['violations'] == []
+    assert check_roster(result['assignments']) == []
+
+
+def test_unavailable_days_are_not_rostered():
+    unavailable = {'E1': ['2026-02-02', '2026-02-03']}
+    result = RosterSolver(time_limit=5).solve(_staff(4), _demand(), 2026, 2, unavailable)
+    assert not _by_employee(result['assignments']).get('E1', set()) & {'2026-02-02', '2026-02-03'}
+    assert result['violations'] == []
+
+
+def test_existing_shifts_block_their_day():
+    existing = [{'employee_id': 'E1', 'shift_date': f"2026-02-{day:02d}", 'shift_type': 'Day',
+                 'start_time': '07:00:00', 'end_time': '15:00:00'} for day in (2, 3, 4)]
+    result = RosterSolver(time_limit=5).solve(_staff(3), _demand(), 2026, 2, existing=existing)
+
+    # The fixed shifts are not handed out again and nobody is double-booked
+    assert not _by_employee(result['assignments']).get('E1', set()) & {'2026-02-02', '2026-02-03', '2026-02-04'}
+    assert result['violations'] == []
+    assert result['stats']['coverage_rate'] == 1.0
+
+
+def test_existing_shifts_count_towards_rules():
+    # A night shift at the end of January leaves no time for a Day shift on 1 February
+    existing = [{'employee_id': 'E1', 'shift_date': '2026-01-31', 'shift_type': 'Night',
+                 'start_time': '23:00:00', 'end_time': '07:00:00'}]
+    # A manually entered shift fills E2's monthly allowance
+    existing += [{'employee_id': 'E2', 'shift_date': '2026-02-10', 'shift_type': 'On call',
+                  'start_time': '08:00:00', 'end_time': '16:00:00'}]
+    result = RosterSolver({'max_shifts': 1}, time_limit=5).solve(_staff(3), _demand(), 2026, 2, existing=existing)
+
+    worked = _by_employee(result['assignments'])
+    assert '2026-02-01' not in worked.get('E1', set())
+    assert 'E2' not in worked
+    assert result['violations'] == []
+
+
+def test_existing_shifts_are_in_the_violation_check():
+    existing = [{'employee_id': 'E1', 'shift_date': f"2026-02-{day:02d}", 'shift_type': 'Day'}
+                for day in range(1, 6)]
+    result = RosterSolver({'max_consecutive_days': 5}, time_limit=5).solve(
+        _staff(1), _demand(), 2026, 2, existing=existing)
+    assert '2026-02-06' not in _by_employee(result['assignments']).get('E1', set())
+
+    # Six fixed days in a row already break the rule; the check reports it
+    existing.append({'employee_id': 'E1', 'shift_date': '2026-02-06', 'shift_type': 'Day'})
+    result = RosterSolver({'max_consecutive_days': 5}, time_limit=5).solve(
+        _staff(1), _demand(), 2026, 2, existing=existing)
+    assert [violation['rule'] for violation in result['violations']] == ['Consecutive days']
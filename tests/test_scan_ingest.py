@@ -0,0 +1,38 @@
+import json
+
+from utils.inventory_index import InventoryIndex
+from utils.scan_ingest import ScanReceiver, normalize_expiry, parse_scans
+from utils.stock_ledger import StockLedger
+
+
+def test_normalize_expiry():
+    assert normalize_expiry('270131') == '2027-01-31'
+    assert normalize_expiry('270200') == '2027-02-28'
+    assert normalize_expiry('271200') == '2027-12-31'
+    assert normalize_expiry('2027-06-30') == '2027-06-30'
+    for value in ('', '271300', '270000', '270230', '2027-13-01', 'soon'):
+        assert normalize_expiry(value) is None, value
+
+
+def test_parse_scans():
+    lines = ["# delivery", "", "0123", "0123\tL1\t270131\t4", "0456, L2 ,, 2", "0789,L3,,many", "END"]
+    assert list(parse_scans(lines)) == [('0123', '', '', 1.0), ('0123', 'L1', '270131', 4.0),
+                                        ('0456', 'L2', '', 2.0), ('0789', 'L3', '', 0.0)]
+
+
+def test_receive_sums_lines_and_rejects_bad_scans(tmp_path):
+    inventory = {'A': {'name': 'Gloves', 'barcode': '0123', 'cost_per_unit': 2.0, 'expiry_date': '2028-01-01'},
+                 'B': {'name': 'Masks', 'barcode': '0456'}}
+    (tmp_path / "inventory.json").write_text(json.dumps(inventory))
+    stock = StockLedger(str(tmp_path / "stock_movements.jsonl"), str(tmp_path / "stock_snapshots.jsonl"))
+    receiver = ScanReceiver(stock, InventoryIndex(str(tmp_path / "inventory.json"), stock))
+
+    summary = receiver.receive(parse_scans([
+        "0123,L1,270131,4", "0123,L1,270131,6", "0456,L2,,2", "0999,L9,,1", "0456,L3,271300,5", "0456,L4,,0"
+    ]), reference="DEL-1")
+
+    assert summary['scans'] == 6 and summary['lines'] == 2 and summary['units'] == 12
+    assert [(r['barcode'], r['reason']) for r in summary['rejected']] == [
+        ('0999', 'Unknown barcode'), ('0456', 'Invalid expiry'), ('0456', 'Invalid quantity')]
+    assert stock.lots['A']['L1'] == {'quantity': 10, 'expiry_date': '2027-01-31', 'unit_cost': 2.0}
+    assert stock.lots['B']['L2']['quantity'] == 2 and 'L3' not in stock.lots['B']
@@ -0,0 +1,57 @@
+import json
+from datetime import date
+
+import pytest
+
+from utils.service_catalog import PricingEngine, PricingError, ServiceCatalog
+
+
+def _catalog(tmp_path):
+    services = {
+        'SRV_1': {'name': 'ECG', 'code': 'diag001', 'category': 'Diagnostic', 'department': 'Cardiology', 'cost': 100},
+        'SRV_2': {'name': 'Blood Test', 'code': 'LAB001', 'category': 'Laboratory', 'cost': 75},
+        'SRV_3': {'name': 'Angiogram', 'code': 'DIAG002', 'category': 'Diagnostic', 'cost': 900, 'active': False},
+    }
+    (tmp_path / "services.json").write_text(json.dumps(services))
+    return ServiceCatalog(str(tmp_path / "services.json"), str(tmp_path / "price_lists.json"))
+
+
+def test_lookups(tmp_path):
+    catalog = _catalog(tmp_path)
+    assert catalog.find_by_code(' Diag001 ') == 'SRV_1'
+    assert catalog.categories() == ['Diagnostic', 'Laboratory']
+    assert catalog.in_category('Diagnostic') == ['SRV_3', 'SRV_1']
+    assert catalog.in_category('Diagnostic', active_only=True) == ['SRV_1']
+
+
+def test_effective_dated_prices(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.set_price('SRV_1', 120, date(2026, 3, 1))
+    catalog.set_price('SRV_1', 110, date(2026, 1, 1))
+    assert catalog.set_price('SRV_1', 125, date(2026, 3, 1)) == 3
+
+    assert catalog.price('SRV_1', date(2025, 12, 31)) == 100
+    assert catalog.price('SRV_1', date(2026, 1, 1)) == 110
+    assert catalog.price('SRV_1', date(2026, 6, 1)) == 125
+    assert [v['price'] for v in catalog.price_history('SRV_1')] == [110, 125]
+    assert ServiceCatalog(catalog.services_file, catalog.price_list_file).price('SRV_1', date(2026, 2, 1)) == 110
+    with pytest.raises(PricingError):
+        catalog.set_price('SRV_9', 1, date(2026, 1, 1))
+
+
+def test_pricing_engine_totals(tmp_path):
+    catalog = _catalog(tmp_path)
+    quote = PricingEngine(catalog).price([('SRV_1', 2), ('SRV_2', 1), ('SRV_2', 0)], on=date(2026, 1, 1),
+                                         extra_lines=[{'name': 'Room', 'amount': 25}],
+                                         tax_rate=0.1, discount=5, discount_rate=0.1)
+    assert [line['total'] for line in quote['lines']] == [200.0, 75.0]
+    assert quote['subtotal'] == 300.0 and quote['tax_amount'] == 30.0
+    assert quote['discount'] == 35.0 and quote['total_amount'] == 295.0
+
+
+def test_pricing_rejects_unknown_and_inactive(tmp_path):
+    engine = PricingEngine(_catalog(tmp_path))
+    with pytest.raises(PricingError):
+        engine.price([('SRV_9', 1)])
+    with pytest.raises(PricingError):
+        engine.price([('SRV_3', 1)])
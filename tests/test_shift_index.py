@@ -0,0 +1,32 @@
+import json
+
+from utils.shift_index import ShiftIndex
+
+
+def _shift(day, start, end):
+    return {'employee_id': 'E1', 'shift_date': day, 'start_time': start, 'end_time': end, 'status': 'Scheduled'}
+
+
+def test_add_after_saving_indexes_the_shift_once(tmp_path):
+    path = tmp_path / "shifts.json"
+    shifts = {'SHF_0001': _shift('2026-02-02', '07:00:00', '19:00:00')}
+    path.write_text(json.dumps(shifts))
+    index = ShiftIndex(str(path))
+    index.refresh()
+
+    # As the shift form does: save the file, then tell the index
+    shifts['SHF_0002'] = _shift('2026-02-03', '07:00:00', '20:00:00')
+    path.write_text(json.dumps(shifts))
+    index.add('SHF_0002', shifts['SHF_0002'])
+
+    assert [shift_id for _, _, shift_id in index._by_employee['E1']] == ['SHF_0001', 'SHF_0002']
+    assert index.hours_between('E1', 0, 10 ** 10) == 25
+    clash = index.check(_shift('2026-02-03', '08:00:00', '09:00:00'))
+    assert [violation['detail'] for violation in clash if violation['rule'] == 'Overlapping shifts'] == [
+        "Overlaps SHF_0002"]
+
+
+def test_add_without_a_file_change_still_indexes(tmp_path):
+    index = ShiftIndex(str(tmp_path / "shifts.json"))
+    index.add('SHF_0001', _shift('2026-02-02', '07:00:00', '15:00:00'))
+    assert index.overlapping('E1', 0, 10 ** 10) == ['SHF_0001']
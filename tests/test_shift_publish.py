@@ -0,0 +1,50 @@
+import json
+
+from streamlit.testing.v1 import AppTest
+
+from utils.shift_index import ShiftIndex
+
+
+def _shift(employee_id, day, start, end, **extra):
+    return dict({'employee_id': employee_id, 'shift_date': day, 'start_time': start, 'end_time': end}, **extra)
+
+
+def test_min_rest_is_configurable():
+    shifts = [_shift('E1', '2026-02-02', '07:00:00', '15:00:00'), _shift('E1', '2026-02-02', '23:00:00', '07:00:00')]
+    assert [violation['rule'] for violation in ShiftIndex("missing.json").check_many(shifts)] == ['Minimum rest']
+    assert ShiftIndex("missing.json", min_rest_hours=8).check_many(shifts) == []
+
+
+def _publish_app():
+    import streamlit as st
+
+    from components.staff_management import StaffManagementSystem
+
+    st.session_state.published = StaffManagementSystem()._write_shifts(
+        st.session_state.roster, replace_roster='roster-2026-02', min_rest_hours=st.session_state.min_rest)
+
+
+def _publish(tmp_path, monkeypatch, min_rest):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir(exist_ok=True)
+    (tmp_path / "data" / "shifts.json").write_text(json.dumps({
+        'SHF_0001': _shift('E1', '2026-02-01', '07:00:00', '15:00:00', status='Scheduled')}))
+
+    app = AppTest.from_function(_publish_app)
+    app.session_state.roster = [_shift('E1', '2026-02-01', '23:00:00', '07:00:00', roster='roster-2026-02')]
+    app.session_state.min_rest = min_rest
+    app.run()
+    assert not app.exception
+    return app.session_state.published, json.loads((tmp_path / "data" / "shifts.json").read_text())
+
+
+def test_roster_publishes_under_its_own_rest_rule(tmp_path, monkeypatch):
+    published, shifts = _publish(tmp_path, monkeypatch, 8)
+    assert published == 1
+    assert sorted(shifts) == ['SHF_0001', 'SHF_0002']
+
+
+def test_roster_breaking_its_rest_rule_is_not_published(tmp_path, monkeypatch):
+    published, shifts = _publish(tmp_path, monkeypatch, 11)
+    assert published is None
+    assert sorted(shifts) == ['SHF_0001']
@@ -0,0 +1,75 @@
+import json
+
+from utils.staff_search import StaffSearchIndex, edit_distance, tokenize
+
+
+def _member(name, employee_id, role='Nurse', department='ICU', specialization=''):
+    return {'full_name': name, 'employee_id': employee_id, 'role': role, 'department': department,
+            'specialization': specialization}
+
+
+def _index(tmp_path):
+    staff = {
+        'STF_001': _member("Sara Johnson", "EMP-0042"),
+        'STF_002': _member("Johanna Malik", "EMP-0043", department='Surgery'),
+        'STF_003': _member("David Smith", "EMP-0142", 'Doctor', 'Cardiology', 'Interventional Cardiology'),
+        'STF_004': _member("John Hassan", "EMP-0007", 'Doctor', 'ICU', 'Critical Care'),
+    }
+    path = tmp_path / "staff.json"
+    path.write_text(json.dumps(staff))
+    return StaffSearchIndex(str(path))
+
+
+def test_tokenize_splits_letters_and_digits():
+    assert tokenize("EMP-0042") == tokenize("emp0042") == ['emp', '0042']
+    assert tokenize(None) == []
+
+
+def test_edit_distance_counts_swaps_once():
+    assert edit_distance("jonhson", "johnson", 2) == 1
+    assert edit_distance("cardiolgy", "cardiology", 2) == 1
+    assert edit_distance("abc", "xyzabc", 1) == 2
+
+
+def test_exact_prefix_and_typo_matches(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("johnson") == ['STF_001']
+    # A partly typed word matches as a prefix, names ranking above other fields
+    assert index.search("joh") == ['STF_002', 'STF_004', 'STF_001']
+    assert index.search("jonhson") == ['STF_001']
+    assert index.search("cardiolgy") == ['STF_003']
+
+
+def test_every_term_must_match(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("doctor icu") == ['STF_004']
+    assert index.search("nurse cardiology") == []
+
+
+def test_numbers_are_not_typo_corrected(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("emp-0042") == ['STF_001']
+    assert index.search("0044") == []
+
+
+def test_department_filter_and_limit(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("emp", department='ICU') == ['STF_004', 'STF_001']
+    assert index.search("emp", limit=2) == index.search("emp")[:2]
+    assert index.search("", department='Surgery') == ['STF_002']
+
+
+def test_add_and_remove_update_without_rebuild(tmp_path):
+    index = _index(tmp_path)
+    index.refresh()
+    index.add('STF_005', _member("Fatima Qureshi", "EMP-0500", specialization='Wound Care'))
+    assert index.search("wound") == ['STF_005']
+    assert index.search("qureshi") == ['STF_005']
+
+    index.add('STF_001', _member("Sara Johnson", "EMP-0042", specialization='Wound Care'))
+    assert index.search("wound") == ['STF_005', 'STF_001']
+
+    index.remove('STF_005')
+    assert index.search("qureshi") == []
+    assert 'qureshi' not in index._vocabulary
+    assert index.search("wound") == ['STF_001']
@@ -0,0 +1,88 @@
+import json
+from datetime import date
+
+import pytest
+
+from utils.stock_ledger import UNLOTTED, StockError, StockLedger
+
+
+def _ledger(tmp_path, **kwargs):
+    return StockLedger(str(tmp_path / "stock_movements.jsonl"), str(tmp_path / "stock_snapshots.jsonl"), **kwargs)
+
+
+def _day(n):
+    return f"2026-03-{n:02d}T09:00:00"
+
+
+def test_quantities_now_and_in_the_past(tmp_path):
+    ledger = _ledger(tmp_path, snapshot_interval=2)
+    ledger.record('A', 'receipt', 10, timestamp=_day(1))
+    ledger.record('A', 'issue', 3, timestamp=_day(2), lot=UNLOTTED)
+    ledger.record('B', 'receipt', 5, timestamp=_day(3))
+    ledger.record('A', 'adjustment', -2, timestamp=_day(4), lot=UNLOTTED)
+    ledger.record('A', 'expiry', 1, timestamp=_day(5), lot=UNLOTTED)
+
+    assert ledger.on_hand_all() == {'A': 4, 'B': 5}
+    assert ledger.on_hand('A', '2026-03-02') == 7 and ledger.on_hand('A', '2026-02-28') == 0
+    assert ledger.daily_on_hand('A', date(2026, 3, 3), date(2026, 3, 5)) == [
+        ('2026-03-03', 7), ('2026-03-04', 5), ('2026-03-05', 4)]
+    assert [m['seq'] for m in ledger.movements('A', start='2026-03-02', types=('issue', 'expiry'))] == [2, 5]
+
+    reloaded = _ledger(tmp_path)
+    assert len(reloaded._snapshots) == 2
+    assert reloaded.on_hand_all() == ledger.on_hand_all() and reloaded.next_seq == 6
+
+
+def test_invalid_batches_write_nothing(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record('A', 'receipt', 5, timestamp=_day(2))
+    with pytest.raises(StockError):
+        ledger.record_many([{'item_id': 'A', 'type': 'issue', 'quantity': 3, 'timestamp': _day(3), 'lot': UNLOTTED},
+                            {'item_id': 'A', 'type': 'issue', 'quantity': 3, 'timestamp': _day(3), 'lot': UNLOTTED}])
+    with pytest.raises(StockError):
+        ledger.record('A', 'issue', 1, timestamp=_day(1), lot=UNLOTTED)
+    with pytest.raises(StockError):
+        ledger.record('A', 'transfer', 1)
+    assert ledger.on_hand('A') == 5 and _ledger(tmp_path).next_seq == 2
+
+
+def test_torn_append_is_read_once_complete(tmp_path):
+    writer, reader = _ledger(tmp_path), _ledger(tmp_path)
+    writer.record('A', 'receipt', 10, timestamp=_day(1))
+    line = json.dumps({'item_id': 'A', 'type': 'issue', 'quantity': -4.0, 'timestamp': _day(2), 'seq': 2,
+                       'lot': UNLOTTED}) + "\n"
+    with open(writer.movements_file, 'a') as f:
+        f.write(line[:25])
+
+    assert reader.on_hand('A') == 10
+    with open(writer.movements_file, 'a') as f:
+        f.write(line[25:])
+    assert reader.on_hand('A') == 6
+
+    reader.record('A', 'issue', 1, timestamp=_day(3), lot=UNLOTTED)
+    seqs = [json.loads(row)['seq'] for row in open(writer.movements_file)]
+    assert seqs == [1, 2, 3]
+
+
+def test_gap_blocks_recording_and_snapshots(tmp_path):
+    ledger = _ledger(tmp_path, snapshot_interval=1)
+    ledger.record('A', 'receipt', 10, timestamp=_day(1))
+    with open(ledger.movements_file, 'a') as f:
+        f.write(json.dumps({'item_id': 'A', 'type': 'issue', 'quantity': -1.0, 'timestamp': _day(3), 'seq': 3}) + "\n")
+
+    reader = _ledger(tmp_path, snapshot_interval=1)
+    assert reader.gap == 3 and reader.on_hand('A') == 10
+    with pytest.raises(StockError):
+        reader.record('A', 'issue', 1, timestamp=_day(4), lot=UNLOTTED)
+    reader.snapshot()
+    assert len(_ledger(tmp_path)._snapshots) == 1
+
+
+def test_opening_balances_are_posted_once(tmp_path):
+    inventory = {'A': {'quantity': 10, 'expiry_date': '2027-01-01'}, 'B': {'quantity': 0}}
+    first, second = _ledger(tmp_path), _ledger(tmp_path)
+    # Both sessions found the ledger empty before either posted
+    assert first.is_empty() and second.is_empty()
+    assert first.bootstrap(inventory) == 1
+    assert second.bootstrap(inventory) == 0
+    assert _ledger(tmp_path).on_hand_all() == {'A': 10}
@@ -0,0 +1,82 @@
+import json
+import random
+
+import pytest
+
+from utils.storage import append_jsonl, atomic_write_json, iter_json_object, iter_jsonl, iter_jsonl_complete
+
+DOCUMENT = {
+    'a': -1.5e3, 'b': None, 'c': True, 'd': False, 'e': 0, 'f': 12345678901234567890, 'g': -0.25,
+    'h': "text with \"quotes\", commas and } braces", 'i': [1, -2.5e-3, None, [True, {}]],
+    'j': {'nested': {'value': 7e10, 'empty': []}}, 'k': "ünïcødé ✓", 'l': 1e-7, 'm': ""
+}
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "data.json"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_json_object_members_survive_every_chunk_split(tmp_path, indent):
+    text = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False)
+    path = _write(tmp_path, text)
+    for chunk_size in range(1, len(text) + 2):
+        assert dict(iter_json_object(path, chunk_size=chunk_size)) == DOCUMENT, chunk_size
+
+
+def test_json_object_fuzz(tmp_path):
+    rng = random.Random(37)
+    scalars = [lambda: rng.randint(-10**6, 10**6), lambda: rng.uniform(-1e6, 1e6), lambda: rng.random() * 1e-9,
+               lambda: None, lambda: True, lambda: False, lambda: "s" * rng.randint(0, 5)]
+    for _ in range(30):
+        document = {f"k{n}": rng.choice(scalars)() for n in range(rng.randint(0, 12))}
+        text = json.dumps(document, separators=rng.choice([(',', ':'), (', ', ': ')]))
+        path = _write(tmp_path, text)
+        for chunk_size in (1, 2, 3, 5, 7, 16):
+            assert dict(iter_json_object(path, chunk_size=chunk_size)) == json.loads(text)
+
+
+def test_json_object_predicate_and_errors(tmp_path):
+    path = _write(tmp_path, '{"a": 1, "b": 2, "c": 3}')
+    assert list(iter_json_object(path, lambda key, value: value != 2, chunk_size=2)) == [('a', 1), ('c', 3)]
+    assert list(iter_json_object(str(tmp_path / "missing.json"))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_object(_write(tmp_path, '[1, 2]')))
+    with pytest.raises(ValueError):
+        list(iter_json_object(_write(tmp_path, '{"a": 1, "b": 2'), chunk_size=3))
+
+
+def test_atomic_write_round_trip(tmp_path):
+    path = str(tmp_path / "sub" / "data.json")
+    atomic_write_json(path, DOCUMENT, indent=None)
+    assert json.loads(open(path).read()) == DOCUMENT
+    assert [p.name for p in (tmp_path / "sub").iterdir()] == ["data.json"]
+
+
+def test_complete_lines_stop_before_a_torn_append(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    append_jsonl(path, [{'n': 1}, {'n': 2}])
+    with open(path, 'a') as f:
+        f.write('{"n": 3')
+
+    lines = list(iter_jsonl_complete(path))
+    assert [record for record, _ in lines] == [{'n': 1}, {'n': 2}]
+    offset = lines[-1][1]
+    assert list(iter_jsonl_complete(path, offset)) == []
+
+    with open(path, 'a') as f:
+        f.write('}\n')
+    assert [record for record, _ in iter_jsonl_complete(path, offset)] == [{'n': 3}]
+
+
+def test_append_after_interrupted_write_keeps_new_records(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    append_jsonl(path, [{'n': 1}])
+    with open(path, 'a') as f:
+        f.write('{"n": 2, "tor')
+    append_jsonl(path, [{'n': 3}])
+
+    assert [record for record, _ in iter_jsonl_complete(path)] == [{'n': 1}, None, {'n': 3}]
+    assert list(iter_jsonl(path)) == [{'n': 1}, {'n': 3}]
@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.storage import atomic_write_json
+
+ATTENDANCE_STATUSES = ["Present", "Absent", "Late", "Half Day", "Leave"]
+
+
+class AttendanceStore:
+    """
+    Attendance records partitioned by day.
+
+    Each day's marks live in their own file (attendance/YYYY-MM/
+    YYYY-MM-DD.json, records keyed by id), and a loaded day keeps its
+    records indexed by employee together with a count per status. Today's
+    view, a day's counters, a staff member's marks in a period and
+    month-to-date totals therefore only read the days asked for, and
+    marking attendance rewrites a single day's file.
+
+    An employee has one mark per day: marking them again replaces the
+    earlier mark and moves the counters with it.
+
+    A flat attendance.json from before partitioning is split into day
+    files the first time the store is opened; it is not written again.
+    The day files are written to a staging directory that is renamed into
+    place once complete, so an interrupted split is redone from scratch
+    on the next open.
+    """
+
+    def __init__(self, directory: str = "data/attendance", legacy_file: Optional[str] = "data/attendance.json"):
+        self.directory = directory
+        self._days: Dict[str, Dict] = {}
+
+        if legacy_file and os.path.exists(legacy_file) and not os.path.exists(directory):
+            self._migrate(legacy_file)
+
+    def mark(self, record: Dict) -> str:
+        """
+        Record or replace an employee's attendance for a day.
+
+        Args:
+            record: Attendance record with at least 'employee_id', 'date'
+                (ISO) and 'status'
+
+        Returns:
+            The record id
+
+        Raises:
+            ValueError: if the date is not an ISO date
+        """
+        day = date.fromisoformat(str(record['date'])[:10]).isoformat()
+        partition = self._load(day)
+        record = dict(record, date=day)
+        record_id = partition['by_staff'].get(record['employee_id'])
+        if record_id is not None:
+            self._count(partition, partition['records'][record_id], -1)
+        else:
+            record_id = f"ATT_{day.replace('-', '')}_{partition['next']:04d}"
+            partition['next'] += 1
+            partition['by_staff'][record['employee_id']] = record_id
+        partition['records'][record_id] = record
+        self._count(partition, record, 1)
+
+        path = self._path(day)
+        atomic_write_json(path, partition['records'])
+        partition['stamp'] = os.path.getmtime(path)
+        return record_id
+
+    def on_date(self, day: str) -> Dict[str, Dict]:
+        """Records of a day, keyed by id."""
+        return self._load(day)['records']
+
+    def counts(self, day: str) -> Dict[str, int]:
+        """Number of staff per attendance status on a day."""
+        return dict(self._load(day)['counts'])
+
+    def get(self, employee_id: str, day: str) -> Optional[Dict]:
+        """An employee's mark for a day, if any."""
+        partition = self._load(day)
+        record_id = partition['by_staff'].get(employee_id)
+        return partition['records'][record_id] if record_id else None
+
+    def between(self, start: date, end: date) -> Iterator[Tuple[str, Dict]]:
+        """(id, record) for every mark from start through end, day by day."""
+        for day in self._days_between(start, end):
+            yield from self._load(day)['records'].items()
+
+    def for_staff(self, employee_id: str, start: date, end: date) -> List[Dict]:
+        """An employee's marks from start through end, oldest first."""
+        return [record for record in (self.get(employee_id, day) for day in self._days_between(start, end)) if record]
+
+    def month(self, year: int, month: int) -> Dict[str, Dict]:
+        """Records of a calendar month, keyed by id."""
+        start = date(year, month, 1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return dict(self.between(start, end))
+
+    def totals(self, start: date, end: date) -> Dict[str, int]:
+        """Per-status counts summed over the days from start through end."""
+        totals = {status: 0 for status in ATTENDANCE_STATUSES}
+        for day in self._days_between(start, end):
+            for status, count in self._load(day)['counts'].items():
+                totals[status] = totals.get(status, 0) + count
+        return totals
+
+    def month_to_date(self, as_of: Optional[date] = None) -> Dict[str, int]:
+        """Per-status counts from the first of the month through `as_of` (default today)."""
+        as_of = as_of or date.today()
+        return self.totals(as_of.replace(day=1), as_of)
+
+    def _load(self, day: str) -> Dict:
+        """A day's partition, read from disk only if its file changed."""
+        path = self._path(day)
+        stamp = os.path.getmtime(path) if os.path.exists(path) else None
+        partition = self._days.get(day)
+        if partition is not None and partition['stamp'] == stamp:
+            return partition
+
+        records = self._load_json(path)
+        partition = {'stamp': stamp, 'records': records, 'by_staff': {},
+                     'counts': {status: 0 for status in ATTENDANCE_STATUSES}, 'next': 1}
+        for record_id, record in records.items():
+            partition['by_staff'][record.get('employee_id')] = record_id
+            self._count(partition, record, 1)
+            suffix = record_id.rsplit('_', 1)[-1]
+            if suffix.isdigit():
+                partition['next'] = max(partition['next'], int(suffix) + 1)
+        self._days[day] = partition
+        return partition
+
+    def _count(self, partition: Dict, record: Dict, delta: int) -> None:
+        status = record.get('status', 'Unknown')
+        partition['counts'][status] = partition['counts'].get(status, 0) + delta
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, day[:7], f"{day}.json")
+
+    def _days_between(self, start: date, end: date) -> List[str]:
+        return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+    def _migrate(self, legacy_file: str) -> None:
+        """Split a flat attendance.json into day files, keeping the last mark per employee and day."""
+        staging = self.directory.rstrip(os.sep) + ".migrating"
+        shutil.rmtree(staging, ignore_errors=True)
+        by_day: Dict[str, Dict[str, Dict]] = {}
+        for record in self._load_json(legacy_file).values():
+            try:
+                day = date.fromisoformat(str(record.get('date', ''))[:10]).isoformat()
+            except ValueError:
+                continue
+            by_day.setdefault(day, {})[record.get('employee_id')] = dict(record, date=day)
+        os.makedirs(staging)
+        for day, marks in by_day.items():
+            atomic_write_json(os.path.join(staging, day[:7], f"{day}.json"),
+                              {f"ATT_{day.replace('-', '')}_{n:04d}": record
+                               for n, record in enumerate(marks.values(), start=1)})
+        os.replace(staging, self.directory)
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    random.seed(47)
+    with tempfile.TemporaryDirectory() as data_dir:
+        legacy = {}
+        first_day = date.today() - timedelta(days=3 * 365)
+        for offset in range(3 * 365):
+            day = (first_day + timedelta(days=offset)).isoformat()
+            for employee in range(500):
+                legacy[f"ATT_{len(legacy) + 1:07d}"] = {
+                    'employee_id': f"E{employee:04d}", 'staff_name': f"Staff {employee}", 'date': day,
+                    'status': random.choices(ATTENDANCE_STATUSES, [85, 4, 6, 2, 3])[0]}
+        legacy_file = os.path.join(data_dir, "attendance.json")
+        atomic_write_json(legacy_file, legacy, indent=None)
+
+        started = time.perf_counter()
+        store = AttendanceStore(os.path.join(data_dir, "attendance"), legacy_file)
+        migrate_s = time.perf_counter() - started
+
+        # Each query is timed on a fresh store, so it includes reading the day files it needs
+        def timed(query):
+            fresh = AttendanceStore(os.path.join(data_dir, "attendance"), legacy_file)
+            started = time.perf_counter()
+            result = query(fresh)
+            return result, (time.perf_counter() - started) * 1000
+
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        today_counts, today_ms = timed(lambda s: s.counts(yesterday))
+        mtd, mtd_ms = timed(lambda s: s.month_to_date(date.today() - timedelta(days=1)))
+        history, staff_ms = timed(lambda s: s.for_staff("E0042", date.today() - timedelta(days=30), date.today()))
+
+        started = time.perf_counter()
+        for employee in range(100):
+            store.mark({'employee_id': f"E{employee:04d}", 'date': date.today().isoformat(), 'status': 'Present'})
+        mark_ms = (time.perf_counter() - started) * 1000 / 100
+
+        print(f"Migrated {len(legacy)} records into {3 * 365} day files in {migrate_s:.1f} s")
+        print(f"One day's counters: {today_ms:.1f} ms ({today_counts['Present']} present); "
+              f"month to date: {mtd_ms:.1f} ms; one employee's last 30 days: {staff_ms:.1f} ms ({len(history)} marks)")
+        print(f"Marking attendance: {mark_ms:.2f} ms per mark")
@@ -0,0 +1,160 @@
+import json
+import math
+from typing import List, Optional, Sequence
+
+import streamlit.components.v1 as components
+
+# Per-layout card geometry: (fixed card height in px, vertical gap in px)
+LAYOUTS = {
+    'grid': (86, 10),
+    'list': (120, 10),
+    'compact': (78, 6),
+}
+
+_TEMPLATE = """
+<style>
+  body { margin: 0; background: transparent; color: #ffffff;
+         font-family: "Source Sans Pro", sans-serif; font-size: 14px; }
+  #cards { display: grid; gap: %(gap)dpx; grid-template-columns: repeat(%(columns)d, minmax(0, 1fr)); }
+  .card { box-sizing: border-box; height: %(height)dpx; overflow: hidden; border-radius: 8px;
+          padding: 8px 12px; background: rgba(255,255,255,0.05); }
+  .grid .card { border: 2px solid var(--accent); text-align: center; }
+  .list .card, .compact .card { border-left: 4px solid var(--accent); border-radius: 5px; }
+  .title { font-weight: 700; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+  .status { color: var(--accent); font-size: 0.85em; }
+  .line { font-size: 0.85em; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+  .compact .line:last-child { opacity: 0.7; }
+</style>
+<div id="cards" class="%(layout)s"></div>
+<script>
+  const rows = %(rows)s;
+  const root = document.getElementById("cards");
+  const fragment = document.createDocumentFragment();
+  for (const [accent, title, status, lines, background] of rows) {
+    const card = document.createElement("div");
+    card.className = "card";
+    card.style.setProperty("--accent", accent);
+    if (background) card.style.background = background;
+    const heading = document.createElement("div");
+    heading.className = "title";
+    heading.textContent = title;
+    card.appendChild(heading);
+    if (status) {
+      const label = document.createElement("div");
+      label.className = "status";
+      label.textContent = status;
+      card.appendChild(label);
+    }
+    for (const text of lines) {
+      const line = document.createElement("div");
+      line.className = "line";
+      line.textContent = text;
+      card.appendChild(line);
+    }
+    fragment.appendChild(card);
+  }
+  root.appendChild(fragment);
+</script>
+"""
+
+
+def card_row(accent: str, title: str, status: str = "", lines: Sequence[str] = (),
+             background: Optional[str] = None) -> List:
+    """
+    Build one compact card row for render_cards().
+
+    Args:
+        accent: Border / status colour
+        title: Bold first line
+        status: Optional status text shown in the accent colour
+        lines: Further plain-text lines
+        background: Optional card background colour
+
+    Returns:
+        Row as a list, the wire format of the renderer
+    """
+    return [accent, str(title), str(status or ""), [str(line) for line in lines if line], background]
+
+
+def render_cards(rows: List[List], layout: str = 'grid', columns: int = 5,
+                 max_height: int = 640) -> None:
+    """
+    Render a collection of cards as a single HTML component.
+
+    All cards are sent to the browser as one JSON array and laid out by a
+    small script, instead of one Streamlit element per card. Text is set
+    with textContent, so record fields are never interpreted as HTML.
+
+    Args:
+        rows: Rows built with card_row()
+        layout: 'grid' (bordered tiles), 'list' (full-width entries) or
+            'compact' (narrow entries, e.g. for the sidebar)
+        columns: Number of columns in the grid layout
+        max_height: Component height above which the grid scrolls
+    """
+    if not rows:
+        return
+
+    columns = columns if layout == 'grid' else 1
+    card_height, gap = LAYOUTS[layout]
+    row_count = math.ceil(len(rows) / columns)
+    height = row_count * card_height + (row_count - 1) * gap + 4
+
+    html = _TEMPLATE % {
+        'rows': json.dumps(rows).replace("<", "\\u003c"),
+        'layout': layout,
+        'columns': columns,
+        'height': card_height,
+        'gap': gap,
+    }
+    components.html(html, height=min(height, max_height), scrolling=height > max_height)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    from streamlit.testing.v1 import AppTest
+
+    # Render a 600-bed map the old way (one markdown element per bed) and
+    # with render_cards(), and time full script runs of each.
+    setup = f"""
+import sys
+sys.path.insert(0, {os.getcwd()!r})
+import streamlit as st
+from utils.batch_render import card_row, render_cards
+colors = ['#00ff88', '#ff4444', '#ffa500']
+statuses = ['Available', 'Occupied', 'Maintenance']
+beds = [(f"BED-{{i:04d}}", statuses[i % 3], colors[i % 3], f"Patient {{i}}" if i % 3 == 1 else "")
+        for i in range(600)]
+"""
+    per_element = setup + """
+cols = st.columns(5)
+for i, (number, status, color, patient) in enumerate(beds):
+    with cols[i % 5]:
+        st.markdown(f'''
+        <div style="border: 2px solid {color}; border-radius: 8px; padding: 10px; text-align: center;">
+            <strong>{number}</strong><br><small style="color: {color};">{status}</small><br>
+            <small>{patient}</small>
+        </div>
+        ''', unsafe_allow_html=True)
+"""
+    batched = setup + """
+render_cards([card_row(color, number, status, [patient]) for number, status, color, patient in beds])
+"""
+
+    with tempfile.TemporaryDirectory() as script_dir:
+        for name, source in (('per-element', per_element), ('batched', batched)):
+            path = os.path.join(script_dir, f"{name}.py")
+            with open(path, 'w') as f:
+                f.write(source)
+
+            AppTest.from_file(path).run()  # warm-up
+            runs = 5
+            start = time.perf_counter()
+            for _ in range(runs):
+                app = AppTest.from_file(path).run()
+            elapsed = (time.perf_counter() - start) / runs * 1000
+            elements = len(app.markdown) + len(app.get('iframe'))
+            print(f"{name:>12}: {elapsed:7.1f} ms per rerun, {elements} rendered elements")
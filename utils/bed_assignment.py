@@ -0,0 +1,264 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Departments that may take a patient when their own department is full,
+# in order of preference.
+DEFAULT_OVERFLOW = {
+    'Emergency': ['General Surgery', 'Cardiology', 'Orthopedics'],
+    'ICU': ['Cardiology', 'Emergency'],
+    'General Surgery': ['Orthopedics', 'Cardiology'],
+    'Cardiology': ['ICU', 'General Surgery'],
+    'Pediatrics': ['Maternity'],
+    'Maternity': ['Pediatrics'],
+    'Orthopedics': ['General Surgery'],
+}
+
+# Bed types that cannot be substituted by anything else
+CRITICAL_BED_TYPES = {'ICU'}
+
+# Bed types that can host patients needing isolation
+ISOLATION_BED_TYPES = {'ICU', 'Private Room'}
+
+OVERFLOW_PENALTY = 10.0
+BED_TYPE_PENALTY = 5.0
+ISOLATION_WASTE_PENALTY = 2.0
+OCCUPANCY_PENALTY = 3.0
+
+
+def is_isolation_capable(bed: Dict) -> bool:
+    """Whether a bed can be used for a patient who needs isolation."""
+    if 'isolation' in bed:
+        return bool(bed['isolation'])
+    return bed.get('bed_type') in ISOLATION_BED_TYPES
+
+
+class BedOccupancyIndex:
+    """
+    Occupancy index over the bed collection.
+
+    Available beds are grouped into buckets of interchangeable beds keyed
+    by (department, bed_type, isolation capable), and per-department
+    counts are kept so occupancy queries do not rescan the beds.
+    """
+
+    def __init__(self, beds: Dict[str, Dict]):
+        self.buckets: Dict[Tuple[str, str, bool], List[str]] = {}
+        self.departments: Dict[str, Dict[str, int]] = {}
+
+        for bed in beds.values():
+            dept = bed.get('department', 'Unknown')
+            counts = self.departments.setdefault(
+                dept, {'total': 0, 'occupied': 0, 'available': 0, 'maintenance': 0}
+            )
+            counts['total'] += 1
+
+            status = bed.get('status', 'Unknown')
+            if status == 'Occupied':
+                counts['occupied'] += 1
+            elif status == 'Maintenance':
+                counts['maintenance'] += 1
+            elif status == 'Available':
+                counts['available'] += 1
+                key = (dept, bed.get('bed_type', 'General'), is_isolation_capable(bed))
+                self.buckets.setdefault(key, []).append(bed['bed_number'])
+
+        for bed_numbers in self.buckets.values():
+            bed_numbers.sort()
+
+    def available_beds(self, department: str) -> List[str]:
+        """Available bed numbers in a department, sorted."""
+        return sorted(
+            bed_number
+            for (dept, _, _), bed_numbers in self.buckets.items() if dept == department
+            for bed_number in bed_numbers
+        )
+
+    def occupancy_rate(self, department: str) -> float:
+        """Fraction of a department's beds that are occupied."""
+        counts = self.departments.get(department)
+        if not counts or counts['total'] == 0:
+            return 0.0
+        return counts['occupied'] / counts['total']
+
+    def totals(self) -> Dict[str, int]:
+        """Hospital-wide bed counts by status."""
+        totals = {'total': 0, 'occupied': 0, 'available': 0, 'maintenance': 0}
+        for counts in self.departments.values():
+            for key in totals:
+                totals[key] += counts[key]
+        return totals
+
+
+class BedAssignmentEngine:
+    """
+    Proposes bed placements for a queue of pending admissions.
+
+    Each pending admission is a dictionary with 'patient_id',
+    'patient_name', 'department', 'acuity' (1 = stable to 5 = critical),
+    'isolation' (bool) and an optional requested 'bed_type'.
+
+    Beds in the same occupancy-index bucket are interchangeable, so the
+    problem is solved over buckets rather than individual beds with a
+    regret-based (Vogel) heuristic: at each step the patient who would
+    lose the most by not getting their best bucket, weighted by acuity,
+    is placed first. Costs are computed as a NumPy matrix of
+    patients x buckets.
+    """
+
+    def __init__(self, overflow: Optional[Dict[str, List[str]]] = None):
+        self.overflow = DEFAULT_OVERFLOW if overflow is None else overflow
+
+    def propose(self, queue: List[Dict], index: BedOccupancyIndex) -> Dict[str, List[Dict]]:
+        """
+        Compute placements for a queue of pending admissions.
+
+        Args:
+            queue: Pending admissions
+            index: Occupancy index built from the current beds
+
+        Returns:
+            Dictionary with 'placements' (patient, bed_number, department,
+            overflow flag and cost) and 'unplaced' admissions
+        """
+        queue = [self._normalize(patient) for patient in queue]
+        keys = list(index.buckets.keys())
+        if not queue or not keys:
+            return {'placements': [], 'unplaced': list(queue)}
+
+        cost = self._cost_matrix(queue, keys, index)
+        capacity = np.array([len(index.buckets[key]) for key in keys])
+        acuity = np.array([p['acuity'] for p in queue])
+        next_bed = {key: 0 for key in keys}
+
+        unassigned = np.ones(len(queue), dtype=bool)
+        placements = []
+
+        while unassigned.any() and capacity.any():
+            masked = np.where(capacity > 0, cost, np.inf)
+            masked[~unassigned] = np.inf
+
+            # Best and second-best bucket per patient
+            order = np.argsort(masked, axis=1)[:, :2]
+            best = np.take_along_axis(masked, order[:, :1], axis=1)[:, 0]
+            feasible = np.isfinite(best) & unassigned
+            if not feasible.any():
+                break
+
+            if masked.shape[1] > 1:
+                second = np.take_along_axis(masked, order[:, 1:2], axis=1)[:, 0]
+                with np.errstate(invalid='ignore'):
+                    regret = np.where(np.isfinite(second), second - best, OVERFLOW_PENALTY * 10)
+            else:
+                regret = np.full(len(queue), OVERFLOW_PENALTY * 10)
+
+            priority = np.where(feasible, acuity * 1000 + regret, -np.inf)
+            patient_idx = int(np.argmax(priority))
+            bucket_idx = int(order[patient_idx, 0])
+
+            key = keys[bucket_idx]
+            bed_number = index.buckets[key][next_bed[key]]
+            next_bed[key] += 1
+            capacity[bucket_idx] -= 1
+            unassigned[patient_idx] = False
+
+            patient = queue[patient_idx]
+            placements.append({
+                **patient,
+                'bed_number': bed_number,
+                'assigned_department': key[0],
+                'assigned_bed_type': key[1],
+                'overflow': key[0] != patient.get('department'),
+                'cost': float(cost[patient_idx, bucket_idx])
+            })
+
+        unplaced = [queue[i] for i in np.flatnonzero(unassigned)]
+        return {'placements': placements, 'unplaced': unplaced}
+
+    def _normalize(self, patient: Dict) -> Dict:
+        """Fill defaults for missing acuity, isolation and bed type (e.g. blank table cells)."""
+        patient = dict(patient)
+        try:
+            acuity = float(patient.get('acuity'))
+        except (TypeError, ValueError):
+            acuity = 3.0
+        patient['acuity'] = acuity if np.isfinite(acuity) else 3.0
+        patient['isolation'] = patient.get('isolation') is True or patient.get('isolation') == 1
+        bed_type = patient.get('bed_type')
+        patient['bed_type'] = bed_type if isinstance(bed_type, str) and bed_type.strip() else None
+        return patient
+
+    def _cost_matrix(self, queue: List[Dict], keys: List[Tuple[str, str, bool]],
+                     index: BedOccupancyIndex) -> np.ndarray:
+        """Build the patients x buckets placement cost matrix (inf = not allowed)."""
+        bucket_dept = np.array([key[0] for key in keys], dtype=object)
+        bucket_type = np.array([key[1] for key in keys], dtype=object)
+        bucket_isolation = np.array([key[2] for key in keys], dtype=bool)
+        bucket_occupancy = np.array([index.occupancy_rate(key[0]) for key in keys])
+
+        cost = np.full((len(queue), len(keys)), np.inf)
+
+        for i, patient in enumerate(queue):
+            department = patient.get('department')
+            rank = np.full(len(keys), np.inf)
+            rank[bucket_dept == department] = 0
+            for position, overflow_dept in enumerate(self.overflow.get(department, []), start=1):
+                rank[bucket_dept == overflow_dept] = np.minimum(rank[bucket_dept == overflow_dept], position)
+
+            row = rank * OVERFLOW_PENALTY + bucket_occupancy * OCCUPANCY_PENALTY
+
+            bed_type = patient.get('bed_type')
+            if bed_type:
+                mismatch = bucket_type != bed_type
+                if bed_type in CRITICAL_BED_TYPES:
+                    row[mismatch] = np.inf
+                else:
+                    row[mismatch] += BED_TYPE_PENALTY
+
+            if patient.get('isolation'):
+                row[~bucket_isolation] = np.inf
+            else:
+                row[bucket_isolation] += ISOLATION_WASTE_PENALTY
+
+            cost[i] = row
+
+        return cost
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    departments = list(DEFAULT_OVERFLOW.keys())
+    bed_types = ['General', 'Private Room', 'ICU']
+    random.seed(7)
+
+    beds = {}
+    for i in range(600):
+        dept = departments[i % len(departments)]
+        beds[f"B{i:04d}"] = {
+            'bed_number': f"{dept[:3].upper()}-{i:04d}",
+            'department': dept,
+            'bed_type': 'ICU' if dept == 'ICU' else random.choice(bed_types[:2]),
+            'status': random.choice(['Available', 'Occupied', 'Occupied']),
+        }
+
+    queue = [
+        {
+            'patient_id': f"P{n:04d}",
+            'patient_name': f"Patient {n}",
+            'department': random.choice(departments),
+            'acuity': random.randint(1, 5),
+            'isolation': random.random() < 0.15,
+            'bed_type': None,
+        }
+        for n in range(40)
+    ]
+
+    start = time.perf_counter()
+    index = BedOccupancyIndex(beds)
+    result = BedAssignmentEngine().propose(queue, index)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    overflow = sum(1 for p in result['placements'] if p['overflow'])
+    print(f"{len(result['placements'])} placed ({overflow} overflow), "
+          f"{len(result['unplaced'])} unplaced in {elapsed:.1f} ms")
@@ -0,0 +1,329 @@
+import bisect
+import itertools
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.storage import append_jsonl, iter_jsonl
+
+# Fields of a bed record that are tracked by the event log
+TRACKED_FIELDS = ('bed_number', 'department', 'bed_type', 'status', 'patient_id', 'patient_name')
+
+
+class BedEventStore:
+    """
+    Append-only log of bed state changes with periodic snapshots.
+
+    Every change to a bed is appended to a JSON-lines event log with a
+    monotonically increasing sequence number. Every `snapshot_interval`
+    events the full bed state is written to a snapshot file, and a small
+    index of (timestamp, seq, offsets) is kept alongside it. The state at
+    any moment is rebuilt by loading the nearest earlier snapshot and
+    replaying at most one interval of events from the recorded byte offset.
+    """
+
+    def __init__(self, events_file: str = "data/bed_events.jsonl",
+                 snapshots_file: str = "data/bed_snapshots.jsonl",
+                 snapshot_interval: int = 500):
+        self.events_file = events_file
+        self.snapshots_file = snapshots_file
+        self.snapshot_index_file = snapshots_file + ".idx"
+        self.snapshot_interval = snapshot_interval
+
+    def build_events(self, beds_before: Dict, beds_after: Dict, cause: str) -> List[Dict]:
+        """
+        Describe the difference between two bed collections as events.
+
+        Args:
+            beds_before: Bed collection before the change
+            beds_after: Bed collection after the change
+            cause: What triggered the change (admission, transfer, ...)
+
+        Returns:
+            Events with sequence numbers following the current log
+        """
+        timestamp = datetime.now().isoformat()
+        seq = self.last_seq()
+        events = []
+
+        for bed_id, bed in beds_after.items():
+            previous = beds_before.get(bed_id)
+            if previous is not None and all(previous.get(f) == bed.get(f) for f in TRACKED_FIELDS):
+                continue
+
+            seq += 1
+            events.append({
+                'seq': seq,
+                'timestamp': timestamp,
+                'bed_id': bed_id,
+                'cause': cause if previous is not None else 'bed_created',
+                'from_status': previous.get('status') if previous else None,
+                **{field: bed.get(field) for field in TRACKED_FIELDS}
+            })
+
+        for bed_id in beds_before.keys() - beds_after.keys():
+            seq += 1
+            events.append({
+                'seq': seq,
+                'timestamp': timestamp,
+                'bed_id': bed_id,
+                'cause': 'bed_removed',
+                'from_status': beds_before[bed_id].get('status'),
+                'bed_number': beds_before[bed_id].get('bed_number'),
+                'department': beds_before[bed_id].get('department'),
+                'status': None
+            })
+
+        return events
+
+    def ensure_baseline(self, beds: Dict) -> None:
+        """
+        Snapshot the current bed state if the log has no snapshot yet.
+
+        This gives beds that existed before event recording started a
+        starting point for replay.
+
+        Args:
+            beds: Current bed collection
+        """
+        if not self._load_snapshot_index():
+            self._write_snapshot(beds, self.last_seq(), datetime.now().isoformat())
+
+    def record(self, events: List[Dict], beds_after: Dict) -> None:
+        """
+        Append events to the log, taking a snapshot when one is due.
+
+        Events already present in the log (by sequence number) are skipped,
+        so replaying a commit journal after a crash is safe. The caller must
+        serialise calls, e.g. by holding the bed transaction lock.
+
+        Args:
+            events: Events from build_events()
+            beds_after: Bed collection after the events
+        """
+        last_seq = self.last_seq()
+        events = [event for event in events if event['seq'] > last_seq]
+        if not events:
+            return
+
+        append_jsonl(self.events_file, events)
+
+        snapshots = self._load_snapshot_index()
+        if not snapshots or events[-1]['seq'] - snapshots[-1]['seq'] >= self.snapshot_interval:
+            self._write_snapshot(beds_after, events[-1]['seq'], events[-1]['timestamp'])
+
+    def last_seq(self) -> int:
+        """Sequence number of the last event in the log (0 if empty)."""
+        if not os.path.exists(self.events_file):
+            return 0
+
+        with open(self.events_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            tail = f.read().splitlines()
+
+        for line in reversed(tail):
+            try:
+                return int(json.loads(line)['seq'])
+            except (ValueError, KeyError):
+                continue
+        return 0
+
+    def state_at(self, when: datetime) -> Dict[str, Dict]:
+        """
+        Reconstruct the state of every bed at a point in time.
+
+        Args:
+            when: Moment to reconstruct
+
+        Returns:
+            Mapping of bed_id to tracked bed fields
+        """
+        state, _ = self._replay_until(when.isoformat())
+        return state
+
+    def occupancy_at(self, when: datetime, department: Optional[str] = None) -> Dict[str, int]:
+        """
+        Bed counts by status at a point in time.
+
+        Args:
+            when: Moment to reconstruct
+            department: Restrict to one department
+
+        Returns:
+            Dictionary with 'total', 'occupied', 'available' and 'maintenance'
+        """
+        return self._count(self.state_at(when), department)
+
+    def occupancy_series(self, start: datetime, end: datetime, step: timedelta,
+                         department: Optional[str] = None) -> List[Dict]:
+        """
+        Occupancy sampled at regular intervals.
+
+        Only the snapshot preceding `start` and the events up to `end` are
+        read, regardless of how long the log is.
+
+        Args:
+            start: First sample time
+            end: Last sample time
+            step: Sampling interval
+            department: Restrict to one department
+
+        Returns:
+            List of dictionaries with 'timestamp' and the counts of occupancy_at()
+        """
+        if end < start or step <= timedelta(0):
+            return []
+
+        state, remaining = self._replay_until(start.isoformat())
+        pending = next(remaining, None)
+        series = []
+        sample = start
+
+        while sample <= end:
+            cutoff = sample.isoformat()
+            while pending is not None and pending['timestamp'] <= cutoff:
+                self._apply(state, pending)
+                pending = next(remaining, None)
+
+            series.append({'timestamp': sample, **self._count(state, department)})
+            sample += step
+
+        return series
+
+    def history(self, bed_number: str, since: datetime) -> List[Dict]:
+        """Events for one bed since a point in time, oldest first."""
+        _, remaining = self._replay_until(since.isoformat())
+        return [event for event in remaining if event.get('bed_number') == bed_number]
+
+    def _replay_until(self, cutoff: str) -> Tuple[Dict[str, Dict], Iterator[Dict]]:
+        """
+        Load the snapshot preceding `cutoff` and replay events up to it.
+
+        A cutoff before the first snapshot predates the log: nothing is
+        known about the beds then, so the state is empty and the remaining
+        events start with the baseline beds as 'baseline' events.
+
+        Returns:
+            The state at `cutoff` and an iterator over the events after it
+        """
+        snapshots = self._load_snapshot_index()
+        if not snapshots:
+            return {}, iter(())
+
+        timestamps = [snapshot['timestamp'] for snapshot in snapshots]
+        position = bisect.bisect_right(timestamps, cutoff) - 1
+        if position < 0:
+            first = snapshots[0]
+            baseline = [{'seq': first['seq'], 'timestamp': first['timestamp'], 'bed_id': bed_id,
+                         'cause': 'baseline', 'from_status': None, **bed}
+                        for bed_id, bed in self._read_snapshot(first['snapshot_offset']).items()]
+            return {}, itertools.chain(baseline, iter_jsonl(self.events_file, offset=first['event_offset']))
+
+        snapshot = snapshots[position]
+        state = self._read_snapshot(snapshot['snapshot_offset'])
+
+        events = iter_jsonl(self.events_file, offset=snapshot['event_offset'])
+        for event in events:
+            if event['timestamp'] > cutoff:
+                return state, itertools.chain([event], events)
+            self._apply(state, event)
+        return state, iter(())
+
+    def _apply(self, state: Dict[str, Dict], event: Dict) -> None:
+        if event.get('status') is None:
+            state.pop(event['bed_id'], None)
+        else:
+            state[event['bed_id']] = {field: event.get(field) for field in TRACKED_FIELDS}
+
+    def _count(self, state: Dict[str, Dict], department: Optional[str]) -> Dict[str, int]:
+        counts = {'total': 0, 'occupied': 0, 'available': 0, 'maintenance': 0}
+        for bed in state.values():
+            if department and bed.get('department') != department:
+                continue
+            counts['total'] += 1
+            status = bed.get('status')
+            if status == 'Occupied':
+                counts['occupied'] += 1
+            elif status == 'Available':
+                counts['available'] += 1
+            elif status == 'Maintenance':
+                counts['maintenance'] += 1
+        return counts
+
+    def _write_snapshot(self, beds: Dict, seq: int, timestamp: str) -> None:
+        os.makedirs(os.path.dirname(self.snapshots_file) or ".", exist_ok=True)
+        event_offset = os.path.getsize(self.events_file) if os.path.exists(self.events_file) else 0
+        snapshot_offset = os.path.getsize(self.snapshots_file) if os.path.exists(self.snapshots_file) else 0
+
+        append_jsonl(self.snapshots_file, [{
+            'seq': seq,
+            'timestamp': timestamp,
+            'beds': {
+                bed_id: {field: bed.get(field) for field in TRACKED_FIELDS}
+                for bed_id, bed in beds.items()
+            }
+        }])
+        append_jsonl(self.snapshot_index_file, [{
+            'seq': seq,
+            'timestamp': timestamp,
+            'event_offset': event_offset,
+            'snapshot_offset': snapshot_offset
+        }])
+
+    def _load_snapshot_index(self) -> List[Dict]:
+        return list(iter_jsonl(self.snapshot_index_file))
+
+    def _read_snapshot(self, offset: int) -> Dict[str, Dict]:
+        with open(self.snapshots_file, 'r') as f:
+            f.seek(offset)
+            return json.loads(f.readline())['beds']
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    random.seed(3)
+    departments = ['Emergency', 'ICU', 'General Surgery', 'Cardiology']
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = BedEventStore(os.path.join(data_dir, "bed_events.jsonl"),
+                              os.path.join(data_dir, "bed_snapshots.jsonl"))
+        beds = {
+            f"B{i:04d}": {'bed_number': f"B-{i:04d}", 'department': departments[i % 4],
+                          'bed_type': 'General', 'status': 'Available'}
+            for i in range(600)
+        }
+        store.ensure_baseline(beds)
+
+        # Half a year of bed changes, written in commit-sized batches
+        start = datetime.now() - timedelta(days=180)
+        seq = 0
+        batch = []
+        for n in range(200_000):
+            bed_id = random.choice(list(beds))
+            bed = dict(beds[bed_id], status=random.choice(['Available', 'Occupied', 'Occupied']))
+            beds[bed_id] = bed
+            seq += 1
+            timestamp = (start + timedelta(seconds=n * 180 * 86400 / 200_000)).isoformat()
+            batch.append({'seq': seq, 'timestamp': timestamp, 'bed_id': bed_id, 'cause': 'benchmark',
+                          'from_status': None, **{f: bed.get(f) for f in TRACKED_FIELDS}})
+            if len(batch) == 50:
+                store.record(batch, beds)
+                batch = []
+
+        when = datetime.now() - timedelta(days=40)
+        begin = time.perf_counter()
+        counts = store.occupancy_at(when, 'ICU')
+        point_ms = (time.perf_counter() - begin) * 1000
+
+        begin = time.perf_counter()
+        series = store.occupancy_series(when, when + timedelta(days=7), timedelta(hours=1), 'ICU')
+        series_ms = (time.perf_counter() - begin) * 1000
+
+        print(f"ICU at {when:%Y-%m-%d %H:%M}: {counts} in {point_ms:.1f} ms")
+        print(f"7-day hourly series ({len(series)} points) in {series_ms:.1f} ms")
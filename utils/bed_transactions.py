@@ -0,0 +1,504 @@
+import copy
+import glob
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from utils.storage import atomic_write_json, file_lock
+from utils.bed_events import BedEventStore
+
+T = TypeVar('T')
+
+COLLECTIONS = ('beds', 'admissions', 'transfers')
+
+
+class TransactionConflictError(Exception):
+    """Raised when a collection changed between a transaction's begin and commit."""
+
+
+class BedAllocationError(Exception):
+    """Raised when an admission, transfer or discharge conflicts with the current bed state."""
+
+
+class BedTransaction:
+    """
+    Consistent snapshot of the beds, admissions and transfers collections.
+
+    Changes are made to the in-memory copies and only become visible to
+    other sessions when the transaction is committed by
+    BedTransactionManager.
+    """
+
+    def __init__(self, data: Dict[str, Dict], versions: Dict[str, int]):
+        self.data = data
+        self.versions = versions
+        self.cause = 'status_update'
+        self._original = copy.deepcopy(data)
+
+    @property
+    def beds(self) -> Dict:
+        return self.data['beds']
+
+    @property
+    def admissions(self) -> Dict:
+        return self.data['admissions']
+
+    @property
+    def transfers(self) -> Dict:
+        return self.data['transfers']
+
+    def changed_collections(self) -> List[str]:
+        """Names of the collections modified since the snapshot was taken."""
+        return [name for name in COLLECTIONS if self.data[name] != self._original[name]]
+
+    def next_id(self, collection: str, prefix: str) -> str:
+        """Generate the next sequential record ID for a collection."""
+        records = self.data[collection]
+        number = len(records) + 1
+        while f"{prefix}_{number:04d}" in records:
+            number += 1
+        return f"{prefix}_{number:04d}"
+
+    def find_bed(self, bed_number: str) -> Tuple[str, Dict]:
+        """
+        Look up a bed by its display number.
+
+        Args:
+            bed_number: Bed number such as "ICU-03"
+
+        Returns:
+            Tuple of (bed_id, bed record)
+        """
+        for bed_id, bed in self.beds.items():
+            if bed.get('bed_number') == bed_number:
+                return bed_id, bed
+        raise BedAllocationError(f"Bed {bed_number} does not exist")
+
+    def set_bed_status(self, bed_number: str, status: str,
+                       patient_name: str = None, patient_id: str = None) -> Dict:
+        """Set the status and occupant of a bed."""
+        _, bed = self.find_bed(bed_number)
+        bed['status'] = status
+        bed['patient_name'] = patient_name
+        bed['patient_id'] = patient_id
+        bed['last_updated'] = datetime.now().isoformat()
+        return bed
+
+    def occupy_bed(self, bed_number: str, patient_name: str, patient_id: str) -> Dict:
+        """Assign a patient to a bed, failing if the bed is no longer available."""
+        _, bed = self.find_bed(bed_number)
+        if bed.get('status') != 'Available':
+            raise BedAllocationError(
+                f"Bed {bed_number} is no longer available (status: {bed.get('status', 'Unknown')})"
+            )
+        return self.set_bed_status(bed_number, 'Occupied', patient_name, patient_id)
+
+    def release_bed(self, bed_number: str, patient_id: str = None) -> Optional[Dict]:
+        """
+        Free a bed.
+
+        When patient_id is given the bed is only released if that patient
+        still occupies it, so a stale discharge cannot evict someone else.
+        """
+        _, bed = self.find_bed(bed_number)
+        if patient_id is not None and bed.get('patient_id') not in (None, patient_id):
+            return None
+        return self.set_bed_status(bed_number, 'Available')
+
+
+class BedTransactionManager:
+    """
+    Optimistic transactions over the bed subsystem's JSON collections.
+
+    Each collection carries a version number in a manifest file. A
+    transaction records the versions it read; commit takes a short
+    exclusive lock, rejects the transaction if any version moved, and
+    otherwise writes all changed collections through a journal so that
+    either every file is replaced or none is.
+
+    When an event store is given, every committed bed change is also
+    appended to its event log as part of the same journal.
+    """
+
+    def __init__(self, beds_file: str = "data/beds.json",
+                 admissions_file: str = "data/admissions.json",
+                 transfers_file: str = "data/transfers.json",
+                 manifest_file: str = "data/bed_manifest.json",
+                 event_store: Optional[BedEventStore] = None):
+        self.event_store = event_store
+        self.files = {
+            'beds': beds_file,
+            'admissions': admissions_file,
+            'transfers': transfers_file,
+        }
+        self.manifest_file = manifest_file
+        self.journal_file = manifest_file + ".journal"
+        self.lock_file = manifest_file + ".lock"
+        self.stats = {'commits': 0, 'conflicts': 0}
+
+        with self._locked():
+            self._recover()
+
+    def begin(self) -> BedTransaction:
+        """Start a transaction on a consistent snapshot of all three collections."""
+        with self._locked():
+            if os.path.exists(self.journal_file):
+                self._recover()
+            versions = self._read_manifest()
+            data = {name: self._load(path) for name, path in self.files.items()}
+        return BedTransaction(data, versions)
+
+    def commit(self, txn: BedTransaction) -> Dict[str, int]:
+        """
+        Atomically publish the collections changed by a transaction.
+
+        Args:
+            txn: Transaction returned by begin()
+
+        Returns:
+            The new collection versions
+        """
+        changed = txn.changed_collections()
+        if not changed:
+            return txn.versions
+
+        with self._locked():
+            current = self._read_manifest()
+            stale = [name for name in COLLECTIONS if current.get(name, 0) != txn.versions.get(name, 0)]
+            if stale:
+                self.stats['conflicts'] += 1
+                raise TransactionConflictError(f"Concurrent update to {', '.join(stale)}")
+
+            new_versions = dict(current)
+            for name in changed:
+                new_versions[name] = current.get(name, 0) + 1
+
+            txn_id = uuid.uuid4().hex
+            staged = {}
+            for name in changed:
+                target = self.files[name]
+                tmp_path = f"{target}.{txn_id}.tmp"
+                self._write_durable(tmp_path, txn.data[name])
+                staged[target] = tmp_path
+
+            events = []
+            if self.event_store is not None and 'beds' in changed:
+                self.event_store.ensure_baseline(txn._original['beds'])
+                events = self.event_store.build_events(txn._original['beds'], txn.beds, txn.cause)
+
+            # Writing the journal is the commit point: from here on recovery
+            # rolls the transaction forward instead of discarding it.
+            journal = {
+                'txn_id': txn_id,
+                'staged': staged,
+                'events': events,
+                'versions': new_versions,
+                'committed_at': datetime.now().isoformat()
+            }
+            atomic_write_json(self.journal_file, journal)
+            self._apply_journal(journal)
+            self.stats['commits'] += 1
+
+        txn.versions = new_versions
+        txn._original = copy.deepcopy(txn.data)
+        return new_versions
+
+    def run(self, operation: Callable[[BedTransaction], T], max_retries: int = 8) -> T:
+        """
+        Execute an operation in a transaction, retrying on conflicts.
+
+        The operation is re-run against a fresh snapshot after each
+        conflict, so it must only touch the transaction it is given.
+
+        Args:
+            operation: Callable receiving a BedTransaction
+            max_retries: Attempts allowed after the first conflict
+
+        Returns:
+            Whatever the operation returned on the successful attempt
+        """
+        for attempt in range(max_retries + 1):
+            txn = self.begin()
+            result = operation(txn)
+            try:
+                self.commit(txn)
+                return result
+            except TransactionConflictError:
+                if attempt == max_retries:
+                    raise
+                time.sleep(random.uniform(0, min(0.05, 0.002 * (2 ** attempt))))
+
+    def admit_patient(self, admission_data: Dict) -> str:
+        """
+        Create an admission and occupy its bed in one transaction.
+
+        Args:
+            admission_data: Admission record including 'bed_number'
+
+        Returns:
+            The new admission ID
+        """
+        def operation(txn: BedTransaction) -> str:
+            txn.cause = 'admission'
+            txn.occupy_bed(admission_data['bed_number'], admission_data['patient_name'],
+                           admission_data['patient_id'])
+            admission_id = txn.next_id('admissions', 'ADM')
+            txn.admissions[admission_id] = dict(admission_data)
+            return admission_id
+
+        return self.run(operation)
+
+    def admit_patients(self, admissions: List[Dict]) -> List[str]:
+        """
+        Admit a batch of patients in one transaction.
+
+        Either every admission is committed or, if any bed has been taken
+        in the meantime, none is.
+
+        Args:
+            admissions: Admission records, each including 'bed_number'
+
+        Returns:
+            The new admission IDs, in input order
+        """
+        def operation(txn: BedTransaction) -> List[str]:
+            txn.cause = 'admission'
+            admission_ids = []
+            for admission_data in admissions:
+                txn.occupy_bed(admission_data['bed_number'], admission_data['patient_name'],
+                               admission_data['patient_id'])
+                admission_id = txn.next_id('admissions', 'ADM')
+                txn.admissions[admission_id] = dict(admission_data)
+                admission_ids.append(admission_id)
+            return admission_ids
+
+        return self.run(operation)
+
+    def transfer_patient(self, patient_id: str, new_department: str, new_bed: str,
+                         reason: str, new_doctor: str, transfer_date: str) -> str:
+        """
+        Move an admitted patient to a new bed and record the transfer.
+
+        Returns:
+            The new transfer ID
+        """
+        def operation(txn: BedTransaction) -> str:
+            txn.cause = 'transfer'
+            admission = next(
+                (adm for adm in txn.admissions.values()
+                 if adm.get('patient_id') == patient_id and adm.get('status') == 'Admitted'),
+                None
+            )
+            if admission is None:
+                raise BedAllocationError(f"Patient {patient_id} is not currently admitted")
+
+            old_bed = admission.get('bed_number')
+            old_department = admission.get('department')
+
+            if old_bed:
+                txn.release_bed(old_bed, patient_id)
+            txn.occupy_bed(new_bed, admission['patient_name'], patient_id)
+
+            admission['department'] = new_department
+            admission['bed_number'] = new_bed
+            admission['attending_doctor'] = new_doctor
+
+            transfer_id = txn.next_id('transfers', 'TRF')
+            txn.transfers[transfer_id] = {
+                'patient_id': patient_id,
+                'patient_name': admission['patient_name'],
+                'from_department': old_department,
+                'from_bed': old_bed,
+                'to_department': new_department,
+                'to_bed': new_bed,
+                'reason': reason,
+                'new_doctor': new_doctor,
+                'transfer_date': transfer_date,
+                'created_at': datetime.now().isoformat()
+            }
+            return transfer_id
+
+        return self.run(operation)
+
+    def discharge_patient(self, admission_id: str) -> None:
+        """Mark an admission as discharged and free its bed."""
+        def operation(txn: BedTransaction) -> None:
+            txn.cause = 'discharge'
+            admission = txn.admissions.get(admission_id)
+            if admission is None or admission.get('status') != 'Admitted':
+                raise BedAllocationError(f"Admission {admission_id} is not active")
+
+            admission['status'] = 'Discharged'
+            admission['discharge_date'] = datetime.now().strftime("%Y-%m-%d")
+            admission['discharge_time'] = datetime.now().strftime("%H:%M:%S")
+            if admission.get('bed_number'):
+                txn.release_bed(admission['bed_number'], admission.get('patient_id'))
+
+        self.run(operation)
+
+    def update_bed_status(self, bed_number: str, status: str,
+                          patient_name: str = None, patient_id: str = None) -> None:
+        """Set a bed's status (e.g. Maintenance or Reserved) transactionally."""
+        self.run(lambda txn: txn.set_bed_status(bed_number, status, patient_name, patient_id))
+
+    def add_beds(self, new_beds: Dict[str, Dict], only_if_empty: bool = False) -> Dict:
+        """
+        Insert bed records.
+
+        Args:
+            new_beds: Mapping of bed_id to bed record
+            only_if_empty: Only insert when no beds exist yet
+
+        Returns:
+            The bed collection after the commit
+        """
+        def operation(txn: BedTransaction) -> Dict:
+            txn.cause = 'bed_created'
+            if not (only_if_empty and txn.beds):
+                txn.beds.update(copy.deepcopy(new_beds))
+            return txn.beds
+
+        return self.run(operation)
+
+    def _locked(self):
+        """Hold the commit lock across threads and, where supported, processes."""
+        return file_lock(self.lock_file)
+
+    def _recover(self):
+        """Roll forward a committed journal and drop staged files of aborted commits."""
+        if os.path.exists(self.journal_file):
+            try:
+                with open(self.journal_file, 'r') as f:
+                    journal = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                journal = None
+
+            if journal:
+                self._apply_journal(journal)
+            else:
+                os.remove(self.journal_file)
+
+        for path in self.files.values():
+            for orphan in glob.glob(f"{glob.escape(path)}.*.tmp"):
+                os.remove(orphan)
+
+    def _apply_journal(self, journal: Dict):
+        """Move staged files into place and publish the new versions."""
+        for target, tmp_path in journal['staged'].items():
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, target)
+        if self.event_store is not None and journal.get('events'):
+            self.event_store.record(journal['events'], self._load(self.files['beds']))
+        atomic_write_json(self.manifest_file, journal['versions'])
+        os.remove(self.journal_file)
+
+    def _read_manifest(self) -> Dict[str, int]:
+        versions = self._load(self.manifest_file)
+        return {name: int(versions.get(name, 0)) for name in COLLECTIONS}
+
+    def _write_durable(self, path: str, data: Dict):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+def _benchmark(workers: int, admissions_per_worker: int, bed_count: int) -> Dict:
+    """
+    Measure admission throughput with many sessions competing for one ward.
+
+    Every worker admits into the first available bed it sees, which is
+    the worst case for contention. The run verifies that no bed ends up
+    with two admissions.
+    """
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = BedTransactionManager(
+            beds_file=os.path.join(data_dir, "beds.json"),
+            admissions_file=os.path.join(data_dir, "admissions.json"),
+            transfers_file=os.path.join(data_dir, "transfers.json"),
+            manifest_file=os.path.join(data_dir, "bed_manifest.json"),
+        )
+        manager.add_beds({
+            f"GW_{i:04d}": {
+                'bed_number': f"GW-{i:04d}", 'room_number': f"GW-{i:04d}",
+                'department': 'General Surgery', 'bed_type': 'General',
+                'status': 'Available', 'patient_name': None, 'patient_id': None
+            }
+            for i in range(1, bed_count + 1)
+        })
+
+        def admit(worker: int) -> int:
+            admitted = 0
+            for n in range(admissions_per_worker):
+                patient_id = f"P{worker:03d}{n:05d}"
+
+                def operation(txn: BedTransaction) -> str:
+                    bed = next((b for b in txn.beds.values() if b['status'] == 'Available'), None)
+                    if bed is None:
+                        raise BedAllocationError("Ward full")
+                    txn.occupy_bed(bed['bed_number'], patient_id, patient_id)
+                    admission_id = txn.next_id('admissions', 'ADM')
+                    txn.admissions[admission_id] = {
+                        'patient_id': patient_id, 'patient_name': patient_id,
+                        'bed_number': bed['bed_number'], 'status': 'Admitted'
+                    }
+                    return admission_id
+
+                try:
+                    manager.run(operation, max_retries=50)
+                    admitted += 1
+                except BedAllocationError:
+                    break
+            return admitted
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            admitted = sum(pool.map(admit, range(workers)))
+        elapsed = time.perf_counter() - start
+
+        txn = manager.begin()
+        occupied = [b['bed_number'] for b in txn.beds.values() if b['status'] == 'Occupied']
+        assigned = [a['bed_number'] for a in txn.admissions.values()]
+        consistent = len(assigned) == len(set(assigned)) == len(occupied) == admitted
+
+        return {
+            'workers': workers,
+            'admitted': admitted,
+            'seconds': elapsed,
+            'admissions_per_second': admitted / elapsed if elapsed else 0.0,
+            'conflicts_retried': manager.stats['conflicts'],
+            'consistent': consistent,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark concurrent bed admissions")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--admissions", type=int, default=25, help="admissions per worker")
+    parser.add_argument("--beds", type=int, default=600)
+    args = parser.parse_args()
+
+    for worker_count in args.workers:
+        result = _benchmark(worker_count, args.admissions, args.beds)
+        print(f"{result['workers']:>3} workers: {result['admitted']:>5} admissions in "
+              f"{result['seconds']:.2f}s ({result['admissions_per_second']:.1f}/s), "
+              f"{result['conflicts_retried']} conflicts retried, consistent={result['consistent']}")
@@ -0,0 +1,471 @@
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.storage import append_jsonl, atomic_write_json, file_lock, iter_jsonl, iter_jsonl_complete
+
+RECEIVABLES = 'Accounts Receivable'
+REVENUE = 'Revenue'
+CASH = 'Cash'
+UNAPPLIED = 'Unapplied Payments'
+
+
+class LedgerError(Exception):
+    """Raised when a journal entry cannot be posted."""
+
+
+def to_cents(amount) -> int:
+    """Convert a currency amount to integer cents."""
+    return int(round(float(amount or 0) * 100))
+
+
+def from_cents(cents: int) -> float:
+    """Convert integer cents back to a currency amount."""
+    return cents / 100
+
+
+class BillingLedger:
+    """
+    Double-entry ledger for bills and payments.
+
+    Every bill and payment is posted as an append-only journal entry whose
+    debits equal its credits. A bill debits Accounts Receivable and
+    credits Revenue; a payment debits Cash and credits Accounts
+    Receivable for the bills it is allocated to, with any excess held in
+    Unapplied Payments. Receivable postings carry the bill id, so the
+    ledger keeps a bill id -> (billed, paid) index and answers balance
+    queries in O(1).
+
+    The index is held in memory and checkpointed to disk every
+    `checkpoint_interval` entries together with the journal offset it
+    covers; loading replays only the journal tail after the checkpoint.
+
+    The index offset only ever moves past complete journal lines, so an
+    append still being written when another process reads is picked up
+    whole on the next read. Entries are numbered consecutively: a gap in
+    the numbers means an entry was lost, and the ledger then stops
+    before it, refuses to post or checkpoint, and retries from there.
+    """
+
+    def __init__(self, journal_file: str = "data/ledger_journal.jsonl",
+                 index_file: str = "data/ledger_index.json",
+                 checkpoint_interval: int = 5000):
+        self.journal_file = journal_file
+        self.index_file = index_file
+        self.lock_file = journal_file + ".lock"
+        self.checkpoint_interval = checkpoint_interval
+        self.index = self._load_index()
+        self.gap: Optional[int] = None
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._catch_up()
+
+    def subscribe(self, listener: Callable[[Dict], None]) -> None:
+        """
+        Call `listener` with every journal entry applied from now on.
+
+        This covers entries posted through this instance as well as
+        entries appended by other processes and picked up on catch-up, so
+        derived indexes can be maintained incrementally.
+
+        Args:
+            listener: Callable taking a journal entry
+        """
+        self._listeners.append(listener)
+
+    def refresh(self) -> None:
+        """Apply entries appended to the journal by other processes."""
+        self._catch_up()
+
+    def is_empty(self) -> bool:
+        """Whether nothing has been posted yet."""
+        self._catch_up()
+        return self.index['next_entry'] == 1
+
+    def post_bill(self, bill_id: str, bill: Dict) -> int:
+        """
+        Post a bill: debit receivables, credit revenue.
+
+        Args:
+            bill_id: Bill identifier
+            bill: Bill record (uses total_amount and bill_date)
+
+        Returns:
+            Journal entry number (the existing one if the bill was already posted)
+        """
+        return self.post([self._bill_entry(bill_id, bill)])[0]
+
+    def post_payment(self, payment_id: str, payment: Dict,
+                     allocations: Optional[Dict[str, float]] = None) -> int:
+        """
+        Post a payment and allocate it to bills.
+
+        Args:
+            payment_id: Payment identifier
+            payment: Payment record (uses amount, bill_id and payment_date)
+            allocations: Amount to apply per bill id. Defaults to the whole
+                payment against payment['bill_id'], capped at its balance.
+
+        Returns:
+            Journal entry number (the existing one if the payment was already posted)
+        """
+        return self.post_payments([(payment_id, payment, allocations)])[0]
+
+    def post_payments(self, payments: Iterable[Tuple]) -> List[int]:
+        """
+        Post many payments with a single journal append.
+
+        Args:
+            payments: (payment_id, payment, allocations) tuples; allocations
+                may be None as in post_payment()
+
+        Returns:
+            Journal entry numbers, in order
+        """
+        with file_lock(self.lock_file):
+            self._catch_up()
+            pending: Dict[str, int] = {}
+            entries = []
+            for payment_id, payment, allocations in payments:
+                entries.append(self._payment_entry(payment_id, payment, allocations, pending))
+            return self._append(entries)
+
+    def post(self, entries: List[Dict]) -> List[int]:
+        """
+        Post prepared journal entries (see _bill_entry / _payment_entry).
+
+        Returns:
+            Journal entry numbers, in order
+        """
+        with file_lock(self.lock_file):
+            self._catch_up()
+            return self._append(entries)
+
+    def bootstrap(self, bills: Dict, payments: Dict) -> int:
+        """
+        Post opening entries for bills and payments written before the ledger existed.
+
+        Does nothing if the journal already has entries.
+
+        Returns:
+            Number of entries posted
+        """
+        with file_lock(self.lock_file):
+            self._catch_up()
+            if self.index['next_entry'] != 1:
+                return 0
+
+            entries = [self._bill_entry(bill_id, bill) for bill_id, bill in bills.items()]
+            self._append(entries)
+            pending: Dict[str, int] = {}
+            payment_entries = [
+                self._payment_entry(payment_id, payment, None, pending)
+                for payment_id, payment in sorted(payments.items(),
+                                                  key=lambda item: str(item[1].get('payment_date', '')))
+            ]
+            self._append(payment_entries)
+            self.checkpoint()
+            return len(entries) + len(payment_entries)
+
+    def balance(self, bill_id: str) -> float:
+        """Amount still owed on a bill."""
+        self._catch_up()
+        bill = self.index['bills'].get(bill_id)
+        return from_cents(bill[0] - bill[1]) if bill else 0.0
+
+    def paid(self, bill_id: str) -> float:
+        """Amount applied to a bill so far."""
+        self._catch_up()
+        bill = self.index['bills'].get(bill_id)
+        return from_cents(bill[1]) if bill else 0.0
+
+    def bill_status(self, bill_id: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Payment status of a bill derived from its ledger balance.
+
+        Returns:
+            'Paid', 'Partially Paid', 'Pending', or `default` if the bill
+            is not in the ledger
+        """
+        self._catch_up()
+        bill = self.index['bills'].get(bill_id)
+        if bill is None:
+            return default
+        billed, paid = bill
+        if paid >= billed:
+            return 'Paid'
+        return 'Partially Paid' if paid > 0 else 'Pending'
+
+    def open_bills(self) -> Dict[str, float]:
+        """Bills with an outstanding balance, mapped to that balance."""
+        self._catch_up()
+        return {
+            bill_id: from_cents(billed - paid)
+            for bill_id, (billed, paid) in self.index['bills'].items() if billed > paid
+        }
+
+    def account_balance(self, account: str) -> float:
+        """Debit-positive balance of a ledger account."""
+        self._catch_up()
+        return from_cents(self.index['accounts'].get(account, 0))
+
+    def trial_balance(self) -> Dict[str, float]:
+        """Debit-positive balance of every account (sums to zero when the books balance)."""
+        self._catch_up()
+        return {account: from_cents(cents) for account, cents in self.index['accounts'].items()}
+
+    def checkpoint(self) -> None:
+        """Write the in-memory index to disk (not while the journal has a gap)."""
+        if self.gap is not None:
+            return
+        atomic_write_json(self.index_file, self.index, indent=None)
+
+    def reconcile(self, bills: Dict, payments: Dict) -> List[Dict]:
+        """
+        Detect drift between the journal, the index and the source records.
+
+        Checks that every journal entry balances, that the index equals a
+        full replay of the journal, and that every bill and payment is
+        posted with the amount it has in bills.json / payments.json.
+
+        Args:
+            bills: All bills, keyed by bill id
+            payments: All payments, keyed by payment id
+
+        Returns:
+            List of issues with 'check', 'ref', 'expected' and 'actual'
+        """
+        self._catch_up()
+        issues = []
+        replayed = self._empty_index()
+        posted: Dict[str, int] = {}
+
+        for entry in iter_jsonl(self.journal_file):
+            debits = sum(to_cents(p.get('debit')) for p in entry['postings'])
+            credits = sum(to_cents(p.get('credit')) for p in entry['postings'])
+            if debits != credits:
+                issues.append({'check': 'unbalanced entry', 'ref': entry['ref'],
+                               'expected': from_cents(debits), 'actual': from_cents(credits)})
+            self._apply(replayed, entry)
+            posted[entry['ref']] = debits if entry['kind'] == 'bill' else to_cents(entry['amount'])
+
+        for name in ('bills', 'accounts'):
+            for key in set(replayed[name]) | set(self.index[name]):
+                if replayed[name].get(key) != self.index[name].get(key):
+                    issues.append({'check': f'index {name}', 'ref': key,
+                                   'expected': replayed[name].get(key), 'actual': self.index[name].get(key)})
+
+        for kind, records, field in (('bill', bills, 'total_amount'), ('payment', payments, 'amount')):
+            for ref, record in records.items():
+                expected = to_cents(record.get(field))
+                if ref not in posted:
+                    issues.append({'check': f'{kind} not posted', 'ref': ref,
+                                   'expected': from_cents(expected), 'actual': None})
+                elif posted[ref] != expected:
+                    issues.append({'check': f'{kind} amount', 'ref': ref,
+                                   'expected': from_cents(expected), 'actual': from_cents(posted[ref])})
+
+        known = set(bills) | set(payments)
+        for ref, amount in posted.items():
+            if ref not in known:
+                issues.append({'check': 'posted without source record', 'ref': ref,
+                               'expected': None, 'actual': from_cents(amount)})
+
+        return issues
+
+    def _bill_entry(self, bill_id: str, bill: Dict) -> Dict:
+        amount = round(float(bill.get('total_amount', 0) or 0), 2)
+        return {
+            'kind': 'bill',
+            'ref': bill_id,
+            'date': bill.get('bill_date'),
+            'due_date': bill.get('due_date'),
+            'payer': bill.get('insurance_provider') or None,
+            'department': bill.get('department') or None,
+            'amount': amount,
+            'postings': [
+                {'account': RECEIVABLES, 'bill_id': bill_id, 'debit': amount, 'credit': 0.0},
+                {'account': REVENUE, 'debit': 0.0, 'credit': amount},
+            ]
+        }
+
+    def _payment_entry(self, payment_id: str, payment: Dict, allocations: Optional[Dict[str, float]],
+                       pending: Dict[str, int]) -> Dict:
+        """
+        Build a payment entry, capping allocations at each bill's balance.
+
+        `pending` tracks cents already allocated by earlier entries of the
+        same batch so one batch cannot over-apply a bill.
+        """
+        amount = to_cents(payment.get('amount'))
+        if amount <= 0:
+            raise LedgerError(f"Payment {payment_id} has no positive amount")
+
+        if allocations is None:
+            allocations = {payment['bill_id']: from_cents(amount)} if payment.get('bill_id') else {}
+
+        postings = [{'account': CASH, 'debit': from_cents(amount), 'credit': 0.0,
+                     'method': payment.get('payment_method')}]
+        remaining = amount
+        for bill_id, requested in allocations.items():
+            billed, paid = self.index['bills'].get(bill_id, (0, 0))
+            applied = min(to_cents(requested), remaining, max(0, billed - paid - pending.get(bill_id, 0)))
+            if applied <= 0:
+                continue
+            pending[bill_id] = pending.get(bill_id, 0) + applied
+            remaining -= applied
+            postings.append({'account': RECEIVABLES, 'bill_id': bill_id,
+                             'debit': 0.0, 'credit': from_cents(applied)})
+
+        if remaining:
+            postings.append({'account': UNAPPLIED, 'debit': 0.0, 'credit': from_cents(remaining)})
+
+        return {
+            'kind': 'payment',
+            'ref': payment_id,
+            'date': payment.get('payment_date'),
+            'amount': from_cents(amount),
+            'postings': postings
+        }
+
+    def _append(self, entries: List[Dict]) -> List[int]:
+        """Number, append and apply entries; the caller holds the lock."""
+        if self.gap is not None:
+            raise LedgerError(f"Journal entry {self.index['next_entry']} is missing "
+                              f"(next entry found is {self.gap}); not posting until it is restored")
+        # A ref posted again must be the same document; two different ones under one id would diverge
+        for entry in entries:
+            posted = self.index['contents'].get(entry['ref'])
+            if posted is not None and posted != self._content(entry):
+                raise LedgerError(f"{entry['ref']} is already posted with different details "
+                                  f"({posted[0]} of {posted[2]:.2f} on {posted[1]})")
+
+        numbers = []
+        fresh = []
+        timestamp = datetime.now().isoformat()
+        for entry in entries:
+            existing = self.index['refs'].get(entry['ref'])
+            if existing is not None:
+                numbers.append(existing)
+                continue
+            entry = dict(entry, entry=self.index['next_entry'], timestamp=timestamp)
+            self._apply(self.index, entry)
+            numbers.append(entry['entry'])
+            fresh.append(entry)
+
+        if fresh:
+            append_jsonl(self.journal_file, fresh)
+            self.index['offset'] = os.path.getsize(self.journal_file)
+            self._notify(fresh)
+            if self.index['next_entry'] - self.index['checkpoint_entry'] >= self.checkpoint_interval:
+                self.index['checkpoint_entry'] = self.index['next_entry']
+                self.checkpoint()
+        return numbers
+
+    def _apply(self, index: Dict, entry: Dict) -> None:
+        """Fold one journal entry into an index."""
+        for posting in entry['postings']:
+            delta = to_cents(posting.get('debit')) - to_cents(posting.get('credit'))
+            index['accounts'][posting['account']] = index['accounts'].get(posting['account'], 0) + delta
+            bill_id = posting.get('bill_id')
+            if bill_id is not None:
+                billed, paid = index['bills'].get(bill_id, (0, 0))
+                if delta > 0:
+                    billed += delta
+                else:
+                    paid -= delta
+                index['bills'][bill_id] = [billed, paid]
+        index['refs'][entry['ref']] = entry['entry']
+        index['contents'][entry['ref']] = self._content(entry)
+        index['next_entry'] = max(index['next_entry'], entry['entry'] + 1)
+
+    @staticmethod
+    def _content(entry: Dict) -> List:
+        """What identifies the document behind an entry: kind, date and amount."""
+        return [entry['kind'], entry.get('date'), entry.get('amount')]
+
+    def _catch_up(self) -> None:
+        """Apply journal entries appended since the index was last brought up to date."""
+        if not os.path.exists(self.journal_file):
+            return
+        size = os.path.getsize(self.journal_file)
+        if size == self.index['offset']:
+            return
+        if size < self.index['offset']:
+            # Journal was replaced; rebuild the index from scratch
+            self.index = self._empty_index()
+
+        applied = []
+        self.gap = None
+        for entry, end in iter_jsonl_complete(self.journal_file, offset=self.index['offset']):
+            if entry is not None and entry['entry'] > self.index['next_entry']:
+                # An earlier entry is missing; stay before it and re-read from here next time
+                self.gap = entry['entry']
+                break
+            if entry is not None and entry['entry'] == self.index['next_entry']:
+                self._apply(self.index, entry)
+                applied.append(entry)
+            self.index['offset'] = end
+        self._notify(applied)
+
+    def _notify(self, entries: List[Dict]) -> None:
+        for listener in self._listeners:
+            for entry in entries:
+                listener(entry)
+
+    def _empty_index(self) -> Dict:
+        return {'offset': 0, 'next_entry': 1, 'checkpoint_entry': 1,
+                'bills': {}, 'accounts': {}, 'refs': {}, 'contents': {}}
+
+    def _load_index(self) -> Dict:
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    index = json.load(f)
+                if 'contents' in index:
+                    return index
+            except (json.JSONDecodeError, FileNotFoundError):
+                pass
+        return self._empty_index()
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    random.seed(11)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        ledger = BillingLedger(os.path.join(data_dir, "ledger_journal.jsonl"),
+                               os.path.join(data_dir, "ledger_index.json"))
+        bills = {f"BILL_{i:05d}": {'total_amount': random.randint(100, 5000), 'bill_date': '2026-01-01'}
+                 for i in range(20_000)}
+        ledger.post([ledger._bill_entry(bill_id, bill) for bill_id, bill in bills.items()])
+
+        # A day's worth of payments, posted in batches as a payment import would
+        bill_ids = list(bills)
+        payments = [
+            (f"PAY_{n:05d}", {'bill_id': random.choice(bill_ids), 'amount': random.randint(10, 1500),
+                              'payment_date': '2026-01-02', 'payment_method': 'Cash'}, None)
+            for n in range(50_000)
+        ]
+        start = time.perf_counter()
+        for i in range(0, len(payments), 500):
+            ledger.post_payments(payments[i:i + 500])
+        posting = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for bill_id in bill_ids:
+            ledger.balance(bill_id)
+        lookups = (time.perf_counter() - start) / len(bill_ids) * 1e6
+
+        start = time.perf_counter()
+        reloaded = BillingLedger(ledger.journal_file, ledger.index_file)
+        reload_ms = (time.perf_counter() - start) * 1000
+
+        issues = reloaded.reconcile(bills, {pid: p for pid, p, _ in payments})
+        print(f"Posted {len(payments)} payments in {posting:.2f} s ({len(payments) / posting:,.0f}/s)")
+        print(f"Balance lookup: {lookups:.1f} us; reload with tail replay: {reload_ms:.0f} ms")
+        print(f"Trial balance sums to {sum(reloaded.trial_balance().values()):.2f}; "
+              f"{len(issues)} reconciliation issues")
@@ -0,0 +1,354 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.storage import atomic_write_json
+
+HOURS_PER_WEEK = 168
+
+# Hour 0 of the model's clock is a Monday at midnight, so hour % 168 is the
+# (day-of-week x hour-of-day) slot with Monday 00:00 as slot 0.
+EPOCH = datetime(1970, 1, 5)
+
+ALL_DEPARTMENTS = 'All'
+
+
+def to_hour(moment: datetime) -> int:
+    """Whole hours between the model epoch and a moment."""
+    return int((moment - EPOCH).total_seconds() // 3600)
+
+
+def from_hour(hour: int) -> datetime:
+    """Inverse of to_hour()."""
+    return EPOCH + timedelta(hours=int(hour))
+
+
+def slot_hours(start: int, end: int) -> np.ndarray:
+    """
+    Count how many hours of [start, end) fall into each weekly slot.
+
+    Args:
+        start: First hour (inclusive)
+        end: Last hour (exclusive)
+
+    Returns:
+        Array of 168 counts
+    """
+    counts = np.zeros(HOURS_PER_WEEK)
+    if end <= start:
+        return counts
+
+    full_weeks, remainder = divmod(end - start, HOURS_PER_WEEK)
+    counts += full_weeks
+    first = start % HOURS_PER_WEEK
+    slots = (first + np.arange(remainder)) % HOURS_PER_WEEK
+    np.add.at(counts, slots, 1)
+    return counts
+
+
+def _parse_moment(date_str: Optional[str], time_str: Optional[str] = None) -> Optional[datetime]:
+    if not date_str:
+        return None
+    try:
+        if time_str:
+            return datetime.fromisoformat(f"{date_str}T{str(time_str)[:8]}")
+        return datetime.fromisoformat(str(date_str)[:10])
+    except ValueError:
+        try:
+            return datetime.fromisoformat(str(date_str)[:10])
+        except ValueError:
+            return None
+
+
+class CensusForecaster:
+    """
+    Census series and seasonal forecasts built from real admission history.
+
+    Each admission is reduced to a stay (department, start hour, end hour).
+    The model keeps, per department and per weekly (day-of-week x hour)
+    slot, the number of arrivals, discharges and occupied bed-hours. From
+    these it derives an arrival rate and a discharge hazard per slot and
+    rolls the census forward hour by hour.
+
+    The sufficient statistics are updated incrementally: a refit only
+    subtracts and re-adds the stays that changed since the previous fit
+    (plus open stays, whose bed-hours keep growing). Forecasts are cached
+    until the next refit. admissions.json is only read when its version
+    changes, and then only admissions whose fields changed are parsed
+    again; a refit because the clock moved reuses the parsed stays.
+    """
+
+    def __init__(self, admissions_file: str = "data/admissions.json",
+                 manifest_file: str = "data/bed_manifest.json",
+                 model_file: str = "data/census_model.json"):
+        self.admissions_file = admissions_file
+        self.manifest_file = manifest_file
+        self.model_file = model_file
+        self.model = self._load_model()
+        self._forecast_cache: Dict[Tuple, pd.DataFrame] = {}
+        self._parsed_source = None
+        self._parsed: Dict[str, Tuple[Tuple, List]] = {}
+
+    def refresh(self, now: Optional[datetime] = None) -> bool:
+        """
+        Refit the model if admissions changed or the clock moved to a new hour.
+
+        Args:
+            now: Current time (defaults to datetime.now())
+
+        Returns:
+            True if a refit happened
+        """
+        now_hour = to_hour(now or datetime.now())
+        source = self._source_version()
+        if self.model['source'] == source and self.model['fit_hour'] == now_hour:
+            return False
+
+        self._refit(now_hour, source)
+        return True
+
+    def departments(self) -> List[str]:
+        """Departments with admission history, plus the hospital-wide aggregate."""
+        self.refresh()
+        return [ALL_DEPARTMENTS] + sorted(d for d in self.model['stats'] if d != ALL_DEPARTMENTS)
+
+    def census_series(self, department: str = ALL_DEPARTMENTS, days: int = 30,
+                      freq: str = 'hourly') -> pd.DataFrame:
+        """
+        Observed census over the last `days` days.
+
+        Args:
+            department: Department name or 'All'
+            days: Length of the window
+            freq: 'hourly' for end-of-hour census, 'daily' for the daily mean
+
+        Returns:
+            DataFrame with 'timestamp' and 'census' columns
+        """
+        self.refresh()
+        end = self.model['fit_hour'] + 1
+        start = end - days * 24
+
+        delta = np.zeros(end - start + 1)
+        for dept, stay_start, stay_end in self.model['stays'].values():
+            if department != ALL_DEPARTMENTS and dept != department:
+                continue
+            stay_end = end if stay_end is None else stay_end
+            if stay_end <= start or stay_start >= end:
+                continue
+            delta[max(stay_start, start) - start] += 1
+            delta[min(stay_end, end) - start] -= 1
+
+        census = np.cumsum(delta)[:-1]
+        frame = pd.DataFrame({
+            'timestamp': [from_hour(h) for h in range(start, end)],
+            'census': census
+        })
+        if freq == 'daily':
+            frame = frame.groupby(frame['timestamp'].dt.normalize())['census'].mean().reset_index()
+        return frame
+
+    def daily_flow(self, department: str = ALL_DEPARTMENTS, days: int = 30) -> pd.DataFrame:
+        """
+        Actual admissions and discharges per day over the last `days` days.
+
+        Returns:
+            DataFrame with 'Date', 'Admissions' and 'Discharges' columns
+        """
+        self.refresh()
+        today = from_hour(self.model['fit_hour']).date()
+        first_day = today - timedelta(days=days - 1)
+        admissions = np.zeros(days, dtype=int)
+        discharges = np.zeros(days, dtype=int)
+
+        for dept, stay_start, stay_end in self.model['stays'].values():
+            if department != ALL_DEPARTMENTS and dept != department:
+                continue
+            offset = (from_hour(stay_start).date() - first_day).days
+            if 0 <= offset < days:
+                admissions[offset] += 1
+            if stay_end is not None:
+                offset = (from_hour(stay_end).date() - first_day).days
+                if 0 <= offset < days:
+                    discharges[offset] += 1
+
+        return pd.DataFrame({
+            'Date': [first_day + timedelta(days=i) for i in range(days)],
+            'Admissions': admissions,
+            'Discharges': discharges
+        })
+
+    def forecast(self, department: str = ALL_DEPARTMENTS, days: int = 7) -> pd.DataFrame:
+        """
+        Forecast daily admissions and census.
+
+        Args:
+            department: Department name or 'All'
+            days: Forecast horizon in days
+
+        Returns:
+            DataFrame with 'Date', 'Predicted Admissions', 'Lower', 'Upper'
+            and 'Predicted Census' (end of day). Empty if there is no history.
+        """
+        self.refresh()
+        key = (department, days)
+        if key in self._forecast_cache:
+            return self._forecast_cache[key]
+
+        stats = self.model['stats'].get(department)
+        if stats is None or not self.model['stays']:
+            return pd.DataFrame(columns=['Date', 'Predicted Admissions', 'Lower', 'Upper', 'Predicted Census'])
+
+        fit_hour = self.model['fit_hour']
+        exposure = slot_hours(self.model['first_hour'], fit_hour + 1)
+        arrivals = np.asarray(stats['arrivals'])
+        discharges = np.asarray(stats['discharges'])
+        bed_hours = np.asarray(stats['bed_hours'])
+
+        arrival_rate = np.divide(arrivals, exposure, out=np.zeros(HOURS_PER_WEEK), where=exposure > 0)
+        hazard = np.divide(discharges, bed_hours, out=np.zeros(HOURS_PER_WEEK), where=bed_hours > 0)
+
+        # Roll the census forward from now to the first full day (tomorrow
+        # 00:00), then over the requested number of days.
+        census = float(stats['open'])
+        first_day_hour = (fit_hour // 24 + 1) * 24
+        hours = np.arange(fit_hour + 1, first_day_hour + days * 24)
+        slots = hours % HOURS_PER_WEEK
+        census_path = np.empty(len(hours))
+        for i, slot in enumerate(slots):
+            census = max(0.0, census + arrival_rate[slot] - hazard[slot] * census)
+            census_path[i] = census
+
+        in_horizon = hours >= first_day_hour
+        daily_arrivals = arrival_rate[slots[in_horizon]].reshape(days, 24).sum(axis=1)
+        daily_census = census_path[in_horizon].reshape(days, 24)[:, -1]
+        margin = 1.96 * np.sqrt(daily_arrivals)
+
+        result = pd.DataFrame({
+            'Date': [from_hour(first_day_hour + 24 * d).date() for d in range(days)],
+            'Predicted Admissions': daily_arrivals,
+            'Lower': np.maximum(0, daily_arrivals - margin),
+            'Upper': daily_arrivals + margin,
+            'Predicted Census': daily_census
+        })
+        self._forecast_cache[key] = result
+        return result
+
+    def _refit(self, now_hour: int, source: List) -> None:
+        """Update the sufficient statistics for stays that changed since the last fit."""
+        old_stays = self.model['stays']
+        old_fit_hour = self.model['fit_hour']
+        new_stays = self._read_stays(now_hour, source)
+        stats = self.model['stats']
+
+        for adm_id, stay in old_stays.items():
+            if new_stays.get(adm_id) != stay or stay[2] is None:
+                self._apply_stay(stats, stay, old_fit_hour + 1, -1)
+
+        for adm_id, stay in new_stays.items():
+            if old_stays.get(adm_id) != stay or stay[2] is None:
+                self._apply_stay(stats, stay, now_hour + 1, 1)
+
+        starts = [stay[1] for stay in new_stays.values()]
+        self.model.update({
+            'stays': new_stays,
+            'fit_hour': now_hour,
+            'first_hour': min(starts) if starts else now_hour,
+            'source': source
+        })
+        self._forecast_cache.clear()
+        atomic_write_json(self.model_file, self.model)
+
+    def _apply_stay(self, stats: Dict, stay: List, until_hour: int, sign: int) -> None:
+        """
+        Add (sign=1) or remove (sign=-1) one stay's contribution to the statistics.
+
+        Open stays contribute bed-hours up to `until_hour`.
+        """
+        dept, start, end = stay
+        for key in (dept, ALL_DEPARTMENTS):
+            dept_stats = stats.setdefault(key, {
+                'arrivals': [0.0] * HOURS_PER_WEEK,
+                'discharges': [0.0] * HOURS_PER_WEEK,
+                'bed_hours': [0.0] * HOURS_PER_WEEK,
+                'open': 0
+            })
+            arrivals = np.asarray(dept_stats['arrivals'])
+            arrivals[start % HOURS_PER_WEEK] += sign
+            bed_hours = np.asarray(dept_stats['bed_hours']) + sign * slot_hours(
+                start, until_hour if end is None else end
+            )
+            if end is None:
+                dept_stats['open'] += sign
+            else:
+                discharges = np.asarray(dept_stats['discharges'])
+                discharges[end % HOURS_PER_WEEK] += sign
+                dept_stats['discharges'] = discharges.tolist()
+            dept_stats['arrivals'] = arrivals.tolist()
+            dept_stats['bed_hours'] = bed_hours.tolist()
+
+    def _read_stays(self, now_hour: int, source: Optional[List] = None) -> Dict[str, List]:
+        """Reduce admissions.json to {admission_id: [department, start_hour, end_hour]} as of `now_hour`."""
+        if source is None or source != self._parsed_source:
+            self._parsed = self._parse_admissions()
+            self._parsed_source = source
+
+        stays = {}
+        for adm_id, (_, (dept, start_hour, end_hour)) in self._parsed.items():
+            start_hour = min(start_hour, now_hour)
+            if end_hour is not None:
+                end_hour = max(start_hour, min(end_hour, now_hour))
+            stays[adm_id] = [dept, start_hour, end_hour]
+        return stays
+
+    def _parse_admissions(self) -> Dict[str, Tuple[Tuple, List]]:
+        """
+        Unclamped stays of admissions.json, keyed by admission id with the fields they came from.
+
+        Admissions whose fields are unchanged since the last parse keep
+        their earlier result instead of having their dates parsed again.
+        """
+        parsed = {}
+        for adm_id, admission in self._load_json(self.admissions_file).items():
+            fields = tuple(admission.get(name) for name in ('department', 'admission_date', 'admission_time',
+                                                            'status', 'discharge_date', 'discharge_time'))
+            previous = self._parsed.get(adm_id)
+            if previous is not None and previous[0] == fields:
+                parsed[adm_id] = previous
+                continue
+
+            start = _parse_moment(admission.get('admission_date'), admission.get('admission_time'))
+            if start is None:
+                continue
+            end_hour = None
+            if admission.get('status') == 'Discharged':
+                end = _parse_moment(admission.get('discharge_date'), admission.get('discharge_time'))
+                if end is not None:
+                    end_hour = to_hour(end)
+            parsed[adm_id] = (fields, [admission.get('department', 'Unknown'), to_hour(start), end_hour])
+        return parsed
+
+    def _source_version(self) -> List:
+        """Admissions version from the bed manifest plus the file's mtime."""
+        version = self._load_json(self.manifest_file).get('admissions', 0)
+        mtime = os.path.getmtime(self.admissions_file) if os.path.exists(self.admissions_file) else 0
+        return [version, mtime]
+
+    def _load_model(self) -> Dict:
+        model = self._load_json(self.model_file)
+        if not model or 'stays' not in model:
+            model = {'stays': {}, 'stats': {}, 'fit_hour': None, 'first_hour': None, 'source': None}
+        return model
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
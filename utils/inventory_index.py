@@ -0,0 +1,187 @@
+import bisect
+import json
+import os
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from utils.stock_ledger import StockLedger
+
+# Card colours of a supply by status
+SUPPLY_STATUS_COLORS = {
+    'Expired': '#ff4444',
+    'Low Stock': '#ffa500',
+    'In Stock': '#00ff88'
+}
+
+DEFAULT_MIN_THRESHOLD = 10
+
+
+def parse_expiry(value) -> Optional[int]:
+    """Day number of an ISO expiry date, or None if missing or unparseable."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+class InventoryIndex:
+    """
+    Expiry and stock-level index over inventory.json.
+
+    Expiry dates are parsed once when the file is loaded and kept in a
+    list sorted by expiry day, and items are kept in a second list sorted
+    by how far their quantity is above the minimum threshold. "Expired",
+    "expiring within N days" and "low stock" are then bisections plus the
+    matching slice. Each item's status is worked out once per load (and
+    again when the date rolls over) instead of on every render. Items
+    with a barcode are also indexed by it.
+
+    With a stock ledger, on-hand quantities come from the ledger instead
+    of inventory.json, an item's expiry is that of its earliest lot still
+    in stock, and recorded movements also trigger a reload. These
+    derived values are set on copies of the records in `items`, which are
+    for display only and must not be saved back to inventory.json.
+    """
+
+    def __init__(self, inventory_file: str = "data/inventory.json", stock: Optional[StockLedger] = None):
+        self.inventory_file = inventory_file
+        self.stock = stock
+        self._stamp: Optional[Tuple] = None
+        self.items: Dict[str, Dict] = {}
+        self.by_barcode: Dict[str, str] = {}
+        self._by_expiry: List[Tuple[int, str]] = []
+        self._by_margin: List[Tuple[float, str]] = []
+        self._status: Dict[str, str] = {}
+
+    def refresh(self) -> None:
+        """Rebuild the index if inventory.json or the stock changed, or the day rolled over."""
+        today = date.today().toordinal()
+        mtime = os.path.getmtime(self.inventory_file) if os.path.exists(self.inventory_file) else None
+        if self.stock is not None:
+            self.stock.refresh()
+        version = self.stock.next_seq if self.stock is not None else None
+        if (mtime, today, version) == self._stamp:
+            return
+
+        self.items = self._load_json(self.inventory_file)
+        if self.stock is not None:
+            for item_id, record in self.items.items():
+                item = self.items[item_id] = dict(record)
+                quantity = self.stock.quantities.get(item_id, 0.0)
+                item['quantity'] = int(quantity) if float(quantity).is_integer() else quantity
+                # An item expires with its earliest lot that still holds stock
+                lot_expiries = [entry['expiry_date'] for entry in self.stock.lots.get(item_id, {}).values()
+                                if entry['quantity'] > 0 and entry.get('expiry_date')]
+                if lot_expiries:
+                    item['expiry_date'] = min(lot_expiries)
+        self._by_expiry = []
+        self._by_margin = []
+        self.by_barcode = {}
+        for item_id, item in self.items.items():
+            if item.get('barcode'):
+                self.by_barcode[str(item['barcode']).strip()] = item_id
+            expiry = parse_expiry(item.get('expiry_date'))
+            # Nothing on the shelf can expire
+            if expiry is not None and (self.stock is None or float(item.get('quantity') or 0) > 0):
+                self._by_expiry.append((expiry, item_id))
+            self._by_margin.append((self._margin(item), item_id))
+        self._by_expiry.sort()
+        self._by_margin.sort()
+
+        expired = set(self._ids(self._by_expiry, None, (today, '')))
+        low = set(self._ids(self._by_margin, None, (0, '')))
+        self._status = {
+            item_id: 'Expired' if item_id in expired else 'Low Stock' if item_id in low else 'In Stock'
+            for item_id in self.items
+        }
+        self._stamp = (mtime, today, version)
+
+    def find_by_barcode(self, barcode: str) -> Optional[str]:
+        """Item id for a scanned barcode."""
+        self.refresh()
+        return self.by_barcode.get(str(barcode).strip())
+
+    def expired(self) -> List[str]:
+        """Ids of items past their expiry date, longest expired first."""
+        self.refresh()
+        return self._ids(self._by_expiry, None, (date.today().toordinal(), ''))
+
+    def expiring_within(self, days: int) -> List[str]:
+        """Ids of items that expire today or within the next `days` days, soonest first."""
+        self.refresh()
+        today = date.today().toordinal()
+        return self._ids(self._by_expiry, (today, ''), (today + days + 1, ''))
+
+    def low_stock(self) -> List[str]:
+        """Ids of items below their minimum threshold, largest shortfall first."""
+        self.refresh()
+        return self._ids(self._by_margin, None, (0, ''))
+
+    def status(self, item_id: str) -> str:
+        """'Expired', 'Low Stock' or 'In Stock'."""
+        self.refresh()
+        return self._status.get(item_id, 'In Stock')
+
+    def status_color(self, item_id: str) -> str:
+        """Card colour for an item's status."""
+        return SUPPLY_STATUS_COLORS[self.status(item_id)]
+
+    def _ids(self, ordered: List[Tuple], low: Optional[Tuple], high: Tuple) -> List[str]:
+        """Ids of the entries in [low, high) of a sorted (key, id) list."""
+        start = bisect.bisect_left(ordered, low) if low is not None else 0
+        end = bisect.bisect_left(ordered, high)
+        return [item_id for _, item_id in ordered[start:end]]
+
+    def _margin(self, item: Dict) -> float:
+        try:
+            return float(item.get('quantity', 0) or 0) - float(item.get('min_threshold', DEFAULT_MIN_THRESHOLD))
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    from utils.storage import atomic_write_json
+
+    random.seed(38)
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, "inventory.json")
+        atomic_write_json(path, {
+            f"SUP_{i:05d}": {
+                'name': f"Supply {i}",
+                'quantity': random.randint(0, 200),
+                'min_threshold': random.randint(5, 40),
+                'expiry_date': (date.today() + timedelta(days=random.randint(-60, 720))).isoformat()
+            }
+            for i in range(50_000)
+        }, indent=None)
+
+        index = InventoryIndex(path)
+        start = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(100):
+            expired, expiring, low = index.expired(), index.expiring_within(30), index.low_stock()
+            colors = [index.status_color(item_id) for item_id in expired[:50]]
+        query_ms = (time.perf_counter() - start) * 1000 / 100
+
+        print(f"Indexed {len(index.items)} items in {build_ms:.0f} ms")
+        print(f"Expired ({len(expired)}), expiring in 30 days ({len(expiring)}) and low stock ({len(low)}) "
+              f"in {query_ms:.2f} ms per render")
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import schedule
+except ImportError:  # Without schedule, jobs only run when triggered explicitly
+    schedule = None
+
+
+class JobRunner:
+    """
+    Runs periodic maintenance jobs on a background daemon thread.
+
+    Jobs are registered by name, so every session of the app can register
+    the jobs it relies on and each is scheduled once per process. The
+    outcome of the last run of each job is kept for display.
+    """
+
+    def __init__(self, poll_seconds: float = 30.0):
+        self.poll_seconds = poll_seconds
+        self.scheduler = schedule.Scheduler() if schedule is not None else None
+        self.jobs: Dict[str, Callable[[], Any]] = {}
+        self.last_runs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def daily(self, name: str, at: str, func: Callable[[], Any]) -> bool:
+        """
+        Run a job every day at a given local time.
+
+        Args:
+            name: Job name; a job already registered under it is kept
+            at: Time of day as 'HH:MM'
+            func: Callable taking no arguments
+
+        Returns:
+            True if the job was newly registered
+        """
+        return self._register(name, func, lambda: self.scheduler.every().day.at(at))
+
+    def every(self, name: str, minutes: int, func: Callable[[], Any]) -> bool:
+        """Run a job every `minutes` minutes (see daily())."""
+        return self._register(name, func, lambda: self.scheduler.every(minutes).minutes)
+
+    def run_now(self, name: str) -> Any:
+        """Run a registered job immediately, on the calling thread; its errors are raised."""
+        return self._run(name)
+
+    def _register(self, name: str, func: Callable[[], Any], when: Callable) -> bool:
+        with self._lock:
+            if name in self.jobs:
+                return False
+            self.jobs[name] = func
+            if self.scheduler is not None:
+                when().do(self._run_scheduled, name)
+                self._start()
+            return True
+
+    def _run(self, name: str) -> Any:
+        started = datetime.now()
+        try:
+            result = self.jobs[name]()
+        except Exception as e:
+            self.last_runs[name] = {'started': started.isoformat(), 'ok': False, 'error': str(e)}
+            raise
+        self.last_runs[name] = {'started': started.isoformat(), 'ok': True, 'result': result}
+        return result
+
+    def _run_scheduled(self, name: str) -> None:
+        # A job that raises into the scheduler is not rescheduled and runs again on every poll
+        try:
+            self._run(name)
+        except Exception:
+            pass  # recorded in last_runs
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.scheduler.run_pending()
+            except Exception:
+                pass  # keep the runner alive whatever the scheduler does
+            time.sleep(self.poll_seconds)
+
+
+_RUNNER: Optional[JobRunner] = None
+_RUNNER_GUARD = threading.Lock()
+
+
+def job_runner() -> JobRunner:
+    """The process-wide job runner."""
+    global _RUNNER
+    with _RUNNER_GUARD:
+        if _RUNNER is None:
+            _RUNNER = JobRunner()
+        return _RUNNER
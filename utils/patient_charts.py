@@ -0,0 +1,395 @@
+import bisect
+import hashlib
+import heapq
+import json
+import os
+import re
+import shutil
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.storage import atomic_write_json, file_lock
+
+# Clinical collections keyed by record id: default file and id prefix
+CLINICAL_COLLECTIONS = {
+    'visits': ("data/patient_visits.json", "VISIT"),
+    'prescriptions': ("data/prescriptions.json", "RX"),
+    'lab_results': ("data/lab_results.json", "LAB")
+}
+
+# Medical history is kept per patient already: {patient_id: [entries]}
+HISTORY = 'medical_history'
+
+# Date, then tie-breaking time, that place each kind of record on the timeline
+TIMELINE_FIELDS = {
+    'visits': ('visit_date', 'visit_time'),
+    'prescriptions': ('prescribed_date', 'created_at'),
+    'lab_results': ('test_date', 'created_at'),
+    HISTORY: ('diagnosis_date', 'added_date')
+}
+
+TIMELINE_PAGE_SIZE = 10
+
+# Charts kept in memory, most recently opened first out last
+CHART_CACHE_SIZE = 32
+
+Cursor = Tuple[str, str, str]  # (timeline key, collection, record id) of the last entry shown
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class PatientChartIndex:
+    """
+    Per-patient index over the clinical collections.
+
+    Alongside patient_visits.json, prescriptions.json, lab_results.json and
+    medical_records.json, every patient has a chart file (charts/<patient>.json)
+    holding their own rows of each collection, keyed by record id as in
+    the collection. Records are written through add(), which saves the
+    collection and the patient's chart together, so opening a chart reads
+    one small file however many patients the hospital has.
+
+    The collection files stay the source of truth and keep serving the
+    hospital-wide lists. Their modification times after the index's last
+    write are kept in a manifest; if a collection has changed since (or
+    there is no manifest yet), the charts are rebuilt from the collections
+    in one pass before the next read. A rebuild writes the charts to a
+    staging directory that then replaces the chart directory, so readers
+    never see a half-written set of charts.
+
+    Each chart also keeps, per collection, its (date, id) pairs in date
+    order, updated by insertion on write. timeline() merges these sorted
+    streams newest first with a heap-based k-way merge, so a page of the
+    timeline costs a bisection per collection to find where the page
+    starts plus a heap step per entry shown, and records beyond the page
+    are never put in order or looked at.
+    """
+
+    def __init__(self, charts_dir: str = "data/charts",
+                 files: Optional[Dict[str, str]] = None,
+                 history_file: str = "data/medical_records.json"):
+        self.charts_dir = charts_dir
+        self.files = {name: path for name, (path, _) in CLINICAL_COLLECTIONS.items()}
+        self.files.update(files or {})
+        self.history_file = history_file
+        self.manifest_file = os.path.join(charts_dir, "_manifest.json")
+        # Beside the chart directory rather than in it, as a rebuild replaces the directory
+        self.lock_file = charts_dir.rstrip(os.sep) + ".lock"
+        self._checked = None
+        self._cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+    def chart(self, patient_id: str) -> Dict:
+        """
+        A patient's clinical records.
+
+        Returns:
+            {'visits': {id: record}, 'prescriptions': {...}, 'lab_results': {...},
+             'medical_history': [entries]}
+        """
+        self.refresh()
+        return self._read_chart(patient_id)
+
+    def records(self, patient_id: str, collection: str) -> Dict[str, Dict]:
+        """A patient's records of one collection, keyed by id."""
+        return self.chart(patient_id)[collection]
+
+    def add(self, collection: str, record: Dict) -> str:
+        """
+        Save a new record to its collection and to the patient's chart.
+
+        Args:
+            collection: One of CLINICAL_COLLECTIONS
+            record: Record with 'patient_id'
+
+        Returns:
+            The new record id
+        """
+        self.refresh()
+        path = self.files[collection]
+        with file_lock(self.lock_file):
+            records = self._load_json(path)
+            record_id = self._next_id(records, CLINICAL_COLLECTIONS[collection][1])
+            records[record_id] = record
+            atomic_write_json(path, records)
+
+            chart = self._read_chart(record['patient_id'])
+            chart[collection][record_id] = record
+            bisect.insort(chart['order'][collection], [self._timeline_key(collection, record), record_id])
+            self._write_chart(record['patient_id'], chart)
+            self._write_manifest()
+        return record_id
+
+    def add_history(self, patient_id: str, entry: Dict) -> None:
+        """Append a medical history entry for a patient."""
+        self.refresh()
+        with file_lock(self.lock_file):
+            history = self._load_json(self.history_file)
+            history.setdefault(patient_id, []).append(entry)
+            atomic_write_json(self.history_file, history)
+
+            chart = self._read_chart(patient_id)
+            chart[HISTORY] = history[patient_id]
+            chart['order'][HISTORY] = self._order(HISTORY, self._history_ids(chart[HISTORY]))
+            self._write_chart(patient_id, chart)
+            self._write_manifest()
+
+    def timeline(self, patient_id: str, before: Optional[Cursor] = None) -> Iterator[Dict]:
+        """
+        A patient's visits, prescriptions, lab results and history, newest first.
+
+        Entries are produced lazily; stop iterating once a page is full.
+
+        Args:
+            before: Cursor of the last entry already shown, to continue after it
+
+        Yields:
+            Dicts with 'date', 'kind' (the collection), 'id', 'record' and
+            'cursor'
+        """
+        chart = self.chart(patient_id)
+        streams = [self._newest_first(chart['order'].get(name, []), name, before) for name in TIMELINE_FIELDS]
+        for key, name, record_id in heapq.merge(*streams, reverse=True):
+            if name == HISTORY:
+                record = chart[HISTORY][int(record_id.rsplit('_', 1)[-1]) - 1]
+            else:
+                record = chart[name][record_id]
+            yield {'date': key[:10], 'kind': name, 'id': record_id, 'record': record,
+                   'cursor': (key, name, record_id)}
+
+    def timeline_page(self, patient_id: str, size: int = TIMELINE_PAGE_SIZE,
+                      before: Optional[Cursor] = None) -> Tuple[List[Dict], Optional[Cursor]]:
+        """
+        One page of a patient's timeline.
+
+        Returns:
+            (entries, cursor of the next page or None if this is the last)
+        """
+        entries = list(islice(self.timeline(patient_id, before), size + 1))
+        more = len(entries) > size
+        entries = entries[:size]
+        return entries, (entries[-1]['cursor'] if more else None)
+
+    def refresh(self) -> None:
+        """Rebuild the charts if a collection changed outside the index."""
+        stamps = self._stamps()
+        if stamps == self._checked:
+            return
+        if self._load_json(self.manifest_file) != stamps:
+            with file_lock(self.lock_file):
+                # Another process may have rebuilt the charts while this one waited
+                stamps = self._stamps()
+                if self._load_json(self.manifest_file) != stamps:
+                    self._rebuild()
+        self._checked = stamps
+
+    def rebuild(self) -> None:
+        """Regroup every collection by patient and rewrite all charts."""
+        with file_lock(self.lock_file):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        # Stamps from before reading, so a collection changed meanwhile triggers another rebuild
+        stamps = self._stamps()
+        charts: Dict[str, Dict] = {}
+        for name, path in self.files.items():
+            for record_id, record in self._load_json(path).items():
+                patient_id = record.get('patient_id')
+                if patient_id:
+                    charts.setdefault(patient_id, {}).setdefault(name, {})[record_id] = record
+        for patient_id, entries in self._load_json(self.history_file).items():
+            charts.setdefault(patient_id, {})[HISTORY] = entries
+
+        staging = self.charts_dir.rstrip(os.sep) + ".rebuilding"
+        retired = self.charts_dir.rstrip(os.sep) + ".old"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for patient_id, chart in charts.items():
+            chart = self._complete(chart)
+            chart['patient_id'] = patient_id
+            atomic_write_json(self._chart_path(patient_id, staging), chart, indent=None)
+        atomic_write_json(os.path.join(staging, os.path.basename(self.manifest_file)), stamps, indent=None)
+
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.isdir(self.charts_dir):
+            os.replace(self.charts_dir, retired)
+        os.replace(staging, self.charts_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+        self._cache.clear()
+        self._checked = stamps
+
+    def _read_chart(self, patient_id: str) -> Dict:
+        """A patient's chart, from memory unless its file changed since it was read."""
+        path = self._chart_path(patient_id)
+        stamp = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            self._cache.move_to_end(path)
+            return cached[1]
+
+        chart = self._complete(self._load_json(path))
+        self._remember(path, stamp, chart)
+        return chart
+
+    def _complete(self, chart: Dict) -> Dict:
+        """Fill in collections a chart has no records of, and its date order if missing."""
+        for name in self.files:
+            chart.setdefault(name, {})
+        chart.setdefault(HISTORY, [])
+        if 'order' not in chart:
+            chart['order'] = self._chart_order(chart)
+        return chart
+
+    def _remember(self, path: str, stamp: Optional[float], chart: Dict) -> None:
+        self._cache[path] = (stamp, chart)
+        self._cache.move_to_end(path)
+        while len(self._cache) > CHART_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _chart_order(self, chart: Dict) -> Dict[str, List[List[str]]]:
+        """Date-sorted [timeline key, id] pairs of each collection in a chart."""
+        order = {name: self._order(name, chart[name]) for name in self.files}
+        order[HISTORY] = self._order(HISTORY, self._history_ids(chart[HISTORY]))
+        return order
+
+    def _order(self, collection: str, records: Dict[str, Dict]) -> List[List[str]]:
+        return sorted([self._timeline_key(collection, record), record_id] for record_id, record in records.items())
+
+    @staticmethod
+    def _history_ids(entries: List[Dict]) -> Dict[str, Dict]:
+        """History entries under positional ids (HIST_0001 is the first)."""
+        return {f"HIST_{n:04d}": entry for n, entry in enumerate(entries, start=1)}
+
+    @staticmethod
+    def _timeline_key(collection: str, record: Dict) -> str:
+        date_field, time_field = TIMELINE_FIELDS[collection]
+        return f"{str(record.get(date_field) or '')[:10]} {record.get(time_field) or ''}"
+
+    @staticmethod
+    def _newest_first(order: List[List[str]], collection: str,
+                      before: Optional[Cursor]) -> Iterator[Tuple[str, str, str]]:
+        """(key, collection, id) of a collection's records, newest first, after the cursor."""
+        end = len(order)
+        if before is not None:
+            key, cursor_collection, record_id = before
+            # Ties on key are ordered by collection name, then id, as in the merge
+            if collection < cursor_collection:
+                end = bisect.bisect_right(order, [key, "\uffff"])
+            elif collection > cursor_collection:
+                end = bisect.bisect_left(order, [key, ""])
+            else:
+                end = bisect.bisect_left(order, [key, record_id])
+        for i in range(end - 1, -1, -1):
+            yield order[i][0], collection, order[i][1]
+
+    def _write_chart(self, patient_id: str, chart: Dict) -> None:
+        chart['patient_id'] = patient_id
+        path = self._chart_path(patient_id)
+        atomic_write_json(path, chart, indent=None)
+        self._remember(path, os.path.getmtime(path), chart)
+
+    def _write_manifest(self) -> None:
+        stamps = self._stamps()
+        atomic_write_json(self.manifest_file, stamps, indent=None)
+        self._checked = stamps
+
+    def _stamps(self) -> Dict[str, Optional[float]]:
+        paths = dict(self.files, **{HISTORY: self.history_file})
+        return {name: os.path.getmtime(path) if os.path.exists(path) else None for name, path in paths.items()}
+
+    def _chart_path(self, patient_id: str, directory: Optional[str] = None) -> str:
+        """Chart file of a patient; ids that are not filename-safe get a hash suffix."""
+        name = _UNSAFE.sub("_", str(patient_id))
+        if name != str(patient_id):
+            name += "_" + hashlib.sha1(str(patient_id).encode()).hexdigest()[:8]
+        return os.path.join(directory or self.charts_dir, f"{name}.json")
+
+    @staticmethod
+    def _next_id(records: Dict, prefix: str) -> str:
+        number = len(records) + 1
+        while f"{prefix}_{number:04d}" in records:
+            number += 1
+        return f"{prefix}_{number:04d}"
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+    from datetime import date, timedelta
+
+    random.seed(49)
+
+    def build(data_dir: str, patients: int) -> PatientChartIndex:
+        files = {name: os.path.join(data_dir, os.path.basename(path)) for name, (path, _) in CLINICAL_COLLECTIONS.items()}
+        for name, path in files.items():
+            records = {}
+            # Eight records per patient on average, and one patient with years of history
+            for n in range(patients * 8 + 2000):
+                records[f"{CLINICAL_COLLECTIONS[name][1]}_{n + 1:07d}"] = {
+                    'patient_id': f"PAT{random.randrange(patients):06d}" if n < patients * 8 else "PAT_LONG",
+                    TIMELINE_FIELDS[name][0]: (date(2020, 1, 1) + timedelta(days=random.randrange(2000))).isoformat(),
+                    'notes': "x" * 200}
+            atomic_write_json(path, records, indent=None)
+        history_file = os.path.join(data_dir, "medical_records.json")
+        atomic_write_json(history_file, {f"PAT{p:06d}": [{'condition': "Hypertension", 'status': 'Chronic'}]
+                                         for p in range(patients)}, indent=None)
+        return PatientChartIndex(os.path.join(data_dir, "charts"), files, history_file)
+
+    for patients in (1_000, 10_000):
+        with tempfile.TemporaryDirectory() as data_dir:
+            index = build(data_dir, patients)
+            started = time.perf_counter()
+            index.refresh()
+            build_s = time.perf_counter() - started
+
+            sample = [f"PAT{random.randrange(patients):06d}" for _ in range(200)]
+            fresh = PatientChartIndex(index.charts_dir, index.files, index.history_file)
+            fresh.refresh()
+            started = time.perf_counter()
+            rows = sum(len(fresh.records(patient_id, 'visits')) for patient_id in sample)
+            chart_ms = (time.perf_counter() - started) * 1000 / len(sample)
+
+            started = time.perf_counter()
+            for patient_id in sample[:20]:
+                visits = index._load_json(index.files['visits'])
+                [v for v in visits.values() if v['patient_id'] == patient_id]
+            scan_ms = (time.perf_counter() - started) * 1000 / 20
+
+            started = time.perf_counter()
+            for patient_id in sample[:20]:
+                index.add('lab_results', {'patient_id': patient_id, 'test_date': date.today().isoformat()})
+            add_ms = (time.perf_counter() - started) * 1000 / 20
+
+            started = time.perf_counter()
+            first_page, cursor = fresh.timeline_page("PAT_LONG")
+            page_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            fresh.timeline_page("PAT_LONG", before=cursor)
+            next_page_ms = (time.perf_counter() - started) * 1000
+            fresh._cache.clear()
+            started = time.perf_counter()
+            chart = fresh.chart("PAT_LONG")
+            everything = sorted(((record[TIMELINE_FIELDS[name][0]], name, record_id)
+                                 for name in CLINICAL_COLLECTIONS for record_id, record in chart[name].items()),
+                                reverse=True)
+            sort_ms = (time.perf_counter() - started) * 1000
+            paged = []
+            while cursor is not None or not paged:
+                page, cursor = fresh.timeline_page("PAT_LONG", 50, paged[-1]['cursor'] if paged else None)
+                paged.extend(page)
+            assert [(e['date'], e['kind'], e['id']) for e in paged] == everything
+
+            print(f"{patients} patients, {patients * 24} clinical records: charts built in {build_s:.1f} s; "
+                  f"open chart {chart_ms:.2f} ms (full scan of visits {scan_ms:.0f} ms); add {add_ms:.0f} ms")
+            print(f"  timeline of a patient with {len(everything)} records: first page {page_ms:.1f} ms, "
+                  f"next page {next_page_ms:.2f} ms (load and sort everything {sort_ms:.1f} ms); all {len(paged)} entries paged in order")
@@ -0,0 +1,245 @@
+import calendar
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.attendance_store import AttendanceStore
+from utils.storage import atomic_write_json
+
+MONTHS = list(calendar.month_name)[1:]
+
+STANDARD_WEEKLY_HOURS = 40
+WORKING_DAYS_PER_YEAR = 260
+
+# Share of a scheduled shift that counts as worked, by attendance status
+ATTENDANCE_FACTORS = {
+    'Present': 1.0,
+    'Late': 1.0,
+    'Half Day': 0.5,
+    'Leave': 0.0,
+    'Absent': 0.0
+}
+
+# Attendance statuses deducted from pay, one day's salary each
+UNPAID_STATUSES = ('Absent',)
+
+PAYROLL_COLUMNS = ['employee_id', 'staff_name', 'basic_salary', 'worked_hours', 'overtime_hours',
+                   'overtime_pay', 'absent_days', 'absence_deduction', 'tax_deduction', 'deductions', 'net_pay']
+
+SHIFT_COLUMNS = ['employee_id', 'shift_date', 'start_time', 'end_time', 'status']
+ATTENDANCE_COLUMNS = ['employee_id', 'date', 'status']
+
+
+class PayrollEngine:
+    """
+    Monthly payroll from salaries, scheduled shifts and attendance.
+
+    A month's shifts and attendance are read into two frames and joined
+    on (employee, day): each shift's scheduled hours are scaled by the
+    attendance status for that day, hours above STANDARD_WEEKLY_HOURS in
+    a calendar week (Monday to Sunday, counting the month's shifts) are
+    overtime, and unpaid absences are deducted at a day's salary. All
+    arithmetic runs column-wise over the whole staff at once. Attendance
+    comes from the day-partitioned store, so only the month's days are read.
+
+    Each payroll record keeps a digest of its inputs (salary, rates and
+    the employee's shift and attendance rows for the month), so a rerun
+    recomputes and rewrites only the employees whose inputs changed.
+    """
+
+    def __init__(self, staff_file: str = "data/staff.json",
+                 shifts_file: str = "data/shifts.json",
+                 attendance: Optional[AttendanceStore] = None,
+                 payroll_file: str = "data/payroll.json"):
+        self.staff_file = staff_file
+        self.shifts_file = shifts_file
+        self.attendance = attendance or AttendanceStore()
+        self.payroll_file = payroll_file
+
+    def run(self, month: str, year: int, overtime_rate: float = 1.5, deduction_rate: float = 10.0) -> Dict:
+        """
+        Generate or update payroll records for a month.
+
+        Args:
+            month: Month name, e.g. 'January'
+            year: Calendar year
+            overtime_rate: Multiplier of the hourly rate for overtime hours
+            deduction_rate: Percentage withheld from gross pay
+
+        Returns:
+            Summary with 'computed', 'unchanged' and 'employees' counts
+        """
+        staff, shifts, attendance = self._inputs(month, year)
+        digests = self._digests(staff, shifts, attendance, overtime_rate, deduction_rate)
+
+        payroll = self._load_json(self.payroll_file)
+        record_ids = {employee_id: self._record_id(employee_id, month, year) for employee_id in staff.index}
+        changed = [employee_id for employee_id in staff.index
+                   if payroll.get(record_ids[employee_id], {}).get('input_digest') != digests[employee_id]]
+
+        if changed:
+            result = self.compute(staff.loc[changed], shifts[shifts['employee_id'].isin(changed)],
+                                  attendance[attendance['employee_id'].isin(changed)],
+                                  overtime_rate, deduction_rate)
+            generated = datetime.now().strftime("%Y-%m-%d")
+            for record in result.to_dict('records'):
+                record.update({'month': month, 'year': year, 'overtime_rate': overtime_rate,
+                               'deduction_rate': deduction_rate, 'generated_date': generated,
+                               'input_digest': digests[record['employee_id']]})
+                payroll[record_ids[record['employee_id']]] = record
+            atomic_write_json(self.payroll_file, payroll)
+
+        return {'computed': len(changed), 'unchanged': len(staff) - len(changed), 'employees': len(staff)}
+
+    def compute(self, staff: pd.DataFrame, shifts: pd.DataFrame, attendance: pd.DataFrame,
+                overtime_rate: float, deduction_rate: float) -> pd.DataFrame:
+        """
+        Pay for every employee in `staff` from their shift and attendance rows.
+
+        Args:
+            staff: Indexed by employee id with 'staff_name' and 'salary'
+            shifts: Rows with SHIFT_COLUMNS
+            attendance: Rows with ATTENDANCE_COLUMNS
+
+        Returns:
+            DataFrame with PAYROLL_COLUMNS, one row per employee
+        """
+        day_status = attendance.drop_duplicates(['employee_id', 'date'], keep='last')
+        worked = shifts.merge(day_status.rename(columns={'date': 'shift_date', 'status': 'attendance'}),
+                              on=['employee_id', 'shift_date'], how='left')
+
+        start = self._clock_minutes(worked['start_time'])
+        end = self._clock_minutes(worked['end_time'])
+        hours = ((end - start) / 60).to_numpy()
+        # Overnight shifts end the next day; shifts whose times cannot be read count no hours
+        hours = np.where(np.isnan(hours), 0.0, np.where(hours <= 0, hours + 24, hours))
+        factor = worked['attendance'].map(ATTENDANCE_FACTORS).fillna(1.0).to_numpy()
+        worked['hours'] = hours * factor
+
+        days = pd.to_datetime(worked['shift_date'], errors='coerce')
+        worked['week'] = (days - pd.to_timedelta(days.dt.weekday, unit='D')).dt.date
+        weekly = worked.groupby(['employee_id', 'week'])['hours'].sum()
+        overtime = (weekly - STANDARD_WEEKLY_HOURS).clip(lower=0).groupby(level='employee_id').sum()
+        total_hours = weekly.groupby(level='employee_id').sum()
+        absent_days = attendance[attendance['status'].isin(UNPAID_STATUSES)].groupby('employee_id')['date'].nunique()
+
+        pay = pd.DataFrame(index=staff.index)
+        salary = staff['salary'].to_numpy(dtype=float)
+        hourly = salary * 12 / (52 * STANDARD_WEEKLY_HOURS)
+        daily = salary * 12 / WORKING_DAYS_PER_YEAR
+
+        pay['staff_name'] = staff['staff_name']
+        pay['basic_salary'] = salary
+        pay['worked_hours'] = total_hours.reindex(pay.index).fillna(0.0).to_numpy()
+        pay['overtime_hours'] = overtime.reindex(pay.index).fillna(0.0).to_numpy()
+        pay['overtime_pay'] = np.round(pay['overtime_hours'].to_numpy() * hourly * overtime_rate, 2)
+        pay['absent_days'] = absent_days.reindex(pay.index).fillna(0).astype(int).to_numpy()
+        pay['absence_deduction'] = np.round(np.minimum(pay['absent_days'].to_numpy() * daily, salary), 2)
+        gross = salary + pay['overtime_pay'].to_numpy() - pay['absence_deduction'].to_numpy()
+        pay['tax_deduction'] = np.round(gross * deduction_rate / 100, 2)
+        pay['deductions'] = pay['absence_deduction'] + pay['tax_deduction']
+        pay['net_pay'] = np.round(gross - pay['tax_deduction'].to_numpy(), 2)
+
+        pay['worked_hours'] = pay['worked_hours'].round(2)
+        pay['overtime_hours'] = pay['overtime_hours'].round(2)
+        return pay.rename_axis('employee_id').reset_index()[PAYROLL_COLUMNS]
+
+    def _inputs(self, month: str, year: int):
+        """Active staff, and the month's shifts and attendance, as frames."""
+        prefix = f"{year:04d}-{MONTHS.index(month) + 1:02d}"
+        staff = pd.DataFrame(
+            [(member.get('employee_id'), member.get('full_name', ''), float(member.get('salary', 0) or 0))
+             for member in self._load_json(self.staff_file).values()
+             if member.get('status') == 'Active' and member.get('employee_id')],
+            columns=['employee_id', 'staff_name', 'salary']
+        ).drop_duplicates('employee_id', keep='last').set_index('employee_id')
+
+        shifts = self._month_rows(self.shifts_file, 'shift_date', prefix, SHIFT_COLUMNS)
+        shifts = shifts[shifts['status'] != 'Cancelled']
+        attendance = pd.DataFrame(list(self.attendance.month(year, MONTHS.index(month) + 1).values()),
+                                  columns=ATTENDANCE_COLUMNS).astype(str)
+        return staff, shifts, attendance
+
+    def _month_rows(self, filename: str, date_field: str, prefix: str, columns: List[str]) -> pd.DataFrame:
+        rows = [record for record in self._load_json(filename).values()
+                if str(record.get(date_field, '')).startswith(prefix)]
+        return pd.DataFrame(rows, columns=columns).astype(str)
+
+    def _digests(self, staff: pd.DataFrame, shifts: pd.DataFrame, attendance: pd.DataFrame,
+                 overtime_rate: float, deduction_rate: float) -> Dict[str, str]:
+        """Order-independent digest of each employee's payroll inputs (row hashes summed mod 2**64)."""
+        digest = pd.util.hash_pandas_object(staff.reset_index(), index=False).to_numpy()
+        for frame in (shifts, attendance):
+            positions = staff.index.get_indexer(frame['employee_id'])
+            known = positions >= 0
+            np.add.at(digest, positions[known], pd.util.hash_pandas_object(frame, index=False).to_numpy()[known])
+        rates = f"{overtime_rate:g}/{deduction_rate:g}"
+        return {employee_id: f"{value:016x}/{rates}" for employee_id, value in zip(staff.index, digest.tolist())}
+
+    @staticmethod
+    def _clock_minutes(times: pd.Series) -> pd.Series:
+        """Minutes after midnight of 'HH:MM' or 'HH:MM:SS' times, NaN where unreadable."""
+        parts = times.str.extract(r'^\s*(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*$').astype(float)
+        parts[(parts[0] > 23) | (parts[1] > 59)] = np.nan
+        return parts[0] * 60 + parts[1]
+
+    @staticmethod
+    def _record_id(employee_id: str, month: str, year: int) -> str:
+        return f"PAY_{employee_id}_{month}_{year}"
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+    from datetime import date, timedelta
+
+    random.seed(44)
+    with tempfile.TemporaryDirectory() as data_dir:
+        files = {name: os.path.join(data_dir, f"{name}.json") for name in ('staff', 'shifts', 'attendance', 'payroll')}
+        staff = {f"STF_{i:04d}": {'full_name': f"Staff {i}", 'employee_id': f"E{i:05d}", 'status': 'Active',
+                                  'salary': random.randint(3000, 12000)} for i in range(2000)}
+        shifts, attendance = {}, {}
+        for member in staff.values():
+            for day in range(1, 29):
+                if random.random() < 0.75:
+                    shift_date = date(2026, 2, day).isoformat()
+                    start = random.choice(["07:00:00", "15:00:00", "23:00:00"])
+                    end = (datetime.strptime(start, "%H:%M:%S") + timedelta(hours=random.choice([8, 10, 12]))).strftime("%H:%M:%S")
+                    shifts[f"SHF_{len(shifts) + 1:06d}"] = {'employee_id': member['employee_id'], 'shift_date': shift_date,
+                                                           'start_time': start, 'end_time': end, 'status': 'Scheduled'}
+                    attendance[f"ATT_{len(attendance) + 1:06d}"] = {
+                        'employee_id': member['employee_id'], 'date': shift_date,
+                        'status': random.choices(list(ATTENDANCE_FACTORS), [85, 5, 3, 4, 3])[0]}
+        for name, data in (('staff', staff), ('shifts', shifts), ('attendance', attendance)):
+            atomic_write_json(files[name], data, indent=None)
+        engine = PayrollEngine(files['staff'], files['shifts'],
+                               AttendanceStore(os.path.join(data_dir, "attendance"), files['attendance']),
+                               files['payroll'])
+
+        timings = []
+        for label in ("first run", "rerun, no changes", "rerun, 20 shifts edited"):
+            if label.endswith("edited"):
+                for shift_id in random.sample(list(shifts), 20):
+                    shifts[shift_id]['end_time'] = "23:59:00"
+                atomic_write_json(files['shifts'], shifts, indent=None)
+            start = time.perf_counter()
+            summary = engine.run("February", 2026)
+            timings.append(f"{label}: {summary['computed']} computed, {summary['unchanged']} unchanged "
+                           f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"{len(staff)} staff, {len(shifts)} shifts, {len(attendance)} attendance records")
+        print("\n".join(timings))
@@ -0,0 +1,282 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.stock_ledger import OPENING_LOT, StockLedger
+from utils.storage import atomic_write_json, file_lock
+
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SERVICE_LEVEL = 0.95
+USAGE_WINDOW_DAYS = 90
+REVIEW_PERIOD_DAYS = 30
+
+# Purchase orders in these states still count as stock on its way
+OPEN_ORDER_STATUSES = ('Draft', 'Pending', 'Approved', 'Ordered')
+
+PLAN_COLUMNS = ['name', 'supplier', 'on_hand', 'on_order', 'lead_time_days', 'daily_usage',
+                'usage_std', 'safety_stock', 'reorder_point', 'order_up_to', 'order_quantity', 'unit_cost']
+
+
+class ReorderPlanner:
+    """
+    Reorder points and draft purchase orders from consumption history.
+
+    Daily usage per item is taken from the 'issue' movements of the stock
+    movement history over a trailing window, laid out as an item x day
+    matrix so mean and variability come from two array reductions for the
+    whole catalog. With the supplier's lead time L and the service level's
+    z-score:
+
+        safety stock  = z * usage std * sqrt(L)
+        reorder point = max(daily usage * L + safety stock, min_threshold)
+
+    Items at or below their reorder point (counting open orders) are
+    ordered up to max_threshold, or to a review period of usage above the
+    reorder point if that is higher, on one draft purchase order per
+    supplier.
+
+    Usage and on-hand quantities come from the stock ledger, so demand is
+    only known once issues are recorded through it; until then reorder
+    points fall back to min_threshold. purchase_orders.json is updated
+    under `orders_lock`, which anything else creating orders should hold
+    too.
+    """
+
+    def __init__(self, stock: StockLedger,
+                 inventory_file: str = "data/inventory.json",
+                 suppliers_file: str = "data/suppliers.json",
+                 orders_file: str = "data/purchase_orders.json",
+                 service_level: float = DEFAULT_SERVICE_LEVEL,
+                 window_days: int = USAGE_WINDOW_DAYS):
+        self.stock = stock
+        self.inventory_file = inventory_file
+        self.suppliers_file = suppliers_file
+        self.orders_file = orders_file
+        self.orders_lock = orders_file + ".lock"
+        self.service_level = service_level
+        self.window_days = window_days
+
+    def usage_rates(self, as_of: Optional[date] = None,
+                    movements: Optional[Iterable[Dict]] = None) -> pd.DataFrame:
+        """
+        Mean and standard deviation of daily usage per item.
+
+        Args:
+            as_of: Last day of the usage window (defaults to today)
+            movements: Movement records (defaults to the stock ledger's)
+
+        Returns:
+            DataFrame indexed by item id with 'daily_usage' and 'usage_std'
+        """
+        as_of = as_of or date.today()
+        first = (as_of - timedelta(days=self.window_days - 1)).isoformat()
+        last = as_of.isoformat()
+
+        issues = pd.DataFrame(
+            [m for m in (movements if movements is not None
+                         else self.stock.movements(start=first, end=last, types=('issue',)))
+             if m.get('type') == 'issue' and first <= str(m.get('timestamp', ''))[:10] <= last],
+            columns=['item_id', 'quantity', 'timestamp']
+        )
+        if issues.empty:
+            return pd.DataFrame(columns=['daily_usage', 'usage_std'], dtype=float)
+
+        issues['day'] = issues['timestamp'].str[:10]
+        issues['used'] = -pd.to_numeric(issues['quantity'], errors='coerce').fillna(0)
+        days = [(as_of - timedelta(days=offset)).isoformat() for offset in range(self.window_days - 1, -1, -1)]
+        daily = (issues.pivot_table(index='item_id', columns='day', values='used', aggfunc='sum')
+                 .reindex(columns=days).fillna(0.0))
+        matrix = daily.to_numpy()
+
+        return pd.DataFrame({
+            'daily_usage': matrix.mean(axis=1),
+            'usage_std': matrix.std(axis=1, ddof=1) if self.window_days > 1 else np.zeros(len(matrix))
+        }, index=daily.index)
+
+    def plan(self, as_of: Optional[date] = None, movements: Optional[Iterable[Dict]] = None) -> pd.DataFrame:
+        """
+        Reorder point, safety stock and order quantity for every inventory item.
+
+        Returns:
+            DataFrame indexed by item id with PLAN_COLUMNS
+        """
+        inventory = self._load_json(self.inventory_file)
+        if not inventory:
+            return pd.DataFrame(columns=PLAN_COLUMNS)
+
+        items = pd.DataFrame.from_dict(inventory, orient='index')
+        for column, default in (('min_threshold', 10), ('max_threshold', 0),
+                                ('cost_per_unit', 0.0), ('supplier', ''), ('name', '')):
+            if column not in items:
+                items[column] = default
+
+        plan = pd.DataFrame(index=items.index)
+        plan['name'] = items['name'].fillna('')
+        plan['supplier'] = items['supplier'].fillna('').astype(str).str.strip()
+        plan['on_hand'] = pd.Series(self.stock.on_hand_all(), dtype=float).reindex(plan.index).fillna(0)
+        plan['on_order'] = pd.Series(self._on_order(inventory), dtype=float).reindex(plan.index).fillna(0)
+
+        lead_times = self._lead_times()
+        plan['lead_time_days'] = plan['supplier'].str.lower().map(lead_times).fillna(DEFAULT_LEAD_TIME_DAYS)
+
+        usage = self.usage_rates(as_of, movements).reindex(plan.index).fillna(0.0)
+        plan['daily_usage'] = usage['daily_usage']
+        plan['usage_std'] = usage['usage_std']
+
+        z = NormalDist().inv_cdf(self.service_level)
+        lead = plan['lead_time_days'].to_numpy(dtype=float)
+        safety = z * plan['usage_std'].to_numpy() * np.sqrt(lead)
+        reorder = np.maximum(plan['daily_usage'].to_numpy() * lead + safety,
+                             pd.to_numeric(items['min_threshold'], errors='coerce').fillna(10).to_numpy())
+        order_up_to = np.maximum(pd.to_numeric(items['max_threshold'], errors='coerce').fillna(0).to_numpy(),
+                                 reorder + plan['daily_usage'].to_numpy() * REVIEW_PERIOD_DAYS)
+        position = plan['on_hand'].to_numpy() + plan['on_order'].to_numpy()
+
+        plan['safety_stock'] = np.ceil(safety)
+        plan['reorder_point'] = np.ceil(reorder)
+        plan['order_up_to'] = np.ceil(order_up_to)
+        plan['order_quantity'] = np.where(position <= reorder, np.ceil(np.maximum(order_up_to - position, 0)), 0)
+        plan['unit_cost'] = pd.to_numeric(items['cost_per_unit'], errors='coerce').fillna(0.0)
+        return plan[PLAN_COLUMNS]
+
+    def draft_orders(self, as_of: Optional[date] = None,
+                     movements: Optional[Iterable[Dict]] = None) -> Dict[str, Dict]:
+        """
+        Write one draft purchase order per supplier for items due for reorder.
+
+        The batch is tagged with its date, and a date that already has a
+        batch is skipped, so the nightly run can be retried safely.
+
+        Returns:
+            The purchase orders created, keyed by PO id
+        """
+        as_of = as_of or date.today()
+        batch = f"reorder-{as_of.isoformat()}"
+        with file_lock(self.orders_lock):
+            orders = self._load_json(self.orders_file)
+            if any(order.get('batch') == batch for order in orders.values()):
+                return {}
+
+            plan = self.plan(as_of, movements)
+            due = plan[plan['order_quantity'] > 0]
+            created = {}
+            next_number = len(orders) + 1
+
+            for supplier, lines in due.groupby('supplier', sort=True):
+                items = [{
+                    'item_id': item_id,
+                    'name': line['name'],
+                    'quantity': int(line['order_quantity']),
+                    'unit_cost': float(line['unit_cost']),
+                    'total_cost': round(int(line['order_quantity']) * float(line['unit_cost']), 2)
+                } for item_id, line in lines.iterrows()]
+                urgent = bool((lines['on_hand'] <= lines['safety_stock']).any())
+                po_id = f"PO_{next_number:04d}"
+                next_number += 1
+                created[po_id] = {
+                    'supplier': supplier or 'Unassigned',
+                    'order_date': as_of.isoformat(),
+                    'expected_delivery': (as_of + timedelta(days=int(lines['lead_time_days'].max()))).isoformat(),
+                    'priority': 'High' if urgent else 'Normal',
+                    'department': 'Inventory',
+                    'requested_by': 'Reorder planner',
+                    'approved_by': '',
+                    'budget_code': '',
+                    'items': items,
+                    'total_amount': round(sum(item['total_cost'] for item in items), 2),
+                    'status': 'Draft',
+                    'batch': batch,
+                    'created_date': datetime.now().isoformat()
+                }
+
+            if created:
+                orders.update(created)
+                atomic_write_json(self.orders_file, orders)
+            return created
+
+    def _on_order(self, inventory: Dict[str, Dict]) -> Dict[str, float]:
+        """Quantity per item on open purchase orders (matched by item id, else by name)."""
+        by_name = {str(item.get('name', '')).lower(): item_id for item_id, item in inventory.items()}
+        on_order: Dict[str, float] = {}
+        for order in self._load_json(self.orders_file).values():
+            if order.get('status') not in OPEN_ORDER_STATUSES:
+                continue
+            for line in order.get('items', []):
+                item_id = line.get('item_id') or by_name.get(str(line.get('name', '')).lower())
+                if item_id:
+                    on_order[item_id] = on_order.get(item_id, 0.0) + float(line.get('quantity', 0) or 0)
+        return on_order
+
+    def _lead_times(self) -> Dict[str, float]:
+        """Lead time in days per supplier name (lower-cased)."""
+        return {
+            str(supplier.get('name', '')).strip().lower(): float(supplier['lead_time_days'])
+            for supplier in self._load_json(self.suppliers_file).values()
+            if supplier.get('lead_time_days')
+        }
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write draft purchase orders for items due for reorder")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--benchmark", action="store_true", help="Time planning over a generated catalog")
+    args = parser.parse_args()
+
+    def open_planner(data_dir: str) -> ReorderPlanner:
+        stock = StockLedger(os.path.join(data_dir, "stock_movements.jsonl"),
+                            os.path.join(data_dir, "stock_snapshots.jsonl"))
+        return ReorderPlanner(stock, *(os.path.join(data_dir, name) for name in (
+            "inventory.json", "suppliers.json", "purchase_orders.json")))
+
+    if not args.benchmark:
+        created = open_planner(args.data_dir).draft_orders()
+        print(f"Created {len(created)} draft purchase orders")
+    else:
+        import random
+        import tempfile
+        import time
+
+        random.seed(39)
+        with tempfile.TemporaryDirectory() as data_dir:
+            suppliers = {f"VEN_{s:03d}": {'name': f"Vendor {s}", 'lead_time_days': random.randint(2, 21)}
+                         for s in range(40)}
+            inventory = {f"SUP_{i:05d}": {'name': f"Supply {i}", 'supplier': f"Vendor {i % 40}",
+                                          'quantity': random.randint(100, 400), 'min_threshold': 100,
+                                          'max_threshold': 300, 'cost_per_unit': round(random.uniform(1, 90), 2)}
+                         for i in range(10_000)}
+            atomic_write_json(os.path.join(data_dir, "suppliers.json"), suppliers)
+            atomic_write_json(os.path.join(data_dir, "inventory.json"), inventory, indent=None)
+
+            planner = open_planner(data_dir)
+            planner.stock.bootstrap(inventory, (date.today() - timedelta(days=90)).isoformat())
+            days = sorted((date.today() - timedelta(days=random.randint(1, 89))).isoformat() for _ in range(200_000))
+            planner.stock.record_many({'item_id': f"SUP_{random.randrange(10_000):05d}", 'type': 'issue',
+                                       'lot': OPENING_LOT, 'quantity': random.randint(1, 2), 'timestamp': day}
+                                      for day in days)
+
+            start = time.perf_counter()
+            plan = planner.plan()
+            plan_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            created = planner.draft_orders()
+            draft_ms = (time.perf_counter() - start) * 1000
+
+            print(f"Planned {len(plan)} items from {len(days)} ledger movements in {plan_ms:.0f} ms")
+            print(f"Nightly batch: {len(created)} draft orders covering "
+                  f"{sum(len(po['items']) for po in created.values())} items in {draft_ms:.0f} ms")
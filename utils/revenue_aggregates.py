@@ -0,0 +1,283 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.storage import atomic_write_json, file_lock
+
+ROOM_CATEGORY = 'Room'
+UNASSIGNED = 'Unassigned'
+
+# Separator of the (month, department, category) parts of a bucket key
+KEY_SEPARATOR = '|'
+
+
+def bucket_key(month: str, department: str, category: str) -> str:
+    """Build the storage key of a (year-month, department, category) bucket."""
+    return KEY_SEPARATOR.join((month, department or UNASSIGNED, category or 'Other'))
+
+
+def split_key(key: str) -> Tuple[str, str, str]:
+    """Inverse of bucket_key()."""
+    month, department, category = key.split(KEY_SEPARATOR, 2)
+    return month, department, category
+
+
+def month_of(date_str: Optional[str]) -> str:
+    """Year-month ('YYYY-MM') of an ISO date string."""
+    return str(date_str or '')[:7] or 'Unknown'
+
+
+def last_months(count: int, today: Optional[datetime] = None) -> List[str]:
+    """The `count` calendar months up to and including the current one, oldest first."""
+    today = today or datetime.now()
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def bill_lines(bill: Dict, services: Optional[Dict] = None) -> List[Tuple[str, str, float]]:
+    """
+    Split a bill's total into (department, category, amount) lines.
+
+    Room charges are booked to the bill's department under the 'Room'
+    category, services to their own department and category. Tax and
+    discount are spread over the lines in proportion to their amounts so
+    the lines always add up to the bill total.
+
+    Args:
+        bill: Bill record
+        services: Service catalog, used for bills written before service
+            lines carried their category
+
+    Returns:
+        List of (department, category, amount)
+    """
+    by_name = {}
+    for service in (services or {}).values():
+        by_name.setdefault(service.get('name'), service)
+
+    lines = []
+    room_charges = float(bill.get('room_charges', 0) or 0)
+    if room_charges:
+        lines.append((bill.get('department') or UNASSIGNED, ROOM_CATEGORY, room_charges))
+
+    for item in bill.get('services', []):
+        catalog = by_name.get(item.get('name'), {})
+        lines.append((
+            item.get('department') or catalog.get('department') or UNASSIGNED,
+            item.get('category') or catalog.get('category') or 'Other',
+            float(item.get('total', 0) or 0)
+        ))
+
+    total = float(bill.get('total_amount', 0) or 0)
+    subtotal = sum(amount for _, _, amount in lines)
+    if subtotal <= 0:
+        return [(bill.get('department') or UNASSIGNED, 'Other', total)] if total else []
+
+    scale = total / subtotal
+    return [(department, category, amount * scale) for department, category, amount in lines]
+
+
+class RevenueAggregateStore:
+    """
+    Pre-bucketed revenue and collection totals.
+
+    Billed and collected amounts are kept per (year-month, department,
+    service category) bucket, with per-month and grand totals rolled up
+    alongside, so the dashboard reads totals in O(1) and trends in
+    O(months) instead of rescanning bills and payments. Bills and payments
+    are added as they are written; rebuild() recomputes everything from
+    the source files for backfills or after manual edits.
+
+    Every update takes the aggregates' lock file and re-reads the file
+    before applying itself, so sessions recording bills and payments at
+    the same time do not overwrite each other's totals; reads pick up the
+    file again whenever another session has changed it.
+    """
+
+    def __init__(self, aggregates_file: str = "data/revenue_aggregates.json",
+                 services_file: str = "data/services.json"):
+        self.aggregates_file = aggregates_file
+        self.services_file = services_file
+        self.lock_file = aggregates_file + ".lock"
+        self._stamp = None
+        self.data = self._load()
+
+    def exists(self) -> bool:
+        """Whether the aggregates have been built at least once."""
+        return os.path.exists(self.aggregates_file)
+
+    def record_bill(self, bill: Dict) -> None:
+        """
+        Add a newly written bill to the aggregates.
+
+        Args:
+            bill: Bill record (uses bill_date, total_amount and its lines)
+        """
+        services = self._load_json(self.services_file)
+        with file_lock(self.lock_file):
+            self.data = self._load()
+            self._add_bill(bill, services)
+            self._save()
+
+    def record_payment(self, payment: Dict, bill: Optional[Dict]) -> None:
+        """
+        Add a newly written payment to the aggregates.
+
+        The payment is spread over the departments and categories of the
+        bill it pays, in the same proportions as the bill itself.
+
+        Args:
+            payment: Payment record (uses payment_date and amount)
+            bill: The bill being paid, if known
+        """
+        services = self._load_json(self.services_file)
+        with file_lock(self.lock_file):
+            self.data = self._load()
+            self._add_payment(payment, bill, services)
+            self._save()
+
+    def rebuild(self, bills: Dict, payments: Dict) -> None:
+        """
+        Recompute all aggregates from the full bill and payment collections.
+
+        Args:
+            bills: All bills, keyed by bill id
+            payments: All payments, keyed by payment id
+        """
+        services = self._load_json(self.services_file)
+        with file_lock(self.lock_file):
+            self.data = self._empty()
+            for bill in bills.values():
+                self._add_bill(bill, services)
+            for payment in payments.values():
+                self._add_payment(payment, bills.get(payment.get('bill_id')), services)
+            self.data['rebuilt_at'] = datetime.now().isoformat()
+            self._save()
+
+    def refresh(self) -> None:
+        """Re-read the aggregates if another session changed the file."""
+        if self._file_stamp() != self._stamp:
+            self.data = self._load()
+
+    def totals(self) -> Dict[str, float]:
+        """Grand totals: 'billed', 'collected' and the 'bills' / 'payments' counts."""
+        self.refresh()
+        return dict(self.data['totals'])
+
+    def month(self, month: str) -> Dict[str, float]:
+        """Totals of one year-month."""
+        self.refresh()
+        return dict(self.data['months'].get(month, self._zero()))
+
+    def monthly_series(self, months: List[str]) -> List[Dict]:
+        """
+        Totals for each of the given months, in order.
+
+        Returns:
+            List of dictionaries with 'month', 'billed' and 'collected'
+        """
+        return [{'month': month, **self.month(month)} for month in months]
+
+    def breakdown(self, months: List[str], by: str = 'category',
+                  measure: str = 'billed') -> Dict[str, float]:
+        """
+        Sum a measure over the given months, grouped by department or category.
+
+        Args:
+            months: Year-months to include
+            by: 'department' or 'category'
+            measure: 'billed' or 'collected'
+
+        Returns:
+            Mapping of department/category to amount
+        """
+        self.refresh()
+        wanted = set(months)
+        position = 1 if by == 'department' else 2
+        result: Dict[str, float] = {}
+        for key, bucket in self.data['buckets'].items():
+            parts = split_key(key)
+            if parts[0] in wanted:
+                result[parts[position]] = result.get(parts[position], 0.0) + bucket[measure]
+        return result
+
+    def _add_bill(self, bill: Dict, services: Dict) -> None:
+        month = month_of(bill.get('bill_date'))
+        for department, category, amount in bill_lines(bill, services):
+            self._add(month, department, category, 'billed', amount)
+        self._bump(month, 'bills')
+
+    def _add_payment(self, payment: Dict, bill: Optional[Dict], services: Dict) -> None:
+        month = month_of(payment.get('payment_date'))
+        amount = float(payment.get('amount', 0) or 0)
+        lines = bill_lines(bill, services) if bill else []
+        total = sum(line_amount for _, _, line_amount in lines)
+
+        if total > 0:
+            for department, category, line_amount in lines:
+                self._add(month, department, category, 'collected', amount * line_amount / total)
+        else:
+            self._add(month, UNASSIGNED, 'Other', 'collected', amount)
+        self._bump(month, 'payments')
+
+    def _add(self, month: str, department: str, category: str, measure: str, amount: float) -> None:
+        bucket = self.data['buckets'].setdefault(bucket_key(month, department, category), self._zero())
+        bucket[measure] += amount
+        self.data['months'].setdefault(month, self._zero())[measure] += amount
+        self.data['totals'][measure] += amount
+
+    def _bump(self, month: str, counter: str) -> None:
+        self.data['months'].setdefault(month, self._zero())[counter] += 1
+        self.data['totals'][counter] += 1
+
+    def _zero(self) -> Dict[str, float]:
+        return {'billed': 0.0, 'collected': 0.0, 'bills': 0, 'payments': 0}
+
+    def _empty(self) -> Dict:
+        return {'buckets': {}, 'months': {}, 'totals': self._zero(), 'rebuilt_at': None}
+
+    def _load(self) -> Dict:
+        self._stamp = self._file_stamp()
+        data = self._load_json(self.aggregates_file)
+        return data if 'buckets' in data else self._empty()
+
+    def _save(self) -> None:
+        atomic_write_json(self.aggregates_file, self.data)
+        self._stamp = self._file_stamp()
+
+    def _file_stamp(self):
+        if not os.path.exists(self.aggregates_file):
+            return None
+        stat = os.stat(self.aggregates_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild revenue aggregates from bills and payments")
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    store = RevenueAggregateStore(os.path.join(args.data_dir, "revenue_aggregates.json"),
+                                  os.path.join(args.data_dir, "services.json"))
+    bills = store._load_json(os.path.join(args.data_dir, "bills.json"))
+    payments = store._load_json(os.path.join(args.data_dir, "payments.json"))
+    store.rebuild(bills, payments)
+    totals = store.totals()
+    print(f"Rebuilt from {totals['bills']} bills and {totals['payments']} payments: "
+          f"billed ${totals['billed']:,.2f}, collected ${totals['collected']:,.2f}")
@@ -0,0 +1,418 @@
+import calendar
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rostered shift types with their start and end times (Night ends the next morning)
+SHIFT_TIMES = {
+    'Day': ('07:00:00', '15:00:00'),
+    'Evening': ('15:00:00', '23:00:00'),
+    'Night': ('23:00:00', '07:00:00')
+}
+SHIFT_HOURS = 8
+
+DEFAULT_RULES = {
+    'max_consecutive_days': 5,
+    'min_rest_hours': 11,
+    'max_shifts': 22
+}
+
+# Objective weights: load is balanced through the sum of squared shift
+# counts, and working outside one's own department costs this much
+OUT_OF_DEPARTMENT_PENALTY = 6.0
+
+SHIFT_TYPES = list(SHIFT_TIMES)
+_START_HOUR = np.array([int(SHIFT_TIMES[shift][0][:2]) for shift in SHIFT_TYPES])
+
+
+def month_days(year: int, month: int) -> List[date]:
+    """Every day of a calendar month."""
+    return [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+class RosterSolver:
+    """
+    Builds a month's shift roster from staffing demand.
+
+    Demand rows give, per day, how many staff of a role (and optionally a
+    specialization) a department needs on a Day, Evening or Night shift.
+    Staff are eligible for a row by role and specialization and never
+    work on days they are unavailable. Hard rules: one shift a day, at
+    most `max_consecutive_days` working days in a row, at least
+    `min_rest_hours` between shifts and at most `max_shifts` a month.
+    Shifts already scheduled outside the roster are fixed: they occupy
+    their staff on that day, count towards the rules and are never moved.
+
+    The roster is kept as a staff x day matrix of shift types, so the
+    rules for a slot are checked for all staff at once with array masks.
+    A greedy pass fills each day's slots, scarcest rows first, with the
+    cheapest feasible staff. Local search follows: uncovered slots are
+    repaired by handing a blocking neighbouring shift to someone else,
+    and shifts are moved between staff while that lowers the objective
+    (squared shift counts plus out-of-department penalties).
+    """
+
+    def __init__(self, rules: Optional[Dict] = None, time_limit: float = 10.0, seed: int = 0):
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.time_limit = time_limit
+        self.seed = seed
+
+        rest = self.rules['min_rest_hours']
+        # rest_ok[a, b]: a shift of type b may follow a shift of type a on the previous day
+        gap = 24 + _START_HOUR[None, :] - _START_HOUR[:, None] - SHIFT_HOURS
+        self._rest_ok = gap >= rest
+
+    def solve(self, staff: Dict[str, Dict], demand: List[Dict], year: int, month: int,
+              unavailable: Optional[Dict[str, Iterable[str]]] = None,
+              existing: Iterable[Dict] = ()) -> Dict:
+        """
+        Compute a roster for a month.
+
+        Args:
+            staff: Staff records keyed by id (only 'Active' staff are rostered)
+            demand: Rows with 'department', 'shift_type', 'role', 'required'
+                and an optional 'specialization'
+            year: Calendar year
+            month: Month number (1-12)
+            unavailable: ISO dates each employee (by employee id) cannot work
+            existing: Shifts already scheduled that the roster must work
+                around; those on the month's days or the day either side
+                are kept fixed
+
+        Returns:
+            Dictionary with 'assignments' (shift records), 'coverage'
+            (DataFrame per demand row), 'uncovered' (per day and row),
+            'violations' and 'stats'
+        """
+        started = time.perf_counter()
+        rng = random.Random(self.seed)
+        days = month_days(year, month)
+        members = [member for member in staff.values()
+                   if member.get('status') == 'Active' and member.get('employee_id')]
+        demand = [self._normalize(row) for row in demand]
+        demand = [row for row in demand if row['required'] > 0]
+
+        n_staff, n_days = len(members), len(days)
+        self._plan = np.full((n_staff, n_days + 2), -1, dtype=np.int8)  # padded by a day either side
+        self._row = np.full((n_staff, n_days + 2), -1, dtype=np.int32)
+        self._count = np.zeros(n_staff, dtype=np.int32)
+        self._available = np.ones((n_staff, n_days + 2), dtype=bool)
+        self._fixed = np.zeros((n_staff, n_days + 2), dtype=bool)
+
+        day_index = {day.isoformat(): d + 1 for d, day in enumerate(days)}
+        for i, member in enumerate(members):
+            for day in (unavailable or {}).get(member['employee_id'], ()):
+                if str(day)[:10] in day_index:
+                    self._available[i, day_index[str(day)[:10]]] = False
+        fixed = self._fix(existing, members, days)
+
+        roles = np.array([str(member.get('role', '')) for member in members], dtype=object)
+        specializations = [str(member.get('specialization', '')).lower() for member in members]
+        departments = np.array([str(member.get('department', '')) for member in members], dtype=object)
+        self._eligible = []
+        self._mismatch = []
+        for row in demand:
+            eligible = roles == row['role']
+            if row['specialization']:
+                eligible &= np.array([row['specialization'].lower() in spec for spec in specializations], dtype=bool)
+            self._eligible.append(eligible)
+            self._mismatch.append((departments != row['department']).astype(float))
+
+        # Greedy construction: day by day, scarcest demand rows first
+        row_order = sorted(range(len(demand)), key=lambda r: (self._eligible[r].sum(), r))
+        missing = np.zeros((len(demand), n_days + 2), dtype=np.int32)
+        for d in range(1, n_days + 1):
+            for r in row_order:
+                shift = SHIFT_TYPES.index(demand[r]['shift_type'])
+                need = demand[r]['required']
+                cost = self._cost(r, d, shift)
+                feasible = np.flatnonzero(np.isfinite(cost))
+                if len(feasible) > need:
+                    feasible = feasible[np.argpartition(cost[feasible], need - 1)[:need]]
+                for i in feasible:
+                    self._assign(i, d, shift, r)
+                missing[r, d] = need - len(feasible)
+
+        # Local search: repair uncovered slots, then rebalance
+        for r, d in zip(*np.nonzero(missing)):
+            shift = SHIFT_TYPES.index(demand[r]['shift_type'])
+            while missing[r, d] and self._repair(r, d, shift, demand):
+                missing[r, d] -= 1
+            if time.perf_counter() - started > self.time_limit:
+                break
+
+        improved = True
+        while improved and time.perf_counter() - started < self.time_limit:
+            improved = False
+            assigned = list(zip(*np.nonzero((self._plan >= 0) & ~self._fixed)))
+            rng.shuffle(assigned)
+            for i, d in assigned:
+                if self._improve(i, d):
+                    improved = True
+                if time.perf_counter() - started > self.time_limit:
+                    break
+
+        assignments = self._assignments(members, demand, days)
+        coverage = self._coverage(demand, missing[:, 1:n_days + 1], n_days)
+        uncovered = [{'date': days[d - 1].isoformat(), **{key: demand[r][key] for key in
+                      ('department', 'shift_type', 'role', 'specialization')}, 'missing': int(missing[r, d])}
+                     for r, d in zip(*np.nonzero(missing))]
+        counts = self._count if n_staff else np.zeros(1)
+        return {
+            'assignments': assignments,
+            'coverage': coverage,
+            'uncovered': uncovered,
+            'violations': check_roster(fixed + assignments, self.rules, unavailable),
+            'stats': {
+                'required': int(coverage['required'].sum()) if len(coverage) else 0,
+                'assigned': len(assignments),
+                'coverage_rate': float(coverage['assigned'].sum() / coverage['required'].sum())
+                if len(coverage) and coverage['required'].sum() else 1.0,
+                'out_of_department': sum(1 for a in assignments if a['out_of_department']),
+                'min_shifts': int(counts.min()),
+                'max_shifts': int(counts.max()),
+                'seconds': round(time.perf_counter() - started, 2)
+            }
+        }
+
+    def _feasible(self, d: int, shift: int) -> np.ndarray:
+        """Staff who can take a shift of type `shift` on padded day `d` under the hard rules."""
+        plan = self._plan
+        prev, nxt = plan[:, d - 1], plan[:, d + 1]
+        ok = (plan[:, d] < 0) & self._available[:, d] & (self._count < self.rules['max_shifts'])
+        ok &= (prev < 0) | self._rest_ok[np.maximum(prev, 0), shift]
+        ok &= (nxt < 0) | self._rest_ok[shift, np.maximum(nxt, 0)]
+
+        limit = self.rules['max_consecutive_days']
+        run = np.ones(len(plan), dtype=np.int32)
+        for step in (-1, 1):
+            working = np.ones(len(plan), dtype=bool)
+            for offset in range(1, limit + 1):
+                column = d + step * offset
+                if column < 0 or column >= plan.shape[1]:
+                    break
+                working &= plan[:, column] >= 0
+                run += working
+        return ok & (run <= limit)
+
+    def _cost(self, r: int, d: int, shift: int) -> np.ndarray:
+        """Cost of giving the slot to each staff member (inf where not allowed)."""
+        ok = self._feasible(d, shift) & self._eligible[r]
+        cost = 2.0 * self._count + OUT_OF_DEPARTMENT_PENALTY * self._mismatch[r]
+        return np.where(ok, cost, np.inf)
+
+    def _assign(self, i: int, d: int, shift: int, r: int) -> None:
+        self._plan[i, d] = shift
+        self._row[i, d] = r
+        self._count[i] += 1
+
+    def _unassign(self, i: int, d: int) -> Tuple[int, int]:
+        shift, r = int(self._plan[i, d]), int(self._row[i, d])
+        self._plan[i, d] = -1
+        self._row[i, d] = -1
+        self._count[i] -= 1
+        return shift, r
+
+    def _repair(self, r: int, d: int, shift: int, demand: List[Dict]) -> bool:
+        """
+        Cover one missing slot by freeing a blocked candidate.
+
+        A candidate eligible for the row but blocked by a shift on the
+        previous or next day hands that shift to someone else who can
+        take it, then takes the slot.
+        """
+        candidates = np.flatnonzero(self._eligible[r] & (self._plan[:, d] < 0) & self._available[:, d])
+        for i in candidates[np.argsort(self._count[candidates], kind='stable')]:
+            for e in (d - 1, d + 1):
+                if self._plan[i, e] < 0 or self._fixed[i, e] or not 1 <= e < self._plan.shape[1] - 1:
+                    continue
+                other_shift, other_row = self._unassign(i, e)
+                if self._feasible(d, shift)[i]:
+                    takers = np.isfinite(self._cost(other_row, e, other_shift))
+                    takers[i] = False
+                    if takers.any():
+                        self._assign(int(np.argmax(takers)), e, other_shift, other_row)
+                        self._assign(i, d, shift, r)
+                        return True
+                self._assign(i, e, other_shift, other_row)
+        return False
+
+    def _improve(self, i: int, d: int) -> bool:
+        """Move the shift of staff i on day d to whoever lowers the objective most."""
+        shift, r = self._unassign(i, d)
+        cost = self._cost(r, d, shift)
+        current = 2.0 * self._count[i] + OUT_OF_DEPARTMENT_PENALTY * self._mismatch[r][i]
+        best = int(np.argmin(cost))
+        if cost[best] < current - 1e-9:
+            self._assign(best, d, shift, r)
+            return True
+        self._assign(i, d, shift, r)
+        return False
+
+    def _fix(self, existing: Iterable[Dict], members: List[Dict], days: List[date]) -> List[Dict]:
+        """
+        Enter already scheduled shifts into the plan as fixed.
+
+        A shift whose type is not a rostered one is taken as the rostered
+        type starting closest to it. Shifts within the month count towards
+        `max_shifts`; those on the padding days only constrain rest and
+        consecutive days.
+
+        Returns:
+            The month's fixed shifts, as records for check_roster()
+        """
+        staff_index = {member['employee_id']: i for i, member in enumerate(members)}
+        first = days[0] - timedelta(days=1)
+        fixed = []
+        for shift in existing:
+            i = staff_index.get(shift.get('employee_id'))
+            try:
+                day = date.fromisoformat(str(shift.get('shift_date', ''))[:10])
+            except ValueError:
+                continue
+            d = (day - first).days
+            if i is None or not 0 <= d < self._plan.shape[1] or self._plan[i, d] >= 0:
+                continue
+            shift_type = shift.get('shift_type')
+            if shift_type not in SHIFT_TIMES:
+                try:
+                    hour = int(str(shift.get('start_time', ''))[:2])
+                except ValueError:
+                    continue
+                shift_type = SHIFT_TYPES[int(np.argmin(np.abs((_START_HOUR - hour + 12) % 24 - 12)))]
+            self._plan[i, d] = SHIFT_TYPES.index(shift_type)
+            self._fixed[i, d] = True
+            if 1 <= d <= len(days):
+                self._count[i] += 1
+                fixed.append({'employee_id': members[i]['employee_id'], 'shift_date': day.isoformat(),
+                              'shift_type': shift_type})
+        return fixed
+
+    def _assignments(self, members: List[Dict], demand: List[Dict], days: List[date]) -> List[Dict]:
+        assignments = []
+        for i, d in zip(*np.nonzero((self._plan >= 0) & ~self._fixed)):
+            member, row = members[i], demand[self._row[i, d]]
+            shift_type = SHIFT_TYPES[self._plan[i, d]]
+            assignments.append({
+                'employee_id': member['employee_id'],
+                'staff_name': member.get('full_name', ''),
+                'role': member.get('role', ''),
+                'shift_date': days[d - 1].isoformat(),
+                'shift_type': shift_type,
+                'start_time': SHIFT_TIMES[shift_type][0],
+                'end_time': SHIFT_TIMES[shift_type][1],
+                'department': row['department'],
+                'out_of_department': member.get('department') != row['department']
+            })
+        assignments.sort(key=lambda a: (a['shift_date'], SHIFT_TYPES.index(a['shift_type']), a['department']))
+        return assignments
+
+    def _coverage(self, demand: List[Dict], missing: np.ndarray, n_days: int) -> pd.DataFrame:
+        coverage = pd.DataFrame(demand, columns=['department', 'shift_type', 'role', 'specialization', 'required'])
+        coverage['required'] = coverage['required'] * n_days
+        coverage['assigned'] = coverage['required'] - missing.sum(axis=1)
+        coverage['coverage'] = np.round(coverage['assigned'] / coverage['required'].where(coverage['required'] > 0) * 100, 1)
+        return coverage
+
+    def _normalize(self, row: Dict) -> Dict:
+        """Fill defaults for blank demand cells (e.g. from a table editor)."""
+        try:
+            required = int(float(row.get('required') or 0))
+        except (TypeError, ValueError):
+            required = 0
+        specialization = row.get('specialization')
+        return {
+            'department': str(row.get('department') or ''),
+            'shift_type': row.get('shift_type') if row.get('shift_type') in SHIFT_TIMES else 'Day',
+            'role': str(row.get('role') or ''),
+            'specialization': specialization.strip() if isinstance(specialization, str) else '',
+            'required': max(required, 0)
+        }
+
+
+def check_roster(assignments: List[Dict], rules: Optional[Dict] = None,
+                 unavailable: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict]:
+    """
+    Check rostered shifts against the hard rules.
+
+    Args:
+        assignments: Shift records with 'employee_id', 'shift_date' and
+            'shift_type' (one of SHIFT_TIMES)
+        rules: Overrides of DEFAULT_RULES
+        unavailable: ISO dates each employee cannot work
+
+    Returns:
+        Violations, each with 'employee_id', 'date', 'rule' and 'detail'
+    """
+    rules = dict(DEFAULT_RULES, **(rules or {}))
+    by_employee: Dict[str, Dict[date, str]] = {}
+    violations = []
+    for shift in assignments:
+        day = date.fromisoformat(shift['shift_date'][:10])
+        worked = by_employee.setdefault(shift['employee_id'], {})
+        if day in worked:
+            violations.append({'employee_id': shift['employee_id'], 'date': day.isoformat(),
+                               'rule': 'One shift a day', 'detail': f"{worked[day]} and {shift['shift_type']}"})
+        worked[day] = shift['shift_type']
+
+    for employee_id, worked in by_employee.items():
+        blocked: Set[str] = {str(day)[:10] for day in (unavailable or {}).get(employee_id, ())}
+        days = sorted(worked)
+        if len(days) > rules['max_shifts']:
+            violations.append({'employee_id': employee_id, 'date': days[-1].isoformat(), 'rule': 'Max shifts',
+                               'detail': f"{len(days)} shifts (limit {rules['max_shifts']})"})
+        run = 0
+        for n, day in enumerate(days):
+            if day.isoformat() in blocked:
+                violations.append({'employee_id': employee_id, 'date': day.isoformat(),
+                                   'rule': 'Availability', 'detail': "Rostered on an unavailable day"})
+            previous = days[n - 1] if n else None
+            run = run + 1 if previous == day - timedelta(days=1) else 1
+            if run == rules['max_consecutive_days'] + 1:
+                violations.append({'employee_id': employee_id, 'date': day.isoformat(), 'rule': 'Consecutive days',
+                                   'detail': f"More than {rules['max_consecutive_days']} days in a row"})
+            if previous == day - timedelta(days=1):
+                rest = 24 + int(SHIFT_TIMES[worked[day]][0][:2]) - int(SHIFT_TIMES[worked[previous]][0][:2]) - SHIFT_HOURS
+                if rest < rules['min_rest_hours']:
+                    violations.append({'employee_id': employee_id, 'date': day.isoformat(), 'rule': 'Minimum rest',
+                                       'detail': f"{rest}h after a {worked[previous]} shift"})
+    return violations
+
+
+if __name__ == "__main__":
+    random.seed(45)
+    departments = ["Emergency", "ICU", "Surgery", "General Ward", "Pharmacy", "Laboratory", "Administration"]
+    roles = ["Nurse"] * 6 + ["Doctor"] * 2 + ["Technician"]
+
+    staff = {}
+    for i in range(500):
+        role = random.choice(roles)
+        staff[f"STF_{i:04d}"] = {
+            'full_name': f"Staff {i}", 'employee_id': f"E{i:04d}", 'status': 'Active', 'role': role,
+            'department': random.choice(departments),
+            'specialization': random.choice(['', '', 'Critical Care', 'Trauma']) if role != 'Technician' else ''
+        }
+    unavailable = {member['employee_id']: [date(2026, 11, random.randint(1, 30)).isoformat() for _ in range(3)]
+                   for member in staff.values()}
+
+    demand = []
+    for department in departments:
+        for shift_type, scale in (('Day', 1.0), ('Evening', 0.8), ('Night', 0.6)):
+            demand.append({'department': department, 'shift_type': shift_type, 'role': 'Nurse',
+                           'required': max(1, round(10 * scale))})
+            demand.append({'department': department, 'shift_type': shift_type, 'role': 'Doctor',
+                           'required': max(1, round(4 * scale))})
+            demand.append({'department': department, 'shift_type': shift_type, 'role': 'Technician', 'required': 2})
+    demand.append({'department': 'ICU', 'shift_type': 'Night', 'role': 'Nurse',
+                   'specialization': 'Critical Care', 'required': 2})
+
+    result = RosterSolver().solve(staff, demand, 2026, 11, unavailable)
+    stats = result['stats']
+    print(f"500 staff, {len(demand)} demand rows: {stats['assigned']} of {stats['required']} shifts covered "
+          f"({stats['coverage_rate']:.1%}) in {stats['seconds']} s")
+    print(f"Shifts per person {stats['min_shifts']}-{stats['max_shifts']}, "
+          f"{stats['out_of_department']} outside home department, {len(result['violations'])} rule violations")
@@ -0,0 +1,232 @@
+import csv
+import io
+import json
+import os
+import socket
+import socketserver
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from utils.inventory_index import InventoryIndex
+from utils.stock_ledger import StockError, StockLedger
+
+# Scans are (barcode, lot, expiry, quantity); lot, expiry and quantity may be blank
+Scan = Tuple[str, str, str, float]
+
+# Line a scanner client sends to apply the scans received so far
+END_OF_RECEIPT = "END"
+
+
+def normalize_expiry(value: str) -> Optional[str]:
+    """
+    ISO date of a scanned expiry.
+
+    Accepts ISO dates and the YYMMDD form used in GS1 barcodes (a day of
+    00 means the end of the month).
+
+    Returns:
+        'YYYY-MM-DD', or None if blank or unreadable (including a month
+        outside 01-12)
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    if len(value) == 6 and value.isdigit():
+        year, month, day = 2000 + int(value[:2]), int(value[2:4]), int(value[4:])
+        if not 1 <= month <= 12:
+            return None
+        if day == 0:
+            next_month = date(year + month // 12, month % 12 + 1, 1)
+            return date.fromordinal(next_month.toordinal() - 1).isoformat()
+        value = f"{year:04d}-{month:02d}-{day:02d}"
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_scans(lines: Iterable[str]) -> Iterator[Scan]:
+    """
+    Parse scanner output, one scan per line.
+
+    Fields are comma- or tab-separated in the order barcode, lot, expiry,
+    quantity; a line with only a barcode counts one unit. Blank lines and
+    lines starting with '#' are skipped.
+
+    Yields:
+        (barcode, lot, expiry, quantity)
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or line == END_OF_RECEIPT:
+            continue
+        fields = next(csv.reader([line], delimiter='\t' if '\t' in line else ','))
+        fields = [field.strip() for field in fields] + [''] * 3
+        try:
+            quantity = float(fields[3]) if fields[3] else 1.0
+        except ValueError:
+            quantity = 0.0
+        yield fields[0], fields[1], fields[2], quantity
+
+
+class ScanReceiver:
+    """
+    Bulk stock receipts from barcode scans.
+
+    Scans are resolved to items through the inventory index's in-memory
+    barcode map, repeated scans of the same item and lot are summed, and
+    the whole receipt is recorded in the stock ledger with one batched
+    append. Scans that cannot be resolved are returned as rejects rather
+    than failing the receipt.
+    """
+
+    def __init__(self, stock: StockLedger, index: InventoryIndex):
+        self.stock = stock
+        self.index = index
+
+    def receive(self, scans: Iterable[Scan], reference: Optional[str] = None) -> Dict:
+        """
+        Record a receipt from scans.
+
+        Args:
+            scans: (barcode, lot, expiry, quantity) tuples
+            reference: Delivery reference stored on every movement
+
+        Returns:
+            Summary with 'scans', 'lines', 'units' and 'rejected' (list
+            of dictionaries with the scan and a 'reason')
+        """
+        self.index.refresh()
+        by_barcode = self.index.by_barcode
+        lines: Dict[Tuple[str, str], Dict] = {}
+        rejected = []
+        count = 0
+
+        for barcode, lot, expiry, quantity in scans:
+            count += 1
+            item_id = by_barcode.get(barcode)
+            if item_id is None:
+                rejected.append({'barcode': barcode, 'lot': lot, 'reason': 'Unknown barcode'})
+                continue
+            if quantity <= 0:
+                rejected.append({'barcode': barcode, 'lot': lot, 'reason': 'Invalid quantity'})
+                continue
+            if expiry and normalize_expiry(expiry) is None:
+                rejected.append({'barcode': barcode, 'lot': lot, 'reason': 'Invalid expiry'})
+                continue
+
+            key = (item_id, lot or f"{item_id}-{date.today():%Y%m%d}")
+            line = lines.get(key)
+            if line is None:
+                line = lines[key] = {
+                    'item_id': item_id, 'type': 'receipt', 'quantity': 0.0, 'lot': key[1],
+                    'reference': reference, 'note': 'Barcode receipt'
+                }
+                if key[1] not in self.stock.lots.get(item_id, {}):
+                    # First receipt into a lot sets its expiry and cost
+                    line['expiry_date'] = normalize_expiry(expiry) or self.index.items[item_id].get('expiry_date')
+                    line['unit_cost'] = self.index.items[item_id].get('cost_per_unit')
+            line['quantity'] += quantity
+
+        self.stock.record_many(lines.values())
+        return {
+            'scans': count,
+            'lines': len(lines),
+            'units': sum(line['quantity'] for line in lines.values()),
+            'rejected': rejected
+        }
+
+    def receive_file(self, source: Union[str, TextIO], reference: Optional[str] = None) -> Dict:
+        """Record a receipt from a scan file (path or open text file)."""
+        if isinstance(source, str):
+            with open(source, 'r') as f:
+                return self.receive(parse_scans(f), reference or os.path.basename(source))
+        return self.receive(parse_scans(source), reference)
+
+    def serve(self, address: str) -> None:
+        """
+        Accept scans over a local socket until interrupted.
+
+        Each connection streams scan lines. A line reading END, or the end
+        of the connection, applies the scans received so far as one
+        receipt and answers with its summary as a JSON line. Uses a Unix
+        socket at `address`, or 127.0.0.1 with `address` as the port
+        where Unix sockets are unavailable.
+        """
+        receiver = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                reader = io.TextIOWrapper(self.rfile, encoding='utf-8', errors='replace')
+                pending: List[Scan] = []
+                for line in reader:
+                    if line.strip() == END_OF_RECEIPT:
+                        self._apply(pending)
+                        pending = []
+                    else:
+                        pending.extend(parse_scans([line]))
+                if pending:
+                    self._apply(pending)
+
+            def _apply(self, scans: List[Scan]) -> None:
+                try:
+                    summary = receiver.receive(scans, reference=f"scanner-{date.today()}")
+                except StockError as e:
+                    summary = {'error': str(e)}
+                self.wfile.write((json.dumps(summary) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+        if hasattr(socket, 'AF_UNIX'):
+            if os.path.exists(address):
+                os.remove(address)
+            server = socketserver.UnixStreamServer(address, Handler)
+        else:
+            server = socketserver.TCPServer(("127.0.0.1", int(address)), Handler)
+        with server:
+            server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Receive stock from barcode scans")
+    parser.add_argument("source", nargs="?", help="Scan file to receive")
+    parser.add_argument("--serve", metavar="SOCKET", help="Listen for scanners on a local socket")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        random.seed(42)
+        with tempfile.TemporaryDirectory() as data_dir:
+            from utils.storage import atomic_write_json
+
+            inventory = {f"SUP_{i:05d}": {'name': f"Supply {i}", 'barcode': f"0{30_000_000_000 + i}",
+                                          'cost_per_unit': 2.5, 'quantity': 0} for i in range(20_000)}
+            atomic_write_json(os.path.join(data_dir, "inventory.json"), inventory, indent=None)
+            stock = StockLedger(os.path.join(data_dir, "stock_movements.jsonl"),
+                                os.path.join(data_dir, "stock_snapshots.jsonl"))
+            receiver = ScanReceiver(stock, InventoryIndex(os.path.join(data_dir, "inventory.json"), stock))
+
+            barcodes = [item['barcode'] for item in inventory.values()]
+            lines = [f"{random.choice(barcodes)},LOT{random.randint(1, 50)},{random.choice(['270131', '2027-06-30'])},"
+                     f"{random.randint(1, 24)}" for _ in range(100_000)]
+
+            start = time.perf_counter()
+            summary = receiver.receive(parse_scans(lines), reference="DELIVERY-1")
+            elapsed = time.perf_counter() - start
+            print(f"Received {summary['scans']} scans as {summary['lines']} lot lines "
+                  f"({summary['units']:.0f} units) in {elapsed:.2f}s: {summary['scans'] / elapsed * 60:,.0f} scans/min")
+    else:
+        stock = StockLedger(os.path.join(args.data_dir, "stock_movements.jsonl"),
+                            os.path.join(args.data_dir, "stock_snapshots.jsonl"))
+        receiver = ScanReceiver(stock, InventoryIndex(os.path.join(args.data_dir, "inventory.json"), stock))
+        if args.serve:
+            receiver.serve(args.serve)
+        elif args.source:
+            print(json.dumps(receiver.receive_file(args.source), indent=2))
+        else:
+            parser.print_help()
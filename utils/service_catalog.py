@@ -0,0 +1,281 @@
+import bisect
+import json
+import os
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.storage import atomic_write_json
+
+
+class PricingError(Exception):
+    """Raised when a bill line refers to an unknown or inactive service."""
+
+
+class ServiceCatalog:
+    """
+    Indexed view of services.json with effective-dated price lists.
+
+    The catalog is loaded once and reloaded only when services.json or
+    the price list file changes on disk. Services are indexed by id,
+    code and category, so lookups and category listings do not rescan
+    the catalog.
+
+    Price lists hold, per service, a list of versions with an
+    'effective_from' date. The price on a date is the latest version
+    effective on or before it (found by bisection), falling back to the
+    service's base 'cost'.
+    """
+
+    def __init__(self, services_file: str = "data/services.json",
+                 price_list_file: str = "data/price_lists.json"):
+        self.services_file = services_file
+        self.price_list_file = price_list_file
+        self._stamp: Optional[Tuple] = None
+        self.services: Dict[str, Dict] = {}
+        self.by_code: Dict[str, str] = {}
+        self.by_category: Dict[str, List[str]] = {}
+        self.price_lists: Dict[str, List[Dict]] = {}
+        self._effective: Dict[str, List[str]] = {}
+
+    def refresh(self) -> None:
+        """Rebuild the indexes if either source file changed."""
+        stamp = tuple(
+            os.path.getmtime(path) if os.path.exists(path) else None
+            for path in (self.services_file, self.price_list_file)
+        )
+        if stamp == self._stamp:
+            return
+
+        self.services = self._load_json(self.services_file)
+        self.by_code = {}
+        self.by_category = {}
+        for service_id, service in self.services.items():
+            if service.get('code'):
+                self.by_code[str(service['code']).strip().upper()] = service_id
+            self.by_category.setdefault(service.get('category', 'Other'), []).append(service_id)
+        for service_ids in self.by_category.values():
+            service_ids.sort(key=lambda sid: self.services[sid].get('name', ''))
+
+        self.price_lists = self._load_json(self.price_list_file)
+        for versions in self.price_lists.values():
+            versions.sort(key=lambda version: version['effective_from'])
+        self._effective = {
+            service_id: [version['effective_from'] for version in versions]
+            for service_id, versions in self.price_lists.items()
+        }
+        self._stamp = stamp
+
+    def get(self, service_id: str) -> Optional[Dict]:
+        """Service record by id."""
+        self.refresh()
+        return self.services.get(service_id)
+
+    def find_by_code(self, code: str) -> Optional[str]:
+        """Service id for a service code (case-insensitive)."""
+        self.refresh()
+        return self.by_code.get(str(code).strip().upper())
+
+    def categories(self) -> List[str]:
+        """Categories present in the catalog, sorted."""
+        self.refresh()
+        return sorted(self.by_category)
+
+    def in_category(self, category: Optional[str] = None, active_only: bool = False) -> List[str]:
+        """Service ids in a category (all services if None), sorted by name."""
+        self.refresh()
+        if category is None:
+            service_ids = [sid for ids in self.by_category.values() for sid in ids]
+        else:
+            service_ids = self.by_category.get(category, [])
+        if active_only:
+            service_ids = [sid for sid in service_ids if self.services[sid].get('active', True)]
+        return service_ids
+
+    def price(self, service_id: str, on: Optional[date] = None) -> float:
+        """
+        Price of a service on a date.
+
+        Args:
+            service_id: Service identifier
+            on: Pricing date (defaults to today)
+
+        Returns:
+            Effective price
+        """
+        self.refresh()
+        return self._price_on(service_id, (on or date.today()).isoformat())
+
+    def prices(self, service_ids: Iterable[str], on: Optional[date] = None) -> Dict[str, float]:
+        """Prices of several services on a date, checking the files for changes once."""
+        self.refresh()
+        day = (on or date.today()).isoformat()
+        return {service_id: self._price_on(service_id, day) for service_id in service_ids}
+
+    def _price_on(self, service_id: str, day: str) -> float:
+        """Effective price on an ISO day, without checking the files for changes."""
+        effective = self._effective.get(service_id)
+        if effective:
+            position = bisect.bisect_right(effective, day) - 1
+            if position >= 0:
+                return float(self.price_lists[service_id][position]['price'])
+        return float(self.services.get(service_id, {}).get('cost', 0) or 0)
+
+    def price_history(self, service_id: str) -> List[Dict]:
+        """All price versions of a service, oldest first."""
+        self.refresh()
+        return list(self.price_lists.get(service_id, []))
+
+    def set_price(self, service_id: str, price: float, effective_from: date) -> int:
+        """
+        Add a price version for a service.
+
+        A version with the same effective date replaces the previous one.
+
+        Args:
+            service_id: Service identifier
+            price: New price
+            effective_from: First day the price applies
+
+        Returns:
+            Version number of the new price
+        """
+        self.refresh()
+        if service_id not in self.services:
+            raise PricingError(f"Unknown service {service_id}")
+
+        versions = [v for v in self.price_lists.get(service_id, [])
+                    if v['effective_from'] != effective_from.isoformat()]
+        version = max((v['version'] for v in self.price_lists.get(service_id, [])), default=0) + 1
+        versions.append({'effective_from': effective_from.isoformat(), 'price': float(price), 'version': version})
+        price_lists = dict(self.price_lists)
+        price_lists[service_id] = sorted(versions, key=lambda v: v['effective_from'])
+        atomic_write_json(self.price_list_file, price_lists)
+        self.refresh()
+        return version
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+class PricingEngine:
+    """Prices bill lines against the service catalog in one call."""
+
+    def __init__(self, catalog: ServiceCatalog):
+        self.catalog = catalog
+
+    def price(self, lines: Iterable[Tuple[str, float]], on: Optional[date] = None,
+              extra_lines: Optional[List[Dict]] = None, tax_rate: float = 0.0,
+              discount: float = 0.0, discount_rate: float = 0.0) -> Dict:
+        """
+        Price a bill.
+
+        Tax is charged on the subtotal and discounts are taken off after
+        tax, as on the bill form. discount_rate is a percentage discount
+        on the subtotal; discount is a fixed amount on top of it.
+
+        Args:
+            lines: (service_id, quantity) pairs
+            on: Pricing date for effective-dated prices (defaults to today)
+            extra_lines: Non-catalog charges such as room charges, each a
+                dictionary with 'name', 'amount' and optional 'category'
+            tax_rate: Tax rate as a fraction
+            discount: Fixed discount amount
+            discount_rate: Percentage discount as a fraction
+
+        Returns:
+            Dictionary with priced 'lines' (service_id, name, code,
+            category, department, cost, quantity, total), 'subtotal',
+            'tax_amount', 'discount', 'total_amount'
+        """
+        self.catalog.refresh()
+        services = self.catalog.services
+        day = (on or date.today()).isoformat()
+        lines = [(service_id, quantity) for service_id, quantity in lines if quantity]
+        priced = []
+        unit_prices = np.empty(len(lines))
+        quantities = np.empty(len(lines))
+
+        for i, (service_id, quantity) in enumerate(lines):
+            service = services.get(service_id)
+            if service is None:
+                raise PricingError(f"Unknown service {service_id}")
+            if not service.get('active', True):
+                raise PricingError(f"Service {service.get('name', service_id)} is inactive")
+            unit_prices[i] = self.catalog._price_on(service_id, day)
+            quantities[i] = quantity
+            priced.append({
+                'service_id': service_id,
+                'name': service.get('name'),
+                'code': service.get('code'),
+                'category': service.get('category'),
+                'department': service.get('department'),
+            })
+
+        totals = (unit_prices * quantities).round(2)
+        for line, unit_price, quantity, total in zip(priced, unit_prices, quantities, totals):
+            line.update({'cost': float(unit_price), 'quantity': int(quantity) if float(quantity).is_integer()
+                         else float(quantity), 'total': float(total)})
+
+        extra_total = sum(float(line.get('amount', 0) or 0) for line in extra_lines or [])
+        subtotal = round(float(totals.sum()) + extra_total, 2)
+        tax_amount = round(subtotal * tax_rate, 2)
+        total_discount = round(min(subtotal + tax_amount, subtotal * discount_rate + discount), 2)
+
+        return {
+            'lines': priced,
+            'subtotal': subtotal,
+            'tax_rate': tax_rate,
+            'tax_amount': tax_amount,
+            'discount': total_discount,
+            'total_amount': round(subtotal + tax_amount - total_discount, 2)
+        }
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    random.seed(19)
+    with tempfile.TemporaryDirectory() as data_dir:
+        categories = ['Consultation', 'Diagnostic', 'Laboratory', 'Surgery', 'Radiology', 'Therapy']
+        services = {
+            f"SRV_{i:05d}": {'name': f"Procedure {i}", 'code': f"{10000 + i}",
+                             'category': random.choice(categories), 'cost': float(random.randint(20, 9000)),
+                             'active': True}
+            for i in range(1, 8001)
+        }
+        atomic_write_json(os.path.join(data_dir, "services.json"), services)
+
+        catalog = ServiceCatalog(os.path.join(data_dir, "services.json"),
+                                 os.path.join(data_dir, "price_lists.json"))
+        price_lists = {
+            service_id: [{'effective_from': (date.today() - timedelta(days=365 * k)).isoformat(),
+                          'price': service['cost'] * (1 - 0.05 * k), 'version': 4 - k} for k in range(4)]
+            for service_id, service in services.items()
+        }
+        atomic_write_json(os.path.join(data_dir, "price_lists.json"), price_lists)
+
+        start = time.perf_counter()
+        catalog.refresh()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        engine = PricingEngine(catalog)
+        service_ids = list(services)
+        bills = [[(random.choice(service_ids), random.randint(1, 3)) for _ in range(25)] for _ in range(1000)]
+        start = time.perf_counter()
+        for lines in bills:
+            engine.price(lines, on=date.today() - timedelta(days=400), tax_rate=0.085, discount=10)
+        pricing_ms = (time.perf_counter() - start) * 1000
+
+        print(f"Indexed {len(services)} services with 4 price versions each in {load_ms:.0f} ms")
+        print(f"Priced 1000 bills of 25 lines in {pricing_ms:.0f} ms ({pricing_ms * 1000 / 25000:.1f} us per line)")
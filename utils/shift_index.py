@@ -0,0 +1,301 @@
+import bisect
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.roster_solver import DEFAULT_RULES
+
+DEFAULT_MAX_WEEKLY_HOURS = 60
+
+WEEK_MINUTES = 7 * 24 * 60
+
+# Shifts in these states do not occupy the staff member
+INACTIVE_SHIFT_STATUSES = ('Cancelled',)
+
+Interval = Tuple[int, int, str]  # (start minute, end minute, shift id)
+
+
+def shift_interval(shift: Dict) -> Optional[Tuple[int, int]]:
+    """
+    Start and end of a shift in minutes since 0001-01-01.
+
+    A shift whose end time is not after its start time ends the next day.
+
+    Returns:
+        (start, end), or None if the date or times cannot be read
+    """
+    try:
+        day = date.fromisoformat(str(shift['shift_date'])[:10]).toordinal() * 1440
+        start_h, start_m = (int(part) for part in str(shift['start_time']).split(':')[:2])
+        end_h, end_m = (int(part) for part in str(shift['end_time']).split(':')[:2])
+    except (KeyError, ValueError):
+        return None
+    start = day + start_h * 60 + start_m
+    end = day + end_h * 60 + end_m
+    return start, end if end > start else end + 1440
+
+
+def to_minutes(moment: datetime) -> int:
+    """Minutes since 0001-01-01 of a datetime."""
+    return moment.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+
+class ShiftIndex:
+    """
+    Interval index over shifts.json for working-time compliance checks.
+
+    Each employee's shifts are kept as (start, end) minute intervals
+    sorted by start, and all shifts together in one more sorted list.
+    Since no shift is longer than the longest one seen (proposed shifts
+    included), every interval that can overlap [s, e) starts within
+    (s - longest, e), so overlaps, hours in a window and who is on duty
+    at a moment are a bisection plus a scan of the few neighbouring
+    shifts.
+
+    check() tests a proposed shift for double-booking, the minimum rest
+    between shifts and the rolling 7-day hour limit; check_many() does
+    the same for a batch such as an imported or generated roster, with
+    each shift also checked against the others in the batch.
+    """
+
+    def __init__(self, shifts_file: str = "data/shifts.json",
+                 max_weekly_hours: float = DEFAULT_MAX_WEEKLY_HOURS,
+                 min_rest_hours: float = DEFAULT_RULES['min_rest_hours']):
+        self.shifts_file = shifts_file
+        self.max_weekly_hours = max_weekly_hours
+        self.min_rest_hours = min_rest_hours
+        self._stamp = None
+        self.shifts: Dict[str, Dict] = {}
+        self._by_employee: Dict[str, List[Interval]] = {}
+        self._all: List[Interval] = []
+        self._longest = 0
+
+    def refresh(self) -> None:
+        """Rebuild the index if shifts.json changed outside this index."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        self.shifts = self._load_json(self.shifts_file)
+        self._by_employee = {}
+        self._all = []
+        self._longest = 0
+        for shift_id, shift in self.shifts.items():
+            self._insert(shift_id, shift, sort=False)
+        for intervals in self._by_employee.values():
+            intervals.sort()
+        self._all.sort()
+        self._stamp = stamp
+
+    def add(self, shift_id: str, shift: Dict) -> None:
+        """Index a shift just written to shifts.json, without rebuilding."""
+        self.refresh()
+        if shift_id in self.shifts:
+            return  # the refresh read it from the file already
+        self.shifts[shift_id] = shift
+        self._insert(shift_id, shift)
+        self._stamp = self._file_stamp()
+
+    def overlapping(self, employee_id: str, start: int, end: int) -> List[str]:
+        """Shifts of an employee overlapping [start, end) minutes."""
+        self.refresh()
+        return [shift_id for _, _, shift_id in self._window(self._by_employee.get(employee_id, []), start, end)]
+
+    def hours_between(self, employee_id: str, start: int, end: int) -> float:
+        """Hours an employee is scheduled within [start, end) minutes."""
+        self.refresh()
+        return self._hours(self._by_employee.get(employee_id, []), start, end)
+
+    def rolling_hours(self, employee_id: str, start: int, end: int, extra: Iterable[Interval] = ()) -> float:
+        """
+        Most hours an employee would work in any 7 days with a shift [start, end) added.
+
+        Args:
+            extra: Intervals counted in addition to the indexed shifts
+        """
+        self.refresh()
+        self._longest = max(self._longest, end - start)
+        intervals = self._merged(employee_id, extra)
+        bisect.insort(intervals, (start, end, ''))
+        return self._peak_hours(intervals, end)
+
+    def on_duty(self, at: datetime, department: Optional[str] = None) -> List[str]:
+        """Shifts in progress at a moment, optionally in one department."""
+        self.refresh()
+        moment = to_minutes(at)
+        return [shift_id for _, _, shift_id in self._window(self._all, moment, moment + 1)
+                if department is None or self.shifts[shift_id].get('department') == department]
+
+    def check(self, shift: Dict, extra: Iterable[Interval] = (), ignore: Iterable[str] = ()) -> List[Dict]:
+        """
+        Working-time rule violations a proposed shift would cause.
+
+        Args:
+            shift: Shift record with 'employee_id', 'shift_date',
+                'start_time' and 'end_time'
+            extra: Other proposed intervals of the same employee
+            ignore: Shift ids to leave out (e.g. ones being replaced)
+
+        Returns:
+            Violations, each with 'employee_id', 'date', 'rule' and 'detail'
+        """
+        self.refresh()
+        employee_id, day = shift.get('employee_id'), str(shift.get('shift_date', ''))[:10]
+        interval = shift_interval(shift)
+        if interval is None:
+            return [{'employee_id': employee_id, 'date': day, 'rule': 'Invalid shift',
+                     'detail': "Date or times could not be read"}]
+        start, end = interval
+        self._longest = max(self._longest, end - start)
+        ignore = set(ignore)
+        intervals = [entry for entry in self._merged(employee_id, extra) if entry[2] not in ignore]
+        violations = []
+
+        clashes = self._window(intervals, start, end)
+        if clashes:
+            violations.append({'employee_id': employee_id, 'date': day, 'rule': 'Overlapping shifts',
+                               'detail': "Overlaps " + ", ".join(shift_id for _, _, shift_id in clashes)})
+
+        rest = self.min_rest_hours * 60
+        near = [entry for entry in self._window(intervals, start - rest, end + rest) if entry not in clashes]
+        if near:
+            gap = min(start - other_end if other_end <= start else other_start - end
+                      for other_start, other_end, _ in near)
+            violations.append({'employee_id': employee_id, 'date': day, 'rule': 'Minimum rest',
+                               'detail': f"{gap / 60:g}h between shifts (minimum {self.min_rest_hours:g}h)"})
+
+        bisect.insort(intervals, (start, end, ''))
+        weekly = self._peak_hours(intervals, end)
+        if weekly > self.max_weekly_hours:
+            violations.append({'employee_id': employee_id, 'date': day, 'rule': 'Weekly hours',
+                               'detail': f"{weekly:g}h in 7 days (limit {self.max_weekly_hours:g}h)"})
+        return violations
+
+    def check_many(self, shifts: Iterable[Dict], ignore: Iterable[str] = ()) -> List[Dict]:
+        """
+        Check a batch of proposed shifts against the index and each other.
+
+        Shifts are checked in start order, each against the indexed shifts
+        and the batch's earlier shifts of the same employee.
+
+        Args:
+            shifts: Proposed shift records
+            ignore: Indexed shift ids the batch replaces
+
+        Returns:
+            Violations, as for check()
+        """
+        self.refresh()
+        ordered = sorted(shifts, key=lambda shift: shift_interval(shift) or (0, 0))
+        accepted: Dict[str, List[Interval]] = {}
+        violations = []
+        for n, shift in enumerate(ordered):
+            employee_id = shift.get('employee_id')
+            violations.extend(self.check(shift, accepted.get(employee_id, ()), ignore))
+            interval = shift_interval(shift)
+            if interval is not None:
+                accepted.setdefault(employee_id, []).append((interval[0], interval[1], f"new-{n + 1}"))
+        return violations
+
+    def _insert(self, shift_id: str, shift: Dict, sort: bool = True) -> None:
+        if shift.get('status') in INACTIVE_SHIFT_STATUSES:
+            return
+        interval = shift_interval(shift)
+        if interval is None:
+            return
+        entry = (interval[0], interval[1], shift_id)
+        intervals = self._by_employee.setdefault(shift.get('employee_id'), [])
+        if sort:
+            bisect.insort(intervals, entry)
+            bisect.insort(self._all, entry)
+        else:
+            intervals.append(entry)
+            self._all.append(entry)
+        self._longest = max(self._longest, interval[1] - interval[0])
+
+    def _merged(self, employee_id: str, extra: Iterable[Interval]) -> List[Interval]:
+        intervals = self._by_employee.get(employee_id, [])
+        extra = list(extra)
+        if not extra:
+            return list(intervals)
+        self._longest = max([self._longest] + [shift_end - shift_start for shift_start, shift_end, _ in extra])
+        return sorted(intervals + extra)
+
+    def _window(self, intervals: List[Interval], start: int, end: int) -> List[Interval]:
+        """Intervals overlapping [start, end): a bisection bounded by the longest shift."""
+        low = bisect.bisect_right(intervals, (start - self._longest, float('inf'), ''))
+        high = bisect.bisect_left(intervals, (end, -1, ''))
+        return [entry for entry in intervals[low:high] if entry[1] > start]
+
+    def _peak_hours(self, intervals: List[Interval], end: int) -> float:
+        """
+        Most hours in any 7-day window containing the shift ending at `end`.
+
+        The 7-day total only peaks where a shift ends, so the windows
+        ending at `end` and at each later shift end within a week are
+        enough.
+        """
+        ends = {end} | {shift_end for _, shift_end, _ in self._window(intervals, end, end + WEEK_MINUTES)
+                        if shift_end > end}
+        return max(self._hours(intervals, moment - WEEK_MINUTES, moment) for moment in ends)
+
+    def _hours(self, intervals: List[Interval], start: int, end: int) -> float:
+        return sum(min(shift_end, end) - max(shift_start, start)
+                   for shift_start, shift_end, _ in self._window(intervals, start, end)) / 60
+
+    def _file_stamp(self):
+        return os.path.getmtime(self.shifts_file) if os.path.exists(self.shifts_file) else None
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    from utils.storage import atomic_write_json
+
+    random.seed(46)
+    with tempfile.TemporaryDirectory() as data_dir:
+        times = [("07:00:00", "15:00:00"), ("15:00:00", "23:00:00"), ("23:00:00", "07:00:00"), ("08:00:00", "20:00:00")]
+        first_day = date(2026, 1, 1)
+        shifts = {}
+        for employee in range(500):
+            for offset in range(365):
+                if random.random() < 0.7:
+                    start, end = random.choice(times)
+                    shifts[f"SHF_{len(shifts) + 1:06d}"] = {
+                        'employee_id': f"E{employee:04d}", 'shift_date': (first_day + timedelta(days=offset)).isoformat(),
+                        'start_time': start, 'end_time': end, 'department': random.choice(["ICU", "Emergency"])}
+        path = os.path.join(data_dir, "shifts.json")
+        atomic_write_json(path, shifts, indent=None)
+        index = ShiftIndex(path)
+
+        started = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        proposals = [{'employee_id': f"E{random.randrange(500):04d}",
+                      'shift_date': (first_day + timedelta(days=random.randrange(365))).isoformat(),
+                      'start_time': "07:00:00", 'end_time': "19:00:00"} for _ in range(10_000)]
+        started = time.perf_counter()
+        rejected = sum(1 for proposal in proposals if index.check(proposal))
+        check_us = (time.perf_counter() - started) * 1e6 / len(proposals)
+
+        moments = [datetime(2026, 1, 1) + timedelta(minutes=random.randrange(365 * 1440)) for _ in range(1000)]
+        started = time.perf_counter()
+        on_duty = sum(len(index.on_duty(moment)) for moment in moments)
+        duty_us = (time.perf_counter() - started) * 1e6 / len(moments)
+
+        print(f"Indexed {len(shifts)} shifts of 500 staff in {build_ms:.0f} ms")
+        print(f"Shift checks (overlap, rest, rolling 7-day hours): {check_us:.0f} us each, "
+              f"{rejected} of {len(proposals)} rejected")
+        print(f"On duty at T: {duty_us:.0f} us per query ({on_duty / len(moments):.0f} staff on average)")
@@ -0,0 +1,303 @@
+import bisect
+import heapq
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set
+
+# Searchable fields and how much a match in each counts towards a result's rank
+SEARCH_FIELDS = {
+    'full_name': 3.0,
+    'employee_id': 3.0,
+    'specialization': 2.0,
+    'role': 1.0,
+    'department': 1.0
+}
+
+# Share of a field's weight earned by each kind of match
+MATCH_WEIGHTS = {
+    'exact': 1.0,
+    'prefix': 0.8,
+    'typo': 0.5
+}
+
+# Query tokens shorter than this only match exactly or as a prefix
+MIN_TYPO_LENGTH = 4
+
+# Query tokens of at least this length may be two edits away; shorter ones one edit
+TWO_TYPO_LENGTH = 8
+
+# Letters and digits split, so "EMP-0042" and "emp0042" both read as "emp", "0042"
+_TOKEN = re.compile(r"[a-z]+|[0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    """Lower-case runs of letters and of digits in a value."""
+    return _TOKEN.findall(str(text or "").lower())
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance between two tokens.
+
+    Insertions, deletions, substitutions and swaps of adjacent characters
+    each count as one edit. Returns limit + 1 as soon as the distance is
+    known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(token: str, depth: int) -> Set[str]:
+    """The token and every string made by removing up to `depth` of its characters."""
+    variants = {token}
+    frontier = {token}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class StaffSearchIndex:
+    """
+    Search index over the staff directory in staff.json.
+
+    Name, employee id, role, department and specialization are split into
+    lower-case tokens, and each token maps to the staff carrying it with
+    the weight of the best field it came from. Tokens are also kept in a
+    sorted list, so every token starting with a query term is one
+    bisection away, and each token's one- and two-character deletions
+    point back to it, so tokens within one or two typos of a query term
+    are found by looking up the term's own deletions (as in SymSpell)
+    and confirming the distance.
+
+    A query matches staff that have every query term as a whole token, a
+    token prefix or, for longer terms, a near miss; results are ranked by
+    how strong and in which field each term matched. add() and remove()
+    update the index for a single member, so adding or editing staff does
+    not rebuild it.
+    """
+
+    def __init__(self, staff_file: str = "data/staff.json"):
+        self.staff_file = staff_file
+        self._stamp = None
+        self.staff: Dict[str, Dict] = {}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._member_tokens: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._near: Dict[str, Set[str]] = {}
+
+    def refresh(self) -> None:
+        """Rebuild the index if staff.json changed outside this index."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        self.staff = self._load_json(self.staff_file)
+        self._postings = {}
+        self._member_tokens = {}
+        self._near = {}
+        for staff_id, member in self.staff.items():
+            self._index(staff_id, member)
+        self._vocabulary = sorted(self._postings)
+        for token in self._vocabulary:
+            self._add_near(token)
+        self._stamp = stamp
+
+    def add(self, staff_id: str, member: Dict) -> None:
+        """Index a member just added to or edited in staff.json, without rebuilding."""
+        self.refresh()
+        self._unindex(staff_id)
+        self.staff[staff_id] = member
+        for token in self._index(staff_id, member):
+            bisect.insort(self._vocabulary, token)
+            self._add_near(token)
+        self._stamp = self._file_stamp()
+
+    def remove(self, staff_id: str) -> None:
+        """Drop a member just removed from staff.json."""
+        self.refresh()
+        self._unindex(staff_id)
+        self.staff.pop(staff_id, None)
+        self._stamp = self._file_stamp()
+
+    def search(self, query: str, department: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Staff ids matching a free-text query, best match first.
+
+        Args:
+            query: Words to look for; the last may be partly typed
+            department: Only staff of this department
+            limit: Most results to return
+
+        Returns:
+            Matching staff ids; every member (in file order) if the query is empty
+        """
+        self.refresh()
+        terms = tokenize(query)
+        if not terms:
+            return [staff_id for staff_id, member in self.staff.items()
+                    if department is None or member.get('department') == department][:limit]
+
+        # Rarest term first, so the others only score the members still in the running
+        matches = sorted((self._term_matches(term) for term in dict.fromkeys(terms)),
+                         key=lambda tokens: sum(len(self._postings[token]) for token in tokens))
+        scores: Optional[Dict[str, float]] = None
+        for tokens in matches:
+            term_scores = self._term_scores(tokens, scores)
+            scores = term_scores if scores is None else {staff_id: score + term_scores[staff_id]
+                                                        for staff_id, score in scores.items()
+                                                        if staff_id in term_scores}
+            if not scores:
+                return []
+
+        if department is not None:
+            scores = {staff_id: score for staff_id, score in scores.items()
+                      if self.staff[staff_id].get('department') == department}
+        key = lambda staff_id: (-scores[staff_id], self.staff[staff_id].get('full_name', ''), staff_id)
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=key)
+        return sorted(scores, key=key)
+
+    def _term_matches(self, term: str) -> Dict[str, str]:
+        """Indexed tokens matching one query term, with the kind of match."""
+        matches = {}
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff", start)
+        for token in self._vocabulary[start:end]:
+            matches[token] = 'exact' if token == term else 'prefix'
+
+        # Ids and other numbers are not typo-corrected: one digit off is another person
+        if len(term) >= MIN_TYPO_LENGTH and term.isalpha():
+            limit = 2 if len(term) >= TWO_TYPO_LENGTH else 1
+            candidates = set()
+            for variant in _deletes(term, limit):
+                candidates |= self._near.get(variant, set())
+            for token in candidates:
+                if token not in matches and edit_distance(term, token, limit) <= limit:
+                    matches[token] = 'typo'
+        return matches
+
+    def _term_scores(self, matches: Dict[str, str], within: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """Best score of each member for one query term, optionally only for members in `within`."""
+        scores: Dict[str, float] = {}
+        for token, match in matches.items():
+            postings = self._postings[token]
+            if within is not None and len(within) < len(postings):
+                postings = {staff_id: postings[staff_id] for staff_id in within if staff_id in postings}
+            weight = MATCH_WEIGHTS[match]
+            for staff_id, field_weight in postings.items():
+                score = field_weight * weight
+                if score > scores.get(staff_id, 0.0):
+                    scores[staff_id] = score
+        return scores
+
+    def _index(self, staff_id: str, member: Dict) -> List[str]:
+        """Post a member's tokens; returns the tokens new to the vocabulary."""
+        tokens: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(member.get(field)):
+                tokens[token] = max(tokens.get(token, 0.0), weight)
+
+        new = []
+        for token, weight in tokens.items():
+            postings = self._postings.setdefault(token, {})
+            if not postings:
+                new.append(token)
+            postings[staff_id] = weight
+        self._member_tokens[staff_id] = tokens
+        return new
+
+    def _unindex(self, staff_id: str) -> None:
+        for token in self._member_tokens.pop(staff_id, {}):
+            postings = self._postings[token]
+            postings.pop(staff_id, None)
+            if postings:
+                continue
+            del self._postings[token]
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+            for variant in _deletes(token, 2):
+                tokens = self._near.get(variant)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._near[variant]
+
+    def _add_near(self, token: str) -> None:
+        if len(token) >= MIN_TYPO_LENGTH - 1:
+            for variant in _deletes(token, 2):
+                self._near.setdefault(variant, set()).add(token)
+
+    def _file_stamp(self):
+        return os.path.getmtime(self.staff_file) if os.path.exists(self.staff_file) else None
+
+    def _load_json(self, filename: str) -> Dict:
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {}
+        return {}
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    from utils.storage import atomic_write_json
+
+    random.seed(48)
+    first_names = ["Amina", "Ahmed", "Sara", "John", "Johanna", "Fatima", "Omar", "Maria", "David", "Aisha",
+                   "Michael", "Zainab", "Hassan", "Emily", "Yusuf", "Grace", "Bilal", "Hannah", "Imran", "Laura"]
+    last_names = ["Khan", "Hassan", "Smith", "Johnson", "Malik", "Garcia", "Ahmed", "Brown", "Qureshi", "Wilson",
+                  "Siddiqui", "Taylor", "Chaudhry", "Martin", "Raza", "Anderson", "Butt", "Thomas", "Sheikh", "Moore"]
+    roles = ["Doctor", "Nurse", "Technician", "Administrator", "Pharmacist", "Therapist", "Security", "Maintenance"]
+    departments = ["Emergency", "ICU", "Surgery", "Cardiology", "Pediatrics", "Radiology", "Laboratory", "Pharmacy"]
+    specializations = ["", "Critical Care", "Pediatric Nursing", "Interventional Cardiology", "Phlebotomy",
+                       "Anesthesiology", "Orthopedics", "Neonatal Care", "Oncology", "BLS Certified"]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        staff = {}
+        for i in range(10_000):
+            first, last = random.choice(first_names), random.choice(last_names)
+            staff[f"STF_{i + 1:05d}"] = {
+                'full_name': f"{first}{random.choice(['', 'a', 'e', 'i'])} {last}", 'employee_id': f"EMP-{i + 1:05d}",
+                'role': random.choice(roles), 'department': random.choice(departments),
+                'specialization': random.choice(specializations), 'status': 'Active'}
+        path = os.path.join(data_dir, "staff.json")
+        atomic_write_json(path, staff, indent=None)
+        index = StaffSearchIndex(path)
+
+        started = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for query in ["hassan", "joh", "jonhson", "nurse icu", "emp-00042", "emp00042", "cardiolgy", "siddiqi nurse", "a"]:
+            started = time.perf_counter()
+            for _ in range(100):
+                results = index.search(query)
+            query_ms = (time.perf_counter() - started) * 1000 / 100
+            print(f"{query!r:>16}: {len(results):5d} matches in {query_ms:.2f} ms")
+
+        started = time.perf_counter()
+        for n in range(100):
+            staff_id = f"STF_{random.randint(1, 10_000):05d}"
+            index.add(staff_id, dict(index.staff[staff_id], specialization=f"Wound Care {n}"))
+        update_ms = (time.perf_counter() - started) * 1000 / 100
+
+        print(f"Indexed {len(staff)} staff ({len(index._vocabulary)} tokens) in {build_ms:.0f} ms; "
+              f"{update_ms:.2f} ms per edit")
@@ -0,0 +1,432 @@
+import bisect
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.storage import append_jsonl, file_lock, iter_jsonl, iter_jsonl_complete
+
+# Sign applied to the quantity of each movement type; adjustments are
+# recorded with the sign they are given.
+MOVEMENT_TYPES = {
+    'receipt': 1,
+    'issue': -1,
+    'adjustment': 0,
+    'expiry': -1
+}
+
+# Lot that opening balances are booked to
+OPENING_LOT = 'OPENING'
+
+# Lot that stock added without a lot number is booked to
+UNLOTTED = 'UNLOTTED'
+
+
+class StockError(Exception):
+    """Raised when a stock movement cannot be recorded."""
+
+
+class StockLedger:
+    """
+    Append-only ledger of stock movements with periodic snapshots.
+
+    Receipts, issues, adjustments and expiries are appended to a JSON
+    lines file, one signed movement per line, in time order. Every
+    `snapshot_interval` movements the on-hand quantity of every item is
+    written as a snapshot together with the movement file offset it
+    covers. On-hand at any point in time is the latest snapshot taken at
+    or before it plus the movements after the snapshot, so neither
+    current nor historical quantities need a replay of the full history.
+
+    Every movement is booked to a lot, so an item's lots always add up
+    to its total: stock added without a lot number goes to the UNLOTTED
+    lot, and removals must name the lot they come from (LotTracker picks
+    them first-expiry-first-out). Receipts into a lot carry its expiry
+    date and unit cost. Current per-lot quantities are kept alongside
+    the item totals and included in the snapshots.
+
+    Snapshot bodies go to `snapshots_file`; a small header per snapshot
+    (sequence number, timestamp, offsets) goes to `snapshot_index_file`
+    so the headers can be kept in memory.
+
+    The movement file offset only moves past complete lines, so a batch
+    still being appended when another process reads is picked up whole
+    later. Sequence numbers are consecutive; after a gap the ledger stays
+    before it, and neither records movements nor writes snapshots until
+    the missing movement is back.
+    """
+
+    def __init__(self, movements_file: str = "data/stock_movements.jsonl",
+                 snapshots_file: str = "data/stock_snapshots.jsonl",
+                 snapshot_interval: int = 1000):
+        self.movements_file = movements_file
+        self.snapshots_file = snapshots_file
+        self.snapshot_index_file = os.path.splitext(snapshots_file)[0] + "_index.jsonl"
+        self.lock_file = movements_file + ".lock"
+        self.snapshot_interval = snapshot_interval
+
+        self.quantities: Dict[str, float] = {}
+        self.lots: Dict[str, Dict[str, Dict]] = {}
+        self._listeners: List[Callable[[Dict], None]] = []
+        self.offset = 0
+        self.next_seq = 1
+        self.gap: Optional[int] = None
+        self.last_timestamp = ""
+        self._snapshots: List[Dict] = list(iter_jsonl(self.snapshot_index_file))
+        self._snapshot_times = [header['timestamp'] for header in self._snapshots]
+
+        if self._snapshots:
+            latest = self._snapshots[-1]
+            body = self._read_snapshot_body(latest)
+            self.quantities = dict(body['quantities'])
+            self.lots = body.get('lots', {})
+            self.offset = latest['offset']
+            self.next_seq = latest['seq'] + 1
+            self.last_timestamp = latest['timestamp']
+        self._catch_up()
+
+    def subscribe(self, listener: Callable[[Dict], None]) -> None:
+        """
+        Call `listener` with every movement applied from now on.
+
+        Covers movements recorded through this instance and movements
+        appended by other processes and picked up on catch-up.
+        """
+        self._listeners.append(listener)
+
+    def refresh(self) -> None:
+        """Apply movements appended by other processes."""
+        self._catch_up()
+
+    def is_empty(self) -> bool:
+        """Whether no movement has been recorded yet."""
+        self._catch_up()
+        return self.next_seq == 1
+
+    def record(self, item_id: str, movement_type: str, quantity: float, reference: Optional[str] = None,
+               note: Optional[str] = None, timestamp: Optional[str] = None, **extra) -> Dict:
+        """
+        Record one stock movement.
+
+        Args:
+            item_id: Inventory item identifier
+            movement_type: 'receipt', 'issue', 'adjustment' or 'expiry'
+            quantity: Units moved; receipts add and issues/expiries remove
+                stock whatever the sign given, adjustments are signed
+            reference: Optional document reference (PO, ward, ...)
+            note: Optional free text
+            lot: Lot number (pass expiry_date and unit_cost on receipts
+                into a new lot); required when removing stock, defaults
+                to UNLOTTED when adding it
+            timestamp: ISO timestamp (defaults to now); must not be earlier
+                than the last recorded movement
+            **extra: Further fields to store on the movement
+
+        Returns:
+            The movement as written
+        """
+        return self.record_many([dict(extra, item_id=item_id, type=movement_type, quantity=quantity,
+                                      reference=reference, note=note, timestamp=timestamp)])[0]
+
+    def record_many(self, movements: Iterable[Dict]) -> List[Dict]:
+        """
+        Record several movements with a single append.
+
+        The batch is checked as a whole first: if any movement is invalid,
+        removes stock without naming a lot, or would take an item or lot
+        below zero, nothing is written.
+
+        Args:
+            movements: Dictionaries with the arguments of record()
+
+        Returns:
+            The movements as written, in order
+        """
+        with file_lock(self.lock_file):
+            return self._record_many(movements)
+
+    def _record_many(self, movements: Iterable[Dict]) -> List[Dict]:
+        """Check and record a batch of movements; the caller holds the lock."""
+        self._catch_up()
+        if self.gap is not None:
+            raise StockError(f"Stock movement {self.next_seq} is missing (next found is {self.gap}); "
+                             f"not recording until it is restored")
+        now = datetime.now().isoformat()
+        pending: Dict[str, float] = {}
+        pending_lots: Dict[Tuple[str, str], float] = {}
+        last_timestamp = self.last_timestamp
+        written = []
+
+        for seq, movement in enumerate(movements, start=self.next_seq):
+            movement_type = movement.get('type')
+            if movement_type not in MOVEMENT_TYPES:
+                raise StockError(f"Unknown movement type '{movement_type}'")
+            sign = MOVEMENT_TYPES[movement_type]
+            quantity = float(movement.get('quantity') or 0)
+            quantity = sign * abs(quantity) if sign else quantity
+            if not quantity:
+                raise StockError(f"Movement for {movement.get('item_id')} has no quantity")
+
+            timestamp = movement.get('timestamp') or now
+            if timestamp < last_timestamp:
+                raise StockError(f"Movement at {timestamp} is earlier than the last one ({last_timestamp})")
+            last_timestamp = timestamp
+
+            item_id = movement['item_id']
+            on_hand = pending.get(item_id, self.quantities.get(item_id, 0.0)) + quantity
+            if on_hand < 0:
+                raise StockError(f"Not enough stock of {item_id}: {on_hand - quantity:g} on hand")
+            pending[item_id] = on_hand
+
+            lot = movement.get('lot')
+            if not lot:
+                if quantity < 0:
+                    raise StockError(f"Removing stock of {item_id} needs a lot number")
+                lot = UNLOTTED
+            lot_quantity = pending_lots.get(
+                (item_id, lot), self.lots.get(item_id, {}).get(lot, {}).get('quantity', 0.0)) + quantity
+            if lot_quantity < 0:
+                raise StockError(f"Not enough stock in lot {lot} of {item_id}: "
+                                 f"{lot_quantity - quantity:g} on hand")
+            pending_lots[(item_id, lot)] = lot_quantity
+
+            written.append({key: value for key, value in dict(
+                movement, seq=seq, quantity=quantity, timestamp=timestamp, lot=lot).items()
+                if value is not None})
+
+        self._append(written)
+        return written
+
+    def on_hand(self, item_id: str, at: Optional[str] = None) -> float:
+        """
+        On-hand quantity of an item, now or at a point in time.
+
+        Args:
+            item_id: Inventory item identifier
+            at: ISO date or timestamp; a bare date means the end of that day
+
+        Returns:
+            Quantity on hand
+        """
+        return self.on_hand_all(at).get(item_id, 0.0)
+
+    def on_hand_all(self, at: Optional[str] = None) -> Dict[str, float]:
+        """On-hand quantity of every item, now or at a point in time (see on_hand())."""
+        self._catch_up()
+        if at is None or self._until(at) >= self.last_timestamp:
+            return dict(self.quantities)
+
+        until = self._until(at)
+        position = bisect.bisect_right(self._snapshot_times, until) - 1
+        if position >= 0:
+            quantities = self._read_snapshot(self._snapshots[position])
+            offset = self._snapshots[position]['offset']
+        else:
+            quantities, offset = {}, 0
+
+        for movement in iter_jsonl(self.movements_file, offset=offset):
+            if movement['timestamp'] > until:
+                break
+            quantities[movement['item_id']] = quantities.get(movement['item_id'], 0.0) + movement['quantity']
+        return quantities
+
+    def movements(self, item_id: Optional[str] = None, start: Optional[str] = None,
+                  end: Optional[str] = None, types: Optional[Tuple[str, ...]] = None) -> Iterator[Dict]:
+        """
+        Movements in time order, optionally filtered.
+
+        Starts reading at the latest snapshot before `start`, so a recent
+        window does not scan the whole history.
+
+        Args:
+            item_id: Only movements of this item
+            start: ISO date or timestamp of the first movement to include
+            end: ISO date or timestamp of the last movement to include
+            types: Only these movement types
+        """
+        offset = 0
+        if start:
+            position = bisect.bisect_left(self._snapshot_times, start) - 1
+            if position >= 0:
+                offset = self._snapshots[position]['offset']
+        until = self._until(end) if end else None
+
+        for movement in iter_jsonl(self.movements_file, offset=offset):
+            if start and movement['timestamp'] < start:
+                continue
+            if until and movement['timestamp'] > until:
+                break
+            if (item_id is None or movement['item_id'] == item_id) and (types is None or movement['type'] in types):
+                yield movement
+
+    def daily_on_hand(self, item_id: str, start: date, end: date) -> List[Tuple[str, float]]:
+        """
+        End-of-day on-hand quantity of an item for each day of a range.
+
+        Returns:
+            List of (ISO date, quantity)
+        """
+        quantity = self.on_hand(item_id, (start - timedelta(days=1)).isoformat())
+        deltas: Dict[str, float] = {}
+        for movement in self.movements(item_id, start.isoformat(), end.isoformat()):
+            day = movement['timestamp'][:10]
+            deltas[day] = deltas.get(day, 0.0) + movement['quantity']
+
+        series = []
+        for offset in range((end - start).days + 1):
+            day = (start + timedelta(days=offset)).isoformat()
+            quantity += deltas.get(day, 0.0)
+            series.append((day, quantity))
+        return series
+
+    def bootstrap(self, inventory: Dict[str, Dict], timestamp: Optional[str] = None) -> int:
+        """
+        Record opening balances for items counted before the ledger existed.
+
+        Args:
+            inventory: Inventory records keyed by item id (uses 'quantity',
+                and 'expiry_date' and 'cost_per_unit' for the opening lot)
+            timestamp: As-of time of the balances (defaults to now)
+
+        Does nothing if the ledger already has movements.
+
+        Returns:
+            Number of movements recorded
+        """
+        opening = [{'item_id': item_id, 'type': 'adjustment', 'quantity': float(item.get('quantity', 0) or 0),
+                    'lot': OPENING_LOT, 'expiry_date': item.get('expiry_date') or None,
+                    'unit_cost': item.get('cost_per_unit'), 'note': 'Opening balance', 'timestamp': timestamp}
+                   for item_id, item in inventory.items() if float(item.get('quantity', 0) or 0)]
+        with file_lock(self.lock_file):
+            self._catch_up()
+            if self.next_seq != 1 or self.gap is not None:
+                return 0
+            return len(self._record_many(opening)) if opening else 0
+
+    def snapshot(self) -> None:
+        """Write a snapshot of the current quantities; the caller holds the lock."""
+        if self.gap is not None:
+            return
+        body = json.dumps({'seq': self.next_seq - 1, 'quantities': self.quantities, 'lots': self.lots})
+        os.makedirs(os.path.dirname(self.snapshots_file) or ".", exist_ok=True)
+        with open(self.snapshots_file, 'a') as f:
+            position = f.tell()
+            f.write(body + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        header = {'seq': self.next_seq - 1, 'timestamp': self.last_timestamp,
+                  'offset': self.offset, 'position': position}
+        append_jsonl(self.snapshot_index_file, [header])
+        self._snapshots.append(header)
+        self._snapshot_times.append(header['timestamp'])
+
+    def _append(self, movements: List[Dict]) -> None:
+        """Append and apply movements; the caller holds the lock."""
+        if not movements:
+            return
+        append_jsonl(self.movements_file, movements)
+        for movement in movements:
+            self._apply(movement)
+        self.offset = os.path.getsize(self.movements_file)
+        self._notify(movements)
+
+        last_snapshot = self._snapshots[-1]['seq'] if self._snapshots else 0
+        if self.next_seq - 1 - last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def _apply(self, movement: Dict) -> None:
+        item_id = movement['item_id']
+        self.quantities[item_id] = self.quantities.get(item_id, 0.0) + movement['quantity']
+        # Movements written before every movement carried a lot count as UNLOTTED
+        entry = self.lots.setdefault(item_id, {}).setdefault(
+            movement.get('lot') or UNLOTTED, {'quantity': 0.0, 'expiry_date': None, 'unit_cost': None})
+        entry['quantity'] += movement['quantity']
+        for field in ('expiry_date', 'unit_cost'):
+            if movement.get(field) is not None:
+                entry[field] = movement[field]
+        self.next_seq = movement['seq'] + 1
+        self.last_timestamp = movement['timestamp']
+
+    def _catch_up(self) -> None:
+        """Apply movements appended since this instance last looked."""
+        if not os.path.exists(self.movements_file):
+            return
+        size = os.path.getsize(self.movements_file)
+        if size == self.offset:
+            return
+
+        applied = []
+        self.gap = None
+        for movement, end in iter_jsonl_complete(self.movements_file, offset=self.offset):
+            if movement is not None and movement['seq'] > self.next_seq:
+                # An earlier movement is missing; stay before it and re-read from here next time
+                self.gap = movement['seq']
+                break
+            if movement is not None and movement['seq'] == self.next_seq:
+                self._apply(movement)
+                applied.append(movement)
+            self.offset = end
+        self._notify(applied)
+
+        # Pick up snapshots written by other processes
+        for header in iter_jsonl(self.snapshot_index_file):
+            if not self._snapshots or header['seq'] > self._snapshots[-1]['seq']:
+                self._snapshots.append(header)
+                self._snapshot_times.append(header['timestamp'])
+
+    def _notify(self, movements: List[Dict]) -> None:
+        for listener in self._listeners:
+            for movement in movements:
+                listener(movement)
+
+    def _read_snapshot(self, header: Dict) -> Dict[str, float]:
+        return dict(self._read_snapshot_body(header)['quantities'])
+
+    def _read_snapshot_body(self, header: Dict) -> Dict:
+        with open(self.snapshots_file, 'r') as f:
+            f.seek(header['position'])
+            return json.loads(f.readline())
+
+    def _until(self, at: str) -> str:
+        """Upper bound for comparisons with timestamps; a bare date covers the whole day."""
+        return at + "T23:59:59.999999" if len(at) == 10 else at
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    random.seed(40)
+    with tempfile.TemporaryDirectory() as data_dir:
+        ledger = StockLedger(os.path.join(data_dir, "stock_movements.jsonl"),
+                             os.path.join(data_dir, "stock_snapshots.jsonl"))
+        items = [f"SUP_{i:04d}" for i in range(2000)]
+        ledger.record_many({'item_id': item_id, 'type': 'receipt', 'quantity': 10_000,
+                            'timestamp': "2025-01-01T00:00:00"} for item_id in items)
+
+        # A year of usage, a day per batch
+        start = time.perf_counter()
+        day = date(2025, 1, 2)
+        for _ in range(365):
+            ledger.record_many({'item_id': random.choice(items), 'type': 'issue', 'lot': UNLOTTED,
+                                'quantity': random.randint(1, 5), 'timestamp': f"{day}T{hour:02d}:00:00"}
+                               for hour in range(8, 20) for _ in range(50))
+            day += timedelta(days=1)
+        record_s = time.perf_counter() - start
+        count = ledger.next_seq - 1
+
+        start = time.perf_counter()
+        reopened = StockLedger(ledger.movements_file, ledger.snapshots_file)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for month in range(1, 13):
+            reopened.on_hand(items[0], f"2025-{month:02d}-15")
+        history_ms = (time.perf_counter() - start) * 1000 / 12
+
+        print(f"Recorded {count} movements in {record_s:.1f}s ({count / record_s:,.0f}/s), "
+              f"{len(reopened._snapshots)} snapshots")
+        print(f"Reopened in {load_ms:.0f} ms; on-hand at a past date in {history_ms:.1f} ms")
+        assert reopened.quantities == ledger.quantities
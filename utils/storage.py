@@ -0,0 +1,248 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+_PROCESS_LOCKS: Dict[str, threading.Lock] = {}
+_PROCESS_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """
+    Hold an exclusive lock across threads and, where supported, processes.
+
+    Args:
+        lock_path: Lock file to create and lock
+    """
+    with _PROCESS_LOCKS_GUARD:
+        thread_lock = _PROCESS_LOCKS.setdefault(os.path.abspath(lock_path), threading.Lock())
+
+    with thread_lock:
+        os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+        with open(lock_path, 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: str, data, indent: Optional[int] = 2) -> None:
+    """
+    Write JSON to a file so readers never observe a partial write.
+
+    The payload is written to a temporary file in the same directory,
+    flushed to disk and then renamed over the target.
+
+    Args:
+        path: Destination file path
+        data: JSON-serialisable object
+        indent: Indentation; None writes compact JSON, which is much
+            faster for large machine-read files such as indexes
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(data, indent=indent, default=str))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def append_jsonl(path: str, records: Iterable[Dict]) -> int:
+    """
+    Append records to a JSON-lines file in a single write.
+
+    Args:
+        path: JSON-lines file path
+        records: Records to append
+
+    Returns:
+        Number of records appended
+    """
+    lines = [json.dumps(record, default=str) for record in records]
+    if not lines:
+        return 0
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'a+b') as f:
+        # Terminate a line torn by an interrupted append so the new records stay readable
+        torn = False
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        f.write((("\n" if torn else "") + "\n".join(lines) + "\n").encode())
+        f.flush()
+        os.fsync(f.fileno())
+    return len(lines)
+
+
+def iter_jsonl(path: str, offset: int = 0) -> Iterator[Dict]:
+    """
+    Iterate over the records of a JSON-lines file.
+
+    A truncated trailing line (from an interrupted append) is skipped.
+
+    Args:
+        path: JSON-lines file path
+        offset: Byte offset to start reading from
+
+    Yields:
+        Decoded records
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r') as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_jsonl_complete(path: str, offset: int = 0) -> Iterator[Tuple[Optional[Dict], int]]:
+    """
+    Iterate over the complete lines of a JSON-lines file with their end offsets.
+
+    Unlike iter_jsonl(), a trailing line without its newline is not read
+    at all: it may be an append still in progress, so readers that keep an
+    offset should stop before it and pick it up on their next read.
+
+    Args:
+        path: JSON-lines file path
+        offset: Byte offset to start reading from
+
+    Yields:
+        (record, offset just past its line); record is None for a
+        complete line that does not decode
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                return
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), offset
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                yield None, offset
+
+
+def read_jsonl(path: str) -> List[Dict]:
+    """Load every record of a JSON-lines file."""
+    return list(iter_jsonl(path))
+
+
+def iter_json_object(path: str, predicate: Optional[Callable[[str, Any], bool]] = None,
+                     chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """
+    Iterate over the members of a JSON object file without loading it whole.
+
+    The file is read in chunks and decoded one member at a time, so memory
+    use is bounded by the chunk size and the largest single record rather
+    than by the file size. Filters passed as `predicate` run on each
+    record as it is decoded, before anything is handed to the caller.
+
+    Args:
+        path: JSON file holding one object (e.g. records keyed by id)
+        predicate: Optional filter called with (key, value)
+        chunk_size: Characters to read per chunk
+
+    Yields:
+        (key, value) pairs, in file order, that pass the predicate
+    """
+    if not os.path.exists(path):
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_space() -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number or literal only ends at a delimiter; up to then it may
+                    # continue in the next chunk ("-1" of "-1.5e3")
+                    complete = isinstance(value, (dict, list, str)) or (
+                        end < len(buffer) and (buffer[end] in ',]}' or buffer[end].isspace()))
+                    if complete or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        skip_space()
+        if pos >= len(buffer):
+            return
+        if buffer[pos] != '{':
+            raise ValueError(f"{path} does not hold a JSON object")
+        pos += 1
+
+        while True:
+            skip_space()
+            if pos >= len(buffer):
+                raise ValueError(f"{path} ends inside the JSON object")
+            if buffer[pos] == '}':
+                return
+            if buffer[pos] == ',':
+                pos += 1
+                skip_space()
+            key = decode()
+            skip_space()
+            if pos >= len(buffer) or buffer[pos] != ':':
+                raise ValueError(f"{path} is not a valid JSON object")
+            pos += 1
+            skip_space()
+            value = decode()
+            if predicate is None or predicate(key, value):
+                yield key, value